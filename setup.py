@@ -122,6 +122,7 @@ setup(
         'Programming Language :: Python :: 3.10'
         # 'Programming Language :: Python :: 3.11'
     ],
+    install_requires=['numpy'],
     extras_require={
         'test': ['tox', 'flake8', 'pytest', 'pytest-cov', 'pytest-xdist', 'mock',
                  'sagemaker', 'docker', 'boto3']
@@ -14,36 +14,118 @@
 #include <nsync.h>
 #include <sys/stat.h>
 
+#include <algorithm>
+#include <atomic>
 #include <chrono>
+#include <cstdio>
+#include <cstring>
+#include <deque>
 #include <iostream>
+#include <numeric>
+#include <random>
+#include <sstream>
 #include <string>
+#include <system_error>
 #include <thread>
+#include <vector>
 
+#include "tensorflow/core/framework/allocation_description.pb.h"
+#include "tensorflow/core/framework/cancellation.h"
 #include "tensorflow/core/framework/common_shape_fns.h"
 #include "tensorflow/core/framework/op.h"
 #include "tensorflow/core/framework/op_def_builder.h"
 #include "tensorflow/core/framework/shape_inference.h"
 #include "tensorflow/core/framework/dataset.h"
+#include "tensorflow/core/lib/hash/crc32c.h"
 #include "tensorflow/core/platform/tstring.h"
+#include "tensorflow/core/profiler/lib/traceme.h"
 
+#include "ArrowDecoder.hpp"
+#include "ArrowStreamReader.hpp"
+#include "AugmentedManifestDecoder.hpp"
+#include "BufferWaitTime.hpp"
+#include "CancellationSignal.hpp"
+#include "CsvDecoder.hpp"
+#include "FileChannelReader.hpp"
+#include "FixedLengthDecoder.hpp"
+#include "FixedLengthRecordReader.hpp"
+#include "JsonDecoder.hpp"
+#include "MemoryBudget.hpp"
+#include "ParallelStage.hpp"
 #include "PipeStateManager.hpp"
-#include "RecordIOReader.hpp"
-#include "TextLineRecordReader.hpp"
-#include "TFRecordReader.hpp"
+#include "Probes.hpp"
+#include "RecordCache.hpp"
+#include "RecordDecoder.hpp"
+#include "RecordFilter.hpp"
+#include "ReadTrace.hpp"
+#include "RecordIOProtobufDecoder.hpp"
+#include "RecordReaderRegistry.hpp"
+#include "RecordTransform.hpp"
+#include "SharedMemoryFanOut.hpp"
+#include "SharedMemoryRecordCache.hpp"
+#include "ShuffleBuffer.hpp"
+#include "SlabPool.hpp"
 
+using sagemaker::tensorflow::ArrowDecoder;
+using sagemaker::tensorflow::ArrowStreamReader;
+using sagemaker::tensorflow::AugmentedManifestDecoder;
+using sagemaker::tensorflow::CancellationSignal;
+using sagemaker::tensorflow::Batch;
+using sagemaker::tensorflow::BufferWaitTime;
+using sagemaker::tensorflow::Column;
+using sagemaker::tensorflow::Compression;
+using sagemaker::tensorflow::CsvDecoder;
+using sagemaker::tensorflow::FanOutRead;
+using sagemaker::tensorflow::FieldKind;
+using sagemaker::tensorflow::FieldSpec;
+using sagemaker::tensorflow::FieldType;
+using sagemaker::tensorflow::FileChannelOptions;
+using sagemaker::tensorflow::FileChannelReader;
+using sagemaker::tensorflow::FixedLengthDecoder;
+using sagemaker::tensorflow::FixedLengthRecordReader;
+using sagemaker::tensorflow::JsonDecoder;
+using sagemaker::tensorflow::MemoryAccount;
+using sagemaker::tensorflow::MemoryBudget;
+using sagemaker::tensorflow::ParallelStage;
+using sagemaker::tensorflow::ParseCompression;
+using sagemaker::tensorflow::PipeWaitStats;
+using sagemaker::tensorflow::ReadTracer;
+using sagemaker::tensorflow::SetReadTracer;
 using sagemaker::tensorflow::PipeStateManager;
-using sagemaker::tensorflow::RecordIOReader;
+using sagemaker::tensorflow::RecordCacheReader;
+using sagemaker::tensorflow::RecordCacheWriter;
+using sagemaker::tensorflow::RecordDecoder;
+using sagemaker::tensorflow::RecordDecoderOptions;
+using sagemaker::tensorflow::RecordFilter;
+using sagemaker::tensorflow::RecordFilterOptions;
+using sagemaker::tensorflow::RecordIOProtobufDecoder;
 using sagemaker::tensorflow::RecordReader;
-using sagemaker::tensorflow::TextLineRecordReader;
-using sagemaker::tensorflow::TFRecordReader;
+using sagemaker::tensorflow::RecordReaderRegistry;
+using sagemaker::tensorflow::RecordTransform;
+using sagemaker::tensorflow::RecoveryStats;
+using sagemaker::tensorflow::SharedMemoryCacheCursor;
+using sagemaker::tensorflow::SharedMemoryCacheWriter;
+using sagemaker::tensorflow::SharedMemoryFanOut;
+using sagemaker::tensorflow::SharedMemoryRecordCache;
+using sagemaker::tensorflow::ShuffleBuffer;
+using sagemaker::tensorflow::SlabPool;
+using sagemaker::tensorflow::SlabPoolStats;
 
+using tensorflow::AllocationDescription;
+using tensorflow::Allocator;
 using tensorflow::data::DatasetBase;
 using tensorflow::data::SerializationContext;
 using tensorflow::data::DatasetContext;
 using tensorflow::data::DatasetIterator;
 using tensorflow::data::DatasetOpKernel;
+using tensorflow::DataType;
 using tensorflow::DataTypeVector;
 using tensorflow::DEVICE_CPU;
+using tensorflow::DT_BOOL;
+using tensorflow::DT_DOUBLE;
+using tensorflow::DT_FLOAT;
+using tensorflow::DT_INT32;
+using tensorflow::DT_INT64;
 using tensorflow::DT_STRING;
 using tensorflow::data::IteratorBase;
 using tensorflow::data::IteratorContext;
@@ -53,13 +135,37 @@ using tensorflow::mutex;
 using tensorflow::OkStatus;
 using tensorflow::mutex_lock;
 using tensorflow::Node;
+using tensorflow::OpKernelConstruction;
 using tensorflow::OpKernelContext;
 using tensorflow::PartialTensorShape;
 using tensorflow::Status;
 using tensorflow::Tensor;
+using tensorflow::TensorBuffer;
 using tensorflow::TensorShape;
+using tensorflow::profiler::TraceMe;
 using tensorflow::tstring;
 
+PIPEMODE_PROBE_SEMAPHORE(record__read__start);
+PIPEMODE_PROBE_SEMAPHORE(record__read__end);
+PIPEMODE_PROBE_SEMAPHORE(queue__depth);
+
+// The number of values of the first ragged batch of an iterator, before it grows to fit its records
+#define RAGGED_INITIAL_CAPACITY 65536
+
+// The number of records framed into each task of the parallel stage, if records are not batched
+#define PARALLEL_RECORDS_PER_TASK 64
+
+// The number of tasks the parallel stage is kept supplied with, per worker thread
+#define PARALLEL_TASKS_PER_THREAD 2
+
+// How long a shared memory fan-out leader waits for room in a full ring, and a consumer for
+// records in an empty ring, before trying again
+#define FANOUT_POLL_INTERVAL std::chrono::milliseconds(1)
+
+// How long a fan-out leader whose Iterator is destroyed before the end of the channel waits for
+// room to mark the end of the epoch in the ring of a consumer
+#define FANOUT_END_OF_EPOCH_TIMEOUT std::chrono::seconds(10)
+
 std::string BuildPipeName(const std::string& channel_directory,
     const std::string& channel_name, const uint32_t pipe_index) {
     std::string pipe_name = channel_name + "_" + std::to_string(pipe_index);
@@ -71,6 +177,371 @@ std::string BuildPipeName(const std::string& channel_directory,
     return channel_path;
 }
 
+std::string BuildChannelPath(const std::string& channel_directory, const std::string& channel_name) {
+    std::string channel_path = channel_directory;
+    if (channel_path[channel_path.length() - 1] != '/') {
+        channel_path += '/';
+    }
+    return channel_path + channel_name;
+}
+
+/**
+   Returns the record format that records of a format are framed in, such as TextLine for CSV
+   records, or the format itself if it is not decoded from another format.
+ */
+std::string ReaderFormat(const std::string& record_format) {
+    if (record_format == "RecordIO-protobuf" || record_format == "AugmentedManifest") {
+        return "RecordIO";
+    }
+    if (record_format == "CSV" || record_format == "JSONLines") {
+        return "TextLine";
+    }
+    return record_format;
+}
+
+/**
+   Creates the RecordReader of a pipe or file whose records are framed in the record format.
+   FixedLength records are framed by the record size, header and footer of their decoder, which
+   is null for other formats. The reader recovers from corrupted data, counting it in
+   recovery_stats, and skips the records filter rejects, unless they are null. Its blocking
+   waits end when cancellation is cancelled.
+ */
+std::unique_ptr<RecordReader> CreateFormatReader(const std::string& record_format, const std::string& file_path,
+    const std::uint32_t max_corrupted_records_to_skip, const FixedLengthDecoder* fixed_length,
+    RecoveryStats* recovery_stats, RecordFilter* filter, const CancellationSignal* cancellation) {
+    std::unique_ptr<RecordReader> record_reader;
+    if (fixed_length) {
+        record_reader = std::unique_ptr<RecordReader>(new FixedLengthRecordReader(file_path,
+            fixed_length->RecordBytes(), fixed_length->HeaderBytes(), fixed_length->FooterBytes()));
+    } else {
+        record_reader = RecordReaderRegistry::Global().Create(ReaderFormat(record_format), file_path,
+            max_corrupted_records_to_skip);
+    }
+    record_reader->SetRecovery(recovery_stats);
+    record_reader->SetFilter(filter);
+    record_reader->SetCancellation(cancellation);
+    return record_reader;
+}
+
+std::unique_ptr<RecordReader> CreateRecordReader(const std::string& record_format, const std::string& pipe_path,
+    const std::uint32_t max_corrupted_records_to_skip, const Compression compression,
+    const FixedLengthDecoder* fixed_length, RecoveryStats* recovery_stats, RecordFilter* filter,
+    const CancellationSignal* cancellation) {
+    std::unique_ptr<RecordReader> record_reader = CreateFormatReader(record_format, pipe_path,
+        max_corrupted_records_to_skip, fixed_length, recovery_stats, filter, cancellation);
+    record_reader->SetCompression(compression);
+    return record_reader;
+}
+
+/**
+   Creates the reader of the files of a File or FastFile mode channel, whose records are framed
+   in the record format. The FixedLength decoder, recovery stats, filter and cancellation
+   signal, if any, must outlive the reader, and are shared by the readers of every file.
+ */
+std::unique_ptr<FileChannelReader> CreateFileChannelReader(const std::string& record_format,
+    const std::string& channel_path, const std::uint32_t max_corrupted_records_to_skip,
+    const Compression compression, const FileChannelOptions& options, const FixedLengthDecoder* fixed_length,
+    RecoveryStats* recovery_stats, RecordFilter* filter, const CancellationSignal* cancellation) {
+    return std::unique_ptr<FileChannelReader>(new FileChannelReader(channel_path,
+        [record_format, max_corrupted_records_to_skip, fixed_length, recovery_stats, filter, cancellation](
+            const std::string& file_path) {
+            return CreateFormatReader(record_format, file_path, max_corrupted_records_to_skip, fixed_length,
+                recovery_stats, filter, cancellation);
+        }, compression, options));
+}
+
+/**
+   Creates the decoder for the fields of records of the specified format, or returns null if
+   records of the format are returned without decoding. Throws std::invalid_argument if the
+   fields or options cannot be decoded from the format.
+ */
+std::unique_ptr<RecordDecoder> CreateRecordDecoder(const std::string& record_format,
+    const std::vector<FieldSpec>& fields, const RecordDecoderOptions& options) {
+    if (record_format == "CSV") {
+        return std::unique_ptr<RecordDecoder>(new CsvDecoder(fields, options));
+    }
+    if (record_format == "FixedLength") {
+        return std::unique_ptr<RecordDecoder>(new FixedLengthDecoder(fields, options));
+    }
+    if (!options.empty()) {
+        throw std::invalid_argument("Record format " + record_format + " has no options");
+    }
+    if (record_format == "RecordIO-protobuf") {
+        return std::unique_ptr<RecordDecoder>(new RecordIOProtobufDecoder(fields));
+    }
+    if (record_format == "JSONLines") {
+        return std::unique_ptr<RecordDecoder>(new JsonDecoder(fields));
+    }
+    if (record_format == "AugmentedManifest") {
+        return std::unique_ptr<RecordDecoder>(new AugmentedManifestDecoder(fields));
+    }
+    return nullptr;
+}
+
+/**
+   Creates the decoder for the record batches of an ArrowStream, or returns null if the
+   record format is not ArrowStream. Throws std::invalid_argument if the fields cannot be
+   decoded from Arrow columns.
+ */
+std::unique_ptr<ArrowDecoder> CreateArrowDecoder(const std::string& record_format,
+    const std::vector<FieldSpec>& fields) {
+    if (record_format == "ArrowStream") {
+        return std::unique_ptr<ArrowDecoder>(new ArrowDecoder(fields));
+    }
+    return nullptr;
+}
+
+DataType ToDataType(FieldType type) {
+    switch (type) {
+        case FieldType::FLOAT32:
+            return DT_FLOAT;
+        case FieldType::FLOAT64:
+            return DT_DOUBLE;
+        case FieldType::INT32:
+            return DT_INT32;
+        case FieldType::INT64:
+            return DT_INT64;
+        default:
+            return DT_STRING;
+    }
+}
+
+/**
+   Returns the FieldSpec of the field with the specified name, kind, type and shape, or an
+   InvalidArgument status if they do not describe a field.
+ */
+Status ToFieldSpec(const std::string& name, const std::string& kind, DataType dtype,
+    const PartialTensorShape& shape, FieldSpec* field) {
+    field->name = name;
+    if (kind == "dense") {
+        field->kind = FieldKind::DENSE;
+        if (!shape.IsFullyDefined()) {
+            return tensorflow::errors::InvalidArgument("Dense field " + name + " must have a fully defined shape");
+        }
+        for (int i = 0; i < shape.dims(); i++) {
+            field->shape.push_back(shape.dim_size(i));
+        }
+    } else if (kind == "sparse") {
+        field->kind = FieldKind::SPARSE;
+    } else {
+        return tensorflow::errors::InvalidArgument("Invalid kind of field " + name + ": " + kind);
+    }
+    switch (dtype) {
+        case DT_FLOAT:
+            field->type = FieldType::FLOAT32;
+            break;
+        case DT_DOUBLE:
+            field->type = FieldType::FLOAT64;
+            break;
+        case DT_INT32:
+            field->type = FieldType::INT32;
+            break;
+        case DT_INT64:
+            field->type = FieldType::INT64;
+            break;
+        case DT_STRING:
+            field->type = FieldType::STRING;
+            break;
+        default:
+            return tensorflow::errors::InvalidArgument("Unsupported type of field " + name);
+    }
+    return OkStatus();
+}
+
+/**
+   Records the stages that readers annotate with ReadTraceScopes as TensorFlow profiler
+   TraceMe activities.
+ */
+const ReadTracer PROFILER_READ_TRACER = {
+    [](int level) { return TraceMe::Active(level); },
+    [](const char* name, int level) { return TraceMe::ActivityStart(name, level); },
+    [](std::int64_t activity_id) { TraceMe::ActivityEnd(activity_id); }
+};
+
+/**
+   Converts a column of decoded values into output tensors of an iterator, allocated by
+   allocator. A DENSE field becomes one tensor of shape [num_rows] + shape, and a SPARSE field
+   becomes the indices, values and dense shape of a SparseTensor.
+ */
+void ColumnToTensors(Allocator* allocator, const Column& column, std::int64_t num_rows,
+    std::vector<Tensor>* out_tensors) {
+    TraceMe trace("PipeModeDataset::BuildTensor", TRACE_LEVEL_TENSOR_BUILD);
+    const FieldSpec& spec = column.Spec();
+    const std::int64_t num_values = column.NumValues();
+    TensorShape values_shape({num_values});
+    if (spec.kind == FieldKind::DENSE) {
+        values_shape = TensorShape({num_rows});
+        for (std::int64_t dim : spec.shape) {
+            values_shape.AddDim(dim);
+        }
+    } else {
+        Tensor indices(allocator, DT_INT64, TensorShape({num_values, 2}));
+        std::copy(column.Indices().begin(), column.Indices().end(), indices.flat<std::int64_t>().data());
+        out_tensors->emplace_back(std::move(indices));
+    }
+    Tensor values(allocator, ToDataType(spec.type), values_shape);
+    if (spec.type == FieldType::STRING) {
+        auto strings = values.flat<tstring>();
+        for (std::int64_t i = 0; i < num_values; i++) {
+            strings(i).assign(column.Strings()[i].data(), column.Strings()[i].size());
+        }
+    } else {
+        std::memcpy(const_cast<char*>(values.tensor_data().data()), column.Data(), values.TotalBytes());
+    }
+    out_tensors->emplace_back(std::move(values));
+    if (spec.kind == FieldKind::SPARSE) {
+        Tensor dense_shape(allocator, DT_INT64, TensorShape({2}));
+        dense_shape.vec<std::int64_t>()(0) = num_rows;
+        dense_shape.vec<std::int64_t>()(1) = column.DenseSize();
+        out_tensors->emplace_back(std::move(dense_shape));
+    }
+}
+
+/**
+   Converts a batch of decoded fields into the output tensors of an iterator, allocated by
+   allocator.
+ */
+void BatchToTensors(Allocator* allocator, const Batch& batch, std::vector<Tensor>* out_tensors) {
+    for (const Column& column : batch.Columns()) {
+        ColumnToTensors(allocator, column, batch.NumRows(), out_tensors);
+    }
+}
+
+/**
+   A TensorBuffer over values in the body of an Arrow message, which it keeps alive, so that
+   a tensor can share the values without copying them.
+ */
+class ArrowBodyBuffer : public TensorBuffer {
+ public:
+    ArrowBodyBuffer(std::shared_ptr<char> body, const char* data, std::size_t size)
+        : TensorBuffer(const_cast<char*>(data)), body_(std::move(body)), size_(size) {}
+
+    std::size_t size() const override { return size_; }
+
+    TensorBuffer* root_buffer() override { return this; }
+
+    void FillAllocationDescription(AllocationDescription* proto) const override {
+        proto->set_requested_bytes(size_);
+        proto->set_allocator_name("ArrowStream");
+    }
+
+    bool OwnsMemory() const override { return false; }
+
+ private:
+    std::shared_ptr<char> body_;
+    std::size_t size_;
+};
+
+/**
+   An Allocator that serves tensor buffers from a SlabPool, so that the buffer of a freed
+   tensor is reused by a later tensor of a similar size rather than returned to malloc. Each
+   buffer follows a header of SLAB_POOL_ALIGNMENT bytes that holds the size of its slab.
+ */
+class SlabAllocator : public Allocator {
+ public:
+    /**
+       Returns the SlabAllocator of the process. It is never destroyed, since the tensors it
+       allocates can outlive the datasets that created them.
+     */
+    static SlabAllocator* Global() {
+        static SlabAllocator* allocator = new SlabAllocator();
+        return allocator;
+    }
+
+    std::string Name() override { return "PipeModeSlabPool"; }
+
+    void* AllocateRaw(std::size_t alignment, std::size_t num_bytes) override {
+        if (alignment > SLAB_POOL_ALIGNMENT) {
+            return nullptr;
+        }
+        std::size_t slab_size;
+        char* slab = pool_.Allocate(SLAB_POOL_ALIGNMENT + num_bytes, &slab_size);
+        *reinterpret_cast<std::size_t*>(slab) = slab_size;
+        return slab + SLAB_POOL_ALIGNMENT;
+    }
+
+    void DeallocateRaw(void* ptr) override {
+        char* slab = static_cast<char*>(ptr) - SLAB_POOL_ALIGNMENT;
+        pool_.Release(slab, *reinterpret_cast<std::size_t*>(slab));
+    }
+
+    SlabPoolStats Stats() const { return pool_.Stats(); }
+
+ private:
+    SlabPool pool_;
+};
+
+/**
+   Parses the "name=value" options of the records a dataset keeps, which are sample_rate,
+   max_record_bytes, split_begin, split_end and split_key_bytes, into options.
+ */
+Status ParseFilterOptions(const std::vector<std::string>& filter_options, RecordFilterOptions* options) {
+    for (const std::string& option : filter_options) {
+        std::size_t separator = option.find('=');
+        const std::string name = option.substr(0, separator);
+        const std::string value = separator == std::string::npos ? "" : option.substr(separator + 1);
+        try {
+            if (name == "sample_rate") {
+                options->sample_rate = std::stod(value);
+            } else if (name == "max_record_bytes") {
+                options->max_record_bytes = std::stoull(value);
+            } else if (name == "split_begin") {
+                options->split_begin = std::stod(value);
+            } else if (name == "split_end") {
+                options->split_end = std::stod(value);
+            } else if (name == "split_key_bytes") {
+                options->split_key_bytes = std::stoull(value);
+            } else {
+                return tensorflow::errors::InvalidArgument("Unknown filter option: " + option);
+            }
+        } catch (const std::logic_error&) {
+            return tensorflow::errors::InvalidArgument("Invalid filter option: " + option);
+        }
+    }
+    try {
+        RecordFilter filter(*options);
+    } catch (const std::invalid_argument& err) {
+        return tensorflow::errors::InvalidArgument(err.what());
+    }
+    return OkStatus();
+}
+
+/**
+   Returns true if a RecordFilter with the options rejects any records.
+ */
+bool FiltersRecords(const RecordFilterOptions& options) {
+    return options.sample_rate < 1.0 || options.max_record_bytes || options.split_begin > 0.0
+        || options.split_end < 1.0;
+}
+
+/**
+   Returns the name the local disk cache of a channel is stored under: the channel, followed
+   by a fingerprint of the options that decide which records are read from it and how they
+   are framed. Datasets of a channel that read different records, such as complementary
+   splits, then never replay each other's cache.
+ */
+std::string RecordCacheName(const std::string& channel, const std::string& record_format,
+    Compression compression, const RecordDecoderOptions& options, const RecordFilterOptions& filter_options,
+    std::uint32_t max_corrupted_records_to_skip, bool recover_corrupted_records, bool file_mode,
+    const FileChannelOptions& file_options) {
+    std::ostringstream key;
+    key.precision(17);
+    key << record_format << '\n' << static_cast<int>(compression) << '\n' << max_corrupted_records_to_skip << '\n'
+        << recover_corrupted_records << '\n' << filter_options.sample_rate << '\n' << filter_options.max_record_bytes
+        << '\n' << filter_options.split_begin << '\n' << filter_options.split_end << '\n'
+        << filter_options.split_key_bytes << '\n' << file_mode << '\n' << file_options.num_shards << '\n'
+        << file_options.shard_index << '\n';
+    // FixedLength records are framed by the header and footer sizes of their record options
+    for (const auto& option : options) {
+        key << option.first << '=' << option.second << '\n';
+    }
+    const std::string key_bytes = key.str();
+    char fingerprint[9];
+    std::snprintf(fingerprint, sizeof(fingerprint), "%08x",
+        ::tensorflow::crc32c::Value(key_bytes.data(), key_bytes.size()));
+    return channel + "-" + fingerprint;
+}
+
 /**
    A TensorFlow DatasetOpKernel that creates Datasets that read records
    from a SageMaker PipeMode Linux named pipe.
@@ -79,10 +550,100 @@ std::string BuildPipeName(const std::string& channel_directory,
    - state_directory [string]: A directory to store pipe index state
    - channel [string]: The name of the SageMaker channel to read
    - channel_directory [string]: The folder where SageMaker pipe mode fifos are created
+   - cache_directory [string]: A local directory to cache the records of the channel in. Empty
+     to disable caching.
+   - cache_max_bytes [uint64]: The maximum size of the cache on disk. Zero means unlimited.
+   - cache_shuffle [bool]: Whether cached records are replayed in a random order.
+   - seed [int64]: The seed for random record ordering. Negative to seed non-deterministically.
+   - shm_cache_name [string]: The name of a POSIX shared memory record cache shared with other
+     processes on the host. Empty to disable the shared memory cache.
+   - shm_cache_bytes [uint64]: The size of the shared memory record cache, if it is created.
+   - shuffle_buffer_bytes [uint64]: The size of a buffer records are shuffled in before they are
+     returned. Zero to return records in the order they are read.
+   - compression [string]: The compression of the channel's pipes. One of "", "GZIP", "ZLIB" or "ZSTD".
+   - batch_size [int64]: The number of records decoded into each output element. Record formats whose
+     records are not decoded output a batch of records as a ragged tensor if it is not zero.
+   - record_format_library [string]: The path of a shared library of record formats, which implements
+     the C ABI of PipeModeRecordFormat.h, to load before the record format is looked up. Empty to only
+     use the built-in record formats.
+   - file_mode [bool]: Whether the channel is a File or FastFile mode channel, whose records are read
+     from every file under channel_directory/channel rather than from its pipes.
+   - parallel_files [int64]: The number of files of a File mode channel read at once.
+   - deterministic [bool]: Whether the records of the files read at once are interleaved in turn,
+     rather than from whichever file has data ready.
+   - num_shards [int64]: The number of shards the files of a File mode channel are split into.
+   - shard_index [int64]: The shard of files to read, below num_shards.
+   - fanout_name [string]: The name of a POSIX shared memory fan-out, through which the leader,
+     consumer 0, distributes the records it reads to the other processes on the host. Empty to
+     read the channel in every process.
+   - fanout_consumers [int64]: The number of processes records are distributed to.
+   - fanout_index [int64]: The consumer this process is, below fanout_consumers.
+   - fanout_ring_bytes [int64]: The size of the ring buffer of each consumer.
+   - fanout_policy [string]: How records are distributed: "round_robin", or "hash" to give each
+     record to a consumer chosen by the CRC32C of its bytes.
+
+   Record formats whose records are decoded, such as RecordIO-protobuf, CSV and JSONLines, take the
+   fields to decode as the attributes field_names, field_kinds ("dense" or "sparse"), field_types and
+   field_shapes. Fields that records may omit have a default value in field_defaults, and are true in
+   field_has_defaults; both attributes are empty if no field has a default value. Options of the
+   record format, such as the CSV field delimiter, are given as "name=value" strings in the attribute
+   record_options. Batches of records that are not decoded are output as the flat values and the
+   row_splits of a ragged tensor, whose values have the type of the attribute ragged_dtype.
+   AugmentedManifest records are framed like RecordIO records, and each group of as many records as
+   there are fields is decoded into one row of scalar string fields, the attributes of a sample.
+   FixedLength records hold the values of dense numeric fields one after another,
+   and are read from a pipe a batch at a time. The ArrowStream record format also takes fields,
+   scalar dense fields named by column, and outputs one element per Arrow record batch. Other record
+   formats output one scalar string per record, or, if the input max_chunk_bytes is positive, one
+   element per chunk of up to max_chunk_bytes bytes of a record: the chunk, the index of its record
+   among those read by the Iterator, the index of the chunk in its record, and whether it is the
+   last chunk of its record.
   */
 class PipeModeDatasetOp : public DatasetOpKernel {
  public:
-    using DatasetOpKernel::DatasetOpKernel;
+    explicit PipeModeDatasetOp(OpKernelConstruction* ctx) : DatasetOpKernel(ctx) {
+        SetReadTracer(&PROFILER_READ_TRACER);
+        std::vector<std::string> field_names;
+        std::vector<std::string> field_kinds;
+        DataTypeVector field_types;
+        std::vector<PartialTensorShape> field_shapes;
+        OP_REQUIRES_OK(ctx, ctx->GetAttr("field_names", &field_names));
+        OP_REQUIRES_OK(ctx, ctx->GetAttr("field_kinds", &field_kinds));
+        OP_REQUIRES_OK(ctx, ctx->GetAttr("field_types", &field_types));
+        OP_REQUIRES_OK(ctx, ctx->GetAttr("field_shapes", &field_shapes));
+        OP_REQUIRES(ctx, field_kinds.size() == field_names.size() && field_types.size() == field_names.size()
+            && field_shapes.size() == field_names.size(),
+            tensorflow::errors::InvalidArgument("Every field must have a name, kind, type and shape"));
+        fields_.resize(field_names.size());
+        for (std::size_t i = 0; i < fields_.size(); i++) {
+            OP_REQUIRES_OK(ctx, ToFieldSpec(field_names[i], field_kinds[i], field_types[i], field_shapes[i],
+                &fields_[i]));
+        }
+        std::vector<std::string> field_defaults;
+        std::vector<bool> field_has_defaults;
+        OP_REQUIRES_OK(ctx, ctx->GetAttr("field_defaults", &field_defaults));
+        OP_REQUIRES_OK(ctx, ctx->GetAttr("field_has_defaults", &field_has_defaults));
+        OP_REQUIRES(ctx, field_defaults.size() == field_has_defaults.size()
+            && (field_defaults.empty() || field_defaults.size() == field_names.size()),
+            tensorflow::errors::InvalidArgument("Field defaults must be given for no field or every field"));
+        for (std::size_t i = 0; i < field_defaults.size(); i++) {
+            fields_[i].has_default = field_has_defaults[i];
+            fields_[i].default_value = field_defaults[i];
+        }
+        std::vector<std::string> record_options;
+        OP_REQUIRES_OK(ctx, ctx->GetAttr("record_options", &record_options));
+        OP_REQUIRES_OK(ctx, ctx->GetAttr("ragged_dtype", &ragged_dtype_));
+        OP_REQUIRES_OK(ctx, ctx->GetAttr("transforms", &transforms_));
+        std::vector<std::string> filter_options;
+        OP_REQUIRES_OK(ctx, ctx->GetAttr("filter_options", &filter_options));
+        OP_REQUIRES_OK(ctx, ParseFilterOptions(filter_options, &filter_options_));
+        for (const std::string& option : record_options) {
+            std::size_t separator = option.find('=');
+            OP_REQUIRES(ctx, separator != std::string::npos,
+                tensorflow::errors::InvalidArgument("Record options must be name=value: " + option));
+            options_[option.substr(0, separator)] = option.substr(separator + 1);
+        }
+    }
 
     void MakeDataset(OpKernelContext* ctx, DatasetBase** output) override {
         tensorflow::tstring record_format;
@@ -92,6 +653,14 @@ class PipeModeDatasetOp : public DatasetOpKernel {
         bool benchmark;
         std::uint64_t benchmark_records_interval;
         std::uint32_t max_corrupted_records_to_skip;
+        tensorflow::tstring cache_directory;
+        std::uint64_t cache_max_bytes;
+        bool cache_shuffle;
+        std::int64_t seed;
+        tensorflow::tstring shm_cache_name;
+        std::uint64_t shm_cache_bytes;
+        std::uint64_t shuffle_buffer_bytes;
+        tensorflow::tstring compression_name;
         OP_REQUIRES_OK(ctx, tensorflow::data::ParseScalarArgument<tensorflow::tstring>(ctx, "record_format",
                                                         &record_format));
         OP_REQUIRES_OK(ctx, tensorflow::data::ParseScalarArgument<tensorflow::tstring>(ctx, "state_directory",
@@ -100,7 +669,20 @@ class PipeModeDatasetOp : public DatasetOpKernel {
                                                         &channel_directory));
         OP_REQUIRES_OK(ctx, tensorflow::data::ParseScalarArgument<tensorflow::tstring>(ctx, "channel",
                                                         &channel));
-        OP_REQUIRES(ctx, record_format == "RecordIO" || record_format == "TFRecord" || record_format == "TextLine",
+        tensorflow::tstring record_format_library;
+        OP_REQUIRES_OK(ctx, tensorflow::data::ParseScalarArgument<tensorflow::tstring>(ctx, "record_format_library",
+                                                        &record_format_library));
+        try {
+            if (!record_format_library.empty()) {
+                RecordReaderRegistry::Global().LoadLibrary(record_format_library);
+            }
+        } catch(std::invalid_argument& err) {
+            ctx->CtxFailure(tensorflow::errors::InvalidArgument(err.what()));
+            return;
+        }
+        // FixedLength records are framed by the size of their fields, rather than by a registered format
+        OP_REQUIRES(ctx, record_format == "FixedLength"
+            || RecordReaderRegistry::Global().Contains(ReaderFormat(record_format)),
             tensorflow::errors::InvalidArgument("Invalid record format: " + record_format));
         OP_REQUIRES_OK(ctx, tensorflow::data::ParseScalarArgument<bool>(ctx, "benchmark",
                                                         &benchmark));
@@ -108,17 +690,197 @@ class PipeModeDatasetOp : public DatasetOpKernel {
                                                         &benchmark_records_interval));
         OP_REQUIRES_OK(ctx, tensorflow::data::ParseScalarArgument<std::uint32_t>(ctx, "max_corrupted_records_to_skip",
                                                         &max_corrupted_records_to_skip));
+        OP_REQUIRES_OK(ctx, tensorflow::data::ParseScalarArgument<tensorflow::tstring>(ctx, "cache_directory",
+                                                        &cache_directory));
+        OP_REQUIRES_OK(ctx, tensorflow::data::ParseScalarArgument<std::uint64_t>(ctx, "cache_max_bytes",
+                                                        &cache_max_bytes));
+        OP_REQUIRES_OK(ctx, tensorflow::data::ParseScalarArgument<bool>(ctx, "cache_shuffle",
+                                                        &cache_shuffle));
+        OP_REQUIRES_OK(ctx, tensorflow::data::ParseScalarArgument<std::int64_t>(ctx, "seed",
+                                                        &seed));
+        OP_REQUIRES_OK(ctx, tensorflow::data::ParseScalarArgument<tensorflow::tstring>(ctx, "shm_cache_name",
+                                                        &shm_cache_name));
+        OP_REQUIRES_OK(ctx, tensorflow::data::ParseScalarArgument<std::uint64_t>(ctx, "shm_cache_bytes",
+                                                        &shm_cache_bytes));
+        OP_REQUIRES_OK(ctx, tensorflow::data::ParseScalarArgument<std::uint64_t>(ctx, "shuffle_buffer_bytes",
+                                                        &shuffle_buffer_bytes));
+        OP_REQUIRES_OK(ctx, tensorflow::data::ParseScalarArgument<tensorflow::tstring>(ctx, "compression",
+                                                        &compression_name));
+        std::int64_t batch_size;
+        OP_REQUIRES_OK(ctx, tensorflow::data::ParseScalarArgument<std::int64_t>(ctx, "batch_size",
+                                                        &batch_size));
+        bool file_mode;
+        FileChannelOptions file_options;
+        std::int64_t parallel_files;
+        std::int64_t num_shards;
+        std::int64_t shard_index;
+        OP_REQUIRES_OK(ctx, tensorflow::data::ParseScalarArgument<bool>(ctx, "file_mode", &file_mode));
+        OP_REQUIRES_OK(ctx, tensorflow::data::ParseScalarArgument<std::int64_t>(ctx, "parallel_files",
+                                                        &parallel_files));
+        OP_REQUIRES_OK(ctx, tensorflow::data::ParseScalarArgument<bool>(ctx, "deterministic",
+                                                        &file_options.deterministic));
+        OP_REQUIRES_OK(ctx, tensorflow::data::ParseScalarArgument<std::int64_t>(ctx, "num_shards", &num_shards));
+        OP_REQUIRES_OK(ctx, tensorflow::data::ParseScalarArgument<std::int64_t>(ctx, "shard_index", &shard_index));
+        std::int64_t num_parallel_calls;
+        OP_REQUIRES_OK(ctx, tensorflow::data::ParseScalarArgument<std::int64_t>(ctx, "num_parallel_calls",
+                                                        &num_parallel_calls));
+        bool recover_corrupted_records;
+        OP_REQUIRES_OK(ctx, tensorflow::data::ParseScalarArgument<bool>(ctx, "recover_corrupted_records",
+                                                        &recover_corrupted_records));
+        bool pool_buffers;
+        OP_REQUIRES_OK(ctx, tensorflow::data::ParseScalarArgument<bool>(ctx, "pool_buffers", &pool_buffers));
+        std::int64_t max_chunk_bytes;
+        OP_REQUIRES_OK(ctx, tensorflow::data::ParseScalarArgument<std::int64_t>(ctx, "max_chunk_bytes",
+                                                        &max_chunk_bytes));
+        std::int64_t memory_budget_bytes;
+        OP_REQUIRES_OK(ctx, tensorflow::data::ParseScalarArgument<std::int64_t>(ctx, "memory_budget_bytes",
+                                                        &memory_budget_bytes));
+        tensorflow::tstring fanout_name;
+        std::int64_t fanout_consumers;
+        std::int64_t fanout_index;
+        std::int64_t fanout_ring_bytes;
+        tensorflow::tstring fanout_policy;
+        OP_REQUIRES_OK(ctx, tensorflow::data::ParseScalarArgument<tensorflow::tstring>(ctx, "fanout_name",
+                                                        &fanout_name));
+        OP_REQUIRES_OK(ctx, tensorflow::data::ParseScalarArgument<std::int64_t>(ctx, "fanout_consumers",
+                                                        &fanout_consumers));
+        OP_REQUIRES_OK(ctx, tensorflow::data::ParseScalarArgument<std::int64_t>(ctx, "fanout_index",
+                                                        &fanout_index));
+        OP_REQUIRES_OK(ctx, tensorflow::data::ParseScalarArgument<std::int64_t>(ctx, "fanout_ring_bytes",
+                                                        &fanout_ring_bytes));
+        OP_REQUIRES_OK(ctx, tensorflow::data::ParseScalarArgument<tensorflow::tstring>(ctx, "fanout_policy",
+                                                        &fanout_policy));
+        OP_REQUIRES(ctx, !file_mode || (parallel_files > 0 && num_shards > 0 && shard_index >= 0
+            && shard_index < num_shards),
+            tensorflow::errors::InvalidArgument("File mode requires positive parallel_files and num_shards, and a "
+                "shard_index below num_shards"));
+        file_options.parallel_files = parallel_files;
+        file_options.num_shards = num_shards;
+        file_options.shard_index = shard_index;
+        Compression compression;
+        bool decodes_records;
+        bool decodes_arrow;
+        try {
+            compression = ParseCompression(compression_name);
+            decodes_records = CreateRecordDecoder(record_format, fields_, options_) != nullptr;
+            decodes_arrow = CreateArrowDecoder(record_format, fields_) != nullptr;
+        } catch(std::invalid_argument& err) {
+            ctx->CtxFailure(tensorflow::errors::InvalidArgument(err.what()));
+            return;
+        }
+        OP_REQUIRES(ctx, !decodes_records || (!fields_.empty() && batch_size > 0),
+            tensorflow::errors::InvalidArgument("Record format " + record_format
+                + " requires fields and a batch size"));
+        // Each element of an ArrowStream is a record batch, whose messages cannot be cached or shuffled
+        OP_REQUIRES(ctx, !decodes_arrow || (!fields_.empty() && !batch_size && cache_directory.empty()
+            && shm_cache_name.empty() && !shuffle_buffer_bytes),
+            tensorflow::errors::InvalidArgument("Record format " + record_format
+                + " requires fields, and cannot be batched, cached or shuffled"));
+        OP_REQUIRES(ctx, !decodes_arrow || !file_mode,
+            tensorflow::errors::InvalidArgument("Record format " + record_format + " cannot be read in File mode"));
+        OP_REQUIRES(ctx, decodes_records || decodes_arrow || (fields_.empty() && options_.empty() && batch_size >= 0),
+            tensorflow::errors::InvalidArgument("Record format " + record_format + " does not decode fields"));
+        for (const std::string& transform : transforms_) {
+            OP_REQUIRES(ctx, RecordReaderRegistry::Global().ContainsTransform(transform),
+                tensorflow::errors::InvalidArgument("Unknown record transform: " + transform));
+        }
+        // Transforms run on the worker threads of the parallel stage, of which there is one per core
+        // if num_parallel_calls is -1, tf.data.AUTOTUNE
+        OP_REQUIRES(ctx, num_parallel_calls >= -1,
+            tensorflow::errors::InvalidArgument("num_parallel_calls must be positive, or -1 for one per core"));
+        if (num_parallel_calls < 0) {
+            num_parallel_calls = std::max(1u, std::thread::hardware_concurrency());
+        } else if (!num_parallel_calls && !transforms_.empty()) {
+            num_parallel_calls = 1;
+        }
+        // CSV headers are recognized by comparing each line to the first, which workers do not all see
+        auto header = options_.find("header");
+        const bool csv_header = header != options_.end() && header->second == "true";
+        OP_REQUIRES(ctx, !num_parallel_calls || (!decodes_arrow && record_format != "AugmentedManifest"
+            && !csv_header),
+            tensorflow::errors::InvalidArgument("Record format " + record_format
+                + " cannot be decoded in parallel with these options"));
+        // Chunks are read straight from the channel, since caches and the shuffle buffer hold whole records
+        OP_REQUIRES(ctx, max_chunk_bytes >= 0 && (!max_chunk_bytes || (fields_.empty() && !batch_size
+            && !num_parallel_calls && cache_directory.empty() && shm_cache_name.empty() && !shuffle_buffer_bytes
+            && !FiltersRecords(filter_options_))),
+            tensorflow::errors::InvalidArgument("max_chunk_bytes must not be negative, and records read in chunks "
+                "cannot be decoded, batched, transformed, cached, shuffled or filtered"));
+        // Each Iterator samples with its own seed, so a cache of one Iterator's sample does not line up with the
+        // records another Iterator keeps
+        OP_REQUIRES(ctx, filter_options_.sample_rate >= 1.0 || (cache_directory.empty() && shm_cache_name.empty()),
+            tensorflow::errors::InvalidArgument("Records sampled by sample_rate cannot be cached"));
+        // The budget is shared by the iterators of every dataset of the process. A negative
+        // memory_budget_bytes leaves it unchanged, and zero removes its limit.
+        if (memory_budget_bytes >= 0) {
+            MemoryBudget::Global()->SetLimit(memory_budget_bytes);
+        }
+        // The attributes of a sample are consecutive records, which must be read in the order they were written,
+        // from one file at a time
+        OP_REQUIRES(ctx, record_format != "AugmentedManifest" || (!shuffle_buffer_bytes && !cache_shuffle
+            && !FiltersRecords(filter_options_) && fanout_name.empty() && (!file_mode || parallel_files == 1)),
+            tensorflow::errors::InvalidArgument("Record format AugmentedManifest cannot be shuffled, filtered, "
+                "distributed by a fan-out or read from more than one file at once"));
+        // Consumers other than the leader never read the channel, so they cannot cache or chunk it. Only one
+        // consumer is sent the header line of a CSV channel, and the others would skip their first line instead.
+        OP_REQUIRES(ctx, fanout_name.empty() || (fanout_consumers > 1 && fanout_index >= 0
+            && fanout_index < fanout_consumers && fanout_ring_bytes > 0
+            && (fanout_policy == "round_robin" || fanout_policy == "hash") && cache_directory.empty()
+            && shm_cache_name.empty() && !max_chunk_bytes && !csv_header),
+            tensorflow::errors::InvalidArgument("A fan-out requires at least two consumers, a consumer index below "
+                "them, a positive ring size and a policy of round_robin or hash, and cannot be cached, chunked or "
+                "read with a CSV header"));
+        std::shared_ptr<SharedMemoryFanOut> fanout;
+        if (!fanout_name.empty()) {
+            try {
+                fanout = std::make_shared<SharedMemoryFanOut>(fanout_name, fanout_consumers, fanout_index,
+                    fanout_ring_bytes);
+            } catch(std::invalid_argument& err) {
+                ctx->CtxFailure(tensorflow::errors::InvalidArgument(err.what()));
+                return;
+            } catch(std::runtime_error& err) {
+                ctx->CtxFailure(absl::InternalError(err.what()));
+                return;
+            }
+        }
+        std::shared_ptr<SharedMemoryRecordCache> shm_cache;
+        if (!shm_cache_name.empty()) {
+            try {
+                shm_cache = std::make_shared<SharedMemoryRecordCache>(shm_cache_name, shm_cache_bytes);
+            } catch(std::runtime_error& err) {
+                ctx->CtxFailure(absl::InternalError(err.what()));
+                return;
+            }
+        }
 
         *output = new Dataset(ctx, record_format, state_directory, channel_directory, channel, benchmark,
-                              benchmark_records_interval, max_corrupted_records_to_skip);
+                              benchmark_records_interval, max_corrupted_records_to_skip, cache_directory,
+                              cache_max_bytes, cache_shuffle, seed, shm_cache, shuffle_buffer_bytes, compression,
+                              fields_, options_, batch_size, file_mode, file_options, ragged_dtype_,
+                              num_parallel_calls, transforms_, recover_corrupted_records, pool_buffers,
+                              filter_options_, max_chunk_bytes, fanout, fanout_policy == "hash");
     }
 
  private:
+    std::vector<FieldSpec> fields_;
+    RecordDecoderOptions options_;
+    DataType ragged_dtype_;
+    std::vector<std::string> transforms_;
+    RecordFilterOptions filter_options_;
+
     class Dataset : public DatasetBase {
      public:
     explicit Dataset(OpKernelContext* ctx, const std::string& record_format, const std::string& state_directory,
             const std::string& channel_directory, const std::string& channel, bool benchmark,
-            std::uint64_t benchmark_records_interval, const std::uint32_t max_corrupted_records_to_skip):
+            std::uint64_t benchmark_records_interval, const std::uint32_t max_corrupted_records_to_skip,
+            const std::string& cache_directory, std::uint64_t cache_max_bytes, bool cache_shuffle,
+            std::int64_t seed, std::shared_ptr<SharedMemoryRecordCache> shm_cache,
+            std::uint64_t shuffle_buffer_bytes, Compression compression, const std::vector<FieldSpec>& fields,
+            const RecordDecoderOptions& options, std::int64_t batch_size, bool file_mode,
+            const FileChannelOptions& file_options, DataType ragged_dtype, std::int64_t num_parallel_calls,
+            const std::vector<std::string>& transforms, bool recover_corrupted_records, bool pool_buffers,
+            const RecordFilterOptions& filter_options, std::int64_t max_chunk_bytes,
+            std::shared_ptr<SharedMemoryFanOut> fanout, bool fanout_by_hash):
             DatasetBase(DatasetContext(ctx)),
             record_format_(record_format),
             channel_directory_(channel_directory),
@@ -126,31 +888,103 @@ class PipeModeDatasetOp : public DatasetOpKernel {
             channel_(channel),
             benchmark_(benchmark),
             benchmark_records_interval_(benchmark_records_interval),
-            max_corrupted_records_to_skip_(max_corrupted_records_to_skip) {}
+            max_corrupted_records_to_skip_(max_corrupted_records_to_skip),
+            cache_directory_(cache_directory),
+            cache_max_bytes_(cache_max_bytes),
+            cache_shuffle_(cache_shuffle),
+            seed_(seed < 0 ? std::random_device()() : seed),
+            epoch_(0),
+            shm_cache_(shm_cache),
+            shuffle_buffer_bytes_(shuffle_buffer_bytes),
+            compression_(compression),
+            fields_(fields),
+            options_(options),
+            batch_size_(batch_size),
+            file_mode_(file_mode),
+            file_options_(file_options),
+            ragged_dtype_(ragged_dtype),
+            num_parallel_calls_(num_parallel_calls),
+            transforms_(transforms),
+            recover_corrupted_records_(recover_corrupted_records),
+            pool_buffers_(pool_buffers),
+            filter_options_(filter_options),
+            max_chunk_bytes_(max_chunk_bytes),
+            fanout_(fanout),
+            fanout_by_hash_(fanout_by_hash) {
+            cache_name_ = RecordCacheName(channel_, record_format_, compression_, options_, filter_options_,
+                max_corrupted_records_to_skip_, recover_corrupted_records_, file_mode_, file_options_);
+            if (max_chunk_bytes_) {
+                output_dtypes_.insert(output_dtypes_.end(), {DT_STRING, DT_INT64, DT_INT64, DT_BOOL});
+                output_shapes_.insert(output_shapes_.end(), 4, PartialTensorShape({}));
+            } else if (fields_.empty() && batch_size_) {
+                output_dtypes_.insert(output_dtypes_.end(), {ragged_dtype_, DT_INT64});
+                output_shapes_.insert(output_shapes_.end(), {PartialTensorShape({-1}), PartialTensorShape({-1})});
+            } else if (fields_.empty()) {
+                output_dtypes_.push_back(DT_STRING);
+                output_shapes_.push_back({});
+            }
+            for (const FieldSpec& field : fields_) {
+                if (field.kind == FieldKind::DENSE) {
+                    output_dtypes_.push_back(ToDataType(field.type));
+                    output_shapes_.push_back(PartialTensorShape({-1}).Concatenate(PartialTensorShape(field.shape)));
+                } else {
+                    output_dtypes_.insert(output_dtypes_.end(), {DT_INT64, ToDataType(field.type), DT_INT64});
+                    output_shapes_.insert(output_shapes_.end(), {PartialTensorShape({-1, 2}),
+                        PartialTensorShape({-1}), PartialTensorShape({2})});
+                }
+            }
+        }
 
         std::unique_ptr<IteratorBase> MakeIteratorInternal(const std::string& prefix) const override {
+            std::unique_ptr<RecordCacheReader> cache_reader;
+            if (!cache_directory_.empty()) {
+                try {
+                    cache_reader = RecordCacheReader::Open(cache_directory_, cache_name_);
+                } catch(std::exception& err) {
+                    // The channel is read from its pipe instead, and the Iterator replaces the cache
+                    std::cerr << "WARN: PipeModeDatasetOp::Dataset ignoring the record cache of channel " << channel_
+                        << ": " << err.what() << std::endl;
+                }
+            }
+            // A complete cache replaces the pipe, which is left unread for a later iterator. Iterators
+            // that read from the shared memory cache only claim a pipe once they miss the cache. File
+            // mode channels have no pipes, and every iterator reads all of the channel's files. Only the
+            // leader of a fan-out reads the channel.
+            bool reads_pipe = (!cache_reader || !cache_reader->IsComplete()) && !shm_cache_ && !file_mode_
+                && !IsFanOutConsumer();
             auto new_prefix = prefix + "::PipeMode-" + channel_ + "-"
                 + std::to_string(pipe_state_manager_.GetPipeIndex());
             auto ptr = std::unique_ptr<IteratorBase>(
                 new Iterator({this, new_prefix}, record_format_, channel_directory_, channel_, benchmark_,
-                    pipe_state_manager_.GetPipeIndex(), benchmark_records_interval_, max_corrupted_records_to_skip_));
-            pipe_state_manager_.IncrementPipeIndex();
+                    pipe_state_manager_.GetPipeIndex(), benchmark_records_interval_, max_corrupted_records_to_skip_,
+                    std::move(cache_reader), cache_directory_, cache_max_bytes_, cache_shuffle_, seed_ + epoch_++,
+                    shm_cache_, reads_pipe, shuffle_buffer_bytes_, compression_, fields_, options_,
+                    batch_size_, file_mode_, file_options_, ragged_dtype_, num_parallel_calls_, transforms_,
+                    recover_corrupted_records_, pool_buffers_, filter_options_, max_chunk_bytes_));
+            if (reads_pipe) {
+                pipe_state_manager_.IncrementPipeIndex();
+            }
             return ptr;
         }
 
         const DataTypeVector& output_dtypes() const override {
-            static DataTypeVector* dtypes = new DataTypeVector({DT_STRING});
-            return *dtypes;
+            return output_dtypes_;
         }
 
         const std::vector<PartialTensorShape>& output_shapes() const override {
-            static std::vector<PartialTensorShape>* shapes =
-            new std::vector<PartialTensorShape>({{}});
-            return *shapes;
+            return output_shapes_;
         }
 
         std::string DebugString() const override { return "PipeModeDatasetOp::Dataset"; }
 
+        /**
+           Returns true if the records of this process are read from a fan-out that another
+           process leads.
+         */
+        bool IsFanOutConsumer() const {
+            return fanout_ && !fanout_->IsLeader();
+        }
+
         Status CheckExternalState() const override {
             return Status();
         }
@@ -170,71 +1004,265 @@ class PipeModeDatasetOp : public DatasetOpKernel {
         bool benchmark_;
         std::uint64_t benchmark_records_interval_;
         std::uint32_t max_corrupted_records_to_skip_;
+        std::string cache_directory_;
+        // The name the cache files of the channel are stored under in cache_directory_
+        std::string cache_name_;
+        std::uint64_t cache_max_bytes_;
+        bool cache_shuffle_;
+        std::uint64_t seed_;
+        mutable std::atomic<std::uint64_t> epoch_;
+        // When an Iterator last reached the end of its pipe, in steady clock nanoseconds, or 0
+        mutable std::atomic<std::int64_t> epoch_end_ns_{0};
+        std::shared_ptr<SharedMemoryRecordCache> shm_cache_;
+        std::uint64_t shuffle_buffer_bytes_;
+        Compression compression_;
+        std::vector<FieldSpec> fields_;
+        RecordDecoderOptions options_;
+        std::int64_t batch_size_;
+        bool file_mode_;
+        FileChannelOptions file_options_;
+        DataType ragged_dtype_;
+        std::int64_t num_parallel_calls_;
+        std::vector<std::string> transforms_;
+        bool recover_corrupted_records_;
+        bool pool_buffers_;
+        RecordFilterOptions filter_options_;
+        std::int64_t max_chunk_bytes_;
+        std::shared_ptr<SharedMemoryFanOut> fanout_;
+        bool fanout_by_hash_;
+        DataTypeVector output_dtypes_;
+        std::vector<PartialTensorShape> output_shapes_;
 
         class Iterator : public DatasetIterator<Dataset> {
          public:
             explicit Iterator(const Params& params, const std::string& record_format,
                 const std::string& channel_directory, const std::string& channel, const bool benchmark,
                 const uint32_t pipe_index, const uint64_t benchmark_records_interval,
-                const uint32_t max_corrupted_records_to_skip)
-                : DatasetIterator<Dataset>(params), read_time_(0), read_bytes_(0),
-                    benchmark_(benchmark), benchmark_records_interval_(benchmark_records_interval) {
-                    std::string pipe_path = BuildPipeName(channel_directory, channel, pipe_index);
-                    if (record_format == "RecordIO") {
-                        record_reader_ = std::unique_ptr<RecordReader>(new RecordIOReader(pipe_path));
-                    } else if (record_format == "TFRecord") {
-                        record_reader_ = std::unique_ptr<RecordReader>(
-                            new TFRecordReader(pipe_path, max_corrupted_records_to_skip));
-                    } else {  // required to be TextLine
-                        record_reader_ = std::unique_ptr<RecordReader>(new TextLineRecordReader(pipe_path));
+                const uint32_t max_corrupted_records_to_skip, std::unique_ptr<RecordCacheReader> cache_reader,
+                const std::string& cache_directory, const uint64_t cache_max_bytes, const bool cache_shuffle,
+                const uint64_t seed, std::shared_ptr<SharedMemoryRecordCache> shm_cache, const bool reads_pipe,
+                const uint64_t shuffle_buffer_bytes, const Compression compression,
+                const std::vector<FieldSpec>& fields, const RecordDecoderOptions& options, const int64_t batch_size,
+                const bool file_mode, const FileChannelOptions& file_options, const DataType ragged_dtype,
+                const int64_t num_parallel_calls, const std::vector<std::string>& transforms,
+                const bool recover_corrupted_records, const bool pool_buffers,
+                const RecordFilterOptions& filter_options, const std::int64_t max_chunk_bytes)
+                : DatasetIterator<Dataset>(params), read_bytes_(0),
+                    benchmark_(benchmark), benchmark_records_interval_(benchmark_records_interval),
+                    record_format_(record_format),
+                    channel_directory_(channel_directory),
+                    channel_(channel),
+                    pipe_path_(reads_pipe ? BuildPipeName(channel_directory, channel, pipe_index) : ""),
+                    max_corrupted_records_to_skip_(max_corrupted_records_to_skip),
+                    compression_(compression),
+                    file_mode_(file_mode),
+                    file_options_(file_options),
+                    recover_corrupted_records_(recover_corrupted_records),
+                    allocator_(pool_buffers ? SlabAllocator::Global() : tensorflow::cpu_allocator()),
+                    initial_pool_stats_(SlabAllocator::Global()->Stats()),
+                    memory_account_(MemoryBudget::Global()),
+                    filter_(CreateRecordFilter(filter_options, seed)),
+                    decoder_(CreateRecordDecoder(record_format, fields, options)),
+                    fixed_length_decoder_(dynamic_cast<FixedLengthDecoder*>(decoder_.get())),
+                    arrow_decoder_(CreateArrowDecoder(record_format, fields)),
+                    batch_(fields),
+                    batch_size_(batch_size),
+                    ragged_dtype_(ragged_dtype),
+                    max_chunk_bytes_(max_chunk_bytes),
+                    cache_reader_(std::move(cache_reader)),
+                    shm_cache_(shm_cache) {
+                    // Errors creating the readers and writers of the Iterator are returned by Initialize
+                    try {
+                        if (shuffle_buffer_bytes) {
+                            shuffle_buffer_ = std::unique_ptr<ShuffleBuffer>(
+                                new ShuffleBuffer(shuffle_buffer_bytes, seed));
+                        }
+                        if (shm_cache_) {
+                            shm_cursor_ = std::unique_ptr<SharedMemoryCacheCursor>(
+                                new SharedMemoryCacheCursor(shm_cache_.get()));
+                            shm_writer_ = std::unique_ptr<SharedMemoryCacheWriter>(
+                                new SharedMemoryCacheWriter(shm_cache_.get()));
+                        } else if (cache_reader_) {
+                            cache_order_.resize(cache_reader_->NumRecords());
+                            std::iota(cache_order_.begin(), cache_order_.end(), 0);
+                            if (cache_shuffle) {
+                                std::shuffle(cache_order_.begin(), cache_order_.end(), std::mt19937_64(seed));
+                            }
+                            cache_reader_->AdviseRandomAccess(cache_shuffle);
+                        } else if (!dataset()->IsFanOutConsumer()) {
+                            OpenRecordReader();
+                            if (!cache_directory.empty()) {
+                                cache_writer_ = std::unique_ptr<RecordCacheWriter>(
+                                    new RecordCacheWriter(cache_directory, dataset()->cache_name_, cache_max_bytes));
+                            }
+                        }
+                        if (num_parallel_calls > 0) {
+                            for (std::int64_t i = 0; i < num_parallel_calls; i++) {
+                                workers_.emplace_back();
+                                Worker& worker = workers_.back();
+                                worker.decoder = CreateRecordDecoder(record_format, fields, options);
+                                worker.batch = std::unique_ptr<Batch>(new Batch(fields));
+                                for (const std::string& transform : transforms) {
+                                    worker.transforms.push_back(
+                                        RecordReaderRegistry::Global().CreateTransform(transform));
+                                }
+                            }
+                            parallel_stage_ = std::unique_ptr<ParallelStage>(
+                                new ParallelStage(num_parallel_calls, file_options.deterministic));
+                        }
+                    } catch(std::exception& err) {
+                        init_status_ = absl::InternalError("Unable to read channel " + channel + ": " + err.what());
                     }
                 }
 
+            /**
+               Cancels the reads of the Iterator when the Iterator is cancelled, such as when
+               it is destroyed or its job is stopped, so that a read waiting for the channel's
+               writer ends with a Cancelled error rather than blocking teardown. Returns the
+               error the Iterator was created with, such as a cache that cannot be written.
+             */
+            Status Initialize(IteratorContext* ctx) override {
+                if (!init_status_.ok()) {
+                    return init_status_;
+                }
+                return tensorflow::RegisterCancellationCallback(ctx->cancellation_manager(),
+                    [this]() { cancellation_.Cancel(); }, &deregister_cancellation_);
+            }
+
             Status GetNextInternal(IteratorContext* ctx,
                                  std::vector<Tensor>* out_tensors,
                                  bool* end_of_sequence) override {
                 *end_of_sequence = false;
-                Tensor result_tensor(DT_STRING, TensorShape({}));
-                tensorflow::tstring* storage = &result_tensor.scalar<tensorflow::tstring>()();
                 try {
                     mutex_lock l(mu_);
-                    auto start = std::chrono::high_resolution_clock::now();
-                    if (record_reader_->ReadRecord(storage)) {
-                        out_tensors->emplace_back(std::move(result_tensor));
+                    PIPEMODE_PROBE1(record__read__start, channel_.c_str());
+                    auto start = std::chrono::steady_clock::now();
+                    if (records_read_) {
+                        consumer_time_ += start - last_get_next_end_;
+                    }
+                    std::size_t record_bytes = 0;
+                    if (parallel_stage_) {
+                        *end_of_sequence = !ReadParallel(out_tensors, &record_bytes);
+                    } else if (fixed_length_decoder_ && ReadsPipeDirectly()) {
+                        *end_of_sequence = !ReadFixedLengthBatch(out_tensors, &record_bytes);
+                    } else if (decoder_) {
+                        *end_of_sequence = !ReadBatch(out_tensors, &record_bytes);
+                    } else if (arrow_decoder_) {
+                        *end_of_sequence = !ReadArrowBatch(out_tensors, &record_bytes);
+                    } else if (max_chunk_bytes_) {
+                        *end_of_sequence = !ReadChunk(out_tensors, &record_bytes);
+                    } else if (batch_size_) {
+                        *end_of_sequence = !ReadRaggedBatch(out_tensors, &record_bytes);
                     } else {
-                        *end_of_sequence = true;
+                        Tensor result_tensor(DT_STRING, TensorShape({}));
+                        tensorflow::tstring* storage = &result_tensor.scalar<tensorflow::tstring>()();
+                        if (ReadNextRecord(storage)) {
+                            record_bytes = storage->size();
+                            out_tensors->emplace_back(std::move(result_tensor));
+                        } else {
+                            *end_of_sequence = true;
+                        }
                     }
-                    auto end = std::chrono::high_resolution_clock::now();
+                    auto end = std::chrono::steady_clock::now();
                     auto delta_ns = std::chrono::duration_cast<std::chrono::nanoseconds>(end - start);
-                    read_time_ += delta_ns;
-                    read_bytes_ += storage->size();
+                    get_next_time_ += delta_ns;
+                    last_get_next_end_ = end;
+                    if (*end_of_sequence) {
+                        EndEpoch(end);
+                    } else if (!records_read_) {
+                        StartEpoch(end);
+                    }
+                    read_bytes_ += record_bytes;
                     records_read_++;
+                    PIPEMODE_PROBE3(record__read__end, channel_.c_str(), record_bytes, *end_of_sequence);
+                    if (PIPEMODE_PROBE_ENABLED(queue__depth)) {
+                        // The depth and buffered bytes take the parallel stage's and the memory budget's locks
+                        PIPEMODE_PROBE3(queue__depth, channel_.c_str(), QueueDepth(), memory_account_.Used());
+                    }
                     if (benchmark_records_interval_ != 0 && (records_read_ % benchmark_records_interval_ == 0)) {
                         std::cout << "PipeModeDatasetOp::Dataset::Iterator records: " << records_read_  << std::endl;
                         std::cout << "PipeModeDatasetOp::Dataset::Iterator records read_time_ns: " << delta_ns.count()
                             << std::endl;
-                        std::cout << "PipeModeDatasetOp::Dataset::Iterator records read_bytes: " << storage->size()
+                        std::cout << "PipeModeDatasetOp::Dataset::Iterator records read_bytes: " << record_bytes
                             << std::endl;
+                        std::cout << "PipeModeDatasetOp::Dataset::Iterator records buffered_bytes: "
+                            << memory_account_.Used() << std::endl;
+                    }
+                } catch(std::system_error& err) {
+                    if (err.code() == std::errc::operation_canceled) {
+                        return absl::CancelledError("Reading channel " + channel_ + " was cancelled");
                     }
+                    return absl::InternalError(err.what());
                 } catch(std::runtime_error& err) {
                     // This convenience functions create an `absl::Status` object with an error
                     // code as indicated by the associated function name, using the error message
                     // passed in `message` i.e. err.what().
                     // https://github.com/abseil/abseil-cpp/blob/master/absl/status/status.h#L730
                     return absl::InternalError(err.what());
+                } catch(std::exception& err) {
+                    // Such as std::length_error, std::out_of_range, or the errors of plugin record formats
+                    return absl::InternalError(err.what());
                 }
                 return OkStatus();;
             }
             ~Iterator() {
+                if (deregister_cancellation_) {
+                    deregister_cancellation_();
+                }
+                // End the waits of threads that read ahead, such as decompression threads, before they are joined
+                cancellation_.Cancel();
+                if (dataset()->fanout_ && dataset()->fanout_->IsLeader() && init_status_.ok()) {
+                    AbortFanOutEpoch();
+                }
                 if (benchmark_) {
-                    int64_t read_time_ms = std::chrono::duration_cast<std::chrono::milliseconds>(read_time_).count();
+                    int64_t read_time_ms = Milliseconds(get_next_time_);
                     std::cout << "PipeModeDatasetOp::Dataset::Iterator total read_time_ms: " << read_time_ms
                         << std::endl;
+                    std::cout << "PipeModeDatasetOp::Dataset::Iterator total pipe_blocked_ms: "
+                        << Milliseconds(PipeBlockedTime()) << std::endl;
+                    std::cout << "PipeModeDatasetOp::Dataset::Iterator total framing_ms: "
+                        << Milliseconds(FramingTime()) << std::endl;
+                    std::cout << "PipeModeDatasetOp::Dataset::Iterator total buffer_wait_ms: "
+                        << Milliseconds(buffer_wait_.Total()) << std::endl;
                     std::cout << "PipeModeDatasetOp::Dataset::Iterator total read_bytes: " << read_bytes_  << std::endl;
                     auto read_giga_bytes = read_bytes_ / std::pow(1024, 3);
                     double read_seconds = read_time_ms / 1000.0;
                     std::cout << "PipeModeDatasetOp::Dataset::Iterator total read_GB/s: "
                         << read_giga_bytes / read_seconds << std::endl;
+                    std::cout << "PipeModeDatasetOp::Dataset::Iterator total skipped_records: "
+                        << recovery_stats_.skipped_records << std::endl;
+                    std::cout << "PipeModeDatasetOp::Dataset::Iterator total resyncs: " << recovery_stats_.resyncs
+                        << std::endl;
+                    std::cout << "PipeModeDatasetOp::Dataset::Iterator total skipped_bytes: "
+                        << recovery_stats_.skipped_bytes << std::endl;
+                    if (filter_) {
+                        std::cout << "PipeModeDatasetOp::Dataset::Iterator total filtered_records: "
+                            << filter_->Stats().rejected_records << std::endl;
+                        std::cout << "PipeModeDatasetOp::Dataset::Iterator total filtered_bytes: "
+                            << filter_->Stats().rejected_bytes << std::endl;
+                    }
+                    if (allocator_ == SlabAllocator::Global()) {
+                        // The pool is shared by every Iterator of the process, so these include their tensors too
+                        SlabPoolStats pool_stats = SlabAllocator::Global()->Stats();
+                        std::uint64_t hits = pool_stats.hits - initial_pool_stats_.hits;
+                        std::uint64_t misses = pool_stats.misses - initial_pool_stats_.misses;
+                        std::cout << "PipeModeDatasetOp::Dataset::Iterator total pooled_buffer_hits: " << hits
+                            << std::endl;
+                        std::cout << "PipeModeDatasetOp::Dataset::Iterator total pooled_buffer_misses: " << misses
+                            << std::endl;
+                        std::cout << "PipeModeDatasetOp::Dataset::Iterator total pooled_buffer_hit_rate: "
+                            << (hits + misses ? static_cast<double>(hits) / (hits + misses) : 0.0) << std::endl;
+                        std::cout << "PipeModeDatasetOp::Dataset::Iterator total pooled_buffers_recycled: "
+                            << pool_stats.recycled - initial_pool_stats_.recycled << std::endl;
+                    }
+                    std::cout << "PipeModeDatasetOp::Dataset::Iterator total peak_buffered_bytes: "
+                        << memory_account_.Peak() << std::endl;
+                }
+                if (recovery_stats_.skipped_bytes) {
+                    std::cerr << "WARN: PipeModeDatasetOp::Dataset::Iterator skipped " << recovery_stats_.skipped_bytes
+                        << " bytes of corrupted data: " << recovery_stats_.skipped_records
+                        << " corrupted records and " << recovery_stats_.resyncs << " corrupted record headers"
+                        << std::endl;
                 }
             }
 
@@ -249,13 +1277,840 @@ class PipeModeDatasetOp : public DatasetOpKernel {
          }
 
          private:
+            /**
+               The state of a worker thread of the parallel stage, which only that thread uses.
+             */
+            struct Worker {
+                std::unique_ptr<RecordDecoder> decoder;
+                std::unique_ptr<Batch> batch;
+                std::vector<std::unique_ptr<RecordTransform>> transforms;
+                // The transformed records of a chunk
+                std::string transformed;
+            };
+
+            /**
+               A chunk of consecutive records, which a worker thread of the parallel stage
+               transforms and decodes into output elements.
+             */
+            class Chunk : public ParallelStage::Task {
+             public:
+                explicit Chunk(Iterator* iterator) : iterator_(iterator) {}
+
+                // Released here rather than when the chunk is taken, so that the bytes of a chunk whose
+                // task threw are released as the error propagates
+                ~Chunk() override {
+                    iterator_->memory_account_.Release(buffered_bytes);
+                }
+
+                void Run(std::size_t worker) override {
+                    iterator_->ProcessChunk(this, &iterator_->workers_[worker]);
+                }
+
+                // The bytes of the records, counted in the Iterator's memory account until the chunk is destroyed
+                std::size_t buffered_bytes = 0;
+                // The records, one after another, and the offset each record ends at
+                std::string records;
+                std::vector<std::size_t> ends;
+                std::vector<std::vector<Tensor>> elements;
+
+             private:
+                Iterator* iterator_;
+            };
+
+            /**
+               Returns the next element of the parallel stage. Chunks of records are read on
+               the calling thread, and transformed and decoded on the worker threads, which are
+               kept supplied with chunks. Elements are returned in the order of their records,
+               or, unless deterministic, in the order their chunks are decoded. Returns false if
+               no records remain.
+
+               param [out] out_tensors: The vector the tensors of the element are appended to.
+               param [out] record_bytes: Incremented by the size of the records read.
+             */
+            bool ReadParallel(std::vector<Tensor>* out_tensors, std::size_t* record_bytes)
+                TF_EXCLUSIVE_LOCKS_REQUIRED(mu_) {
+                const std::size_t chunk_records = batch_size_ ? batch_size_ : PARALLEL_RECORDS_PER_TASK;
+                while (parallel_elements_.empty()) {
+                    // Reading ahead stops while the Iterator is over its memory budget, unless nothing is pending
+                    while (!parallel_end_of_input_
+                        && parallel_stage_->NumPending() < PARALLEL_TASKS_PER_THREAD * workers_.size()
+                        && (!parallel_stage_->NumPending() || !memory_account_.OverBudget())) {
+                        std::unique_ptr<Chunk> chunk(new Chunk(this));
+                        while (chunk->ends.size() < chunk_records && ReadNextRecord(&record_)) {
+                            chunk->records.append(record_.data(), record_.size());
+                            chunk->ends.push_back(chunk->records.size());
+                        }
+                        parallel_end_of_input_ = chunk->ends.size() < chunk_records;
+                        if (chunk->ends.empty()) {
+                            break;
+                        }
+                        *record_bytes += chunk->records.size();
+                        chunk->buffered_bytes = chunk->records.size();
+                        memory_account_.Acquire(chunk->buffered_bytes);
+                        parallel_records_ += chunk->ends.size();
+                        buffer_wait_.Update(parallel_records_);
+                        parallel_stage_->Submit(std::move(chunk));
+                    }
+                    std::unique_ptr<ParallelStage::Task> task = parallel_stage_->Next();
+                    if (!task) {
+                        return false;
+                    }
+                    parallel_records_ -= static_cast<Chunk*>(task.get())->ends.size();
+                    buffer_wait_.Update(parallel_records_);
+                    for (std::vector<Tensor>& element : static_cast<Chunk*>(task.get())->elements) {
+                        parallel_elements_.push_back(std::move(element));
+                    }
+                }
+                for (Tensor& tensor : parallel_elements_.front()) {
+                    out_tensors->push_back(std::move(tensor));
+                }
+                parallel_elements_.pop_front();
+                return true;
+            }
+
+            /**
+               Transforms and decodes a chunk on a worker thread of the parallel stage, into
+               one batch of decoded fields or ragged records, or one scalar string per record
+               if records are not batched. Throws std::runtime_error if a record cannot be
+               transformed or decoded.
+             */
+            void ProcessChunk(Chunk* chunk, Worker* worker) {
+                if (!worker->transforms.empty()) {
+                    worker->transformed.clear();
+                    std::size_t start = 0;
+                    for (std::size_t& end : chunk->ends) {
+                        const char* data = chunk->records.data() + start;
+                        std::size_t size = end - start;
+                        for (const std::unique_ptr<RecordTransform>& transform : worker->transforms) {
+                            transform->Transform(data, size, &data, &size);
+                        }
+                        worker->transformed.append(data, size);
+                        start = end;
+                        end = worker->transformed.size();
+                    }
+                    chunk->records.swap(worker->transformed);
+                }
+                std::size_t start = 0;
+                if (worker->decoder) {
+                    worker->batch->Clear();
+                    for (std::size_t end : chunk->ends) {
+                        worker->decoder->Decode(chunk->records.data() + start, end - start, worker->batch.get());
+                        start = end;
+                    }
+                    chunk->elements.emplace_back();
+                    BatchToTensors(allocator_, *worker->batch, &chunk->elements.back());
+                } else if (batch_size_) {
+                    chunk->elements.emplace_back();
+                    RecordsToRagged(chunk->records, chunk->ends, &chunk->elements.back());
+                } else {
+                    for (std::size_t end : chunk->ends) {
+                        Tensor record(DT_STRING, TensorShape({}));
+                        record.scalar<tensorflow::tstring>()().assign(chunk->records.data() + start, end - start);
+                        chunk->elements.push_back({std::move(record)});
+                        start = end;
+                    }
+                }
+            }
+
+            /**
+               Copies records into the flat values and row_splits of a ragged batch. Throws
+               std::runtime_error if a record is not a whole number of values.
+
+               param [in] records: The records, one after another.
+               param [in] ends: The offset each record ends at.
+               param [out] out_tensors: The vector the values and row_splits are appended to.
+             */
+            void RecordsToRagged(const std::string& records, const std::vector<std::size_t>& ends,
+                std::vector<Tensor>* out_tensors) const {
+                const std::size_t value_size = tensorflow::DataTypeSize(ragged_dtype_);
+                Tensor values(allocator_, ragged_dtype_,
+                    TensorShape({static_cast<std::int64_t>(records.size() / value_size)}));
+                Tensor row_splits(allocator_, DT_INT64, TensorShape({static_cast<std::int64_t>(ends.size() + 1)}));
+                auto splits = row_splits.vec<std::int64_t>();
+                splits(0) = 0;
+                for (std::size_t i = 0; i < ends.size(); i++) {
+                    CheckRaggedRecord(ends[i] - (i ? ends[i - 1] : 0));
+                    splits(i + 1) = ends[i] / value_size;
+                }
+                std::memcpy(const_cast<char*>(values.tensor_data().data()), records.data(), records.size());
+                out_tensors->push_back(std::move(values));
+                out_tensors->push_back(std::move(row_splits));
+            }
+
+            /**
+               Throws std::runtime_error if a record of the specified size is not a whole number
+               of ragged values.
+             */
+            void CheckRaggedRecord(std::size_t size) const {
+                if (size % tensorflow::DataTypeSize(ragged_dtype_)) {
+                    throw std::runtime_error("Record of " + std::to_string(size)
+                        + " bytes is not a whole number of " + tensorflow::DataTypeString(ragged_dtype_)
+                        + " values");
+                }
+            }
+
+            /**
+               Reads the next chunk of a record into the tensors of an element, which are the
+               chunk, the index of its record, the index of the chunk in its record, and whether
+               it is the last chunk of its record. Returns false if no records remain.
+
+               param [out] out_tensors: The vector the tensors of the element are appended to.
+               param [out] record_bytes: Incremented by the size of the chunk.
+             */
+            bool ReadChunk(std::vector<Tensor>* out_tensors, std::size_t* record_bytes)
+                TF_EXCLUSIVE_LOCKS_REQUIRED(mu_) {
+                Tensor chunk(DT_STRING, TensorShape({}));
+                tensorflow::tstring* storage = &chunk.scalar<tensorflow::tstring>()();
+                bool is_last;
+                if (!TimeChannelRead([&]() {
+                        return file_reader_ ? file_reader_->ReadRecordChunk(storage, max_chunk_bytes_, &is_last)
+                            : record_reader_->ReadRecordChunk(storage, max_chunk_bytes_, &is_last);
+                    })) {
+                    return false;
+                }
+                *record_bytes += storage->size();
+                Tensor record_id(DT_INT64, TensorShape({}));
+                record_id.scalar<std::int64_t>()() = chunked_records_;
+                Tensor chunk_index(DT_INT64, TensorShape({}));
+                chunk_index.scalar<std::int64_t>()() = chunk_index_;
+                Tensor last(DT_BOOL, TensorShape({}));
+                last.scalar<bool>()() = is_last;
+                out_tensors->insert(out_tensors->end(), {std::move(chunk), std::move(record_id),
+                    std::move(chunk_index), std::move(last)});
+                if (is_last) {
+                    chunked_records_++;
+                    chunk_index_ = 0;
+                } else {
+                    chunk_index_++;
+                }
+                return true;
+            }
+
+            /**
+               Reads the next record, through the shuffle buffer if records are shuffled.
+             */
+            bool ReadNextRecord(tensorflow::tstring* storage) TF_EXCLUSIVE_LOCKS_REQUIRED(mu_) {
+                return shuffle_buffer_ ? ReadShuffledRecord(storage) : ReadRecord(storage);
+            }
+
+            /**
+               Reads and decodes up to batch_size records into the output tensors. Returns false
+               if no records remain.
+
+               param [out] out_tensors: The vector the tensors of the batch are appended to.
+               param [out] record_bytes: Incremented by the size of the records read.
+             */
+            bool ReadBatch(std::vector<Tensor>* out_tensors, std::size_t* record_bytes)
+                TF_EXCLUSIVE_LOCKS_REQUIRED(mu_) {
+                batch_.Clear();
+                while (batch_.NumRows() < static_cast<std::size_t>(batch_size_)) {
+                    if (!ReadNextRecord(&record_)) {
+                        decoder_->Finish();
+                        break;
+                    }
+                    decoder_->Decode(record_.data(), record_.size(), &batch_);
+                    *record_bytes += record_.size();
+                }
+                if (!batch_.NumRows()) {
+                    return false;
+                }
+                BatchToTensors(allocator_, batch_, out_tensors);
+                return true;
+            }
+
+            /**
+               Reads up to batch_size records into the flat values and row_splits of a ragged
+               tensor. Records are copied into one values tensor, which starts with the capacity
+               the last batch needed and grows by doubling, and is output as a slice. Returns
+               false if no records remain. Throws std::runtime_error if a record is not a whole
+               number of values.
+
+               param [out] out_tensors: The vector the values and row_splits are appended to.
+               param [out] record_bytes: Incremented by the size of the records read.
+             */
+            bool ReadRaggedBatch(std::vector<Tensor>* out_tensors, std::size_t* record_bytes)
+                TF_EXCLUSIVE_LOCKS_REQUIRED(mu_) {
+                const std::size_t value_size = tensorflow::DataTypeSize(ragged_dtype_);
+                Tensor values(allocator_, ragged_dtype_, TensorShape({ragged_capacity_}));
+                Tensor row_splits(allocator_, DT_INT64, TensorShape({batch_size_ + 1}));
+                auto splits = row_splits.vec<std::int64_t>();
+                splits(0) = 0;
+                std::size_t num_bytes = 0;
+                std::int64_t num_records = 0;
+                while (num_records < batch_size_ && ReadNextRecord(&record_)) {
+                    CheckRaggedRecord(record_.size());
+                    TraceMe trace("PipeModeDataset::BuildTensor", TRACE_LEVEL_TENSOR_BUILD);
+                    if (num_bytes + record_.size() > values.TotalBytes()) {
+                        ragged_capacity_ = std::max<std::int64_t>(2 * ragged_capacity_,
+                            (num_bytes + record_.size()) / value_size);
+                        Tensor grown(allocator_, ragged_dtype_, TensorShape({ragged_capacity_}));
+                        std::memcpy(const_cast<char*>(grown.tensor_data().data()), values.tensor_data().data(),
+                            num_bytes);
+                        values = std::move(grown);
+                    }
+                    std::memcpy(const_cast<char*>(values.tensor_data().data()) + num_bytes, record_.data(),
+                        record_.size());
+                    num_bytes += record_.size();
+                    splits(++num_records) = num_bytes / value_size;
+                }
+                if (!num_records) {
+                    return false;
+                }
+                out_tensors->push_back(values.Slice(0, num_bytes / value_size));
+                out_tensors->push_back(row_splits.Slice(0, num_records + 1));
+                *record_bytes += num_bytes;
+                return true;
+            }
+
+            /**
+               Reads up to batch_size FixedLength records from the pipe in one read, into the
+               tensor of their field if records hold nothing else, and otherwise into a buffer
+               the values of each field are copied from. Returns false if no records remain.
+
+               param [out] out_tensors: The vector the tensors of the batch are appended to.
+               param [out] record_bytes: Incremented by the size of the records read.
+             */
+            bool ReadFixedLengthBatch(std::vector<Tensor>* out_tensors, std::size_t* record_bytes)
+                TF_EXCLUSIVE_LOCKS_REQUIRED(mu_) {
+                FixedLengthRecordReader* reader = static_cast<FixedLengthRecordReader*>(record_reader_.get());
+                std::vector<Tensor> tensors;
+                std::vector<char*> values;
+                for (const FieldSpec& field : fixed_length_decoder_->Fields()) {
+                    TensorShape shape({batch_size_});
+                    for (std::int64_t dim : field.shape) {
+                        shape.AddDim(dim);
+                    }
+                    tensors.emplace_back(allocator_, ToDataType(field.type), shape);
+                    values.push_back(const_cast<char*>(tensors.back().tensor_data().data()));
+                }
+                char* records = values[0];
+                if (!fixed_length_decoder_->IsContiguous()) {
+                    fixed_length_records_.resize(batch_size_ * fixed_length_decoder_->RecordBytes());
+                    records = &fixed_length_records_[0];
+                }
+                const std::int64_t num_records = TimeChannelRead([&]() {
+                    return reader->ReadRecords(records, batch_size_);
+                });
+                if (!num_records) {
+                    return false;
+                }
+                if (!fixed_length_decoder_->IsContiguous()) {
+                    fixed_length_decoder_->DecodeRecords(records, num_records, values);
+                }
+                for (Tensor& tensor : tensors) {
+                    out_tensors->push_back(num_records < batch_size_ ? tensor.Slice(0, num_records) : tensor);
+                }
+                *record_bytes += num_records * fixed_length_decoder_->RecordBytes();
+                return true;
+            }
+
+            /**
+               Reads the next record batch of an ArrowStream into the output tensors, skipping
+               other messages. Returns false if no record batches remain. Values are shared
+               with the message body where their tensor's type and alignment allow, and copied
+               otherwise.
+
+               param [out] out_tensors: The vector the tensors of the record batch are appended to.
+               param [out] record_bytes: Incremented by the size of the messages read.
+             */
+            bool ReadArrowBatch(std::vector<Tensor>* out_tensors, std::size_t* record_bytes)
+                TF_EXCLUSIVE_LOCKS_REQUIRED(mu_) {
+                ArrowStreamReader* reader = static_cast<ArrowStreamReader*>(record_reader_.get());
+                std::shared_ptr<char> body;
+                std::int64_t body_size;
+                do {
+                    if (!TimeChannelRead([&]() { return reader->ReadMessage(&arrow_metadata_, &body, &body_size); })) {
+                        return false;
+                    }
+                    *record_bytes += arrow_metadata_.size() + body_size;
+                } while (!arrow_decoder_->DecodeMessage(arrow_metadata_.data(), arrow_metadata_.size(), body.get(),
+                    body_size));
+                const std::int64_t num_rows = arrow_decoder_->NumRows();
+                batch_.Clear();
+                for (std::size_t i = 0; i < batch_.Columns().size(); i++) {
+                    Column& column = batch_.Columns()[i];
+                    const char* values = arrow_decoder_->SharedValues(i);
+                    if (!values || reinterpret_cast<std::uintptr_t>(values) % EIGEN_MAX_ALIGN_BYTES != 0) {
+                        arrow_decoder_->CopyValues(i, &column);
+                        ColumnToTensors(allocator_, column, num_rows, out_tensors);
+                        continue;
+                    }
+                    DataType dtype = ToDataType(column.Spec().type);
+                    TensorBuffer* buffer = new ArrowBodyBuffer(body, values,
+                        num_rows * tensorflow::DataTypeSize(dtype));
+                    out_tensors->emplace_back(dtype, TensorShape({num_rows}), buffer);
+                    buffer->Unref();
+                }
+                return true;
+            }
+
+            /**
+               Reads the next record, from the cache while cached records remain and from
+               the pipe afterwards. Records read from the pipe are written to the cache if
+               this iterator is populating it.
+             */
+            bool ReadRecord(tensorflow::tstring* storage) TF_EXCLUSIVE_LOCKS_REQUIRED(mu_) {
+                if (dataset()->fanout_) {
+                    return ReadFanOutRecord(storage);
+                }
+                if (shm_cache_) {
+                    return ReadSharedRecord(storage);
+                }
+                if (cache_reader_) {
+                    if (cache_position_ < cache_order_.size()) {
+                        const char* data;
+                        std::size_t size = cache_reader_->GetRecord(cache_order_[cache_position_++], &data);
+                        storage->assign(data, size);
+                        return true;
+                    }
+                    if (cache_reader_->IsComplete()) {
+                        return false;
+                    }
+                }
+                if (!ChannelOpen()) {
+                    // Only a prefix of the channel is cached. Skip past it in the pipe.
+                    OpenRecordReader();
+                    for (std::uint64_t i = 0; i < cache_order_.size(); i++) {
+                        if (!ReadChannelRecord(storage)) {
+                            break;
+                        }
+                    }
+                }
+                if (!ReadChannelRecord(storage)) {
+                    if (cache_writer_) {
+                        cache_writer_->Finalize();
+                        cache_writer_.reset();
+                    }
+                    return false;
+                }
+                if (cache_writer_) {
+                    cache_writer_->Append(storage->data(), storage->size());
+                }
+                return true;
+            }
+
+            /**
+               Reads the next record from the shuffle buffer. The buffer is filled with
+               records until the next record does not fit, and a random record is removed.
+               Records that do not fit in an empty buffer are returned without shuffling.
+             */
+            bool ReadShuffledRecord(tensorflow::tstring* storage) TF_EXCLUSIVE_LOCKS_REQUIRED(mu_) {
+                while (true) {
+                    // The buffer stops filling while the Iterator is over its memory budget
+                    if (!shuffle_buffer_->Empty() && memory_account_.OverBudget()) {
+                        break;
+                    }
+                    if (!has_pending_ && !end_of_input_) {
+                        has_pending_ = ReadRecord(&pending_);
+                        end_of_input_ = !has_pending_;
+                    }
+                    if (!has_pending_ || !shuffle_buffer_->Fits(pending_.size())) {
+                        break;
+                    }
+                    shuffle_buffer_->Add(pending_.data(), pending_.size());
+                    buffer_wait_.Update(shuffle_buffer_->NumRecords());
+                    memory_account_.Acquire(pending_.size());
+                    has_pending_ = false;
+                }
+                if (!shuffle_buffer_->Empty()) {
+                    const char* data;
+                    std::size_t size = shuffle_buffer_->Take(&data);
+                    buffer_wait_.Update(shuffle_buffer_->NumRecords());
+                    memory_account_.Release(size);
+                    storage->assign(data, size);
+                    return true;
+                }
+                if (has_pending_) {
+                    storage->assign(pending_.data(), pending_.size());
+                    has_pending_ = false;
+                    return true;
+                }
+                return false;
+            }
+
+            /**
+               Reads the next record from the shared memory cache if it holds the record,
+               and from the pipe otherwise. Records read from the pipe are offered to the
+               shared memory cache.
+             */
+            bool ReadSharedRecord(tensorflow::tstring* storage) TF_EXCLUSIVE_LOCKS_REQUIRED(mu_) {
+                if (shm_num_records_ < 0) {
+                    shm_num_records_ = shm_cache_->NumRecords();
+                }
+                if (shm_num_records_ >= 0 && next_record_ >= static_cast<std::uint64_t>(shm_num_records_)) {
+                    return false;
+                }
+                // Once the pipe has caught up, reading it is cheaper than reading the cache and
+                // skipping the record in the pipe later.
+                if (!ChannelOpen() || pipe_position_ != next_record_) {
+                    const char* data;
+                    std::size_t size;
+                    if (shm_cursor_->Read(next_record_, &data, &size)) {
+                        storage->assign(data, size);
+                        ++next_record_;
+                        return true;
+                    }
+                }
+                if (!ChannelOpen()) {
+                    OpenRecordReader();
+                }
+                while (pipe_position_ <= next_record_) {
+                    if (!ReadChannelRecord(storage)) {
+                        shm_writer_->Seal();
+                        shm_cache_->SetNumRecords(pipe_position_);
+                        return false;
+                    }
+                    shm_writer_->Append(pipe_position_++, storage->data(), storage->size());
+                }
+                ++next_record_;
+                return true;
+            }
+
+            /**
+               Reads the next record given to this process by the shared memory fan-out. The
+               leader reads the channel, keeps its own records and writes every other record to
+               the ring of its consumer, waiting while the ring is full. At the end of the
+               channel, it marks the end of the epoch in every ring. Other consumers read the
+               records of their ring.
+             */
+            bool ReadFanOutRecord(tensorflow::tstring* storage) TF_EXCLUSIVE_LOCKS_REQUIRED(mu_) {
+                SharedMemoryFanOut* fanout = dataset()->fanout_.get();
+                if (!fanout->IsLeader()) {
+                    const char* data;
+                    std::size_t size;
+                    while (true) {
+                        FanOutRead read = fanout->TryRead(&data, &size);
+                        if (read == FanOutRead::RECORD) {
+                            storage->assign(data, size);
+                            return true;
+                        } else if (read == FanOutRead::END_OF_EPOCH) {
+                            return false;
+                        }
+                        // The consumers of a fan-out wait for the leader to read the pipe
+                        auto wait_start = std::chrono::steady_clock::now();
+                        cancellation_.SleepFor(FANOUT_POLL_INTERVAL);
+                        pipe_wait_stats_.blocked_ns += std::chrono::duration_cast<std::chrono::nanoseconds>(
+                            std::chrono::steady_clock::now() - wait_start).count();
+                    }
+                }
+                if (!ChannelOpen()) {
+                    OpenRecordReader();
+                }
+                const std::uint32_t num_consumers = fanout->NumConsumers();
+                // No records are read once the leader has started to mark the end of the epoch
+                while (fanout_end_consumer_ == 1 && ReadChannelRecord(storage)) {
+                    std::uint32_t consumer = dataset()->fanout_by_hash_
+                        ? ::tensorflow::crc32c::Value(storage->data(), storage->size()) % num_consumers
+                        : fanout_records_++ % num_consumers;
+                    if (!consumer) {
+                        return true;
+                    }
+                    while (!fanout->TryWrite(consumer, storage->data(), storage->size())) {
+                        cancellation_.SleepFor(FANOUT_POLL_INTERVAL);
+                    }
+                }
+                for (; fanout_end_consumer_ < num_consumers; fanout_end_consumer_++) {
+                    while (!fanout->TryEndEpoch(fanout_end_consumer_)) {
+                        cancellation_.SleepFor(FANOUT_POLL_INTERVAL);
+                    }
+                }
+                return false;
+            }
+
+            /**
+               Marks the end of the epoch in the ring of every consumer of the fan-out that has
+               not been marked yet, when the leader's Iterator is destroyed before the end of the
+               channel, such as by take() or early stopping, so that the epochs of the consumers
+               end with it. Records always leave room in a ring for the mark, so the leader only
+               waits, for up to FANOUT_END_OF_EPOCH_TIMEOUT, for a consumer that has not read the
+               mark of an earlier epoch yet.
+             */
+            void AbortFanOutEpoch() {
+                SharedMemoryFanOut* fanout = dataset()->fanout_.get();
+                auto deadline = std::chrono::steady_clock::now() + FANOUT_END_OF_EPOCH_TIMEOUT;
+                for (; fanout_end_consumer_ < fanout->NumConsumers(); fanout_end_consumer_++) {
+                    while (!fanout->TryEndEpoch(fanout_end_consumer_)) {
+                        if (std::chrono::steady_clock::now() > deadline) {
+                            std::cerr << "WARN: PipeModeDatasetOp::Dataset::Iterator unable to end the epoch of "
+                                "fan-out consumer " << fanout_end_consumer_ << std::endl;
+                            break;
+                        }
+                        std::this_thread::sleep_for(FANOUT_POLL_INTERVAL);
+                    }
+                }
+            }
+
+            /**
+               Opens the pipe this iterator reads from, claiming the next pipe index of the
+               channel if the iterator was created without one, or the channel's files in
+               File mode.
+             */
+            void OpenRecordReader() TF_EXCLUSIVE_LOCKS_REQUIRED(mu_) {
+                TraceMe trace("PipeModeDataset::OpenEpoch", TRACE_LEVEL_EPOCH_OPEN);
+                if (file_mode_) {
+                    file_reader_ = CreateFileChannelReader(record_format_, BuildChannelPath(channel_directory_,
+                        channel_), max_corrupted_records_to_skip_, compression_, file_options_,
+                        fixed_length_decoder_, RecoveryStatsIfRecovering(), filter_.get(), &cancellation_);
+                    return;
+                }
+                if (pipe_path_.empty()) {
+                    const PipeStateManager& pipe_state_manager = dataset()->pipe_state_manager_;
+                    pipe_path_ = BuildPipeName(channel_directory_, channel_, pipe_state_manager.GetPipeIndex());
+                    pipe_state_manager.IncrementPipeIndex();
+                }
+                record_reader_ = CreateRecordReader(record_format_, pipe_path_, max_corrupted_records_to_skip_,
+                    compression_, fixed_length_decoder_, RecoveryStatsIfRecovering(), filter_.get(),
+                    &cancellation_);
+                record_reader_->SetPipeWaitStats(&pipe_wait_stats_);
+            }
+
+            /**
+               Returns the filter of the records read from the channel, which samples with the
+               seed of the Iterator, or null if the options keep every record.
+             */
+            static std::unique_ptr<RecordFilter> CreateRecordFilter(RecordFilterOptions options, std::uint64_t seed) {
+                if (!FiltersRecords(options)) {
+                    return nullptr;
+                }
+                options.seed = seed;
+                return std::unique_ptr<RecordFilter>(new RecordFilter(options));
+            }
+
+            /**
+               Returns the stats readers count corrupted data they recover from in, or null if
+               readers do not recover from corrupted data.
+             */
+            RecoveryStats* RecoveryStatsIfRecovering() {
+                return recover_corrupted_records_ ? &recovery_stats_ : nullptr;
+            }
+
+            /**
+               Returns the result of a read from the channel, and counts the time it took as
+               time spent reading the channel.
+             */
+            template <typename Read>
+            auto TimeChannelRead(Read read) -> decltype(read()) TF_EXCLUSIVE_LOCKS_REQUIRED(mu_) {
+                auto start = std::chrono::steady_clock::now();
+                auto result = read();
+                channel_read_time_ += std::chrono::steady_clock::now() - start;
+                if (file_reader_) {
+                    ChargeOpenFiles();
+                }
+                return result;
+            }
+
+            /**
+               Charges the memory account for the blocks read ahead of each file open in File
+               mode, which files open and close as they are read. Once every file is read the
+               charge is released.
+             */
+            void ChargeOpenFiles() TF_EXCLUSIVE_LOCKS_REQUIRED(mu_) {
+                const std::size_t bytes = file_reader_->NumOpenFiles() * file_options_.block_size
+                    * file_options_.read_ahead_blocks;
+                if (bytes > open_file_bytes_) {
+                    memory_account_.Acquire(bytes - open_file_bytes_);
+                } else if (bytes < open_file_bytes_) {
+                    memory_account_.Release(open_file_bytes_ - bytes);
+                }
+                open_file_bytes_ = bytes;
+            }
+
+            /**
+               Returns the time spent blocked on the writer of the channel's pipe: waiting for the
+               pipe to be created and opened and for data, or for the leader of a fan-out.
+             */
+            std::chrono::nanoseconds PipeBlockedTime() const {
+                return std::chrono::nanoseconds(pipe_wait_stats_.blocked_ns.load());
+            }
+
+            /**
+               Returns the time spent reading the channel that was not blocked on its writer,
+               framing records and checking their CRCs. Decompression threads wait for the pipe
+               while the Iterator decompresses, so the difference is never negative.
+             */
+            std::chrono::nanoseconds FramingTime() const TF_EXCLUSIVE_LOCKS_REQUIRED(mu_) {
+                return std::max(channel_read_time_ - PipeBlockedTime(), std::chrono::nanoseconds(0));
+            }
+
+            static std::int64_t Milliseconds(std::chrono::nanoseconds duration) {
+                return std::chrono::duration_cast<std::chrono::milliseconds>(duration).count();
+            }
+
+            /**
+               Measures the gap between the end of the pipe of the Iterator that last reached
+               one, and the first element of this Iterator.
+             */
+            void StartEpoch(std::chrono::steady_clock::time_point first_element) TF_EXCLUSIVE_LOCKS_REQUIRED(mu_) {
+                std::int64_t epoch_end_ns = dataset()->epoch_end_ns_.load();
+                if (epoch_end_ns) {
+                    epoch_gap_ = first_element.time_since_epoch() - std::chrono::nanoseconds(epoch_end_ns);
+                }
+            }
+
+            /**
+               Records the end of the Iterator's pipe, and prints a summary of the epoch if
+               benchmarking: where the time of the input went, and whether the input was
+               producer-bound, blocked on the writer of the pipe for longer than its consumer
+               spent between elements, or consumer-bound.
+             */
+            void EndEpoch(std::chrono::steady_clock::time_point end) TF_EXCLUSIVE_LOCKS_REQUIRED(mu_) {
+                if (reached_end_) {
+                    return;
+                }
+                reached_end_ = true;
+                dataset()->epoch_end_ns_.store(
+                    std::chrono::duration_cast<std::chrono::nanoseconds>(end.time_since_epoch()).count());
+                if (!benchmark_) {
+                    return;
+                }
+                std::cout << "PipeModeDatasetOp::Dataset::Iterator epoch pipe_blocked_ms: "
+                    << Milliseconds(PipeBlockedTime()) << std::endl;
+                std::cout << "PipeModeDatasetOp::Dataset::Iterator epoch framing_ms: " << Milliseconds(FramingTime())
+                    << std::endl;
+                std::cout << "PipeModeDatasetOp::Dataset::Iterator epoch buffer_wait_ms: "
+                    << Milliseconds(buffer_wait_.Total()) << std::endl;
+                std::cout << "PipeModeDatasetOp::Dataset::Iterator epoch consumer_ms: " << Milliseconds(consumer_time_)
+                    << std::endl;
+                if (epoch_gap_.count() >= 0) {
+                    std::cout << "PipeModeDatasetOp::Dataset::Iterator epoch gap_ms: " << Milliseconds(epoch_gap_)
+                        << std::endl;
+                }
+                std::cout << "PipeModeDatasetOp::Dataset::Iterator epoch bound: "
+                    << (PipeBlockedTime() > consumer_time_ ? "producer" : "consumer") << std::endl;
+            }
+
+            /**
+               Returns the number of records in the shuffle buffer, or of chunks pending in the
+               parallel stage.
+             */
+            std::size_t QueueDepth() const TF_EXCLUSIVE_LOCKS_REQUIRED(mu_) {
+                if (shuffle_buffer_) {
+                    return shuffle_buffer_->NumRecords();
+                }
+                return parallel_stage_ ? parallel_stage_->NumPending() : 0;
+            }
+
+            /**
+               Returns true if the channel's pipe, or its files, are open.
+             */
+            bool ChannelOpen() const TF_EXCLUSIVE_LOCKS_REQUIRED(mu_) {
+                return record_reader_ || file_reader_;
+            }
+
+            /**
+               Reads the next record of the channel, from its pipe or, in File mode, from its files.
+             */
+            bool ReadChannelRecord(tensorflow::tstring* storage) TF_EXCLUSIVE_LOCKS_REQUIRED(mu_) {
+                return TimeChannelRead([&]() {
+                    return file_reader_ ? file_reader_->ReadRecord(storage) : record_reader_->ReadRecord(storage);
+                });
+            }
+
+            /**
+               Returns true if records are read straight from the channel's pipe, rather than
+               through a cache or the shuffle buffer, or from the files of a File mode channel.
+             */
+            bool ReadsPipeDirectly() const TF_EXCLUSIVE_LOCKS_REQUIRED(mu_) {
+                return record_reader_ && !cache_reader_ && !cache_writer_ && !shm_cache_ && !shuffle_buffer_
+                    && !filter_ && !dataset()->fanout_;
+            }
+
             bool benchmark_;
             mutex mu_;
+            const std::string record_format_;
+            const std::string channel_directory_;
+            const std::string channel_;
+            std::string pipe_path_ TF_GUARDED_BY(mu_);
+            const std::uint32_t max_corrupted_records_to_skip_;
+            const Compression compression_;
+            const bool file_mode_;
+            const FileChannelOptions file_options_;
+            const bool recover_corrupted_records_;
+            // Allocates the tensors of batched elements, from reused slabs if buffers are pooled. Elements
+            // of single records or chunks are scalars whose bytes tstring allocates itself, so a slab
+            // would only hold their header.
+            Allocator* const allocator_;
+            // The counts of the slab pool when the Iterator was created
+            const SlabPoolStats initial_pool_stats_;
+            // Counts the bytes the Iterator buffers against the memory budget of the process
+            MemoryAccount memory_account_;
+            // Declared before the readers that count skipped data in it
+            RecoveryStats recovery_stats_;
+            // Ends the blocking waits of the readers. Declared before the readers that wait on it
+            CancellationSignal cancellation_;
+            // The error the Iterator was created with, if any, which Initialize returns
+            Status init_status_;
+            // Deregisters the callback that cancels cancellation_ from the Iterator's cancellation manager
+            std::function<void()> deregister_cancellation_;
+            // Chooses the records read from the channel, if records are filtered. Declared before the readers that
+            // use it
+            const std::unique_ptr<RecordFilter> filter_;
+            const std::unique_ptr<RecordDecoder> decoder_;
+            // The decoder of FixedLength records, whose batches are read in bulk, or null
+            FixedLengthDecoder* const fixed_length_decoder_;
+            const std::unique_ptr<ArrowDecoder> arrow_decoder_;
+            // The metadata of the Arrow message being decoded
+            std::string arrow_metadata_ TF_GUARDED_BY(mu_);
+            Batch batch_ TF_GUARDED_BY(mu_);
+            const std::int64_t batch_size_;
+            const DataType ragged_dtype_;
+            // The size of the largest chunk records are read in, or zero if records are read whole
+            const std::int64_t max_chunk_bytes_;
+            // The number of records read in chunks so far, and the index of the next chunk of the record being read
+            std::int64_t chunked_records_ TF_GUARDED_BY(mu_) = 0;
+            std::int64_t chunk_index_ TF_GUARDED_BY(mu_) = 0;
+            // The number of values the ragged values tensor of the next batch is created with
+            std::int64_t ragged_capacity_ TF_GUARDED_BY(mu_) = RAGGED_INITIAL_CAPACITY;
+            // The FixedLength records of a batch, if they are not read straight into a tensor
+            std::string fixed_length_records_ TF_GUARDED_BY(mu_);
+            // The record being decoded
+            tensorflow::tstring record_ TF_GUARDED_BY(mu_);
             std::unique_ptr<RecordReader> record_reader_ TF_GUARDED_BY(mu_);
-            std::chrono::nanoseconds read_time_;
+            std::unique_ptr<FileChannelReader> file_reader_ TF_GUARDED_BY(mu_);
+            // The bytes charged for the blocks read ahead of the files file_reader_ has open
+            std::size_t open_file_bytes_ TF_GUARDED_BY(mu_) = 0;
+            std::unique_ptr<RecordCacheReader> cache_reader_ TF_GUARDED_BY(mu_);
+            std::unique_ptr<RecordCacheWriter> cache_writer_ TF_GUARDED_BY(mu_);
+            std::vector<std::uint64_t> cache_order_ TF_GUARDED_BY(mu_);
+            std::uint64_t cache_position_ TF_GUARDED_BY(mu_) = 0;
+            std::shared_ptr<SharedMemoryRecordCache> shm_cache_;
+            std::unique_ptr<SharedMemoryCacheCursor> shm_cursor_ TF_GUARDED_BY(mu_);
+            std::unique_ptr<SharedMemoryCacheWriter> shm_writer_ TF_GUARDED_BY(mu_);
+            std::int64_t shm_num_records_ TF_GUARDED_BY(mu_) = -1;
+            std::uint64_t next_record_ TF_GUARDED_BY(mu_) = 0;
+            std::uint64_t pipe_position_ TF_GUARDED_BY(mu_) = 0;
+            // The number of records the leader of a fan-out has read, which picks their consumer in turn
+            std::uint64_t fanout_records_ TF_GUARDED_BY(mu_) = 0;
+            // The next consumer whose ring the leader marks the end of the epoch in, from 1, the first
+            // consumer other than the leader
+            std::uint32_t fanout_end_consumer_ = 1;
+            std::unique_ptr<ShuffleBuffer> shuffle_buffer_ TF_GUARDED_BY(mu_);
+            // The record read after the shuffle buffer filled up
+            tensorflow::tstring pending_ TF_GUARDED_BY(mu_);
+            bool has_pending_ TF_GUARDED_BY(mu_) = false;
+            bool end_of_input_ TF_GUARDED_BY(mu_) = false;
+            // The time spent in GetNext, and the part of it spent reading the channel
+            std::chrono::nanoseconds get_next_time_{0};
+            std::chrono::nanoseconds channel_read_time_{0};
+            PipeWaitStats pipe_wait_stats_;
+            // The time records waited in the shuffle buffer, or in chunks of the parallel stage
+            BufferWaitTime buffer_wait_ TF_GUARDED_BY(mu_);
+            std::size_t parallel_records_ TF_GUARDED_BY(mu_) = 0;
+            // The time the consumer of the elements spent between calls to GetNext
+            std::chrono::nanoseconds consumer_time_{0};
+            std::chrono::steady_clock::time_point last_get_next_end_;
+            // The time from the end of the last pipe read to the first element of this Iterator, if known
+            std::chrono::nanoseconds epoch_gap_{-1};
+            bool reached_end_ = false;
             std::uint64_t read_bytes_;
             std::uint64_t records_read_ = 0;
             std::uint64_t benchmark_records_interval_;
+            // The elements of the last chunk taken from the parallel stage that are yet to be returned
+            std::deque<std::vector<Tensor>> parallel_elements_ TF_GUARDED_BY(mu_);
+            bool parallel_end_of_input_ TF_GUARDED_BY(mu_) = false;
+            std::vector<Worker> workers_;
+            // Declared last, so that its worker threads stop before the state they use is destroyed
+            std::unique_ptr<ParallelStage> parallel_stage_;
         };
     };
 };
@@ -270,6 +2125,41 @@ REGISTER_OP("PipeModeDataset")
     .Input("channel_directory: string")
     .Input("benchmark_records_interval: uint64")
     .Input("max_corrupted_records_to_skip: uint32")
+    .Input("cache_directory: string")
+    .Input("cache_max_bytes: uint64")
+    .Input("cache_shuffle: bool")
+    .Input("seed: int64")
+    .Input("shm_cache_name: string")
+    .Input("shm_cache_bytes: uint64")
+    .Input("shuffle_buffer_bytes: uint64")
+    .Input("compression: string")
+    .Input("batch_size: int64")
+    .Input("record_format_library: string")
+    .Input("file_mode: bool")
+    .Input("parallel_files: int64")
+    .Input("deterministic: bool")
+    .Input("num_shards: int64")
+    .Input("shard_index: int64")
+    .Input("num_parallel_calls: int64")
+    .Input("recover_corrupted_records: bool")
+    .Input("pool_buffers: bool")
+    .Input("max_chunk_bytes: int64")
+    .Input("memory_budget_bytes: int64")
+    .Input("fanout_name: string")
+    .Input("fanout_consumers: int64")
+    .Input("fanout_index: int64")
+    .Input("fanout_ring_bytes: int64")
+    .Input("fanout_policy: string")
+    .Attr("field_names: list(string) = []")
+    .Attr("field_kinds: list(string) = []")
+    .Attr("field_types: list({float, double, int32, int64, string}) = []")
+    .Attr("field_shapes: list(shape) = []")
+    .Attr("field_defaults: list(string) = []")
+    .Attr("field_has_defaults: list(bool) = []")
+    .Attr("record_options: list(string) = []")
+    .Attr("ragged_dtype: {uint8, int8, int16, int32, int64, float, double} = DT_UINT8")
+    .Attr("transforms: list(string) = []")
+    .Attr("filter_options: list(string) = []")
     .Output("handle: variant")
     .SetIsStateful()
     .SetShapeFn(tensorflow::shape_inference::ScalarShape);
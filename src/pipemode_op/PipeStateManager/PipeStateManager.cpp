@@ -21,10 +21,13 @@
 #include <string>
 #include <system_error>
 #include "PipeStateManager.hpp"
+#include "Probes.hpp"
 
 using sagemaker::tensorflow::PipeStateManager;
 using sagemaker::tensorflow::Lock;
 
+PIPEMODE_PROBE_SEMAPHORE(epoch__rollover);
+
 PipeStateManager::PipeStateManager(const std::string& state_directory, const std::string& channel):
     lock_file_(state_directory + "/." + channel + "-pipe_mode-lock"),
     state_file_(state_directory + "/." + channel + "-pipe_mode-state") {
@@ -51,6 +54,7 @@ void PipeStateManager::IncrementPipeIndex() const {
     state_file_istream.close();
 
     ++pipe_index;
+    PIPEMODE_PROBE2(epoch__rollover, state_file_.c_str(), pipe_index);
 
     std::fstream state_file_ostream(state_file_, std::ios_base::out);
     state_file_ostream << pipe_index;
@@ -0,0 +1,88 @@
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+// The CRC32C that TFRecordReader checks records with. The TensorFlow op gets it from the
+// TensorFlow framework library, which the reader module does not load, so the module
+// defines it here.
+
+#include <cstdint>
+#include <cstring>
+
+#include "tensorflow/tsl/lib/hash/crc32c.h"
+
+#if defined(__x86_64__)
+#include <nmmintrin.h>
+#endif
+
+namespace {
+
+using tsl::crc32c::uint32;
+
+// The reflected Castagnoli polynomial
+const uint32 kPolynomial = 0x82f63b78;
+
+struct Table {
+    uint32 entries[256];
+
+    Table() {
+        for (uint32 i = 0; i < 256; i++) {
+            uint32 crc = i;
+            for (int bit = 0; bit < 8; bit++) {
+                crc = (crc & 1) ? (crc >> 1) ^ kPolynomial : crc >> 1;
+            }
+            entries[i] = crc;
+        }
+    }
+};
+
+uint32 ExtendPortable(uint32 crc, const char* buf, size_t size) {
+    static const Table table;
+    for (size_t i = 0; i < size; i++) {
+        crc = table.entries[(crc ^ static_cast<unsigned char>(buf[i])) & 0xff] ^ (crc >> 8);
+    }
+    return crc;
+}
+
+#if defined(__x86_64__)
+__attribute__((target("sse4.2"))) uint32 ExtendSse42(uint32 crc, const char* buf, size_t size) {
+    std::uint64_t crc64 = crc;
+    for (; size >= sizeof(std::uint64_t); buf += sizeof(std::uint64_t), size -= sizeof(std::uint64_t)) {
+        std::uint64_t word;
+        std::memcpy(&word, buf, sizeof(word));
+        crc64 = _mm_crc32_u64(crc64, word);
+    }
+    crc = static_cast<uint32>(crc64);
+    for (; size; buf++, size--) {
+        crc = _mm_crc32_u8(crc, static_cast<unsigned char>(*buf));
+    }
+    return crc;
+}
+#endif
+
+}  // namespace
+
+namespace tsl {
+namespace crc32c {
+
+uint32 Extend(uint32 init_crc, const char* buf, size_t size) {
+#if defined(__x86_64__)
+    static const bool sse42 = __builtin_cpu_supports("sse4.2");
+    if (sse42) {
+        return ~ExtendSse42(~init_crc, buf, size);
+    }
+#endif
+    return ~ExtendPortable(~init_crc, buf, size);
+}
+
+}  // namespace crc32c
+}  // namespace tsl
@@ -0,0 +1,333 @@
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#define PY_SSIZE_T_CLEAN
+#include <Python.h>
+
+#include <cstdint>
+#include <memory>
+#include <mutex>
+#include <stdexcept>
+#include <string>
+#include <system_error>
+#include <utility>
+
+#include "tensorflow/core/platform/tstring.h"
+
+#include "FileChannelReader.hpp"
+#include "PipeStateManager.hpp"
+#include "RecordReaderRegistry.hpp"
+
+using sagemaker::tensorflow::Compression;
+using sagemaker::tensorflow::FileChannelOptions;
+using sagemaker::tensorflow::FileChannelReader;
+using sagemaker::tensorflow::ParseCompression;
+using sagemaker::tensorflow::PipeStateManager;
+using sagemaker::tensorflow::RecordReader;
+using sagemaker::tensorflow::RecordReaderRegistry;
+
+/**
+   A Python extension module, _pipemode_reader, that reads the records of a SageMaker channel
+   without TensorFlow.
+
+   A Reader reads one pass over a channel, from the channel's next pipe or from its files, and
+   returns records in batches of two buffers: the bytes of the records, one after another, and
+   the int64 offsets of the records in the bytes, with a leading 0. Both support the buffer
+   protocol, so they can be wrapped in NumPy arrays without copying. The GIL is released while
+   a Reader opens its channel and reads records.
+ */
+namespace {
+
+/**
+   Reads the records of one pass over a channel.
+ */
+class ChannelReader {
+ public:
+    ChannelReader(const std::string& record_format, const std::string& channel, const std::string& channel_directory,
+        const std::string& state_directory, Compression compression, std::uint32_t max_corrupted_records_to_skip,
+        bool file_mode, const FileChannelOptions& file_options) {
+        std::string channel_path = channel_directory;
+        if (channel_path.empty() || channel_path.back() != '/') {
+            channel_path += '/';
+        }
+        channel_path += channel;
+        if (file_mode) {
+            file_reader_ = std::unique_ptr<FileChannelReader>(new FileChannelReader(channel_path,
+                [record_format, max_corrupted_records_to_skip](const std::string& file_path) {
+                    return RecordReaderRegistry::Global().Create(record_format, file_path,
+                        max_corrupted_records_to_skip);
+                }, compression, file_options));
+            return;
+        }
+        PipeStateManager pipe_state_manager(state_directory, channel);
+        std::string pipe_path = channel_path + "_" + std::to_string(pipe_state_manager.GetPipeIndex());
+        pipe_state_manager.IncrementPipeIndex();
+        record_reader_ = RecordReaderRegistry::Global().Create(record_format, pipe_path,
+            max_corrupted_records_to_skip);
+        record_reader_->SetCompression(compression);
+    }
+
+    /**
+       Reads up to max_records records, or records until their size reaches max_bytes if it
+       is not zero. Returns false if no records remain.
+     */
+    bool ReadBatch(std::size_t max_records, std::size_t max_bytes, std::string* values, std::string* offsets) {
+        std::lock_guard<std::mutex> lock(mutex_);
+        std::int64_t end = 0;
+        offsets->append(reinterpret_cast<const char*>(&end), sizeof(end));
+        std::size_t num_records = 0;
+        while (num_records < max_records && (!max_bytes || values->size() < max_bytes)) {
+            bool read = file_reader_ ? file_reader_->ReadRecord(&record_) : record_reader_->ReadRecord(&record_);
+            if (!read) {
+                break;
+            }
+            values->append(record_.data(), record_.size());
+            end = values->size();
+            offsets->append(reinterpret_cast<const char*>(&end), sizeof(end));
+            ++num_records;
+        }
+        return num_records > 0;
+    }
+
+ private:
+    std::mutex mutex_;
+    std::unique_ptr<RecordReader> record_reader_;
+    std::unique_ptr<FileChannelReader> file_reader_;
+    ::tensorflow::tstring record_;
+};
+
+/**
+   Runs a function without the GIL, and raises its C++ exception as a Python exception.
+   Returns false if the function threw.
+ */
+template <typename Function>
+bool CallWithoutGil(Function function) {
+    PyObject* error_type = nullptr;
+    std::string error;
+    Py_BEGIN_ALLOW_THREADS
+    try {
+        function();
+    } catch (const std::invalid_argument& err) {
+        error_type = PyExc_ValueError;
+        error = err.what();
+    } catch (const std::system_error& err) {
+        error_type = PyExc_OSError;
+        error = err.what();
+    } catch (const std::exception& err) {
+        error_type = PyExc_RuntimeError;
+        error = err.what();
+    }
+    Py_END_ALLOW_THREADS
+    if (error_type) {
+        PyErr_SetString(error_type, error.c_str());
+        return false;
+    }
+    return true;
+}
+
+struct BufferObject {
+    PyObject_HEAD
+    std::string* data;
+};
+
+PyTypeObject BufferType = {PyVarObject_HEAD_INIT(nullptr, 0)};
+
+void BufferDealloc(PyObject* self) {
+    delete reinterpret_cast<BufferObject*>(self)->data;
+    Py_TYPE(self)->tp_free(self);
+}
+
+int BufferGetBuffer(PyObject* self, Py_buffer* view, int flags) {
+    std::string* data = reinterpret_cast<BufferObject*>(self)->data;
+    return PyBuffer_FillInfo(view, self, &(*data)[0], data->size(), 1, flags);
+}
+
+PyBufferProcs BufferProcs = {BufferGetBuffer, nullptr};
+
+PyObject* NewBuffer(std::unique_ptr<std::string> data) {
+    BufferObject* buffer = PyObject_New(BufferObject, &BufferType);
+    if (buffer) {
+        buffer->data = data.release();
+    }
+    return reinterpret_cast<PyObject*>(buffer);
+}
+
+struct ReaderObject {
+    PyObject_HEAD
+    // Shared with calls that read without the GIL, so that closing the reader cannot free it under them
+    std::shared_ptr<ChannelReader>* reader;
+};
+
+PyTypeObject ReaderType = {PyVarObject_HEAD_INIT(nullptr, 0)};
+
+int ReaderInit(PyObject* self, PyObject* args, PyObject* kwargs) {
+    static const char* keywords[] = {"record_format", "channel", "channel_directory", "state_directory",
+        "compression", "max_corrupted_records_to_skip", "file_mode", "parallel_files", "deterministic",
+        "num_shards", "shard_index", "record_format_library", nullptr};
+    const char* record_format;
+    const char* channel;
+    const char* channel_directory;
+    const char* state_directory;
+    const char* compression_name = "";
+    unsigned int max_corrupted_records_to_skip = 0;
+    int file_mode = 0;
+    Py_ssize_t parallel_files = DEFAULT_PARALLEL_FILES;
+    int deterministic = 1;
+    unsigned int num_shards = 1;
+    unsigned int shard_index = 0;
+    const char* record_format_library = "";
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "ssss|sIpnpIIs", const_cast<char**>(keywords), &record_format,
+            &channel, &channel_directory, &state_directory, &compression_name, &max_corrupted_records_to_skip,
+            &file_mode, &parallel_files, &deterministic, &num_shards, &shard_index, &record_format_library)) {
+        return -1;
+    }
+    if (parallel_files < 1) {
+        PyErr_SetString(PyExc_ValueError, "parallel_files must be positive");
+        return -1;
+    }
+    FileChannelOptions file_options;
+    file_options.parallel_files = parallel_files;
+    file_options.deterministic = deterministic;
+    file_options.num_shards = num_shards;
+    file_options.shard_index = shard_index;
+    std::shared_ptr<ChannelReader> reader;
+    std::string library(record_format_library);
+    bool opened = CallWithoutGil([&]() {
+        if (!library.empty()) {
+            RecordReaderRegistry::Global().LoadLibrary(library);
+        }
+        reader = std::make_shared<ChannelReader>(record_format, channel, channel_directory, state_directory,
+            ParseCompression(compression_name), max_corrupted_records_to_skip, file_mode, file_options);
+    });
+    if (!opened) {
+        return -1;
+    }
+    ReaderObject* reader_object = reinterpret_cast<ReaderObject*>(self);
+    delete reader_object->reader;
+    reader_object->reader = new std::shared_ptr<ChannelReader>(std::move(reader));
+    return 0;
+}
+
+void ReaderDealloc(PyObject* self) {
+    std::shared_ptr<ChannelReader>* reader = reinterpret_cast<ReaderObject*>(self)->reader;
+    if (reader) {
+        // Destroying the reader may join decompression threads
+        Py_BEGIN_ALLOW_THREADS
+        delete reader;
+        Py_END_ALLOW_THREADS
+    }
+    Py_TYPE(self)->tp_free(self);
+}
+
+std::shared_ptr<ChannelReader> OpenReader(PyObject* self) {
+    std::shared_ptr<ChannelReader>* reader = reinterpret_cast<ReaderObject*>(self)->reader;
+    if (!reader || !*reader) {
+        PyErr_SetString(PyExc_ValueError, "The reader is closed");
+        return nullptr;
+    }
+    return *reader;
+}
+
+PyObject* ReaderReadBatch(PyObject* self, PyObject* args, PyObject* kwargs) {
+    static const char* keywords[] = {"max_records", "max_bytes", nullptr};
+    Py_ssize_t max_records;
+    Py_ssize_t max_bytes = 0;
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "n|n", const_cast<char**>(keywords), &max_records,
+            &max_bytes)) {
+        return nullptr;
+    }
+    if (max_records < 1 || max_bytes < 0) {
+        PyErr_SetString(PyExc_ValueError, "max_records must be positive, and max_bytes must not be negative");
+        return nullptr;
+    }
+    std::shared_ptr<ChannelReader> reader = OpenReader(self);
+    if (!reader) {
+        return nullptr;
+    }
+    std::unique_ptr<std::string> values(new std::string());
+    std::unique_ptr<std::string> offsets(new std::string());
+    bool read = false;
+    if (!CallWithoutGil([&]() { read = reader->ReadBatch(max_records, max_bytes, values.get(), offsets.get()); })) {
+        return nullptr;
+    }
+    if (!read) {
+        Py_RETURN_NONE;
+    }
+    PyObject* values_buffer = NewBuffer(std::move(values));
+    PyObject* offsets_buffer = NewBuffer(std::move(offsets));
+    if (!values_buffer || !offsets_buffer) {
+        Py_XDECREF(values_buffer);
+        Py_XDECREF(offsets_buffer);
+        return nullptr;
+    }
+    PyObject* batch = PyTuple_Pack(2, values_buffer, offsets_buffer);
+    Py_DECREF(values_buffer);
+    Py_DECREF(offsets_buffer);
+    return batch;
+}
+
+PyObject* ReaderClose(PyObject* self, PyObject*) {
+    std::shared_ptr<ChannelReader>* reader = reinterpret_cast<ReaderObject*>(self)->reader;
+    if (reader) {
+        std::shared_ptr<ChannelReader> closed = std::move(*reader);
+        Py_BEGIN_ALLOW_THREADS
+        closed.reset();
+        Py_END_ALLOW_THREADS
+    }
+    Py_RETURN_NONE;
+}
+
+PyMethodDef ReaderMethods[] = {
+    {"read_batch", reinterpret_cast<PyCFunction>(reinterpret_cast<void*>(ReaderReadBatch)),
+        METH_VARARGS | METH_KEYWORDS,
+        "read_batch(max_records, max_bytes=0)\n\nReads the next batch of records, as a tuple of a buffer of the "
+        "records' bytes and a buffer of their int64 offsets, or returns None if no records remain."},
+    {"close", ReaderClose, METH_NOARGS, "Closes the reader's pipe or files."},
+    {nullptr, nullptr, 0, nullptr}
+};
+
+PyModuleDef ReaderModule = {PyModuleDef_HEAD_INIT, "_pipemode_reader",
+    "Reads the records of SageMaker channels without TensorFlow.", -1, nullptr};
+
+}  // namespace
+
+PyMODINIT_FUNC PyInit__pipemode_reader() {
+    BufferType.tp_name = "_pipemode_reader.Buffer";
+    BufferType.tp_basicsize = sizeof(BufferObject);
+    BufferType.tp_flags = Py_TPFLAGS_DEFAULT;
+    BufferType.tp_doc = "The read-only bytes of a batch of records.";
+    BufferType.tp_dealloc = BufferDealloc;
+    BufferType.tp_as_buffer = &BufferProcs;
+    ReaderType.tp_name = "_pipemode_reader.Reader";
+    ReaderType.tp_basicsize = sizeof(ReaderObject);
+    ReaderType.tp_flags = Py_TPFLAGS_DEFAULT;
+    ReaderType.tp_doc = "Reads the records of one pass over a SageMaker channel.";
+    ReaderType.tp_new = PyType_GenericNew;
+    ReaderType.tp_init = ReaderInit;
+    ReaderType.tp_dealloc = ReaderDealloc;
+    ReaderType.tp_methods = ReaderMethods;
+    if (PyType_Ready(&BufferType) < 0 || PyType_Ready(&ReaderType) < 0) {
+        return nullptr;
+    }
+    PyObject* module = PyModule_Create(&ReaderModule);
+    if (!module) {
+        return nullptr;
+    }
+    Py_INCREF(&ReaderType);
+    if (PyModule_AddObject(module, "Reader", reinterpret_cast<PyObject*>(&ReaderType)) < 0) {
+        Py_DECREF(&ReaderType);
+        Py_DECREF(module);
+        return nullptr;
+    }
+    return module;
+}
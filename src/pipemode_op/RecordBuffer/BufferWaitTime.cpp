@@ -0,0 +1,23 @@
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include "BufferWaitTime.hpp"
+
+using sagemaker::tensorflow::BufferWaitTime;
+
+void BufferWaitTime::Update(std::size_t num_records) {
+    auto now = std::chrono::steady_clock::now();
+    total_ += num_records_ * std::chrono::duration_cast<std::chrono::nanoseconds>(now - updated_);
+    num_records_ = num_records;
+    updated_ = now;
+}
@@ -0,0 +1,52 @@
+#ifndef SRC_PIPEMODE_OP_RECORDBUFFER_BUFFERWAITTIME_HPP_
+#define SRC_PIPEMODE_OP_RECORDBUFFER_BUFFERWAITTIME_HPP_
+
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include <chrono>
+#include <cstdint>
+
+namespace sagemaker {
+namespace tensorflow {
+
+/**
+   Measures the time records wait in a buffer, such as a shuffle buffer, before they are
+   consumed. The buffer reports the number of records it holds each time it changes. The
+   number of records held, integrated over time, is the sum of the time each record waited,
+   so records need not be timed one by one.
+
+   Instances of this class are not thread-safe.
+ */
+class BufferWaitTime {
+ public:
+    /**
+       Records that the buffer holds num_records records from now on.
+     */
+    void Update(std::size_t num_records);
+
+    /**
+       Returns the total time records waited in the buffer, up to the last update.
+     */
+    std::chrono::nanoseconds Total() const { return total_; }
+
+ private:
+    std::size_t num_records_ = 0;
+    std::chrono::steady_clock::time_point updated_;
+    std::chrono::nanoseconds total_{0};
+};
+
+}  // namespace tensorflow
+}  // namespace sagemaker
+
+#endif  // SRC_PIPEMODE_OP_RECORDBUFFER_BUFFERWAITTIME_HPP_
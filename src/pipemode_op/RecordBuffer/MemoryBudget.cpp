@@ -0,0 +1,80 @@
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include "MemoryBudget.hpp"
+
+#include <algorithm>
+
+using sagemaker::tensorflow::MemoryAccount;
+using sagemaker::tensorflow::MemoryBudget;
+
+MemoryBudget* MemoryBudget::Global() {
+    // Never destroyed, since iterators may release bytes until the process exits
+    static MemoryBudget* budget = new MemoryBudget();
+    return budget;
+}
+
+void MemoryBudget::SetLimit(std::size_t limit) {
+    std::lock_guard<std::mutex> lock(mu_);
+    limit_ = limit;
+}
+
+std::size_t MemoryBudget::Limit() const {
+    std::lock_guard<std::mutex> lock(mu_);
+    return limit_;
+}
+
+std::size_t MemoryBudget::Used() const {
+    std::lock_guard<std::mutex> lock(mu_);
+    return used_;
+}
+
+MemoryAccount::MemoryAccount(MemoryBudget* budget) : budget_(budget) {
+    std::lock_guard<std::mutex> lock(budget_->mu_);
+    budget_->num_accounts_++;
+}
+
+MemoryAccount::~MemoryAccount() {
+    std::lock_guard<std::mutex> lock(budget_->mu_);
+    budget_->used_ -= used_;
+    budget_->num_accounts_--;
+}
+
+void MemoryAccount::Acquire(std::size_t bytes) {
+    std::lock_guard<std::mutex> lock(budget_->mu_);
+    used_ += bytes;
+    peak_ = std::max(peak_, used_);
+    budget_->used_ += bytes;
+}
+
+void MemoryAccount::Release(std::size_t bytes) {
+    std::lock_guard<std::mutex> lock(budget_->mu_);
+    used_ -= bytes;
+    budget_->used_ -= bytes;
+}
+
+bool MemoryAccount::OverBudget() const {
+    std::lock_guard<std::mutex> lock(budget_->mu_);
+    return budget_->limit_ && budget_->used_ > budget_->limit_
+        && used_ > budget_->limit_ / budget_->num_accounts_;
+}
+
+std::size_t MemoryAccount::Used() const {
+    std::lock_guard<std::mutex> lock(budget_->mu_);
+    return used_;
+}
+
+std::size_t MemoryAccount::Peak() const {
+    std::lock_guard<std::mutex> lock(budget_->mu_);
+    return peak_;
+}
@@ -0,0 +1,117 @@
+#ifndef SRC_PIPEMODE_OP_RECORDBUFFER_MEMORYBUDGET_HPP_
+#define SRC_PIPEMODE_OP_RECORDBUFFER_MEMORYBUDGET_HPP_
+
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include <cstdint>
+#include <mutex>
+
+namespace sagemaker {
+namespace tensorflow {
+
+/**
+   A byte budget shared by the buffers of several readers, such as the iterators of the
+   PipeModeDatasets of a process. Each reader counts the bytes it buffers in a MemoryAccount
+   of the budget, and stops reading ahead while its account is over budget.
+
+   The budget is shared fairly: while the bytes of all accounts exceed the limit, only
+   accounts holding more than their fair share, the limit divided by the number of accounts,
+   are over budget. An account under its fair share can always read ahead, so a reader that
+   buffers a lot cannot starve the others, and the accounts over their share shrink until the
+   total fits again. A limit of zero means no limit.
+
+   Instances of this class are thread-safe.
+ */
+class MemoryBudget {
+ public:
+    explicit MemoryBudget(std::size_t limit = 0) : limit_(limit) {}
+
+    MemoryBudget(const MemoryBudget&) = delete;
+    MemoryBudget& operator=(const MemoryBudget&) = delete;
+
+    /**
+       Returns the budget shared by every PipeModeDataset iterator of the process.
+     */
+    static MemoryBudget* Global();
+
+    void SetLimit(std::size_t limit);
+
+    std::size_t Limit() const;
+
+    /**
+       Returns the number of bytes held by all accounts.
+     */
+    std::size_t Used() const;
+
+ private:
+    friend class MemoryAccount;
+
+    mutable std::mutex mu_;
+    std::size_t limit_;
+    std::size_t used_ = 0;
+    std::size_t num_accounts_ = 0;
+};
+
+/**
+   The bytes one reader holds of a MemoryBudget. The bytes are returned to the budget when the
+   account is destroyed.
+
+   Instances of this class are thread-safe.
+ */
+class MemoryAccount {
+ public:
+    explicit MemoryAccount(MemoryBudget* budget);
+
+    ~MemoryAccount();
+
+    MemoryAccount(const MemoryAccount&) = delete;
+    MemoryAccount& operator=(const MemoryAccount&) = delete;
+
+    /**
+       Counts bytes the reader now holds. Bytes are counted even if the account is over
+       budget, since they are held already: readers check OverBudget before they read ahead.
+     */
+    void Acquire(std::size_t bytes);
+
+    /**
+       Counts bytes the reader no longer holds.
+     */
+    void Release(std::size_t bytes);
+
+    /**
+       Returns true if the reader should stop reading ahead until it releases bytes: the
+       budget's accounts hold more than its limit, and this account more than its fair share.
+     */
+    bool OverBudget() const;
+
+    /**
+       Returns the number of bytes the reader holds.
+     */
+    std::size_t Used() const;
+
+    /**
+       Returns the largest number of bytes the reader held at once.
+     */
+    std::size_t Peak() const;
+
+ private:
+    MemoryBudget* const budget_;
+    std::size_t used_ = 0;
+    std::size_t peak_ = 0;
+};
+
+}  // namespace tensorflow
+}  // namespace sagemaker
+
+#endif  // SRC_PIPEMODE_OP_RECORDBUFFER_MEMORYBUDGET_HPP_
@@ -0,0 +1,95 @@
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include "ShuffleBuffer.hpp"
+
+#include <algorithm>
+#include <cstring>
+#include <stdexcept>
+
+using sagemaker::tensorflow::ShuffleBuffer;
+
+ShuffleBuffer::ShuffleBuffer(std::size_t capacity, std::uint64_t seed):
+    capacity_(capacity / sizeof(Entry) * sizeof(Entry)),
+    arena_(new char[capacity_]),
+    num_records_(0),
+    data_end_(0),
+    hole_bytes_(0),
+    random_(seed) {}
+
+ShuffleBuffer::Entry* ShuffleBuffer::EntryAt(std::size_t index) const {
+    return reinterpret_cast<Entry*>(arena_.get() + capacity_) - index - 1;
+}
+
+std::size_t ShuffleBuffer::TailSpace() const {
+    return capacity_ - data_end_ - num_records_ * sizeof(Entry);
+}
+
+bool ShuffleBuffer::Fits(std::size_t size) const {
+    std::size_t required = size + sizeof(Entry);
+    if (required <= TailSpace()) {
+        return true;
+    }
+    // Only compact once enough space has been freed to amortize the cost of compacting.
+    return hole_bytes_ >= capacity_ / 4 && required <= TailSpace() + hole_bytes_;
+}
+
+void ShuffleBuffer::Add(const char* data, std::size_t size) {
+    if (size + sizeof(Entry) > TailSpace()) {
+        Compact();
+        if (size + sizeof(Entry) > TailSpace()) {
+            throw std::length_error("Record does not fit in shuffle buffer");
+        }
+    }
+    if (size) {
+        std::memcpy(arena_.get() + data_end_, data, size);
+    }
+    Entry* entry = EntryAt(num_records_++);
+    entry->offset = data_end_;
+    entry->size = size;
+    data_end_ += size;
+}
+
+std::size_t ShuffleBuffer::Take(const char** data) {
+    if (!num_records_) {
+        throw std::out_of_range("Shuffle buffer is empty");
+    }
+    std::size_t index = std::uniform_int_distribution<std::size_t>(0, num_records_ - 1)(random_);
+    Entry taken = *EntryAt(index);
+    *EntryAt(index) = *EntryAt(--num_records_);
+    *data = arena_.get() + taken.offset;
+    hole_bytes_ += taken.size;
+    if (!num_records_) {
+        data_end_ = 0;
+        hole_bytes_ = 0;
+    }
+    return taken.size;
+}
+
+void ShuffleBuffer::Compact() {
+    if (!num_records_) {
+        return;
+    }
+    Entry* entries = EntryAt(num_records_ - 1);
+    std::sort(entries, entries + num_records_, [](const Entry& a, const Entry& b) { return a.offset < b.offset; });
+    std::size_t end = 0;
+    for (std::size_t i = 0; i < num_records_; i++) {
+        if (entries[i].offset != end) {
+            std::memmove(arena_.get() + end, arena_.get() + entries[i].offset, entries[i].size);
+            entries[i].offset = end;
+        }
+        end += entries[i].size;
+    }
+    data_end_ = end;
+    hole_bytes_ = 0;
+}
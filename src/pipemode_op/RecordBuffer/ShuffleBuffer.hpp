@@ -0,0 +1,101 @@
+#ifndef SRC_PIPEMODE_OP_RECORDBUFFER_SHUFFLEBUFFER_HPP_
+#define SRC_PIPEMODE_OP_RECORDBUFFER_SHUFFLEBUFFER_HPP_
+
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include <cstdint>
+#include <memory>
+#include <random>
+
+namespace sagemaker {
+namespace tensorflow {
+
+/**
+   A buffer of records from which records are removed in a random order.
+
+   Records are held in a single arena of a fixed size. Record bytes are appended
+   to the front of the arena and an index entry for each record is added to the
+   back, so the buffer never uses more memory than its capacity. Removing a record
+   leaves a hole in the arena; holes are reclaimed by compacting the arena once
+   they make up a quarter of it.
+
+   Instances of this class are not thread-safe.
+ */
+class ShuffleBuffer {
+ public:
+    /**
+       Constructs a new ShuffleBuffer.
+
+       param [in] capacity: The size of the arena in bytes.
+       param [in] seed: The seed for choosing which record to remove.
+     */
+    ShuffleBuffer(std::size_t capacity, std::uint64_t seed);
+
+    ShuffleBuffer(const ShuffleBuffer&) = delete;
+    ShuffleBuffer& operator=(const ShuffleBuffer&) = delete;
+
+    /**
+       Returns true if a record of the specified size can be added to the buffer.
+       A record that does not fit in an empty buffer never fits.
+     */
+    bool Fits(std::size_t size) const;
+
+    /**
+       Adds a record to the buffer. The record must fit.
+     */
+    void Add(const char* data, std::size_t size);
+
+    /**
+       Removes a record chosen uniformly at random. The buffer must not be empty.
+
+       param [out] data: Set to the first byte of the record. The record remains
+                         valid until the next call to Add.
+       return the size of the record in bytes.
+     */
+    std::size_t Take(const char** data);
+
+    /**
+       Returns true if the buffer holds no records.
+     */
+    bool Empty() const { return !num_records_; }
+
+    /**
+       Returns the number of records in the buffer.
+     */
+    std::size_t NumRecords() const { return num_records_; }
+
+ private:
+    struct Entry {
+        std::uint64_t offset;
+        std::uint64_t size;
+    };
+
+    Entry* EntryAt(std::size_t index) const;
+    std::size_t TailSpace() const;
+    void Compact();
+
+    std::size_t capacity_;
+    std::unique_ptr<char[]> arena_;
+    std::size_t num_records_;
+    // The end of the record bytes at the front of the arena
+    std::size_t data_end_;
+    // The number of bytes in the front of the arena freed by Take
+    std::size_t hole_bytes_;
+    std::mt19937_64 random_;
+};
+
+}  // namespace tensorflow
+}  // namespace sagemaker
+
+#endif  // SRC_PIPEMODE_OP_RECORDBUFFER_SHUFFLEBUFFER_HPP_
@@ -0,0 +1,91 @@
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include "SlabPool.hpp"
+
+#include <new>
+
+using sagemaker::tensorflow::SlabPool;
+using sagemaker::tensorflow::SlabPoolStats;
+
+namespace {
+
+/**
+   Returns the index of the size class of slabs of at least size bytes, which must not
+   exceed SLAB_POOL_MAX_SLAB_BYTES.
+ */
+std::size_t SizeClass(std::size_t size) {
+    std::size_t size_class = 0;
+    for (std::size_t slab_size = SLAB_POOL_MIN_SLAB_BYTES; slab_size < size; slab_size <<= 1) {
+        size_class++;
+    }
+    return size_class;
+}
+
+char* NewSlab(std::size_t slab_size) {
+    return static_cast<char*>(::operator new(slab_size, std::align_val_t(SLAB_POOL_ALIGNMENT)));
+}
+
+void DeleteSlab(char* slab) {
+    ::operator delete(slab, std::align_val_t(SLAB_POOL_ALIGNMENT));
+}
+
+}  // namespace
+
+SlabPool::SlabPool(std::size_t max_free_bytes)
+    : max_free_bytes_(max_free_bytes), free_slabs_(SizeClass(SLAB_POOL_MAX_SLAB_BYTES) + 1), free_bytes_(0) {}
+
+SlabPool::~SlabPool() {
+    for (std::vector<char*>& slabs : free_slabs_) {
+        for (char* slab : slabs) {
+            DeleteSlab(slab);
+        }
+    }
+}
+
+char* SlabPool::Allocate(std::size_t size, std::size_t* slab_size) {
+    const bool pooled = size <= SLAB_POOL_MAX_SLAB_BYTES;
+    const std::size_t size_class = pooled ? SizeClass(size) : 0;
+    *slab_size = pooled ? std::size_t(SLAB_POOL_MIN_SLAB_BYTES) << size_class : size;
+    {
+        std::lock_guard<std::mutex> lock(mu_);
+        std::vector<char*>& slabs = free_slabs_[size_class];
+        if (pooled && !slabs.empty()) {
+            char* slab = slabs.back();
+            slabs.pop_back();
+            free_bytes_ -= *slab_size;
+            stats_.hits++;
+            return slab;
+        }
+        stats_.misses++;
+    }
+    return NewSlab(*slab_size);
+}
+
+void SlabPool::Release(char* slab, std::size_t slab_size) {
+    if (slab_size <= SLAB_POOL_MAX_SLAB_BYTES) {
+        std::lock_guard<std::mutex> lock(mu_);
+        if (free_bytes_ + slab_size <= max_free_bytes_) {
+            free_slabs_[SizeClass(slab_size)].push_back(slab);
+            free_bytes_ += slab_size;
+            stats_.recycled++;
+            return;
+        }
+    }
+    DeleteSlab(slab);
+}
+
+SlabPoolStats SlabPool::Stats() const {
+    std::lock_guard<std::mutex> lock(mu_);
+    return stats_;
+}
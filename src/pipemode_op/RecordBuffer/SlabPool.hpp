@@ -0,0 +1,105 @@
+#ifndef SRC_PIPEMODE_OP_RECORDBUFFER_SLABPOOL_HPP_
+#define SRC_PIPEMODE_OP_RECORDBUFFER_SLABPOOL_HPP_
+
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include <cstdint>
+#include <mutex>
+#include <vector>
+
+namespace sagemaker {
+namespace tensorflow {
+
+// The size of the smallest and largest slabs a SlabPool recycles
+#define SLAB_POOL_MIN_SLAB_BYTES 64
+#define SLAB_POOL_MAX_SLAB_BYTES (1 << 20)
+
+// The alignment of every slab, which suits vectorized access to tensor values
+#define SLAB_POOL_ALIGNMENT 64
+
+// The default number of bytes of free slabs a SlabPool keeps for reuse
+#define SLAB_POOL_DEFAULT_MAX_FREE_BYTES (64 << 20)
+
+/**
+   Counts the slabs a SlabPool served.
+ */
+struct SlabPoolStats {
+    // Slabs served from free slabs
+    std::uint64_t hits = 0;
+    // Slabs newly allocated, because no free slab of their size class was left or they were too large to pool
+    std::uint64_t misses = 0;
+    // Released slabs kept for reuse
+    std::uint64_t recycled = 0;
+};
+
+/**
+   A pool of memory slabs in power of two size classes, from SLAB_POOL_MIN_SLAB_BYTES to
+   SLAB_POOL_MAX_SLAB_BYTES. Released slabs are kept, up to a number of bytes, and handed
+   out again to later allocations of their size class, so that allocating buffers for a
+   stream of records of similar sizes does not reach malloc once the pool is warm.
+
+   Slabs larger than SLAB_POOL_MAX_SLAB_BYTES are allocated and freed directly.
+
+   Instances of this class are thread-safe: slabs can be released on a different thread
+   from the one that allocated them.
+ */
+class SlabPool {
+ public:
+    /**
+       Constructs a new SlabPool.
+
+       param [in] max_free_bytes: The number of bytes of released slabs kept for reuse. Slabs
+                                  released beyond it are freed.
+     */
+    explicit SlabPool(std::size_t max_free_bytes = SLAB_POOL_DEFAULT_MAX_FREE_BYTES);
+
+    /**
+       Frees the slabs kept for reuse. Slabs must not be released after the pool is destroyed.
+     */
+    ~SlabPool();
+
+    SlabPool(const SlabPool&) = delete;
+    SlabPool& operator=(const SlabPool&) = delete;
+
+    /**
+       Allocates a slab of at least size bytes, aligned to SLAB_POOL_ALIGNMENT bytes.
+
+       param [in] size: The number of bytes needed.
+       param [out] slab_size: Set to the size of the slab, which must be passed to Release.
+     */
+    char* Allocate(std::size_t size, std::size_t* slab_size);
+
+    /**
+       Releases a slab returned by Allocate, keeping it for reuse if there is room.
+     */
+    void Release(char* slab, std::size_t slab_size);
+
+    /**
+       Returns the counts of slabs served so far.
+     */
+    SlabPoolStats Stats() const;
+
+ private:
+    const std::size_t max_free_bytes_;
+    mutable std::mutex mu_;
+    // The free slabs of each size class, smallest first
+    std::vector<std::vector<char*>> free_slabs_;
+    std::size_t free_bytes_;
+    SlabPoolStats stats_;
+};
+
+}  // namespace tensorflow
+}  // namespace sagemaker
+
+#endif  // SRC_PIPEMODE_OP_RECORDBUFFER_SLABPOOL_HPP_
@@ -0,0 +1,215 @@
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include "RecordCache.hpp"
+
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <fcntl.h>
+#include <unistd.h>
+#include <cstdio>
+#include <cstdlib>
+#include <stdexcept>
+#include <string>
+#include <system_error>
+#include <vector>
+
+using sagemaker::tensorflow::RecordCacheHeader;
+using sagemaker::tensorflow::RecordCacheReader;
+using sagemaker::tensorflow::RecordCacheWriter;
+
+std::uint64_t RECORD_CACHE_MAGIC = 0x48434143444d5053;  // "SPMDCACH"
+std::uint32_t RECORD_CACHE_VERSION = 1;
+
+std::string JoinCachePath(const std::string& cache_directory, const std::string& file_name) {
+    std::string path = cache_directory;
+    if (path[path.length() - 1] != '/') {
+        path += '/';
+    }
+    return path + file_name;
+}
+
+std::string sagemaker::tensorflow::RecordCacheDataPath(const std::string& cache_directory,
+    const std::string& channel) {
+    return JoinCachePath(cache_directory, channel + ".records");
+}
+
+std::string sagemaker::tensorflow::RecordCacheIndexPath(const std::string& cache_directory,
+    const std::string& channel) {
+    return JoinCachePath(cache_directory, channel + ".index");
+}
+
+std::string MakeTemporaryFile(const std::string& path) {
+    std::vector<char> name_template(path.begin(), path.end());
+    const std::string suffix = ".XXXXXX";
+    name_template.insert(name_template.end(), suffix.begin(), suffix.end());
+    name_template.push_back('\0');
+    int fd = mkstemp(name_template.data());
+    if (-1 == fd) {
+        throw std::system_error(errno, std::system_category());
+    }
+    close(fd);
+    return std::string(name_template.data());
+}
+
+RecordCacheWriter::RecordCacheWriter(const std::string& cache_directory, const std::string& channel,
+    std::uint64_t max_bytes):
+    data_path_(sagemaker::tensorflow::RecordCacheDataPath(cache_directory, channel)),
+    index_path_(sagemaker::tensorflow::RecordCacheIndexPath(cache_directory, channel)),
+    max_bytes_(max_bytes),
+    num_records_(0),
+    data_bytes_(0),
+    exhausted_(false),
+    finalized_(false) {
+    tmp_data_path_ = MakeTemporaryFile(data_path_);
+    tmp_index_path_ = MakeTemporaryFile(index_path_);
+    data_stream_.open(tmp_data_path_, std::ios_base::out | std::ios_base::binary | std::ios_base::trunc);
+    index_stream_.open(tmp_index_path_, std::ios_base::out | std::ios_base::binary | std::ios_base::trunc);
+    if (!data_stream_ || !index_stream_) {
+        throw std::runtime_error("Unable to create record cache in: " + cache_directory);
+    }
+    RecordCacheHeader header = {RECORD_CACHE_MAGIC, RECORD_CACHE_VERSION, 0, 0};
+    std::uint64_t first_offset = 0;
+    index_stream_.write(reinterpret_cast<const char*>(&header), sizeof(header));
+    index_stream_.write(reinterpret_cast<const char*>(&first_offset), sizeof(first_offset));
+}
+
+RecordCacheWriter::~RecordCacheWriter() {
+    if (!finalized_) {
+        data_stream_.close();
+        index_stream_.close();
+        std::remove(tmp_data_path_.c_str());
+        std::remove(tmp_index_path_.c_str());
+    }
+}
+
+bool RecordCacheWriter::Append(const char* data, std::size_t size) {
+    if (exhausted_) {
+        return false;
+    }
+    std::uint64_t index_bytes = sizeof(RecordCacheHeader) + (num_records_ + 2) * sizeof(std::uint64_t);
+    if (max_bytes_ && data_bytes_ + size + index_bytes > max_bytes_) {
+        exhausted_ = true;
+        return false;
+    }
+    data_stream_.write(data, size);
+    data_bytes_ += size;
+    index_stream_.write(reinterpret_cast<const char*>(&data_bytes_), sizeof(data_bytes_));
+    if (!data_stream_ || !index_stream_) {
+        throw std::runtime_error("Failed writing record cache: " + tmp_data_path_);
+    }
+    ++num_records_;
+    return true;
+}
+
+void RecordCacheWriter::Finalize() {
+    RecordCacheHeader header = {RECORD_CACHE_MAGIC, RECORD_CACHE_VERSION, exhausted_ ? 0u : 1u, num_records_};
+    index_stream_.seekp(0);
+    index_stream_.write(reinterpret_cast<const char*>(&header), sizeof(header));
+    data_stream_.close();
+    index_stream_.close();
+    if (!data_stream_ || !index_stream_) {
+        throw std::runtime_error("Failed writing record cache: " + tmp_index_path_);
+    }
+    // The index is published last; its presence marks the cache as readable.
+    if (std::rename(tmp_data_path_.c_str(), data_path_.c_str())
+        || std::rename(tmp_index_path_.c_str(), index_path_.c_str())) {
+        throw std::system_error(errno, std::system_category());
+    }
+    finalized_ = true;
+}
+
+void* MapFile(const std::string& path, std::size_t* size) {
+    int fd = open(path.c_str(), O_RDONLY);
+    if (-1 == fd) {
+        throw std::system_error(errno, std::system_category());
+    }
+    struct stat buffer;
+    if (fstat(fd, &buffer) == -1) {
+        int error = errno;
+        close(fd);
+        throw std::system_error(error, std::system_category());
+    }
+    *size = buffer.st_size;
+    void* map = nullptr;
+    if (*size) {
+        map = mmap(nullptr, *size, PROT_READ, MAP_SHARED, fd, 0);
+    }
+    int error = errno;
+    close(fd);
+    if (map == MAP_FAILED) {
+        throw std::system_error(error, std::system_category());
+    }
+    return map;
+}
+
+std::unique_ptr<RecordCacheReader> RecordCacheReader::Open(const std::string& cache_directory,
+    const std::string& channel) {
+    std::string index_path = sagemaker::tensorflow::RecordCacheIndexPath(cache_directory, channel);
+    struct stat buffer;
+    if (stat(index_path.c_str(), &buffer) == -1) {
+        return nullptr;
+    }
+    return std::unique_ptr<RecordCacheReader>(new RecordCacheReader(index_path,
+        sagemaker::tensorflow::RecordCacheDataPath(cache_directory, channel)));
+}
+
+RecordCacheReader::RecordCacheReader(const std::string& index_path, const std::string& data_path):
+    index_map_(nullptr),
+    index_map_size_(0),
+    data_map_(nullptr),
+    data_map_size_(0) {
+    index_map_ = MapFile(index_path, &index_map_size_);
+    if (index_map_size_ < sizeof(RecordCacheHeader)) {
+        munmap(index_map_, index_map_size_);
+        throw std::runtime_error("Invalid record cache index: " + index_path);
+    }
+    const RecordCacheHeader* header = static_cast<const RecordCacheHeader*>(index_map_);
+    offsets_ = reinterpret_cast<const std::uint64_t*>(header + 1);
+    num_records_ = header->num_records;
+    complete_ = header->complete;
+    if (header->magic_number != RECORD_CACHE_MAGIC || header->version != RECORD_CACHE_VERSION
+        || index_map_size_ != sizeof(RecordCacheHeader) + (num_records_ + 1) * sizeof(std::uint64_t)) {
+        munmap(index_map_, index_map_size_);
+        throw std::runtime_error("Invalid record cache index: " + index_path);
+    }
+    data_map_ = MapFile(data_path, &data_map_size_);
+    if (data_map_size_ != offsets_[num_records_]) {
+        munmap(index_map_, index_map_size_);
+        if (data_map_) {
+            munmap(data_map_, data_map_size_);
+        }
+        throw std::runtime_error("Record cache data does not match its index: " + data_path);
+    }
+}
+
+RecordCacheReader::~RecordCacheReader() {
+    munmap(index_map_, index_map_size_);
+    if (data_map_) {
+        munmap(data_map_, data_map_size_);
+    }
+}
+
+void RecordCacheReader::AdviseRandomAccess(bool random) const {
+    if (data_map_) {
+        madvise(data_map_, data_map_size_, random ? MADV_RANDOM : MADV_SEQUENTIAL);
+    }
+}
+
+std::size_t RecordCacheReader::GetRecord(std::uint64_t index, const char** data) const {
+    if (index >= num_records_) {
+        throw std::out_of_range("Record cache index out of range: " + std::to_string(index));
+    }
+    *data = static_cast<const char*>(data_map_) + offsets_[index];
+    return offsets_[index + 1] - offsets_[index];
+}
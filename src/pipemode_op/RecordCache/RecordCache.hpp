@@ -0,0 +1,166 @@
+#ifndef SRC_PIPEMODE_OP_RECORDCACHE_RECORDCACHE_HPP_
+#define SRC_PIPEMODE_OP_RECORDCACHE_RECORDCACHE_HPP_
+
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include <cstdint>
+#include <fstream>
+#include <memory>
+#include <string>
+
+namespace sagemaker {
+namespace tensorflow {
+
+/**
+   The header at the start of a record cache index file. The header is followed
+   by num_records + 1 offsets into the cache data file; record i occupies the
+   bytes [offsets[i], offsets[i + 1]).
+ */
+struct RecordCacheHeader {
+    std::uint64_t magic_number;
+    std::uint32_t version;
+    std::uint32_t complete;
+    std::uint64_t num_records;
+};
+
+/**
+   Writes the records of a channel to a local disk cache.
+
+   Record payloads are appended to a data file and their end offsets to an index
+   file. Both files are written under temporary names and only become visible to
+   RecordCacheReader once Finalize is called. A writer that is destroyed without
+   being finalized removes its temporary files.
+
+   Instances of this class are not thread-safe.
+ */
+class RecordCacheWriter {
+ public:
+    /**
+       Constructs a new RecordCacheWriter.
+
+       param [in] cache_directory: The directory the cache files are written to.
+       param [in] channel: The name of the channel being cached.
+       param [in] max_bytes: The maximum number of bytes the cache may occupy on disk,
+                             including its index. Zero means unlimited.
+     */
+    RecordCacheWriter(const std::string& cache_directory, const std::string& channel, std::uint64_t max_bytes);
+
+    RecordCacheWriter(const RecordCacheWriter&) = delete;
+    RecordCacheWriter& operator=(const RecordCacheWriter&) = delete;
+
+    ~RecordCacheWriter();
+
+    /**
+       Appends a record to the cache.
+
+       param [in] data: The record bytes.
+       param [in] size: The number of record bytes.
+       return true if the record was cached, false if the disk budget is exhausted.
+              Once Append has returned false no further records are cached.
+     */
+    bool Append(const char* data, std::size_t size);
+
+    /**
+       Publishes the cache. The cache is marked complete if every record appended
+       to this writer was cached, and partial otherwise.
+     */
+    void Finalize();
+
+ private:
+    std::string data_path_;
+    std::string index_path_;
+    std::string tmp_data_path_;
+    std::string tmp_index_path_;
+    std::ofstream data_stream_;
+    std::ofstream index_stream_;
+    std::uint64_t max_bytes_;
+    std::uint64_t num_records_;
+    std::uint64_t data_bytes_;
+    bool exhausted_;
+    bool finalized_;
+};
+
+/**
+   Reads records from a local disk cache written by RecordCacheWriter.
+
+   The data file is memory mapped, so records can be read in any order.
+ */
+class RecordCacheReader {
+ public:
+    /**
+       Opens the cache for a channel.
+
+       param [in] cache_directory: The directory the cache files were written to.
+       param [in] channel: The name of the cached channel.
+       return a reader, or nullptr if no cache has been published for the channel.
+     */
+    static std::unique_ptr<RecordCacheReader> Open(const std::string& cache_directory, const std::string& channel);
+
+    RecordCacheReader(const RecordCacheReader&) = delete;
+    RecordCacheReader& operator=(const RecordCacheReader&) = delete;
+
+    ~RecordCacheReader();
+
+    /**
+       Returns the number of cached records.
+     */
+    std::uint64_t NumRecords() const { return num_records_; }
+
+    /**
+       Returns true if every record of the channel is cached, false if only a
+       prefix of the channel fit within the disk budget.
+     */
+    bool IsComplete() const { return complete_; }
+
+    /**
+       Advises the kernel whether records will be read in random or sequential order.
+     */
+    void AdviseRandomAccess(bool random) const;
+
+    /**
+       Retrieves a record without copying it. The record remains valid for the
+       lifetime of this reader.
+
+       param [in] index: The index of the record, in [0, NumRecords()).
+       param [out] data: Set to the first byte of the record.
+       return the size of the record in bytes.
+     */
+    std::size_t GetRecord(std::uint64_t index, const char** data) const;
+
+ private:
+    RecordCacheReader(const std::string& index_path, const std::string& data_path);
+
+    void* index_map_;
+    std::size_t index_map_size_;
+    void* data_map_;
+    std::size_t data_map_size_;
+    const std::uint64_t* offsets_;
+    std::uint64_t num_records_;
+    bool complete_;
+};
+
+/**
+   Returns the path of the cache data file for a channel.
+ */
+std::string RecordCacheDataPath(const std::string& cache_directory, const std::string& channel);
+
+/**
+   Returns the path of the cache index file for a channel.
+ */
+std::string RecordCacheIndexPath(const std::string& cache_directory, const std::string& channel);
+
+}  // namespace tensorflow
+}  // namespace sagemaker
+
+#endif  // SRC_PIPEMODE_OP_RECORDCACHE_RECORDCACHE_HPP_
@@ -0,0 +1,307 @@
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include "SharedMemoryFanOut.hpp"
+
+#include <signal.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <fcntl.h>
+#include <unistd.h>
+#include <cerrno>
+#include <chrono>
+#include <cstring>
+#include <stdexcept>
+#include <string>
+#include <system_error>
+#include <thread>
+
+using sagemaker::tensorflow::FanOutRead;
+using sagemaker::tensorflow::SharedMemoryFanOut;
+using sagemaker::tensorflow::SharedMemoryFanOutHeader;
+using sagemaker::tensorflow::SharedMemoryFanOutRing;
+
+std::uint64_t SHM_FANOUT_MAGIC = 0x54554f4e414650;  // "PFANOUT"
+std::uint32_t SHM_FANOUT_VERSION = 1;
+auto SHM_FANOUT_ATTACH_TIMEOUT = std::chrono::seconds(10);
+
+// The pid of a leader or consumer that has not attached yet, or has detached
+std::int64_t FANOUT_NOT_ATTACHED = 0;
+std::int64_t FANOUT_DETACHED = -1;
+
+// The sizes that mark the end of an epoch, and the unused end of a ring that the next entry wraps past
+std::uint64_t FANOUT_END_OF_EPOCH = UINT64_MAX;
+std::uint64_t FANOUT_WRAP = UINT64_MAX - 1;
+
+namespace sagemaker {
+namespace tensorflow {
+
+struct SharedMemoryFanOutHeader {
+    std::uint64_t magic_number;
+    std::uint32_t version;
+    std::uint32_t initialized;
+    std::uint32_t num_consumers;
+    std::uint64_t ring_size;
+    std::uint64_t data_offset;
+    std::int64_t leader_pid;
+    std::uint64_t attached;
+};
+
+/**
+   The positions of a ring, in bytes written and read since the ring was created. The
+   head is only written by the leader, and the tail by the ring's consumer, so each is
+   kept on its own cache line.
+ */
+struct SharedMemoryFanOutRing {
+    alignas(64) std::uint64_t head;
+    alignas(64) std::uint64_t tail;
+    alignas(64) std::int64_t consumer_pid;
+};
+
+}  // namespace tensorflow
+}  // namespace sagemaker
+
+namespace {
+
+// Each record in a ring is stored as its size followed by its bytes, padded to 8 bytes.
+inline std::uint64_t EntrySize(std::uint64_t size) {
+    return sizeof(std::uint64_t) + (size + 7) / 8 * 8;
+}
+
+inline bool ProcessExists(std::int64_t pid) {
+    return kill(static_cast<pid_t>(pid), 0) == 0 || errno != ESRCH;
+}
+
+inline bool ProcessGone(std::int64_t pid) {
+    return pid == FANOUT_DETACHED || (pid > 0 && !ProcessExists(pid));
+}
+
+/**
+   Claims a pid field of the shared memory object for this process. Returns false if
+   another live process holds it.
+ */
+bool Claim(std::int64_t* pid_field) {
+    std::int64_t pid = __atomic_load_n(pid_field, __ATOMIC_ACQUIRE);
+    while (pid == FANOUT_NOT_ATTACHED || ProcessGone(pid)) {
+        if (__atomic_compare_exchange_n(pid_field, &pid, static_cast<std::int64_t>(getpid()), false,
+            __ATOMIC_ACQ_REL, __ATOMIC_ACQUIRE)) {
+            return true;
+        }
+    }
+    return false;
+}
+
+}  // namespace
+
+SharedMemoryFanOut::SharedMemoryFanOut(const std::string& name, std::uint32_t num_consumers,
+    std::uint32_t consumer, std::uint64_t ring_size): name_(name), consumer_(consumer), size_(0), map_(nullptr),
+    header_(nullptr), read_entry_size_(0) {
+    ring_size = ring_size / 8 * 8;
+    if (num_consumers < 2 || consumer >= num_consumers) {
+        throw std::invalid_argument("A shared memory fan-out needs at least two consumers, and a consumer "
+            "index below the number of consumers");
+    }
+    if (ring_size < 64) {
+        throw std::invalid_argument("The rings of a shared memory fan-out must be at least 64 bytes");
+    }
+    std::uint64_t data_offset = (sizeof(SharedMemoryFanOutHeader) + 63) / 64 * 64
+        + (num_consumers - 1) * sizeof(SharedMemoryFanOutRing);
+    std::uint64_t capacity = data_offset + (num_consumers - 1) * ring_size;
+
+    int fd = shm_open(name_.c_str(), O_RDWR | O_CREAT | O_EXCL, 0666);
+    bool creator = fd != -1;
+    if (!creator) {
+        if (errno != EEXIST) {
+            throw std::system_error(errno, std::system_category());
+        }
+        fd = shm_open(name_.c_str(), O_RDWR, 0);
+        if (-1 == fd) {
+            throw std::system_error(errno, std::system_category());
+        }
+    }
+    auto deadline = std::chrono::steady_clock::now() + SHM_FANOUT_ATTACH_TIMEOUT;
+    if (creator) {
+        if (ftruncate(fd, capacity) == -1) {
+            int error = errno;
+            close(fd);
+            shm_unlink(name_.c_str());
+            throw std::system_error(error, std::system_category());
+        }
+        size_ = capacity;
+    } else {
+        // Wait for the creating process to size the shared memory object
+        struct stat buffer;
+        while (fstat(fd, &buffer) == 0 && buffer.st_size == 0 && std::chrono::steady_clock::now() < deadline) {
+            std::this_thread::sleep_for(std::chrono::milliseconds(10));
+        }
+        size_ = buffer.st_size;
+    }
+    if (size_ < sizeof(SharedMemoryFanOutHeader)) {
+        close(fd);
+        throw std::runtime_error("Invalid shared memory fan-out: " + name_);
+    }
+    map_ = mmap(nullptr, size_, PROT_READ | PROT_WRITE, MAP_SHARED, fd, 0);
+    int error = errno;
+    close(fd);
+    if (map_ == MAP_FAILED) {
+        throw std::system_error(error, std::system_category());
+    }
+    header_ = static_cast<SharedMemoryFanOutHeader*>(map_);
+
+    if (creator) {
+        header_->magic_number = SHM_FANOUT_MAGIC;
+        header_->version = SHM_FANOUT_VERSION;
+        header_->num_consumers = num_consumers;
+        header_->ring_size = ring_size;
+        header_->data_offset = data_offset;
+        header_->leader_pid = FANOUT_NOT_ATTACHED;
+        header_->attached = 0;
+        __atomic_store_n(&header_->initialized, 1, __ATOMIC_RELEASE);
+    } else {
+        while (!__atomic_load_n(&header_->initialized, __ATOMIC_ACQUIRE)
+            && std::chrono::steady_clock::now() < deadline) {
+            std::this_thread::sleep_for(std::chrono::milliseconds(10));
+        }
+        if (!__atomic_load_n(&header_->initialized, __ATOMIC_ACQUIRE)
+            || header_->magic_number != SHM_FANOUT_MAGIC || header_->version != SHM_FANOUT_VERSION) {
+            munmap(map_, size_);
+            throw std::runtime_error("Invalid shared memory fan-out: " + name_);
+        }
+        if (header_->num_consumers != num_consumers || header_->ring_size != ring_size || size_ != capacity) {
+            std::string message = "Shared memory fan-out " + name_ + " was created for "
+                + std::to_string(header_->num_consumers) + " consumers with rings of "
+                + std::to_string(header_->ring_size) + " bytes";
+            munmap(map_, size_);
+            throw std::invalid_argument(message);
+        }
+    }
+    if (!Claim(IsLeader() ? &header_->leader_pid : &Ring(consumer_)->consumer_pid)) {
+        munmap(map_, size_);
+        throw std::invalid_argument("Another process is attached to shared memory fan-out " + name_
+            + " as consumer " + std::to_string(consumer_));
+    }
+    __atomic_add_fetch(&header_->attached, 1, __ATOMIC_ACQ_REL);
+}
+
+SharedMemoryFanOut::~SharedMemoryFanOut() {
+    __atomic_store_n(IsLeader() ? &header_->leader_pid : &Ring(consumer_)->consumer_pid, FANOUT_DETACHED,
+        __ATOMIC_RELEASE);
+    bool last = __atomic_sub_fetch(&header_->attached, 1, __ATOMIC_ACQ_REL) == 0;
+    munmap(map_, size_);
+    if (last) {
+        shm_unlink(name_.c_str());
+    }
+}
+
+std::uint32_t SharedMemoryFanOut::NumConsumers() const {
+    return header_->num_consumers;
+}
+
+SharedMemoryFanOutRing* SharedMemoryFanOut::Ring(std::uint32_t consumer) const {
+    // The leader keeps its own records, so it has no ring
+    return reinterpret_cast<SharedMemoryFanOutRing*>(static_cast<char*>(map_)
+        + (sizeof(SharedMemoryFanOutHeader) + 63) / 64 * 64) + (consumer - 1);
+}
+
+char* SharedMemoryFanOut::RingData(std::uint32_t consumer) const {
+    return static_cast<char*>(map_) + header_->data_offset + (consumer - 1) * header_->ring_size;
+}
+
+bool SharedMemoryFanOut::ConsumerAttached(std::uint32_t consumer) const {
+    // Records are kept for a consumer until it attaches
+    return !ProcessGone(__atomic_load_n(&Ring(consumer)->consumer_pid, __ATOMIC_ACQUIRE));
+}
+
+bool SharedMemoryFanOut::TryWrite(std::uint32_t consumer, const char* data, std::size_t size) {
+    if (EntrySize(size) + EntrySize(0) > header_->ring_size) {
+        throw std::runtime_error("Record of " + std::to_string(size) + " bytes is larger than the rings of "
+            "shared memory fan-out " + name_);
+    }
+    return TryWriteEntry(consumer, size, data, size);
+}
+
+bool SharedMemoryFanOut::TryEndEpoch(std::uint32_t consumer) {
+    return TryWriteEntry(consumer, FANOUT_END_OF_EPOCH, nullptr, 0);
+}
+
+bool SharedMemoryFanOut::TryWriteEntry(std::uint32_t consumer, std::uint64_t size_field, const char* data,
+    std::size_t size) {
+    if (!ConsumerAttached(consumer)) {
+        return true;
+    }
+    SharedMemoryFanOutRing* ring = Ring(consumer);
+    char* ring_data = RingData(consumer);
+    const std::uint64_t ring_size = header_->ring_size;
+    const std::uint64_t entry_size = EntrySize(size);
+    // Records leave room for the mark of the end of an epoch, which never wraps, so that an epoch
+    // can be ended without waiting for the consumer
+    const std::uint64_t reserved = size_field == FANOUT_END_OF_EPOCH ? 0 : EntrySize(0);
+    std::uint64_t head = ring->head;
+    const std::uint64_t tail = __atomic_load_n(&ring->tail, __ATOMIC_ACQUIRE);
+    std::uint64_t offset = head % ring_size;
+    if (entry_size > ring_size - offset) {
+        // Entries are contiguous, so the entry starts again at the front of the ring
+        if (ring_size - (head - tail) < ring_size - offset + reserved) {
+            return false;
+        }
+        std::memcpy(ring_data + offset, &FANOUT_WRAP, sizeof(FANOUT_WRAP));
+        head += ring_size - offset;
+        offset = 0;
+        __atomic_store_n(&ring->head, head, __ATOMIC_RELEASE);
+    }
+    if (ring_size - (head - tail) < entry_size + reserved) {
+        return false;
+    }
+    std::memcpy(ring_data + offset, &size_field, sizeof(size_field));
+    if (size) {
+        std::memcpy(ring_data + offset + sizeof(size_field), data, size);
+    }
+    __atomic_store_n(&ring->head, head + entry_size, __ATOMIC_RELEASE);
+    return true;
+}
+
+FanOutRead SharedMemoryFanOut::TryRead(const char** data, std::size_t* size) {
+    SharedMemoryFanOutRing* ring = Ring(consumer_);
+    const char* ring_data = RingData(consumer_);
+    const std::uint64_t ring_size = header_->ring_size;
+    std::uint64_t tail = ring->tail;
+    if (read_entry_size_) {
+        tail += read_entry_size_;
+        read_entry_size_ = 0;
+        __atomic_store_n(&ring->tail, tail, __ATOMIC_RELEASE);
+    }
+    while (true) {
+        if (tail == __atomic_load_n(&ring->head, __ATOMIC_ACQUIRE)) {
+            if (ProcessGone(__atomic_load_n(&header_->leader_pid, __ATOMIC_ACQUIRE))) {
+                throw std::runtime_error("The leader of shared memory fan-out " + name_ + " has exited");
+            }
+            return FanOutRead::EMPTY;
+        }
+        std::uint64_t offset = tail % ring_size;
+        std::uint64_t size_field;
+        std::memcpy(&size_field, ring_data + offset, sizeof(size_field));
+        if (size_field == FANOUT_WRAP) {
+            tail += ring_size - offset;
+            __atomic_store_n(&ring->tail, tail, __ATOMIC_RELEASE);
+            continue;
+        }
+        if (size_field == FANOUT_END_OF_EPOCH) {
+            __atomic_store_n(&ring->tail, tail + EntrySize(0), __ATOMIC_RELEASE);
+            return FanOutRead::END_OF_EPOCH;
+        }
+        *data = ring_data + offset + sizeof(size_field);
+        *size = size_field;
+        read_entry_size_ = EntrySize(size_field);
+        return FanOutRead::RECORD;
+    }
+}
@@ -0,0 +1,136 @@
+#ifndef SRC_PIPEMODE_OP_RECORDCACHE_SHAREDMEMORYFANOUT_HPP_
+#define SRC_PIPEMODE_OP_RECORDCACHE_SHAREDMEMORYFANOUT_HPP_
+
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include <cstdint>
+#include <string>
+
+namespace sagemaker {
+namespace tensorflow {
+
+#define DEFAULT_SHM_FANOUT_RING_SIZE (64 << 20)
+
+struct SharedMemoryFanOutHeader;
+struct SharedMemoryFanOutRing;
+
+/**
+   The outcome of SharedMemoryFanOut::TryRead.
+ */
+enum class FanOutRead {
+    // A record was read
+    RECORD,
+    // The leader reached the end of an epoch
+    END_OF_EPOCH,
+    // No record is ready yet
+    EMPTY
+};
+
+/**
+   Distributes the records of one reader to the other processes on the host, through
+   a POSIX shared memory object shared by every process that opens it under the same name.
+
+   Consumer 0 is the leader, which reads the channel and writes each record it does not
+   keep to the ring buffer of the consumer the record is for. Every other consumer reads
+   its records from its own ring buffer. Each ring buffer has a single writer and a single
+   reader, so records are passed without locks: the leader advances the ring's head once a
+   record is written, and the consumer advances its tail once the record is read.
+
+   TryWrite and TryRead never block. Callers wait and retry while a ring is full or empty.
+
+   Records written to a consumer that has detached, or whose process has died, are
+   discarded. The shared memory object is removed when the last process detaches from it.
+
+   Instances of this class are not thread-safe.
+ */
+class SharedMemoryFanOut {
+ public:
+    /**
+       Opens the shared memory fan-out with the specified name, creating it if it does not
+       exist, and attaches to it as a consumer. Throws std::invalid_argument if consumer is
+       not below num_consumers, if another live process is attached as the consumer, or if
+       the fan-out was created with a different number of consumers or ring size.
+
+       param [in] name: The name of the POSIX shared memory object, e.g. "/training-fanout".
+       param [in] num_consumers: The number of processes records are distributed to,
+                                 including the leader.
+       param [in] consumer: The index of this process among the consumers. 0 is the leader.
+       param [in] ring_size: The number of bytes of each consumer's ring buffer. Records
+                             larger than a ring cannot be written.
+     */
+    SharedMemoryFanOut(const std::string& name, std::uint32_t num_consumers, std::uint32_t consumer,
+        std::uint64_t ring_size = DEFAULT_SHM_FANOUT_RING_SIZE);
+
+    SharedMemoryFanOut(const SharedMemoryFanOut&) = delete;
+    SharedMemoryFanOut& operator=(const SharedMemoryFanOut&) = delete;
+
+    /**
+       Detaches from the shared memory object.
+     */
+    ~SharedMemoryFanOut();
+
+    std::uint32_t NumConsumers() const;
+
+    std::uint32_t Consumer() const { return consumer_; }
+
+    bool IsLeader() const { return consumer_ == 0; }
+
+    /**
+       Writes a record to the ring of a consumer other than the leader. Returns false if the
+       ring does not have room for the record yet, and for the mark of the end of an epoch
+       after it. Throws std::runtime_error if the record and the mark are larger than a
+       ring. May only be called by the leader.
+
+       param [in] consumer: The consumer the record is for.
+       param [in] data: The record bytes.
+       param [in] size: The number of record bytes.
+     */
+    bool TryWrite(std::uint32_t consumer, const char* data, std::size_t size);
+
+    /**
+       Marks the end of an epoch in the ring of a consumer. Returns false if the ring does
+       not have room for the mark yet, which only happens if the consumer has not yet read
+       the mark of an earlier epoch that no record followed. May only be called by the leader.
+     */
+    bool TryEndEpoch(std::uint32_t consumer);
+
+    /**
+       Reads the next record from this consumer's ring. A record read stays valid until the
+       next call. Throws std::runtime_error if the ring is empty and the leader has detached
+       or died. May not be called by the leader.
+
+       param [out] data: Set to the first byte of the record, if one is read.
+       param [out] size: Set to the size of the record in bytes, if one is read.
+     */
+    FanOutRead TryRead(const char** data, std::size_t* size);
+
+ private:
+    bool TryWriteEntry(std::uint32_t consumer, std::uint64_t size_field, const char* data, std::size_t size);
+    bool ConsumerAttached(std::uint32_t consumer) const;
+    SharedMemoryFanOutRing* Ring(std::uint32_t consumer) const;
+    char* RingData(std::uint32_t consumer) const;
+
+    const std::string name_;
+    const std::uint32_t consumer_;
+    std::uint64_t size_;
+    void* map_;
+    SharedMemoryFanOutHeader* header_;
+    // The bytes of the record last read, which are released to the leader by the next TryRead
+    std::uint64_t read_entry_size_;
+};
+
+}  // namespace tensorflow
+}  // namespace sagemaker
+
+#endif  // SRC_PIPEMODE_OP_RECORDCACHE_SHAREDMEMORYFANOUT_HPP_
@@ -0,0 +1,412 @@
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include "SharedMemoryRecordCache.hpp"
+
+#include <pthread.h>
+#include <signal.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <fcntl.h>
+#include <unistd.h>
+#include <algorithm>
+#include <cerrno>
+#include <chrono>
+#include <cstring>
+#include <stdexcept>
+#include <string>
+#include <system_error>
+#include <thread>
+
+using sagemaker::tensorflow::SharedMemoryCacheCursor;
+using sagemaker::tensorflow::SharedMemoryCacheHeader;
+using sagemaker::tensorflow::SharedMemoryCacheSegment;
+using sagemaker::tensorflow::SharedMemoryCacheWriter;
+using sagemaker::tensorflow::SharedMemoryRecordCache;
+
+std::uint64_t SHM_CACHE_MAGIC = 0x4d4853444d5053;  // "SPMDSHM"
+std::uint32_t SHM_CACHE_VERSION = 1;
+auto SHM_CACHE_ATTACH_TIMEOUT = std::chrono::seconds(10);
+
+std::uint32_t SEGMENT_FREE = 0;
+std::uint32_t SEGMENT_FILLING = 1;
+std::uint32_t SEGMENT_SEALED = 2;
+
+namespace sagemaker {
+namespace tensorflow {
+
+struct SharedMemoryCacheHeader {
+    std::uint64_t magic_number;
+    std::uint32_t version;
+    std::uint32_t initialized;
+    pthread_mutex_t mutex;
+    std::uint64_t num_segments;
+    std::uint64_t segment_size;
+    std::uint64_t data_offset;
+    std::int64_t num_records;
+    std::uint64_t clock_hand;
+    std::uint64_t attached;
+};
+
+/**
+   The bookkeeping for a segment. All fields are guarded by the cache mutex, except
+   that the process filling a segment updates num_records and used atomically
+   without holding it.
+ */
+struct SharedMemoryCacheSegment {
+    std::uint32_t state;
+    std::uint32_t referenced;
+    std::uint64_t pins;
+    std::int64_t owner;
+    std::uint64_t first_record;
+    std::uint64_t num_records;
+    std::uint64_t used;
+};
+
+}  // namespace tensorflow
+}  // namespace sagemaker
+
+// Each record in a segment is stored as its size followed by its bytes, padded to 8 bytes.
+inline std::uint64_t EntrySize(std::uint64_t size) {
+    return sizeof(std::uint64_t) + (size + 7) / 8 * 8;
+}
+
+inline bool ProcessExists(std::int64_t pid) {
+    return kill(static_cast<pid_t>(pid), 0) == 0 || errno != ESRCH;
+}
+
+SharedMemoryRecordCache::SharedMemoryRecordCache(const std::string& name, std::uint64_t capacity,
+    std::uint64_t segment_size): name_(name), size_(0), map_(nullptr), header_(nullptr) {
+    int fd = shm_open(name_.c_str(), O_RDWR | O_CREAT | O_EXCL, 0666);
+    bool creator = fd != -1;
+    if (!creator) {
+        if (errno != EEXIST) {
+            throw std::system_error(errno, std::system_category());
+        }
+        fd = shm_open(name_.c_str(), O_RDWR, 0);
+        if (-1 == fd) {
+            throw std::system_error(errno, std::system_category());
+        }
+    }
+    auto deadline = std::chrono::steady_clock::now() + SHM_CACHE_ATTACH_TIMEOUT;
+    if (creator) {
+        if (ftruncate(fd, capacity) == -1) {
+            int error = errno;
+            close(fd);
+            shm_unlink(name_.c_str());
+            throw std::system_error(error, std::system_category());
+        }
+        size_ = capacity;
+    } else {
+        // Wait for the creating process to size the shared memory object
+        struct stat buffer;
+        while (fstat(fd, &buffer) == 0 && buffer.st_size == 0 && std::chrono::steady_clock::now() < deadline) {
+            std::this_thread::sleep_for(std::chrono::milliseconds(10));
+        }
+        size_ = buffer.st_size;
+    }
+    if (size_ < sizeof(SharedMemoryCacheHeader)) {
+        close(fd);
+        throw std::runtime_error("Shared memory record cache is too small: " + name_);
+    }
+    map_ = mmap(nullptr, size_, PROT_READ | PROT_WRITE, MAP_SHARED, fd, 0);
+    int error = errno;
+    close(fd);
+    if (map_ == MAP_FAILED) {
+        throw std::system_error(error, std::system_category());
+    }
+    header_ = static_cast<SharedMemoryCacheHeader*>(map_);
+
+    if (creator) {
+        std::uint64_t segment_bytes = std::min(segment_size, capacity / 4) / 8 * 8;
+        std::uint64_t num_segments = 0;
+        std::uint64_t data_offset = 0;
+        if (segment_bytes) {
+            num_segments = (capacity - sizeof(SharedMemoryCacheHeader))
+                / (sizeof(SharedMemoryCacheSegment) + segment_bytes);
+            data_offset = (sizeof(SharedMemoryCacheHeader) + num_segments * sizeof(SharedMemoryCacheSegment)
+                + 63) / 64 * 64;
+            while (num_segments && data_offset + num_segments * segment_bytes > capacity) {
+                --num_segments;
+            }
+        }
+        if (segment_bytes < 64 || !num_segments) {
+            munmap(map_, size_);
+            shm_unlink(name_.c_str());
+            throw std::runtime_error("Shared memory record cache is too small: " + name_);
+        }
+        pthread_mutexattr_t attr;
+        pthread_mutexattr_init(&attr);
+        pthread_mutexattr_setpshared(&attr, PTHREAD_PROCESS_SHARED);
+        pthread_mutexattr_setrobust(&attr, PTHREAD_MUTEX_ROBUST);
+        pthread_mutex_init(&header_->mutex, &attr);
+        pthread_mutexattr_destroy(&attr);
+        header_->magic_number = SHM_CACHE_MAGIC;
+        header_->version = SHM_CACHE_VERSION;
+        header_->num_segments = num_segments;
+        header_->segment_size = segment_bytes;
+        header_->data_offset = data_offset;
+        header_->num_records = -1;
+        header_->clock_hand = 0;
+        header_->attached = 0;
+        __atomic_store_n(&header_->initialized, 1, __ATOMIC_RELEASE);
+    } else {
+        while (!__atomic_load_n(&header_->initialized, __ATOMIC_ACQUIRE)
+            && std::chrono::steady_clock::now() < deadline) {
+            std::this_thread::sleep_for(std::chrono::milliseconds(10));
+        }
+        if (!__atomic_load_n(&header_->initialized, __ATOMIC_ACQUIRE)
+            || header_->magic_number != SHM_CACHE_MAGIC || header_->version != SHM_CACHE_VERSION) {
+            munmap(map_, size_);
+            throw std::runtime_error("Invalid shared memory record cache: " + name_);
+        }
+    }
+    Lock();
+    ++header_->attached;
+    Unlock();
+}
+
+SharedMemoryRecordCache::~SharedMemoryRecordCache() {
+    bool last = false;
+    try {
+        Lock();
+        last = --header_->attached == 0;
+        Unlock();
+    } catch(const std::system_error&) {
+        // The attach count cannot be updated without the lock, so the object is left for the
+        // other processes to unlink rather than removed while they may use it.
+    }
+    munmap(map_, size_);
+    if (last) {
+        shm_unlink(name_.c_str());
+    }
+}
+
+void SharedMemoryRecordCache::Lock() const {
+    int result = pthread_mutex_lock(&header_->mutex);
+    if (result == EOWNERDEAD) {
+        // A process died while holding the lock. Segment pins it held are leaked.
+        pthread_mutex_consistent(&header_->mutex);
+    } else if (result) {
+        throw std::system_error(result, std::system_category());
+    }
+}
+
+void SharedMemoryRecordCache::Unlock() const {
+    pthread_mutex_unlock(&header_->mutex);
+}
+
+std::int64_t SharedMemoryRecordCache::NumRecords() const {
+    Lock();
+    std::int64_t num_records = header_->num_records;
+    Unlock();
+    return num_records;
+}
+
+void SharedMemoryRecordCache::SetNumRecords(std::uint64_t num_records) {
+    Lock();
+    header_->num_records = num_records;
+    Unlock();
+}
+
+std::uint64_t SharedMemoryRecordCache::NumSegments() const {
+    return header_->num_segments;
+}
+
+std::uint64_t SharedMemoryRecordCache::SegmentSize() const {
+    return header_->segment_size;
+}
+
+SharedMemoryCacheSegment* SharedMemoryRecordCache::Segment(std::uint64_t index) const {
+    return reinterpret_cast<SharedMemoryCacheSegment*>(header_ + 1) + index;
+}
+
+char* SharedMemoryRecordCache::SegmentData(std::uint64_t index) const {
+    return static_cast<char*>(map_) + header_->data_offset + index * header_->segment_size;
+}
+
+std::int64_t SharedMemoryRecordCache::FindSegment(std::uint64_t record) const {
+    for (std::uint64_t i = 0; i < header_->num_segments; i++) {
+        SharedMemoryCacheSegment* segment = Segment(i);
+        if (segment->state == SEGMENT_SEALED && segment->first_record <= record
+            && record < segment->first_record + segment->num_records) {
+            return i;
+        }
+    }
+    return -1;
+}
+
+std::int64_t SharedMemoryRecordCache::AllocateSegment(std::uint64_t first_record) {
+    std::uint64_t num_segments = header_->num_segments;
+    for (std::uint64_t i = 0; i < 2 * num_segments; i++) {
+        std::uint64_t index = header_->clock_hand;
+        header_->clock_hand = (index + 1) % num_segments;
+        SharedMemoryCacheSegment* segment = Segment(index);
+        if (segment->state == SEGMENT_FILLING && ProcessExists(segment->owner)) {
+            continue;
+        }
+        if (segment->state == SEGMENT_SEALED) {
+            if (segment->pins) {
+                continue;
+            }
+            if (segment->referenced) {
+                segment->referenced = 0;
+                continue;
+            }
+        }
+        segment->state = SEGMENT_FILLING;
+        segment->referenced = 0;
+        segment->pins = 0;
+        segment->owner = getpid();
+        segment->first_record = first_record;
+        __atomic_store_n(&segment->num_records, 0, __ATOMIC_RELAXED);
+        __atomic_store_n(&segment->used, 0, __ATOMIC_RELAXED);
+        return index;
+    }
+    return -1;
+}
+
+SharedMemoryCacheCursor::SharedMemoryCacheCursor(SharedMemoryRecordCache* cache):
+    cache_(cache), segment_(-1), next_record_(0), next_offset_(0) {}
+
+SharedMemoryCacheCursor::~SharedMemoryCacheCursor() {
+    try {
+        Unpin();
+    } catch(const std::system_error&) {
+        // The pin is leaked, as it is when a process dies holding it
+    }
+}
+
+void SharedMemoryCacheCursor::Unpin() {
+    if (segment_ >= 0) {
+        cache_->Lock();
+        --cache_->Segment(segment_)->pins;
+        cache_->Unlock();
+        segment_ = -1;
+    }
+}
+
+bool SharedMemoryCacheCursor::Read(std::uint64_t record, const char** data, std::size_t* size) {
+    // The pinned segment is sealed and cannot change, so it is safe to inspect without locking.
+    if (segment_ >= 0) {
+        SharedMemoryCacheSegment* segment = cache_->Segment(segment_);
+        if (record < segment->first_record || record >= segment->first_record + segment->num_records) {
+            Unpin();
+        }
+    }
+    if (segment_ < 0) {
+        cache_->Lock();
+        segment_ = cache_->FindSegment(record);
+        if (segment_ >= 0) {
+            SharedMemoryCacheSegment* segment = cache_->Segment(segment_);
+            ++segment->pins;
+            segment->referenced = 1;
+            next_record_ = segment->first_record;
+            next_offset_ = 0;
+        }
+        cache_->Unlock();
+        if (segment_ < 0) {
+            return false;
+        }
+    }
+    const char* segment_data = cache_->SegmentData(segment_);
+    if (record < next_record_) {
+        next_record_ = cache_->Segment(segment_)->first_record;
+        next_offset_ = 0;
+    }
+    std::uint64_t record_size;
+    while (true) {
+        std::memcpy(&record_size, segment_data + next_offset_, sizeof(record_size));
+        if (next_record_ == record) {
+            break;
+        }
+        next_offset_ += EntrySize(record_size);
+        ++next_record_;
+    }
+    *data = segment_data + next_offset_ + sizeof(record_size);
+    *size = record_size;
+    next_offset_ += EntrySize(record_size);
+    ++next_record_;
+    return true;
+}
+
+SharedMemoryCacheWriter::SharedMemoryCacheWriter(SharedMemoryRecordCache* cache):
+    cache_(cache), segment_(-1), skip_until_(0) {}
+
+SharedMemoryCacheWriter::~SharedMemoryCacheWriter() {
+    try {
+        Seal();
+    } catch(const std::system_error&) {
+        // The segment stays owned by this process, and is reclaimed by the others once it exits
+    }
+}
+
+void SharedMemoryCacheWriter::Seal() {
+    if (segment_ >= 0) {
+        cache_->Lock();
+        SharedMemoryCacheSegment* segment = cache_->Segment(segment_);
+        segment->state = segment->num_records ? SEGMENT_SEALED : SEGMENT_FREE;
+        segment->referenced = 1;
+        segment->owner = 0;
+        cache_->Unlock();
+        segment_ = -1;
+    }
+}
+
+void SharedMemoryCacheWriter::Append(std::uint64_t record, const char* data, std::size_t size) {
+    std::uint64_t entry_size = EntrySize(size);
+    if (entry_size > cache_->SegmentSize()) {
+        Seal();
+        return;
+    }
+    if (segment_ >= 0) {
+        SharedMemoryCacheSegment* segment = cache_->Segment(segment_);
+        if (segment->first_record + segment->num_records != record
+            || segment->used + entry_size > cache_->SegmentSize()) {
+            Seal();
+        }
+    }
+    if (segment_ < 0) {
+        if (record < skip_until_) {
+            return;
+        }
+        cache_->Lock();
+        // Leave records that another segment holds, or is being filled with, to that segment.
+        for (std::uint64_t i = 0; i < cache_->NumSegments(); i++) {
+            SharedMemoryCacheSegment* segment = cache_->Segment(i);
+            std::uint64_t end = segment->first_record + __atomic_load_n(&segment->num_records, __ATOMIC_RELAXED);
+            if (segment->state != SEGMENT_FREE && segment->first_record <= record && record < end) {
+                skip_until_ = end;
+            }
+        }
+        if (record >= skip_until_) {
+            segment_ = cache_->AllocateSegment(record);
+            if (segment_ < 0) {
+                skip_until_ = record + 1;
+            }
+        }
+        cache_->Unlock();
+        if (segment_ < 0) {
+            return;
+        }
+    }
+    SharedMemoryCacheSegment* segment = cache_->Segment(segment_);
+    char* destination = cache_->SegmentData(segment_) + segment->used;
+    std::uint64_t record_size = size;
+    std::memcpy(destination, &record_size, sizeof(record_size));
+    if (size) {
+        std::memcpy(destination + sizeof(record_size), data, size);
+    }
+    __atomic_store_n(&segment->used, segment->used + entry_size, __ATOMIC_RELAXED);
+    __atomic_store_n(&segment->num_records, segment->num_records + 1, __ATOMIC_RELAXED);
+}
@@ -0,0 +1,180 @@
+#ifndef SRC_PIPEMODE_OP_RECORDCACHE_SHAREDMEMORYRECORDCACHE_HPP_
+#define SRC_PIPEMODE_OP_RECORDCACHE_SHAREDMEMORYRECORDCACHE_HPP_
+
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include <cstdint>
+#include <string>
+
+namespace sagemaker {
+namespace tensorflow {
+
+#define DEFAULT_SHM_SEGMENT_SIZE 8388608
+
+struct SharedMemoryCacheHeader;
+struct SharedMemoryCacheSegment;
+
+/**
+   A record cache held in a POSIX shared memory object, shared by every process
+   on the host that opens the cache under the same name.
+
+   The cache holds the records of one record stream, identified by their position
+   in the stream. Processes that share a cache must read identical data, for
+   example the same S3 prefix through different channels.
+
+   The shared memory object is divided into fixed size segments. Each segment
+   holds a run of consecutive records. Segments are filled by one process at a
+   time and become readable once sealed. When the cache is full, sealed segments
+   are evicted in CLOCK order. Readers pin the segment they read from, and pinned
+   segments are never evicted.
+
+   The shared memory object is removed when the last process detaches from it.
+ */
+class SharedMemoryRecordCache {
+ public:
+    /**
+       Opens the shared memory cache with the specified name, creating it if it
+       does not exist.
+
+       param [in] name: The name of the POSIX shared memory object, e.g. "/training".
+       param [in] capacity: The size of the shared memory object in bytes. Ignored
+                            if the cache already exists.
+       param [in] segment_size: The preferred size of a segment in bytes. Records
+                                larger than a segment are not cached.
+     */
+    SharedMemoryRecordCache(const std::string& name, std::uint64_t capacity,
+        std::uint64_t segment_size = DEFAULT_SHM_SEGMENT_SIZE);
+
+    SharedMemoryRecordCache(const SharedMemoryRecordCache&) = delete;
+    SharedMemoryRecordCache& operator=(const SharedMemoryRecordCache&) = delete;
+
+    /**
+       Detaches from the shared memory object.
+     */
+    ~SharedMemoryRecordCache();
+
+    /**
+       Returns the number of records in the stream, or -1 if no process has read
+       the stream to its end yet.
+     */
+    std::int64_t NumRecords() const;
+
+    /**
+       Records the number of records in the stream.
+     */
+    void SetNumRecords(std::uint64_t num_records);
+
+    /**
+       Returns the number of segments in the cache.
+     */
+    std::uint64_t NumSegments() const;
+
+    /**
+       Returns the number of bytes a segment can hold.
+     */
+    std::uint64_t SegmentSize() const;
+
+ private:
+    friend class SharedMemoryCacheCursor;
+    friend class SharedMemoryCacheWriter;
+
+    void Lock() const;
+    void Unlock() const;
+    SharedMemoryCacheSegment* Segment(std::uint64_t index) const;
+    char* SegmentData(std::uint64_t index) const;
+    std::int64_t FindSegment(std::uint64_t record) const;
+    std::int64_t AllocateSegment(std::uint64_t first_record);
+
+    const std::string name_;
+    std::uint64_t size_;
+    void* map_;
+    SharedMemoryCacheHeader* header_;
+};
+
+/**
+   Reads records from a SharedMemoryRecordCache. A cursor keeps the segment of the
+   last record it returned pinned, so the record stays valid until the next call
+   to Read or the destruction of the cursor.
+
+   Instances of this class are not thread-safe.
+ */
+class SharedMemoryCacheCursor {
+ public:
+    explicit SharedMemoryCacheCursor(SharedMemoryRecordCache* cache);
+
+    SharedMemoryCacheCursor(const SharedMemoryCacheCursor&) = delete;
+    SharedMemoryCacheCursor& operator=(const SharedMemoryCacheCursor&) = delete;
+
+    ~SharedMemoryCacheCursor();
+
+    /**
+       Looks up a record.
+
+       param [in] record: The position of the record in the stream.
+       param [out] data: Set to the first byte of the record.
+       param [out] size: Set to the size of the record in bytes.
+       return true if the record is cached, false otherwise.
+     */
+    bool Read(std::uint64_t record, const char** data, std::size_t* size);
+
+ private:
+    void Unpin();
+
+    SharedMemoryRecordCache* cache_;
+    std::int64_t segment_;
+    std::uint64_t next_record_;
+    std::uint64_t next_offset_;
+};
+
+/**
+   Writes records to a SharedMemoryRecordCache. Records are appended to a segment
+   owned by this writer, which becomes readable by other processes when it is full,
+   when a record is appended out of sequence, or when the writer is destroyed.
+
+   Instances of this class are not thread-safe.
+ */
+class SharedMemoryCacheWriter {
+ public:
+    explicit SharedMemoryCacheWriter(SharedMemoryRecordCache* cache);
+
+    SharedMemoryCacheWriter(const SharedMemoryCacheWriter&) = delete;
+    SharedMemoryCacheWriter& operator=(const SharedMemoryCacheWriter&) = delete;
+
+    ~SharedMemoryCacheWriter();
+
+    /**
+       Offers a record to the cache. The record is not cached if it is already cached,
+       if it is larger than a segment, or if every segment is pinned.
+
+       param [in] record: The position of the record in the stream.
+       param [in] data: The record bytes.
+       param [in] size: The number of record bytes.
+     */
+    void Append(std::uint64_t record, const char* data, std::size_t size);
+
+    /**
+       Makes the records appended so far readable.
+     */
+    void Seal();
+
+ private:
+    SharedMemoryRecordCache* cache_;
+    std::int64_t segment_;
+    std::uint64_t skip_until_;
+};
+
+}  // namespace tensorflow
+}  // namespace sagemaker
+
+#endif  // SRC_PIPEMODE_OP_RECORDCACHE_SHAREDMEMORYRECORDCACHE_HPP_
@@ -0,0 +1,498 @@
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include "ArrowDecoder.hpp"
+
+#include <cstring>
+#include <stdexcept>
+
+using sagemaker::tensorflow::ArrowDecoder;
+using sagemaker::tensorflow::Column;
+using sagemaker::tensorflow::FieldKind;
+using sagemaker::tensorflow::FieldSpec;
+using sagemaker::tensorflow::FieldType;
+
+namespace {
+
+// The Message header types, and the Type union members, of the Arrow flatbuffer schema
+const std::uint8_t ARROW_SCHEMA = 1;
+const std::uint8_t ARROW_DICTIONARY_BATCH = 2;
+const std::uint8_t ARROW_RECORD_BATCH = 3;
+
+enum ArrowTypeId : std::uint8_t {
+    NONE = 0,
+    NULL_TYPE = 1,
+    INT = 2,
+    FLOATING_POINT = 3,
+    BINARY = 4,
+    UTF8 = 5,
+    BOOL = 6,
+    LIST = 12,
+    STRUCT = 13,
+    UNION = 14,
+    FIXED_SIZE_LIST = 16,
+    MAP = 17,
+    LARGE_BINARY = 19,
+    LARGE_UTF8 = 20,
+    LARGE_LIST = 21,
+    RUN_END_ENCODED = 22,
+    BINARY_VIEW = 23,
+    UTF8_VIEW = 24,
+    LIST_VIEW = 25,
+    LARGE_LIST_VIEW = 26
+};
+
+// The size of the FieldNode and Buffer structs of a RecordBatch
+const std::int64_t ARROW_STRUCT_SIZE = 16;
+
+/**
+   Reads the tables, vectors and scalars of a flatbuffer, checking that they are
+   within its bounds. Tables, vectors and strings are identified by their position.
+ */
+class FlatBuffer {
+ public:
+    FlatBuffer(const char* data, std::size_t size) : data_(data), size_(size) {}
+
+    template <typename T>
+    T Read(std::int64_t position) const {
+        if (position < 0 || static_cast<std::size_t>(position) + sizeof(T) > size_) {
+            throw std::runtime_error("Invalid Arrow message metadata");
+        }
+        T value;
+        std::memcpy(&value, data_ + position, sizeof(T));
+        return value;
+    }
+
+    std::int64_t Root() const {
+        return Read<std::uint32_t>(0);
+    }
+
+    /**
+       Returns the position of a field of a table, or -1 if the field is absent.
+     */
+    std::int64_t Field(std::int64_t table, int id) const {
+        std::int64_t vtable = table - Read<std::int32_t>(table);
+        std::int64_t slot = 4 + 2 * id;
+        if (slot + 2 > Read<std::uint16_t>(vtable)) {
+            return -1;
+        }
+        std::uint16_t offset = Read<std::uint16_t>(vtable + slot);
+        return offset ? table + offset : -1;
+    }
+
+    template <typename T>
+    T Scalar(std::int64_t table, int id, T default_value) const {
+        std::int64_t position = Field(table, id);
+        return position < 0 ? default_value : Read<T>(position);
+    }
+
+    /**
+       Returns the position of the table, vector or string a field refers to, or -1 if the
+       field is absent.
+     */
+    std::int64_t Offset(std::int64_t table, int id) const {
+        std::int64_t position = Field(table, id);
+        return position < 0 ? -1 : position + Read<std::uint32_t>(position);
+    }
+
+    std::int64_t Length(std::int64_t vector) const {
+        return vector < 0 ? 0 : Read<std::uint32_t>(vector);
+    }
+
+    /**
+       Returns the position of an element of a vector of tables.
+     */
+    std::int64_t TableAt(std::int64_t vector, std::int64_t index) const {
+        std::int64_t position = vector + 4 + 4 * index;
+        return position + Read<std::uint32_t>(position);
+    }
+
+    std::string String(std::int64_t string) const {
+        std::int64_t length = Length(string);
+        if (static_cast<std::size_t>(string + 4 + length) > size_) {
+            throw std::runtime_error("Invalid Arrow message metadata");
+        }
+        return std::string(data_ + string + 4, length);
+    }
+
+ private:
+    const char* data_;
+    std::size_t size_;
+};
+
+/**
+   Adds the number of nodes and buffers that a field and its children take in a
+   record batch.
+ */
+void CountLayout(const FlatBuffer& flat, std::int64_t field, std::int64_t* nodes, std::int64_t* buffers) {
+    ++*nodes;
+    std::uint8_t type = flat.Scalar<std::uint8_t>(field, 2, NONE);
+    if (flat.Offset(field, 4) >= 0) {
+        // Dictionary encoded values are stored as indices
+        *buffers += 2;
+    } else {
+        switch (type) {
+            case NULL_TYPE:
+            case RUN_END_ENCODED:
+                break;
+            case STRUCT:
+            case FIXED_SIZE_LIST:
+                *buffers += 1;
+                break;
+            case LIST:
+            case LARGE_LIST:
+            case MAP:
+                *buffers += 2;
+                break;
+            case BINARY:
+            case UTF8:
+            case LARGE_BINARY:
+            case LARGE_UTF8:
+            case LIST_VIEW:
+            case LARGE_LIST_VIEW:
+                *buffers += 3;
+                break;
+            case UNION: {
+                // Sparse unions have a buffer of type ids, dense unions also have offsets
+                std::int64_t union_type = flat.Offset(field, 3);
+                *buffers += union_type >= 0 && flat.Scalar<std::int16_t>(union_type, 0, 0) == 1 ? 2 : 1;
+                break;
+            }
+            case NONE:
+            case BINARY_VIEW:
+            case UTF8_VIEW:
+                throw std::runtime_error("Unsupported Arrow type id: " + std::to_string(type));
+            default:
+                *buffers += 2;
+        }
+    }
+    std::int64_t children = flat.Offset(field, 5);
+    for (std::int64_t i = 0; i < flat.Length(children); i++) {
+        CountLayout(flat, flat.TableAt(children, i), nodes, buffers);
+    }
+}
+
+}  // namespace
+
+ArrowDecoder::ArrowDecoder(const std::vector<FieldSpec>& fields)
+    : fields_(fields), layouts_(fields.size()), has_schema_(false), num_rows_(0), columns_(fields.size()) {
+    for (std::size_t i = 0; i < fields.size(); i++) {
+        const FieldSpec& field = fields[i];
+        if (field.kind != FieldKind::DENSE || !field.shape.empty()) {
+            throw std::invalid_argument("Arrow field " + field.name + " must be a dense scalar");
+        }
+        for (std::size_t j = 0; j < i; j++) {
+            if (fields[j].name == field.name) {
+                throw std::invalid_argument("Arrow field " + field.name + " is repeated");
+            }
+        }
+        Column column(field);
+        if (field.has_default && !column.AppendText(field.default_value.data(), field.default_value.size())) {
+            throw std::invalid_argument("Cannot parse default value \"" + field.default_value + "\" of field "
+                + field.name + " as " + FieldTypeName(field.type));
+        }
+    }
+}
+
+bool ArrowDecoder::DecodeMessage(const char* metadata, std::size_t metadata_size, const char* body,
+    std::int64_t body_size) {
+    FlatBuffer flat(metadata, metadata_size);
+    std::int64_t message = flat.Root();
+    std::uint8_t header_type = flat.Scalar<std::uint8_t>(message, 1, 0);
+    std::int64_t header = flat.Offset(message, 2);
+    if (header < 0) {
+        throw std::runtime_error("Arrow message has no header");
+    }
+    switch (header_type) {
+        case ARROW_SCHEMA:
+            DecodeSchema(metadata, metadata_size, header);
+            return false;
+        case ARROW_DICTIONARY_BATCH:
+            // Only needed by dictionary encoded columns, which are rejected with the schema
+            return false;
+        case ARROW_RECORD_BATCH:
+            DecodeRecordBatch(metadata, metadata_size, header, body, body_size);
+            return true;
+        default:
+            throw std::runtime_error("Unsupported Arrow message type: " + std::to_string(header_type));
+    }
+}
+
+void ArrowDecoder::DecodeSchema(const char* metadata, std::size_t metadata_size, std::int64_t schema) {
+    FlatBuffer flat(metadata, metadata_size);
+    if (flat.Scalar<std::int16_t>(schema, 0, 0) != 0) {
+        throw std::runtime_error("Big endian Arrow streams are not supported");
+    }
+    has_schema_ = false;
+    std::vector<bool> found(fields_.size());
+    std::int64_t nodes = 0;
+    std::int64_t buffers = 0;
+    std::int64_t columns = flat.Offset(schema, 1);
+    for (std::int64_t i = 0; i < flat.Length(columns); i++) {
+        std::int64_t column = flat.TableAt(columns, i);
+        std::int64_t name = flat.Offset(column, 0);
+        std::string column_name = name < 0 ? "" : flat.String(name);
+        for (std::size_t j = 0; j < fields_.size(); j++) {
+            if (fields_[j].name != column_name) {
+                continue;
+            }
+            const FieldSpec& spec = fields_[j];
+            ColumnLayout& layout = layouts_[j];
+            layout.node = nodes;
+            layout.buffer = buffers;
+            layout.bit_width = 0;
+            layout.is_signed = false;
+            std::uint8_t type_id = flat.Scalar<std::uint8_t>(column, 2, NONE);
+            std::int64_t type = flat.Offset(column, 3);
+            bool supported = flat.Offset(column, 4) < 0;
+            switch (type_id) {
+                case INT:
+                    layout.type = ColumnType::INT;
+                    layout.bit_width = type < 0 ? 0 : flat.Scalar<std::int32_t>(type, 0, 0);
+                    layout.is_signed = type >= 0 && flat.Scalar<std::uint8_t>(type, 1, 0);
+                    supported &= layout.bit_width == 8 || layout.bit_width == 16 || layout.bit_width == 32
+                        || layout.bit_width == 64;
+                    break;
+                case FLOATING_POINT: {
+                    // Half precision floats are not supported
+                    std::int16_t precision = type < 0 ? 0 : flat.Scalar<std::int16_t>(type, 0, 0);
+                    layout.type = ColumnType::FLOAT;
+                    layout.bit_width = precision == 1 ? 32 : 64;
+                    supported &= precision == 1 || precision == 2;
+                    break;
+                }
+                case BOOL:
+                    layout.type = ColumnType::BOOL;
+                    break;
+                case BINARY:
+                case UTF8:
+                    layout.type = ColumnType::BINARY;
+                    break;
+                case LARGE_BINARY:
+                case LARGE_UTF8:
+                    layout.type = ColumnType::LARGE_BINARY;
+                    break;
+                default:
+                    supported = false;
+            }
+            bool is_binary = layout.type == ColumnType::BINARY || layout.type == ColumnType::LARGE_BINARY;
+            if (!supported || is_binary != (spec.type == FieldType::STRING)) {
+                throw std::runtime_error("Arrow column " + column_name + " cannot be read as "
+                    + FieldTypeName(spec.type));
+            }
+            found[j] = true;
+        }
+        CountLayout(flat, column, &nodes, &buffers);
+    }
+    for (std::size_t j = 0; j < fields_.size(); j++) {
+        if (!found[j]) {
+            throw std::runtime_error("Arrow stream has no column " + fields_[j].name);
+        }
+    }
+    has_schema_ = true;
+}
+
+void ArrowDecoder::DecodeRecordBatch(const char* metadata, std::size_t metadata_size, std::int64_t record_batch,
+    const char* body, std::int64_t body_size) {
+    if (!has_schema_) {
+        throw std::runtime_error("Arrow record batch has no schema");
+    }
+    FlatBuffer flat(metadata, metadata_size);
+    if (flat.Offset(record_batch, 3) >= 0) {
+        throw std::runtime_error("Compressed Arrow record batches are not supported");
+    }
+    num_rows_ = flat.Scalar<std::int64_t>(record_batch, 0, 0);
+    if (num_rows_ < 0) {
+        throw std::runtime_error("Invalid Arrow record batch length: " + std::to_string(num_rows_));
+    }
+    std::int64_t nodes = flat.Offset(record_batch, 1);
+    std::int64_t buffers = flat.Offset(record_batch, 2);
+    auto read_buffer = [&](std::int64_t index, std::int64_t min_size, std::int64_t* size = nullptr) {
+        if (index >= flat.Length(buffers)) {
+            throw std::runtime_error("Arrow record batch has too few buffers");
+        }
+        std::int64_t offset = flat.Read<std::int64_t>(buffers + 4 + ARROW_STRUCT_SIZE * index);
+        std::int64_t length = flat.Read<std::int64_t>(buffers + 4 + ARROW_STRUCT_SIZE * index + 8);
+        if (offset < 0 || length < min_size || offset > body_size || length > body_size - offset) {
+            throw std::runtime_error("Invalid Arrow buffer at offset " + std::to_string(offset) + " of length "
+                + std::to_string(length));
+        }
+        if (size) {
+            *size = length;
+        }
+        return body + offset;
+    };
+    for (std::size_t i = 0; i < fields_.size(); i++) {
+        const ColumnLayout& layout = layouts_[i];
+        ColumnData& data = columns_[i];
+        if (layout.node >= flat.Length(nodes)) {
+            throw std::runtime_error("Arrow record batch has too few nodes");
+        }
+        std::int64_t node = nodes + 4 + ARROW_STRUCT_SIZE * layout.node;
+        if (flat.Read<std::int64_t>(node) != num_rows_) {
+            throw std::runtime_error("Arrow column " + fields_[i].name + " has a different length than its "
+                "record batch");
+        }
+        data.null_count = flat.Read<std::int64_t>(node + 8);
+        std::int64_t bitmap_size = (num_rows_ + 7) / 8;
+        data.validity = data.null_count ? read_buffer(layout.buffer, bitmap_size) : nullptr;
+        switch (layout.type) {
+            case ColumnType::BINARY:
+            case ColumnType::LARGE_BINARY: {
+                std::int64_t offset_size = layout.type == ColumnType::BINARY ? 4 : 8;
+                data.offsets = read_buffer(layout.buffer + 1, num_rows_ ? (num_rows_ + 1) * offset_size : 0);
+                data.values = read_buffer(layout.buffer + 2, 0, &data.values_size);
+                break;
+            }
+            case ColumnType::BOOL:
+                data.offsets = nullptr;
+                data.values = read_buffer(layout.buffer + 1, bitmap_size);
+                break;
+            default:
+                data.offsets = nullptr;
+                data.values = read_buffer(layout.buffer + 1, num_rows_ * (layout.bit_width / 8));
+        }
+    }
+}
+
+const char* ArrowDecoder::SharedValues(std::size_t field) const {
+    const ColumnLayout& layout = layouts_[field];
+    if (columns_[field].null_count) {
+        return nullptr;
+    }
+    switch (fields_[field].type) {
+        case FieldType::FLOAT32:
+            return layout.type == ColumnType::FLOAT && layout.bit_width == 32 ? columns_[field].values : nullptr;
+        case FieldType::FLOAT64:
+            return layout.type == ColumnType::FLOAT && layout.bit_width == 64 ? columns_[field].values : nullptr;
+        case FieldType::INT32:
+            return layout.type == ColumnType::INT && layout.is_signed && layout.bit_width == 32
+                ? columns_[field].values : nullptr;
+        case FieldType::INT64:
+            return layout.type == ColumnType::INT && layout.is_signed && layout.bit_width == 64
+                ? columns_[field].values : nullptr;
+        default:
+            return nullptr;
+    }
+}
+
+void ArrowDecoder::CopyValues(std::size_t field, Column* column) const {
+    const ColumnLayout& layout = layouts_[field];
+    switch (layout.type) {
+        case ColumnType::BINARY:
+        case ColumnType::LARGE_BINARY:
+            CopyStrings(field, column);
+            break;
+        case ColumnType::BOOL: {
+            std::vector<std::uint8_t> values(num_rows_);
+            const char* bits = columns_[field].values;
+            for (std::int64_t row = 0; row < num_rows_; row++) {
+                values[row] = (bits[row >> 3] >> (row & 7)) & 1;
+            }
+            AppendRows(field, values.data(), column);
+            break;
+        }
+        case ColumnType::FLOAT:
+            if (layout.bit_width == 32) {
+                CopyNumbers<float>(field, column);
+            } else {
+                CopyNumbers<double>(field, column);
+            }
+            break;
+        default:
+            switch (layout.bit_width) {
+                case 8:
+                    layout.is_signed ? CopyNumbers<std::int8_t>(field, column)
+                        : CopyNumbers<std::uint8_t>(field, column);
+                    break;
+                case 16:
+                    layout.is_signed ? CopyNumbers<std::int16_t>(field, column)
+                        : CopyNumbers<std::uint16_t>(field, column);
+                    break;
+                case 32:
+                    layout.is_signed ? CopyNumbers<std::int32_t>(field, column)
+                        : CopyNumbers<std::uint32_t>(field, column);
+                    break;
+                default:
+                    layout.is_signed ? CopyNumbers<std::int64_t>(field, column)
+                        : CopyNumbers<std::uint64_t>(field, column);
+            }
+    }
+}
+
+template <typename T>
+void ArrowDecoder::CopyNumbers(std::size_t field, Column* column) const {
+    const char* data = columns_[field].values;
+    if (reinterpret_cast<std::uintptr_t>(data) % alignof(T) == 0) {
+        AppendRows(field, reinterpret_cast<const T*>(data), column);
+        return;
+    }
+    std::vector<T> values(num_rows_);
+    std::memcpy(values.data(), data, num_rows_ * sizeof(T));
+    AppendRows(field, values.data(), column);
+}
+
+template <typename T>
+void ArrowDecoder::AppendRows(std::size_t field, const T* values, Column* column) const {
+    const ColumnData& data = columns_[field];
+    if (!data.null_count) {
+        column->AppendValues(values, num_rows_);
+        return;
+    }
+    for (std::int64_t row = 0; row < num_rows_; row++) {
+        if (IsValid(data, row)) {
+            column->AppendValues(values + row, 1);
+        } else {
+            AppendMissing(field, column);
+        }
+    }
+}
+
+void ArrowDecoder::CopyStrings(std::size_t field, Column* column) const {
+    const ColumnData& data = columns_[field];
+    bool large = layouts_[field].type == ColumnType::LARGE_BINARY;
+    auto read_offset = [&](std::int64_t row) {
+        if (large) {
+            std::int64_t offset;
+            std::memcpy(&offset, data.offsets + row * sizeof(offset), sizeof(offset));
+            return offset;
+        }
+        std::int32_t offset;
+        std::memcpy(&offset, data.offsets + row * sizeof(offset), sizeof(offset));
+        return static_cast<std::int64_t>(offset);
+    };
+    for (std::int64_t row = 0; row < num_rows_; row++) {
+        if (!IsValid(data, row)) {
+            AppendMissing(field, column);
+            continue;
+        }
+        std::int64_t begin = read_offset(row);
+        std::int64_t end = read_offset(row + 1);
+        if (begin < 0 || end < begin || end > data.values_size) {
+            throw std::runtime_error("Invalid offsets in Arrow column " + fields_[field].name);
+        }
+        column->AppendString(data.values + begin, end - begin);
+    }
+}
+
+bool ArrowDecoder::IsValid(const ColumnData& data, std::int64_t row) const {
+    return data.validity == nullptr || ((data.validity[row >> 3] >> (row & 7)) & 1);
+}
+
+void ArrowDecoder::AppendMissing(std::size_t field, Column* column) const {
+    const FieldSpec& spec = fields_[field];
+    if (!spec.has_default) {
+        throw std::runtime_error("Arrow column " + spec.name + " has a null value and no default");
+    }
+    column->AppendText(spec.default_value.data(), spec.default_value.size());
+}
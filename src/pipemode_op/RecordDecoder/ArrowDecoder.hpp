@@ -0,0 +1,135 @@
+#ifndef SRC_PIPEMODE_OP_RECORDDECODER_ARROWDECODER_HPP_
+#define SRC_PIPEMODE_OP_RECORDDECODER_ARROWDECODER_HPP_
+
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include <cstdint>
+#include <string>
+#include <vector>
+
+#include "RecordDecoder.hpp"
+
+namespace sagemaker {
+namespace tensorflow {
+
+/**
+   Decodes the columns of the record batches of an Apache Arrow IPC stream.
+
+   Unlike a RecordDecoder, which decodes one row from each record, an ArrowDecoder decodes
+   a whole record batch message into columns, whose values can often be used in place. The
+   messages are read with an ArrowStreamReader; a schema message describes the columns of
+   the record batches that follow it, until the next schema.
+
+   Fields are named by the top level column they are read from, and must be scalar DENSE
+   fields. Numeric fields are read from integer, single or double precision floating point
+   and boolean columns, converting the values to the type of the field. STRING fields are
+   read from utf8 and binary columns. Null values take the default value of the field; a
+   field without a default value must not have nulls. Dictionary encoded and compressed
+   columns are not supported.
+ */
+class ArrowDecoder {
+ public:
+    /**
+       Constructs a new ArrowDecoder. Throws std::invalid_argument if a field is not a
+       dense scalar, or if a default value is not valid.
+     */
+    explicit ArrowDecoder(const std::vector<FieldSpec>& fields);
+
+    ArrowDecoder(const ArrowDecoder&) = delete;
+    ArrowDecoder& operator=(const ArrowDecoder&) = delete;
+
+    /**
+       Decodes a message of the stream. Returns true if the message is a record batch,
+       whose columns can then be read until the next call. Throws std::runtime_error if the
+       message is not valid, or if the schema does not have a supported column for each field.
+
+       param [in] metadata: The flatbuffer Message of the message.
+       param [in] metadata_size: The number of metadata bytes.
+       param [in] body: The body of the message, which must outlive the decoded record batch.
+       param [in] body_size: The number of body bytes.
+     */
+    bool DecodeMessage(const char* metadata, std::size_t metadata_size, const char* body,
+        std::int64_t body_size);
+
+    /**
+       Returns the number of rows of the last record batch.
+     */
+    std::int64_t NumRows() const { return num_rows_; }
+
+    /**
+       Returns the values of a field in the last record batch's body if they are stored
+       there as they would be in a tensor, that is with the field's type and without nulls.
+       Returns nullptr otherwise.
+     */
+    const char* SharedValues(std::size_t field) const;
+
+    /**
+       Appends the values of a field in the last record batch to a column, converting them
+       to the type of the field. Throws std::runtime_error if a value is null and the field
+       has no default value.
+     */
+    void CopyValues(std::size_t field, Column* column) const;
+
+    const std::vector<FieldSpec>& Fields() const { return fields_; }
+
+ private:
+    enum class ColumnType {
+        INT,
+        FLOAT,
+        BOOL,
+        BINARY,
+        LARGE_BINARY
+    };
+
+    struct ColumnLayout {
+        ColumnType type;
+        // The width of integer and floating point values, in bits
+        std::int32_t bit_width;
+        bool is_signed;
+        // The position of the column's first node and buffer in a record batch
+        std::int64_t node;
+        std::int64_t buffer;
+    };
+
+    struct ColumnData {
+        std::int64_t null_count;
+        const char* validity;
+        // The offsets of BINARY and LARGE_BINARY values, or null
+        const char* offsets;
+        const char* values;
+        std::int64_t values_size;
+    };
+
+    void DecodeSchema(const char* metadata, std::size_t metadata_size, std::int64_t schema);
+    void DecodeRecordBatch(const char* metadata, std::size_t metadata_size, std::int64_t record_batch,
+        const char* body, std::int64_t body_size);
+    bool IsValid(const ColumnData& data, std::int64_t row) const;
+    void AppendMissing(std::size_t field, Column* column) const;
+    template <typename T>
+    void CopyNumbers(std::size_t field, Column* column) const;
+    template <typename T>
+    void AppendRows(std::size_t field, const T* values, Column* column) const;
+    void CopyStrings(std::size_t field, Column* column) const;
+
+    const std::vector<FieldSpec> fields_;
+    std::vector<ColumnLayout> layouts_;
+    bool has_schema_;
+    std::int64_t num_rows_;
+    std::vector<ColumnData> columns_;
+};
+
+}  // namespace tensorflow
+}  // namespace sagemaker
+
+#endif  // SRC_PIPEMODE_OP_RECORDDECODER_ARROWDECODER_HPP_
@@ -0,0 +1,52 @@
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include "AugmentedManifestDecoder.hpp"
+
+#include <stdexcept>
+#include <string>
+
+using sagemaker::tensorflow::AugmentedManifestDecoder;
+using sagemaker::tensorflow::Batch;
+using sagemaker::tensorflow::FieldKind;
+using sagemaker::tensorflow::FieldSpec;
+using sagemaker::tensorflow::FieldType;
+
+AugmentedManifestDecoder::AugmentedManifestDecoder(const std::vector<FieldSpec>& fields)
+    : RecordDecoder(fields), attribute_(0) {
+    if (fields.empty()) {
+        throw std::invalid_argument("Augmented manifest records require attribute names");
+    }
+    for (const FieldSpec& field : fields) {
+        if (field.kind != FieldKind::DENSE || field.type != FieldType::STRING || field.NumElements() != 1) {
+            throw std::invalid_argument("Augmented manifest attribute " + field.name + " must be a scalar string");
+        }
+    }
+}
+
+void AugmentedManifestDecoder::Decode(const char* data, std::size_t size, Batch* batch) {
+    batch->Columns()[attribute_].AppendString(data, size);
+    if (++attribute_ == fields_.size()) {
+        attribute_ = 0;
+        batch->FinishRow();
+    }
+}
+
+void AugmentedManifestDecoder::Finish() {
+    if (attribute_) {
+        const std::string& missing = fields_[attribute_].name;
+        attribute_ = 0;
+        throw std::runtime_error("The augmented manifest ended partway through a sample, missing attribute "
+            + missing);
+    }
+}
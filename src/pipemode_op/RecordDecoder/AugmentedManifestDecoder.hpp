@@ -0,0 +1,57 @@
+#ifndef SRC_PIPEMODE_OP_RECORDDECODER_AUGMENTEDMANIFESTDECODER_HPP_
+#define SRC_PIPEMODE_OP_RECORDDECODER_AUGMENTEDMANIFESTDECODER_HPP_
+
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include <cstdint>
+#include <vector>
+
+#include "RecordDecoder.hpp"
+
+namespace sagemaker {
+namespace tensorflow {
+
+/**
+   Groups the records of a SageMaker Augmented Manifest File channel into samples.
+
+   SageMaker writes the attributes of each line of an Augmented Manifest File to the
+   channel as consecutive records, such as an image followed by its label. Each field is
+   an attribute, in the order the attributes are written, and must be a scalar DENSE
+   string field. Every group of as many records as there are fields is decoded into one
+   row, whose fields hold the bytes of the records.
+ */
+class AugmentedManifestDecoder : public RecordDecoder {
+ public:
+    /**
+       Constructs a new AugmentedManifestDecoder. Throws std::invalid_argument if there are
+       no fields, or a field is not a scalar DENSE string field.
+     */
+    explicit AugmentedManifestDecoder(const std::vector<FieldSpec>& fields);
+
+    void Decode(const char* data, std::size_t size, Batch* batch) override;
+
+    /**
+       Throws std::runtime_error if the last sample is missing attributes.
+     */
+    void Finish() override;
+
+ private:
+    // The attribute the next record holds
+    std::size_t attribute_;
+};
+
+}  // namespace tensorflow
+}  // namespace sagemaker
+
+#endif  // SRC_PIPEMODE_OP_RECORDDECODER_AUGMENTEDMANIFESTDECODER_HPP_
@@ -0,0 +1,181 @@
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include "CsvDecoder.hpp"
+
+#include <stdexcept>
+
+#include "NumberParser.hpp"
+
+using sagemaker::tensorflow::Batch;
+using sagemaker::tensorflow::CsvDecoder;
+using sagemaker::tensorflow::FieldKind;
+using sagemaker::tensorflow::FieldSpec;
+using sagemaker::tensorflow::FieldType;
+using sagemaker::tensorflow::ParseInt64;
+using sagemaker::tensorflow::RecordDecoderOptions;
+
+namespace {
+
+bool ParseOption(const RecordDecoderOptions& options, const std::string& name, std::string* value) {
+    auto option = options.find(name);
+    if (option == options.end()) {
+        return false;
+    }
+    *value = option->second;
+    return true;
+}
+
+}  // namespace
+
+CsvDecoder::CsvDecoder(const std::vector<FieldSpec>& fields, const RecordDecoderOptions& options)
+    : RecordDecoder(fields), delim_(','), header_(false), seen_header_(false) {
+    for (const auto& option : options) {
+        if (option.first != "field_delim" && option.first != "na_value" && option.first != "header") {
+            throw std::invalid_argument("Unknown CSV option: " + option.first);
+        }
+    }
+    std::string value;
+    if (ParseOption(options, "field_delim", &value)) {
+        if (value.size() != 1 || value == "\"") {
+            throw std::invalid_argument("The CSV field delimiter must be a single character other than '\"'");
+        }
+        delim_ = value[0];
+    }
+    ParseOption(options, "na_value", &na_value_);
+    if (ParseOption(options, "header", &value)) {
+        if (value != "true" && value != "false") {
+            throw std::invalid_argument("The CSV header option must be true or false: " + value);
+        }
+        header_ = value == "true";
+    }
+
+    std::int64_t last_column = -1;
+    for (std::size_t i = 0; i < fields.size(); i++) {
+        const FieldSpec& field = fields[i];
+        std::int64_t column;
+        if (!ParseInt64(field.name.data(), field.name.size(), &column) || column <= last_column) {
+            throw std::invalid_argument("CSV fields must be named by increasing column indices: " + field.name);
+        }
+        if (field.kind != FieldKind::DENSE || !field.shape.empty()) {
+            throw std::invalid_argument("CSV field " + field.name + " must be a dense scalar");
+        }
+        column_fields_.resize(column + 1, -1);
+        column_fields_[column] = i;
+        last_column = column;
+    }
+
+    // Checks the default values by decoding them once
+    Batch batch(fields);
+    for (std::size_t i = 0; i < fields.size(); i++) {
+        if (fields[i].has_default && fields[i].type != FieldType::STRING) {
+            try {
+                AppendValue(i, fields[i].default_value.data(), fields[i].default_value.size(), &batch);
+            } catch (const std::runtime_error& err) {
+                throw std::invalid_argument(err.what());
+            }
+        }
+    }
+}
+
+void CsvDecoder::Decode(const char* data, std::size_t size, Batch* batch) {
+    if (size > 0 && data[size - 1] == '\r') {
+        --size;
+    }
+    if (header_) {
+        if (!seen_header_) {
+            header_line_.assign(data, size);
+            seen_header_ = true;
+            return;
+        }
+        if (size == header_line_.size() && header_line_.compare(0, size, data, size) == 0) {
+            return;
+        }
+    }
+    const char* pos = data;
+    const char* end = data + size;
+    std::size_t column = 0;
+    for (; column < column_fields_.size() && pos != nullptr; column++) {
+        const char* field_data;
+        std::size_t field_size;
+        pos = NextField(pos, end, &field_data, &field_size);
+        std::int64_t field = column_fields_[column];
+        if (field < 0) {
+            continue;
+        }
+        if (field_size == 0 || (field_size == na_value_.size() && na_value_.compare(0, field_size, field_data,
+                field_size) == 0)) {
+            AppendMissing(field, batch);
+        } else {
+            AppendValue(field, field_data, field_size, batch);
+        }
+    }
+    for (; column < column_fields_.size(); column++) {
+        if (column_fields_[column] >= 0) {
+            AppendMissing(column_fields_[column], batch);
+        }
+    }
+    batch->FinishRow();
+}
+
+const char* CsvDecoder::NextField(const char* begin, const char* end, const char** data, std::size_t* size) {
+    if (begin == end || *begin != '"') {
+        const char* pos = begin;
+        while (pos != end && *pos != delim_) {
+            ++pos;
+        }
+        *data = begin;
+        *size = pos - begin;
+        return pos == end ? nullptr : pos + 1;
+    }
+    unquoted_.clear();
+    const char* pos = begin + 1;
+    while (true) {
+        const char* quote = pos;
+        while (quote != end && *quote != '"') {
+            ++quote;
+        }
+        if (quote == end) {
+            throw std::runtime_error("Unterminated quoted CSV field: " + std::string(begin, end));
+        }
+        unquoted_.append(pos, quote);
+        pos = quote + 1;
+        if (pos != end && *pos == '"') {
+            unquoted_.push_back('"');
+            ++pos;
+            continue;
+        }
+        break;
+    }
+    if (pos != end && *pos != delim_) {
+        throw std::runtime_error("Unexpected text after quoted CSV field: " + std::string(begin, end));
+    }
+    *data = unquoted_.data();
+    *size = unquoted_.size();
+    return pos == end ? nullptr : pos + 1;
+}
+
+void CsvDecoder::AppendValue(std::size_t field, const char* data, std::size_t size, Batch* batch) {
+    if (!batch->Columns()[field].AppendText(data, size)) {
+        throw std::runtime_error("Cannot parse \"" + std::string(data, size) + "\" in CSV column "
+            + fields_[field].name + " as " + FieldTypeName(fields_[field].type));
+    }
+}
+
+void CsvDecoder::AppendMissing(std::size_t field, Batch* batch) {
+    const FieldSpec& spec = fields_[field];
+    if (!spec.has_default) {
+        throw std::runtime_error("CSV column " + spec.name + " has no value and no default");
+    }
+    AppendValue(field, spec.default_value.data(), spec.default_value.size(), batch);
+}
@@ -0,0 +1,75 @@
+#ifndef SRC_PIPEMODE_OP_RECORDDECODER_CSVDECODER_HPP_
+#define SRC_PIPEMODE_OP_RECORDDECODER_CSVDECODER_HPP_
+
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include <cstdint>
+#include <string>
+#include <vector>
+
+#include "RecordDecoder.hpp"
+
+namespace sagemaker {
+namespace tensorflow {
+
+/**
+   Decodes lines of delimiter separated values, one record per line.
+
+   Fields are named by the zero based index of the column they are read from, in
+   increasing order, and must be scalar DENSE fields. Columns without a field are
+   skipped without being parsed. A field that is empty, equal to the na_value option,
+   or missing from a short line takes its default value; a field without a default
+   value must be present.
+
+   Fields may be quoted with '"', in which case they may contain the delimiter, and a
+   doubled quote stands for one quote.
+
+   Supported options:
+       field_delim: The character that separates fields, "," by default.
+       na_value: The text of a missing value, "" by default.
+       header: "true" if the first line is a header. The header and every later line
+               equal to it are skipped, which skips the header of every file of a channel
+               whose files are concatenated into a single stream.
+ */
+class CsvDecoder : public RecordDecoder {
+ public:
+    /**
+       Constructs a new CsvDecoder. Throws std::invalid_argument if a field or option is
+       not valid.
+     */
+    CsvDecoder(const std::vector<FieldSpec>& fields, const RecordDecoderOptions& options);
+
+    void Decode(const char* data, std::size_t size, Batch* batch) override;
+
+ private:
+    void AppendValue(std::size_t field, const char* data, std::size_t size, Batch* batch);
+    void AppendMissing(std::size_t field, Batch* batch);
+    const char* NextField(const char* begin, const char* end, const char** data, std::size_t* size);
+
+    // The field read from each column up to the last selected one, or -1
+    std::vector<std::int64_t> column_fields_;
+    char delim_;
+    std::string na_value_;
+    bool header_;
+    bool seen_header_;
+    std::string header_line_;
+
+    // The unescaped text of a quoted field, reused between fields
+    std::string unquoted_;
+};
+
+}  // namespace tensorflow
+}  // namespace sagemaker
+
+#endif  // SRC_PIPEMODE_OP_RECORDDECODER_CSVDECODER_HPP_
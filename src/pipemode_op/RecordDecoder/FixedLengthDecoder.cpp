@@ -0,0 +1,100 @@
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include "FixedLengthDecoder.hpp"
+
+#include <cstring>
+#include <stdexcept>
+#include <string>
+
+#include "NumberParser.hpp"
+
+using sagemaker::tensorflow::Batch;
+using sagemaker::tensorflow::FieldKind;
+using sagemaker::tensorflow::FieldSpec;
+using sagemaker::tensorflow::FieldType;
+using sagemaker::tensorflow::FieldTypeSize;
+using sagemaker::tensorflow::FixedLengthDecoder;
+using sagemaker::tensorflow::ParseInt64;
+using sagemaker::tensorflow::RecordDecoderOptions;
+
+namespace {
+
+std::size_t ParseSizeOption(const RecordDecoderOptions& options, const std::string& name) {
+    auto option = options.find(name);
+    if (option == options.end()) {
+        return 0;
+    }
+    std::int64_t value;
+    if (!ParseInt64(option->second.data(), option->second.size(), &value) || value < 0) {
+        throw std::invalid_argument("The FixedLength option " + name + " must be a number of bytes: "
+            + option->second);
+    }
+    return value;
+}
+
+}  // namespace
+
+FixedLengthDecoder::FixedLengthDecoder(const std::vector<FieldSpec>& fields, const RecordDecoderOptions& options)
+    : RecordDecoder(fields) {
+    for (const auto& option : options) {
+        if (option.first != "header_bytes" && option.first != "footer_bytes"
+            && option.first != "record_header_bytes" && option.first != "record_footer_bytes") {
+            throw std::invalid_argument("Unknown FixedLength option: " + option.first);
+        }
+    }
+    header_bytes_ = ParseSizeOption(options, "header_bytes");
+    footer_bytes_ = ParseSizeOption(options, "footer_bytes");
+    record_bytes_ = ParseSizeOption(options, "record_header_bytes");
+    for (const FieldSpec& field : fields) {
+        if (field.kind != FieldKind::DENSE || field.type == FieldType::STRING || field.has_default) {
+            throw std::invalid_argument("FixedLength field " + field.name
+                + " must be a dense numeric field without a default value");
+        }
+        offsets_.push_back(record_bytes_);
+        sizes_.push_back(field.NumElements() * FieldTypeSize(field.type));
+        record_bytes_ += sizes_.back();
+    }
+    record_bytes_ += ParseSizeOption(options, "record_footer_bytes");
+    if (!record_bytes_) {
+        throw std::invalid_argument("FixedLength records must have at least one byte");
+    }
+}
+
+void FixedLengthDecoder::Decode(const char* data, std::size_t size, Batch* batch) {
+    if (size != record_bytes_) {
+        throw std::runtime_error("Record of " + std::to_string(size) + " bytes is not a FixedLength record of "
+            + std::to_string(record_bytes_) + " bytes");
+    }
+    for (std::size_t i = 0; i < fields_.size(); i++) {
+        batch->Columns()[i].AppendBytes(data + offsets_[i], sizes_[i]);
+    }
+    batch->FinishRow();
+}
+
+void FixedLengthDecoder::DecodeRecords(const char* records, std::size_t num_records,
+    const std::vector<char*>& values) const {
+    for (std::size_t i = 0; i < fields_.size(); i++) {
+        const char* source = records + offsets_[i];
+        char* dest = values[i];
+        for (std::size_t record = 0; record < num_records; record++) {
+            std::memcpy(dest, source, sizes_[i]);
+            source += record_bytes_;
+            dest += sizes_[i];
+        }
+    }
+}
+
+bool FixedLengthDecoder::IsContiguous() const {
+    return fields_.size() == 1 && sizes_[0] == record_bytes_;
+}
@@ -0,0 +1,80 @@
+#ifndef SRC_PIPEMODE_OP_RECORDDECODER_FIXEDLENGTHDECODER_HPP_
+#define SRC_PIPEMODE_OP_RECORDDECODER_FIXEDLENGTHDECODER_HPP_
+
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include <cstdint>
+#include <vector>
+
+#include "RecordDecoder.hpp"
+
+namespace sagemaker {
+namespace tensorflow {
+
+/**
+   Decodes binary records of a fixed size, which hold the values of DENSE numeric fields one
+   after another, in native byte order, between a record header and a record footer.
+
+   Takes the options record_header_bytes and record_footer_bytes, the number of bytes before
+   and after the fields of each record, and header_bytes and footer_bytes, the number of bytes
+   before the first record and after the last record of each file, which are skipped by the
+   FixedLengthRecordReader the records are read with. All default to zero.
+ */
+class FixedLengthDecoder : public RecordDecoder {
+ public:
+    /**
+       Constructs a new FixedLengthDecoder. Throws std::invalid_argument if a field is not a
+       DENSE numeric field without a default value, or if an option is unknown or not a number.
+     */
+    FixedLengthDecoder(const std::vector<FieldSpec>& fields, const RecordDecoderOptions& options);
+
+    /**
+       Decodes a record. Throws std::runtime_error if the record is not RecordBytes() long.
+     */
+    void Decode(const char* data, std::size_t size, Batch* batch) override;
+
+    /**
+       Copies the fields of consecutive records into one array of values per field.
+
+       param [in] records: num_records records, one after another.
+       param [in] num_records: The number of records.
+       param [out] values: For each field, an array to write the field's values of every record to.
+     */
+    void DecodeRecords(const char* records, std::size_t num_records, const std::vector<char*>& values) const;
+
+    /**
+       Returns true if records are the values of a single field and nothing else, so that records
+       read one after another are the values of the field in a batch.
+     */
+    bool IsContiguous() const;
+
+    std::size_t RecordBytes() const { return record_bytes_; }
+
+    std::size_t HeaderBytes() const { return header_bytes_; }
+
+    std::size_t FooterBytes() const { return footer_bytes_; }
+
+ private:
+    std::size_t header_bytes_;
+    std::size_t footer_bytes_;
+    std::size_t record_bytes_;
+    // The position of each field in a record, and its size
+    std::vector<std::size_t> offsets_;
+    std::vector<std::size_t> sizes_;
+};
+
+}  // namespace tensorflow
+}  // namespace sagemaker
+
+#endif  // SRC_PIPEMODE_OP_RECORDDECODER_FIXEDLENGTHDECODER_HPP_
@@ -0,0 +1,406 @@
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include "JsonDecoder.hpp"
+
+#include <algorithm>
+#include <cstring>
+#include <stdexcept>
+
+using sagemaker::tensorflow::Batch;
+using sagemaker::tensorflow::Column;
+using sagemaker::tensorflow::FieldKind;
+using sagemaker::tensorflow::FieldSpec;
+using sagemaker::tensorflow::FieldType;
+using sagemaker::tensorflow::JsonDecoder;
+
+namespace {
+
+const std::size_t kNoChild = static_cast<std::size_t>(-1);
+
+bool IsWhitespace(char c) {
+    return c == ' ' || c == '\t' || c == '\n' || c == '\r';
+}
+
+bool IsTokenEnd(char c) {
+    return c == ',' || c == '}' || c == ']' || IsWhitespace(c);
+}
+
+int HexDigit(char c) {
+    if (c >= '0' && c <= '9') {
+        return c - '0';
+    }
+    if (c >= 'a' && c <= 'f') {
+        return c - 'a' + 10;
+    }
+    if (c >= 'A' && c <= 'F') {
+        return c - 'A' + 10;
+    }
+    throw std::runtime_error("Invalid \\u escape in JSON string");
+}
+
+std::uint32_t ReadCodeUnit(const char* pos, const char* end) {
+    if (end - pos < 4) {
+        throw std::runtime_error("Invalid \\u escape in JSON string");
+    }
+    return HexDigit(pos[0]) << 12 | HexDigit(pos[1]) << 8 | HexDigit(pos[2]) << 4 | HexDigit(pos[3]);
+}
+
+void AppendUtf8(std::uint32_t code_point, std::string* text) {
+    if (code_point < 0x80) {
+        text->push_back(static_cast<char>(code_point));
+    } else if (code_point < 0x800) {
+        text->push_back(static_cast<char>(0xc0 | code_point >> 6));
+        text->push_back(static_cast<char>(0x80 | (code_point & 0x3f)));
+    } else if (code_point < 0x10000) {
+        text->push_back(static_cast<char>(0xe0 | code_point >> 12));
+        text->push_back(static_cast<char>(0x80 | (code_point >> 6 & 0x3f)));
+        text->push_back(static_cast<char>(0x80 | (code_point & 0x3f)));
+    } else {
+        text->push_back(static_cast<char>(0xf0 | code_point >> 18));
+        text->push_back(static_cast<char>(0x80 | (code_point >> 12 & 0x3f)));
+        text->push_back(static_cast<char>(0x80 | (code_point >> 6 & 0x3f)));
+        text->push_back(static_cast<char>(0x80 | (code_point & 0x3f)));
+    }
+}
+
+/**
+   Appends the unescaped text of the body of a JSON string, between its quotes.
+ */
+void Unescape(const char* pos, const char* end, std::string* text) {
+    while (pos != end) {
+        const char* backslash = static_cast<const char*>(std::memchr(pos, '\\', end - pos));
+        if (!backslash) {
+            text->append(pos, end);
+            return;
+        }
+        text->append(pos, backslash);
+        pos = backslash + 1;
+        char escaped = *pos++;
+        switch (escaped) {
+            case 'b':
+                text->push_back('\b');
+                break;
+            case 'f':
+                text->push_back('\f');
+                break;
+            case 'n':
+                text->push_back('\n');
+                break;
+            case 'r':
+                text->push_back('\r');
+                break;
+            case 't':
+                text->push_back('\t');
+                break;
+            case 'u': {
+                std::uint32_t code_point = ReadCodeUnit(pos, end);
+                pos += 4;
+                if (code_point >= 0xd800 && code_point < 0xdc00 && end - pos >= 6 && pos[0] == '\\'
+                    && pos[1] == 'u') {
+                    std::uint32_t low = ReadCodeUnit(pos + 2, end);
+                    if (low >= 0xdc00 && low < 0xe000) {
+                        code_point = 0x10000 + ((code_point - 0xd800) << 10) + (low - 0xdc00);
+                        pos += 6;
+                    }
+                }
+                AppendUtf8(code_point, text);
+                break;
+            }
+            default:
+                text->push_back(escaped);
+        }
+    }
+}
+
+}  // namespace
+
+JsonDecoder::JsonDecoder(const std::vector<FieldSpec>& fields)
+    : RecordDecoder(fields), nodes_(1), present_(fields.size()), end_(nullptr) {
+    for (std::size_t i = 0; i < fields.size(); i++) {
+        const std::string& path = fields[i].name;
+        std::size_t node = 0;
+        std::size_t start = 0;
+        while (true) {
+            std::size_t dot = path.find('.', start);
+            std::string key = path.substr(start, dot == std::string::npos ? std::string::npos : dot - start);
+            if (key.empty() || nodes_[node].field >= 0) {
+                throw std::invalid_argument("Invalid JSON field path: " + path);
+            }
+            std::size_t child = FindChild(node, key.data(), key.size());
+            if (child == kNoChild) {
+                child = nodes_.size();
+                nodes_[node].children.emplace_back(key, child);
+                nodes_.emplace_back();
+            }
+            node = child;
+            if (dot == std::string::npos) {
+                break;
+            }
+            start = dot + 1;
+        }
+        if (nodes_[node].field >= 0 || !nodes_[node].children.empty()) {
+            throw std::invalid_argument("Invalid JSON field path: " + path);
+        }
+        nodes_[node].field = i;
+    }
+
+    // Checks the default values by decoding them once
+    Batch batch(fields);
+    for (std::size_t i = 0; i < fields.size(); i++) {
+        if (fields[i].has_default && !batch.Columns()[i].AppendText(fields[i].default_value.data(),
+                fields[i].default_value.size())) {
+            throw std::invalid_argument("Invalid default value of JSON field " + fields[i].name + ": "
+                + fields[i].default_value);
+        }
+    }
+}
+
+void JsonDecoder::Decode(const char* data, std::size_t size, Batch* batch) {
+    end_ = data + size;
+    const char* pos = SkipWhitespace(data);
+    if (pos == end_) {
+        return;
+    }
+    std::fill(present_.begin(), present_.end(), false);
+    pos = SkipWhitespace(DecodeObject(0, Expect(pos, '{'), batch));
+    if (pos != end_) {
+        throw std::runtime_error("Unexpected text after JSON object: " + std::string(pos, end_));
+    }
+    for (std::size_t i = 0; i < fields_.size(); i++) {
+        if (!present_[i]) {
+            AppendMissing(i, batch);
+        }
+    }
+    batch->FinishRow();
+}
+
+const char* JsonDecoder::DecodeObject(std::size_t node, const char* pos, Batch* batch) {
+    // pos is just past the opening brace
+    pos = SkipWhitespace(pos);
+    if (pos != end_ && *pos == '}') {
+        return pos + 1;
+    }
+    while (true) {
+        const char* key;
+        std::size_t key_size;
+        Expect(pos, '"');
+        pos = ReadString(pos, &key, &key_size);
+        pos = SkipWhitespace(Expect(SkipWhitespace(pos), ':'));
+        std::size_t child = FindChild(node, key, key_size);
+        if (child == kNoChild) {
+            pos = SkipValue(pos);
+        } else if (nodes_[child].field >= 0) {
+            pos = DecodeField(nodes_[child].field, pos, batch);
+        } else if (pos != end_ && *pos == '{') {
+            pos = DecodeObject(child, pos + 1, batch);
+        } else {
+            // Not an object, so none of the fields below this key are present
+            pos = SkipValue(pos);
+        }
+        pos = SkipWhitespace(pos);
+        if (pos != end_ && *pos == '}') {
+            return pos + 1;
+        }
+        pos = SkipWhitespace(Expect(pos, ','));
+    }
+}
+
+const char* JsonDecoder::DecodeField(std::size_t field, const char* pos, Batch* batch) {
+    const FieldSpec& spec = fields_[field];
+    if (end_ - pos >= 4 && std::memcmp(pos, "null", 4) == 0) {
+        return pos + 4;
+    }
+    if (present_[field]) {
+        throw std::runtime_error("JSON field " + spec.name + " is repeated");
+    }
+    present_[field] = true;
+    std::int64_t count = 0;
+    pos = AppendValues(field, pos, batch, &count);
+    if (spec.kind == FieldKind::DENSE) {
+        if (count != spec.NumElements()) {
+            throw std::runtime_error("JSON field " + spec.name + " has " + std::to_string(count) + " values, not "
+                + std::to_string(spec.NumElements()));
+        }
+    } else {
+        Column& column = batch->Columns()[field];
+        std::int64_t row = batch->NumRows();
+        for (std::int64_t i = 0; i < count; i++) {
+            column.AppendIndex(row, i);
+        }
+    }
+    return pos;
+}
+
+const char* JsonDecoder::AppendValues(std::size_t field, const char* pos, Batch* batch, std::int64_t* count) {
+    if (pos == end_ || *pos != '[') {
+        ++*count;
+        return AppendScalar(field, pos, batch);
+    }
+    pos = SkipWhitespace(pos + 1);
+    if (pos != end_ && *pos == ']') {
+        return pos + 1;
+    }
+    while (true) {
+        pos = SkipWhitespace(AppendValues(field, pos, batch, count));
+        if (pos != end_ && *pos == ']') {
+            return pos + 1;
+        }
+        pos = SkipWhitespace(Expect(pos, ','));
+    }
+}
+
+const char* JsonDecoder::AppendScalar(std::size_t field, const char* pos, Batch* batch) {
+    const char* data;
+    std::size_t size;
+    const char* next;
+    if (pos != end_ && *pos == '"') {
+        next = ReadString(pos, &data, &size);
+    } else if (pos != end_ && *pos == '{') {
+        throw std::runtime_error("JSON field " + fields_[field].name + " holds an object, not a value");
+    } else {
+        next = SkipToken(pos);
+        data = pos;
+        size = next - pos;
+    }
+    Column& column = batch->Columns()[field];
+    bool appended;
+    if (fields_[field].type != FieldType::STRING && *pos != '"' && size == 4 && std::memcmp(data, "true", 4) == 0) {
+        appended = column.AppendText("1", 1);
+    } else if (fields_[field].type != FieldType::STRING && *pos != '"' && size == 5
+        && std::memcmp(data, "false", 5) == 0) {
+        appended = column.AppendText("0", 1);
+    } else {
+        appended = column.AppendText(data, size);
+    }
+    if (!appended) {
+        throw std::runtime_error("Cannot parse " + std::string(pos, next) + " in JSON field " + fields_[field].name
+            + " as " + FieldTypeName(fields_[field].type));
+    }
+    return next;
+}
+
+void JsonDecoder::AppendMissing(std::size_t field, Batch* batch) {
+    const FieldSpec& spec = fields_[field];
+    if (spec.kind == FieldKind::SPARSE) {
+        return;
+    }
+    if (!spec.has_default) {
+        throw std::runtime_error("JSON field " + spec.name + " is missing and has no default");
+    }
+    Column& column = batch->Columns()[field];
+    for (std::int64_t i = 0; i < spec.NumElements(); i++) {
+        column.AppendText(spec.default_value.data(), spec.default_value.size());
+    }
+}
+
+const char* JsonDecoder::ReadString(const char* pos, const char** data, std::size_t* size) {
+    const char* begin = pos + 1;
+    const char* end = FindStringEnd(begin);
+    if (!std::memchr(begin, '\\', end - begin)) {
+        *data = begin;
+        *size = end - begin;
+    } else {
+        unescaped_.clear();
+        Unescape(begin, end, &unescaped_);
+        *data = unescaped_.data();
+        *size = unescaped_.size();
+    }
+    return end + 1;
+}
+
+const char* JsonDecoder::FindStringEnd(const char* pos) {
+    // Finds the closing quote with memchr, and checks whether it is escaped
+    const char* search = pos;
+    while (true) {
+        const char* quote = static_cast<const char*>(std::memchr(search, '"', end_ - search));
+        if (!quote) {
+            throw std::runtime_error("Unterminated JSON string");
+        }
+        const char* backslash = quote;
+        while (backslash != pos && backslash[-1] == '\\') {
+            --backslash;
+        }
+        if ((quote - backslash) % 2 == 0) {
+            return quote;
+        }
+        search = quote + 1;
+    }
+}
+
+const char* JsonDecoder::SkipValue(const char* pos) {
+    if (pos == end_) {
+        throw std::runtime_error("Missing JSON value");
+    }
+    if (*pos == '"') {
+        return FindStringEnd(pos + 1) + 1;
+    }
+    if (*pos != '{' && *pos != '[') {
+        return SkipToken(pos);
+    }
+    std::int64_t depth = 0;
+    for (; pos != end_; ++pos) {
+        switch (*pos) {
+            case '"':
+                pos = FindStringEnd(pos + 1);
+                break;
+            case '{':
+            case '[':
+                ++depth;
+                break;
+            case '}':
+            case ']':
+                if (--depth == 0) {
+                    return pos + 1;
+                }
+                break;
+            default:
+                break;
+        }
+    }
+    throw std::runtime_error("Unterminated JSON object or array");
+}
+
+const char* JsonDecoder::SkipToken(const char* pos) {
+    const char* begin = pos;
+    while (pos != end_ && !IsTokenEnd(*pos)) {
+        ++pos;
+    }
+    if (pos == begin) {
+        throw std::runtime_error("Missing JSON value");
+    }
+    return pos;
+}
+
+const char* JsonDecoder::SkipWhitespace(const char* pos) {
+    while (pos != end_ && IsWhitespace(*pos)) {
+        ++pos;
+    }
+    return pos;
+}
+
+const char* JsonDecoder::Expect(const char* pos, char c) {
+    if (pos == end_ || *pos != c) {
+        throw std::runtime_error(std::string("Expected '") + c + "' in JSON record");
+    }
+    return pos + 1;
+}
+
+std::size_t JsonDecoder::FindChild(std::size_t node, const char* key, std::size_t size) const {
+    for (const auto& child : nodes_[node].children) {
+        if (child.first.size() == size && std::memcmp(child.first.data(), key, size) == 0) {
+            return child.second;
+        }
+    }
+    return kNoChild;
+}
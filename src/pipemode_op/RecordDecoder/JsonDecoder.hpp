@@ -0,0 +1,85 @@
+#ifndef SRC_PIPEMODE_OP_RECORDDECODER_JSONDECODER_HPP_
+#define SRC_PIPEMODE_OP_RECORDDECODER_JSONDECODER_HPP_
+
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include <cstdint>
+#include <string>
+#include <utility>
+#include <vector>
+
+#include "RecordDecoder.hpp"
+
+namespace sagemaker {
+namespace tensorflow {
+
+/**
+   Decodes JSON Lines records, each a JSON object on one line.
+
+   Fields are named by the dot separated path of object keys that leads to their value,
+   e.g. "user.id". The object is scanned once; values that are not on the path of a field
+   are skipped without being decoded, and no document tree is built.
+
+   A DENSE field takes a scalar, or an array, possibly nested, with exactly as many values
+   as the field's shape. A SPARSE field takes a scalar or an array of any length, whose
+   values get the indices 0..n-1 of the record's row. Numbers and quoted numbers are
+   parsed into numeric fields, and true and false are parsed as 1 and 0. String fields
+   take the text of strings, numbers and literals.
+
+   A null or missing DENSE field takes its default value, repeated to fill its shape, and
+   must be present if it has no default value. A null or missing SPARSE field has no values.
+   Blank lines are skipped.
+ */
+class JsonDecoder : public RecordDecoder {
+ public:
+    /**
+       Constructs a new JsonDecoder. Throws std::invalid_argument if a field path is empty,
+       repeated or passes through another field, or if a default value is not valid.
+     */
+    explicit JsonDecoder(const std::vector<FieldSpec>& fields);
+
+    void Decode(const char* data, std::size_t size, Batch* batch) override;
+
+ private:
+    struct PathNode {
+        std::vector<std::pair<std::string, std::size_t>> children;
+        std::int64_t field = -1;
+    };
+
+    const char* DecodeObject(std::size_t node, const char* pos, Batch* batch);
+    const char* DecodeField(std::size_t field, const char* pos, Batch* batch);
+    const char* AppendValues(std::size_t field, const char* pos, Batch* batch, std::int64_t* count);
+    const char* AppendScalar(std::size_t field, const char* pos, Batch* batch);
+    void AppendMissing(std::size_t field, Batch* batch);
+    const char* ReadString(const char* pos, const char** data, std::size_t* size);
+    const char* FindStringEnd(const char* pos);
+    const char* SkipValue(const char* pos);
+    const char* SkipToken(const char* pos);
+    const char* SkipWhitespace(const char* pos);
+    const char* Expect(const char* pos, char c);
+    std::size_t FindChild(std::size_t node, const char* key, std::size_t size) const;
+
+    std::vector<PathNode> nodes_;
+    std::vector<bool> present_;
+
+    // The end of the record being decoded
+    const char* end_;
+    // The unescaped text of the last string read, reused between strings
+    std::string unescaped_;
+};
+
+}  // namespace tensorflow
+}  // namespace sagemaker
+
+#endif  // SRC_PIPEMODE_OP_RECORDDECODER_JSONDECODER_HPP_
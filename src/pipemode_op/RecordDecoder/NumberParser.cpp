@@ -0,0 +1,153 @@
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include "NumberParser.hpp"
+
+#include <cctype>
+#include <cstdlib>
+#include <limits>
+#include <string>
+
+namespace {
+
+// Powers of ten that are exactly representable as doubles
+const double kExactPowersOfTen[] = {
+    1e0, 1e1, 1e2, 1e3, 1e4, 1e5, 1e6, 1e7, 1e8, 1e9, 1e10, 1e11,
+    1e12, 1e13, 1e14, 1e15, 1e16, 1e17, 1e18, 1e19, 1e20, 1e21, 1e22
+};
+const int kMaxExactPowerOfTen = 22;
+const std::uint64_t kMaxExactMantissa = std::uint64_t(1) << 53;
+const int kMaxMantissaDigits = 19;
+
+bool IsDigit(char c) {
+    return c >= '0' && c <= '9';
+}
+
+bool StrtodDouble(const char* data, std::size_t size, double* value) {
+    // strtod skips leading whitespace, which is not part of a number
+    if (size == 0 || std::isspace(static_cast<unsigned char>(data[0]))) {
+        return false;
+    }
+    std::string text(data, size);
+    char* end;
+    *value = std::strtod(text.c_str(), &end);
+    return end == text.c_str() + size;
+}
+
+}  // namespace
+
+bool sagemaker::tensorflow::ParseDouble(const char* data, std::size_t size, double* value) {
+    const char* pos = data;
+    const char* end = data + size;
+    bool negative = false;
+    if (pos != end && (*pos == '-' || *pos == '+')) {
+        negative = *pos == '-';
+        ++pos;
+    }
+    std::uint64_t mantissa = 0;
+    int num_digits = 0;
+    int exponent = 0;
+    bool any_digits = false;
+    for (; pos != end && IsDigit(*pos); ++pos) {
+        any_digits = true;
+        if (mantissa == 0 && *pos == '0') {
+            continue;
+        }
+        if (num_digits == kMaxMantissaDigits) {
+            return StrtodDouble(data, size, value);
+        }
+        mantissa = mantissa * 10 + (*pos - '0');
+        ++num_digits;
+    }
+    if (pos != end && *pos == '.') {
+        for (++pos; pos != end && IsDigit(*pos); ++pos) {
+            any_digits = true;
+            if (mantissa == 0 && *pos == '0') {
+                --exponent;
+                continue;
+            }
+            if (num_digits == kMaxMantissaDigits) {
+                return StrtodDouble(data, size, value);
+            }
+            mantissa = mantissa * 10 + (*pos - '0');
+            ++num_digits;
+            --exponent;
+        }
+    }
+    if (!any_digits) {
+        // Not a plain decimal number, but possibly inf, nan or hexadecimal
+        return StrtodDouble(data, size, value);
+    }
+    if (pos != end && (*pos == 'e' || *pos == 'E')) {
+        ++pos;
+        bool negative_exponent = false;
+        if (pos != end && (*pos == '-' || *pos == '+')) {
+            negative_exponent = *pos == '-';
+            ++pos;
+        }
+        if (pos == end || !IsDigit(*pos)) {
+            return false;
+        }
+        int explicit_exponent = 0;
+        for (; pos != end && IsDigit(*pos); ++pos) {
+            if (explicit_exponent > 100000) {
+                return StrtodDouble(data, size, value);
+            }
+            explicit_exponent = explicit_exponent * 10 + (*pos - '0');
+        }
+        exponent += negative_exponent ? -explicit_exponent : explicit_exponent;
+    }
+    if (pos != end) {
+        return false;
+    }
+    if (mantissa > kMaxExactMantissa || exponent < -kMaxExactPowerOfTen || exponent > kMaxExactPowerOfTen) {
+        return StrtodDouble(data, size, value);
+    }
+    // Both operands are exact, so IEEE arithmetic rounds the result correctly
+    double result = static_cast<double>(mantissa);
+    if (exponent < 0) {
+        result /= kExactPowersOfTen[-exponent];
+    } else {
+        result *= kExactPowersOfTen[exponent];
+    }
+    *value = negative ? -result : result;
+    return true;
+}
+
+bool sagemaker::tensorflow::ParseInt64(const char* data, std::size_t size, std::int64_t* value) {
+    const char* pos = data;
+    const char* end = data + size;
+    bool negative = false;
+    if (pos != end && (*pos == '-' || *pos == '+')) {
+        negative = *pos == '-';
+        ++pos;
+    }
+    if (pos == end) {
+        return false;
+    }
+    std::uint64_t limit = negative ? std::uint64_t(std::numeric_limits<std::int64_t>::max()) + 1
+        : std::numeric_limits<std::int64_t>::max();
+    std::uint64_t result = 0;
+    for (; pos != end; ++pos) {
+        if (!IsDigit(*pos)) {
+            return false;
+        }
+        std::uint64_t digit = *pos - '0';
+        if (result > (limit - digit) / 10) {
+            return false;
+        }
+        result = result * 10 + digit;
+    }
+    *value = negative ? static_cast<std::int64_t>(0 - result) : static_cast<std::int64_t>(result);
+    return true;
+}
@@ -0,0 +1,41 @@
+#ifndef SRC_PIPEMODE_OP_RECORDDECODER_NUMBERPARSER_HPP_
+#define SRC_PIPEMODE_OP_RECORDDECODER_NUMBERPARSER_HPP_
+
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include <cstddef>
+#include <cstdint>
+
+namespace sagemaker {
+namespace tensorflow {
+
+/**
+   Parses a decimal floating point number, like strtod, but without requiring the text
+   to be null terminated. Returns false if the text is not a number.
+
+   Numbers with at most 19 significant digits and a small exponent are converted
+   exactly with a single multiplication or division; others fall back to strtod.
+ */
+bool ParseDouble(const char* data, std::size_t size, double* value);
+
+/**
+   Parses a decimal integer. Returns false if the text is not an integer or does not
+   fit in 64 bits.
+ */
+bool ParseInt64(const char* data, std::size_t size, std::int64_t* value);
+
+}  // namespace tensorflow
+}  // namespace sagemaker
+
+#endif  // SRC_PIPEMODE_OP_RECORDDECODER_NUMBERPARSER_HPP_
@@ -0,0 +1,106 @@
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include "ParallelStage.hpp"
+
+#include <algorithm>
+#include <stdexcept>
+#include <utility>
+
+using sagemaker::tensorflow::ParallelStage;
+
+ParallelStage::ParallelStage(std::size_t num_threads, bool deterministic)
+    : deterministic_(deterministic), stopping_(false) {
+    if (!num_threads) {
+        throw std::invalid_argument("A parallel stage must have at least one thread");
+    }
+    for (std::size_t i = 0; i < num_threads; i++) {
+        threads_.emplace_back(&ParallelStage::WorkerLoop, this, i);
+    }
+}
+
+ParallelStage::~ParallelStage() {
+    {
+        std::lock_guard<std::mutex> lock(mu_);
+        stopping_ = true;
+    }
+    task_added_.notify_all();
+    for (std::thread& thread : threads_) {
+        thread.join();
+    }
+}
+
+void ParallelStage::Submit(std::unique_ptr<Task> task) {
+    std::shared_ptr<Slot> slot = std::make_shared<Slot>();
+    slot->task = std::move(task);
+    {
+        std::lock_guard<std::mutex> lock(mu_);
+        pending_.push_back(slot);
+        queued_.push_back(slot);
+    }
+    task_added_.notify_one();
+}
+
+std::unique_ptr<ParallelStage::Task> ParallelStage::Next() {
+    std::unique_lock<std::mutex> lock(mu_);
+    if (pending_.empty()) {
+        return nullptr;
+    }
+    auto done = pending_.begin();
+    if (deterministic_) {
+        task_done_.wait(lock, [this] { return pending_.front()->done; });
+    } else {
+        auto is_done = [](const std::shared_ptr<Slot>& slot) { return slot->done; };
+        task_done_.wait(lock, [this, &done, &is_done] {
+            done = std::find_if(pending_.begin(), pending_.end(), is_done);
+            return done != pending_.end();
+        });
+    }
+    std::shared_ptr<Slot> slot = *done;
+    pending_.erase(done);
+    lock.unlock();
+    if (slot->error) {
+        std::rethrow_exception(slot->error);
+    }
+    return std::move(slot->task);
+}
+
+std::size_t ParallelStage::NumPending() const {
+    std::lock_guard<std::mutex> lock(mu_);
+    return pending_.size();
+}
+
+void ParallelStage::WorkerLoop(std::size_t worker) {
+    while (true) {
+        std::shared_ptr<Slot> slot;
+        {
+            std::unique_lock<std::mutex> lock(mu_);
+            task_added_.wait(lock, [this] { return stopping_ || !queued_.empty(); });
+            if (stopping_) {
+                return;
+            }
+            slot = queued_.front();
+            queued_.pop_front();
+        }
+        try {
+            slot->task->Run(worker);
+        } catch (...) {
+            slot->error = std::current_exception();
+        }
+        {
+            std::lock_guard<std::mutex> lock(mu_);
+            slot->done = true;
+        }
+        task_done_.notify_all();
+    }
+}
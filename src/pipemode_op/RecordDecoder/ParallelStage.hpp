@@ -0,0 +1,112 @@
+#ifndef SRC_PIPEMODE_OP_RECORDDECODER_PARALLELSTAGE_HPP_
+#define SRC_PIPEMODE_OP_RECORDDECODER_PARALLELSTAGE_HPP_
+
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include <condition_variable>
+#include <cstdint>
+#include <deque>
+#include <exception>
+#include <memory>
+#include <mutex>
+#include <thread>
+#include <vector>
+
+namespace sagemaker {
+namespace tensorflow {
+
+/**
+   Runs tasks on a pool of worker threads. Tasks are submitted by one thread, which takes each
+   task back once it has run, either in the order tasks were submitted or in the order they
+   finished.
+
+   Each worker thread has an index, so that tasks can use state that belongs to the worker
+   running them, such as a decoder, without locking it.
+ */
+class ParallelStage {
+ public:
+    class Task {
+     public:
+        virtual ~Task() = default;
+
+        /**
+           Runs the task.
+
+           param [in] worker: The index of the worker thread running the task, below NumThreads().
+         */
+        virtual void Run(std::size_t worker) = 0;
+    };
+
+    /**
+       Constructs a new ParallelStage and starts its worker threads. Throws std::invalid_argument
+       if num_threads is zero.
+
+       param [in] num_threads: The number of worker threads.
+       param [in] deterministic: If true, tasks are taken back in the order they were submitted,
+                                 and otherwise in the order they finished running.
+     */
+    ParallelStage(std::size_t num_threads, bool deterministic);
+
+    /**
+       Stops the worker threads once they finish the tasks they are running. Tasks that have not
+       started are not run.
+     */
+    ~ParallelStage();
+
+    ParallelStage(const ParallelStage&) = delete;
+    ParallelStage& operator=(const ParallelStage&) = delete;
+
+    /**
+       Queues a task to be run by the next idle worker thread.
+     */
+    void Submit(std::unique_ptr<Task> task);
+
+    /**
+       Takes back a submitted task once it has run, waiting for it if necessary. Returns null if
+       no submitted task remains. Rethrows the exception the task threw, if any.
+     */
+    std::unique_ptr<Task> Next();
+
+    /**
+       Returns the number of tasks submitted and not yet taken back.
+     */
+    std::size_t NumPending() const;
+
+    std::size_t NumThreads() const { return threads_.size(); }
+
+ private:
+    struct Slot {
+        std::unique_ptr<Task> task;
+        bool done = false;
+        std::exception_ptr error;
+    };
+
+    void WorkerLoop(std::size_t worker);
+
+    const bool deterministic_;
+    mutable std::mutex mu_;
+    std::condition_variable task_added_;
+    std::condition_variable task_done_;
+    // The tasks not yet taken back, in the order they were submitted
+    std::deque<std::shared_ptr<Slot>> pending_;
+    // The tasks no worker has started
+    std::deque<std::shared_ptr<Slot>> queued_;
+    bool stopping_;
+    std::vector<std::thread> threads_;
+};
+
+}  // namespace tensorflow
+}  // namespace sagemaker
+
+#endif  // SRC_PIPEMODE_OP_RECORDDECODER_PARALLELSTAGE_HPP_
@@ -0,0 +1,236 @@
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include "RecordDecoder.hpp"
+
+#include <algorithm>
+#include <cstring>
+#include <limits>
+#include <stdexcept>
+#include <type_traits>
+
+#include "NumberParser.hpp"
+
+using sagemaker::tensorflow::Batch;
+using sagemaker::tensorflow::Column;
+using sagemaker::tensorflow::FieldSpec;
+using sagemaker::tensorflow::FieldType;
+using sagemaker::tensorflow::FieldTypeSize;
+using sagemaker::tensorflow::ParseDouble;
+using sagemaker::tensorflow::ParseInt64;
+
+namespace {
+
+template <typename Dst, typename Src>
+void AppendConverted(std::vector<char>* data, const Src* values, std::size_t count) {
+    std::size_t start = data->size();
+    data->resize(start + count * sizeof(Dst));
+    if (std::is_same<Dst, Src>::value) {
+        std::memcpy(data->data() + start, values, count * sizeof(Dst));
+        return;
+    }
+    Dst* dest = reinterpret_cast<Dst*>(data->data() + start);
+    for (std::size_t i = 0; i < count; i++) {
+        dest[i] = static_cast<Dst>(values[i]);
+    }
+}
+
+template <typename Dst, typename Src>
+void ScatterConverted(std::vector<char>* data, const Src* values, const std::uint64_t* keys,
+    std::size_t num_values, std::size_t count) {
+    std::size_t start = data->size();
+    data->resize(start + count * sizeof(Dst), 0);
+    Dst* dest = reinterpret_cast<Dst*>(data->data() + start);
+    for (std::size_t i = 0; i < num_values; i++) {
+        dest[keys[i]] = static_cast<Dst>(values[i]);
+    }
+}
+
+}  // namespace
+
+std::string sagemaker::tensorflow::FieldTypeName(FieldType type) {
+    switch (type) {
+        case FieldType::FLOAT32:
+            return "float32";
+        case FieldType::FLOAT64:
+            return "float64";
+        case FieldType::INT32:
+            return "int32";
+        case FieldType::INT64:
+            return "int64";
+        default:
+            return "string";
+    }
+}
+
+std::size_t sagemaker::tensorflow::FieldTypeSize(FieldType type) {
+    switch (type) {
+        case FieldType::FLOAT32:
+        case FieldType::INT32:
+            return 4;
+        case FieldType::FLOAT64:
+        case FieldType::INT64:
+            return 8;
+        default:
+            return 0;
+    }
+}
+
+std::int64_t FieldSpec::NumElements() const {
+    std::int64_t num_elements = 1;
+    for (std::int64_t dim : shape) {
+        num_elements *= dim;
+    }
+    return num_elements;
+}
+
+Column::Column(const FieldSpec& spec): spec_(spec), value_size_(FieldTypeSize(spec.type)), dense_size_(0) {}
+
+template <typename T>
+void Column::AppendValues(const T* values, std::size_t count) {
+    switch (spec_.type) {
+        case FieldType::FLOAT32:
+            AppendConverted<float>(&data_, values, count);
+            break;
+        case FieldType::FLOAT64:
+            AppendConverted<double>(&data_, values, count);
+            break;
+        case FieldType::INT32:
+            AppendConverted<std::int32_t>(&data_, values, count);
+            break;
+        case FieldType::INT64:
+            AppendConverted<std::int64_t>(&data_, values, count);
+            break;
+        default:
+            throw std::runtime_error("Field " + spec_.name + " holds strings, not numbers");
+    }
+}
+
+template <typename T>
+void Column::ScatterValues(const T* values, const std::uint64_t* keys, std::size_t num_values,
+    std::size_t count) {
+    for (std::size_t i = 0; i < num_values; i++) {
+        if (keys[i] >= count) {
+            throw std::runtime_error("Key " + std::to_string(keys[i]) + " of field " + spec_.name
+                + " is out of range");
+        }
+    }
+    switch (spec_.type) {
+        case FieldType::FLOAT32:
+            ScatterConverted<float>(&data_, values, keys, num_values, count);
+            break;
+        case FieldType::FLOAT64:
+            ScatterConverted<double>(&data_, values, keys, num_values, count);
+            break;
+        case FieldType::INT32:
+            ScatterConverted<std::int32_t>(&data_, values, keys, num_values, count);
+            break;
+        case FieldType::INT64:
+            ScatterConverted<std::int64_t>(&data_, values, keys, num_values, count);
+            break;
+        default:
+            throw std::runtime_error("Field " + spec_.name + " holds strings, not numbers");
+    }
+}
+
+template void Column::AppendValues<float>(const float*, std::size_t);
+template void Column::AppendValues<double>(const double*, std::size_t);
+template void Column::AppendValues<std::int32_t>(const std::int32_t*, std::size_t);
+template void Column::AppendValues<std::int64_t>(const std::int64_t*, std::size_t);
+template void Column::AppendValues<std::int8_t>(const std::int8_t*, std::size_t);
+template void Column::AppendValues<std::int16_t>(const std::int16_t*, std::size_t);
+template void Column::AppendValues<std::uint8_t>(const std::uint8_t*, std::size_t);
+template void Column::AppendValues<std::uint16_t>(const std::uint16_t*, std::size_t);
+template void Column::AppendValues<std::uint32_t>(const std::uint32_t*, std::size_t);
+template void Column::AppendValues<std::uint64_t>(const std::uint64_t*, std::size_t);
+template void Column::ScatterValues<float>(const float*, const std::uint64_t*, std::size_t, std::size_t);
+template void Column::ScatterValues<double>(const double*, const std::uint64_t*, std::size_t, std::size_t);
+template void Column::ScatterValues<std::int32_t>(const std::int32_t*, const std::uint64_t*, std::size_t,
+    std::size_t);
+template void Column::ScatterValues<std::int64_t>(const std::int64_t*, const std::uint64_t*, std::size_t,
+    std::size_t);
+
+void Column::AppendBytes(const char* data, std::size_t size) {
+    if (spec_.type == FieldType::STRING) {
+        throw std::runtime_error("Field " + spec_.name + " holds strings, not numbers");
+    }
+    data_.insert(data_.end(), data, data + size);
+}
+
+void Column::AppendString(const char* data, std::size_t size) {
+    if (spec_.type != FieldType::STRING) {
+        throw std::runtime_error("Field " + spec_.name + " holds numbers, not strings");
+    }
+    strings_.emplace_back(data, size);
+}
+
+bool Column::AppendText(const char* data, std::size_t size) {
+    switch (spec_.type) {
+        case FieldType::STRING:
+            AppendString(data, size);
+            return true;
+        case FieldType::FLOAT32:
+        case FieldType::FLOAT64: {
+            double value;
+            if (!ParseDouble(data, size, &value)) {
+                return false;
+            }
+            AppendValues(&value, 1);
+            return true;
+        }
+        default: {
+            std::int64_t value;
+            if (!ParseInt64(data, size, &value) || (spec_.type == FieldType::INT32
+                    && (value < std::numeric_limits<std::int32_t>::min()
+                        || value > std::numeric_limits<std::int32_t>::max()))) {
+                return false;
+            }
+            AppendValues(&value, 1);
+            return true;
+        }
+    }
+}
+
+void Column::AppendIndex(std::int64_t row, std::int64_t index) {
+    indices_.push_back(row);
+    indices_.push_back(index);
+    dense_size_ = std::max(dense_size_, index + 1);
+}
+
+void Column::ExtendDenseSize(std::int64_t size) {
+    dense_size_ = std::max(dense_size_, size);
+}
+
+std::size_t Column::NumValues() const {
+    return spec_.type == FieldType::STRING ? strings_.size() : data_.size() / value_size_;
+}
+
+void Column::Clear() {
+    data_.clear();
+    strings_.clear();
+    indices_.clear();
+    dense_size_ = 0;
+}
+
+Batch::Batch(const std::vector<FieldSpec>& fields): num_rows_(0) {
+    for (const FieldSpec& field : fields) {
+        columns_.emplace_back(field);
+    }
+}
+
+void Batch::Clear() {
+    for (Column& column : columns_) {
+        column.Clear();
+    }
+    num_rows_ = 0;
+}
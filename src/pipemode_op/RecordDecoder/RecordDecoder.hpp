@@ -0,0 +1,241 @@
+#ifndef SRC_PIPEMODE_OP_RECORDDECODER_RECORDDECODER_HPP_
+#define SRC_PIPEMODE_OP_RECORDDECODER_RECORDDECODER_HPP_
+
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include <cstdint>
+#include <map>
+#include <string>
+#include <vector>
+
+namespace sagemaker {
+namespace tensorflow {
+
+/**
+   The type of the values of a field.
+ */
+enum class FieldType {
+    FLOAT32,
+    FLOAT64,
+    INT32,
+    INT64,
+    STRING
+};
+
+/**
+   Returns the name of a FieldType, e.g. "float32".
+ */
+std::string FieldTypeName(FieldType type);
+
+/**
+   Returns the size in bytes of a value of a numeric FieldType, or 0 for STRING.
+ */
+std::size_t FieldTypeSize(FieldType type);
+
+/**
+   How the values of a field are batched.
+
+   DENSE fields have the same number of values in every record, and are batched
+   into a tensor of shape [batch_size] + shape. SPARSE fields have a variable
+   number of values, each with an index, and are batched into the indices, values
+   and dense shape of a sparse tensor of rank 2.
+ */
+enum class FieldKind {
+    DENSE,
+    SPARSE
+};
+
+/**
+   Describes a field that is decoded from each record.
+ */
+struct FieldSpec {
+    // The name of the field. Its meaning depends on the record format.
+    std::string name;
+    FieldKind kind;
+    FieldType type;
+    // The shape of the field in one record. Only used by DENSE fields.
+    std::vector<std::int64_t> shape;
+    // Whether a record may omit the field, in which case default_value is decoded instead.
+    bool has_default = false;
+    std::string default_value;
+
+    /**
+       Returns the number of values of a DENSE field in one record.
+     */
+    std::int64_t NumElements() const;
+};
+
+/**
+   The values of one field of a batch of records.
+ */
+class Column {
+ public:
+    explicit Column(const FieldSpec& spec);
+
+    const FieldSpec& Spec() const { return spec_; }
+
+    /**
+       Appends values to the column, converting them to the type of the column.
+       Throws std::runtime_error if the column holds strings.
+     */
+    template <typename T>
+    void AppendValues(const T* values, std::size_t count);
+
+    /**
+       Appends count values, writing values[i] at position keys[i] and zeros
+       elsewhere. Throws std::runtime_error if a key is not less than count.
+     */
+    template <typename T>
+    void ScatterValues(const T* values, const std::uint64_t* keys, std::size_t num_values, std::size_t count);
+
+    /**
+       Appends the bytes of values of the type of the column, in native byte order.
+       Throws std::runtime_error if the column holds strings.
+     */
+    void AppendBytes(const char* data, std::size_t size);
+
+    /**
+       Appends a string value. Throws std::runtime_error if the column does not
+       hold strings.
+     */
+    void AppendString(const char* data, std::size_t size);
+
+    /**
+       Parses a value of the type of the column from text and appends it. Returns
+       false if the text is not a value of that type.
+     */
+    bool AppendText(const char* data, std::size_t size);
+
+    /**
+       Appends the index of a value of a SPARSE column.
+
+       param [in] row: The row of the batch the value belongs to.
+       param [in] index: The position of the value in the row.
+     */
+    void AppendIndex(std::int64_t row, std::int64_t index);
+
+    /**
+       Widens the dense shape of a SPARSE column to hold rows of the specified size.
+     */
+    void ExtendDenseSize(std::int64_t size);
+
+    /**
+       Returns the number of values in the column.
+     */
+    std::size_t NumValues() const;
+
+    /**
+       Returns the bytes of the numeric values of the column.
+     */
+    const char* Data() const { return data_.data(); }
+
+    const std::vector<std::string>& Strings() const { return strings_; }
+
+    /**
+       Returns the row and position of each value of a SPARSE column, flattened.
+     */
+    const std::vector<std::int64_t>& Indices() const { return indices_; }
+
+    /**
+       Returns the size of the rows of a SPARSE column.
+     */
+    std::int64_t DenseSize() const { return dense_size_; }
+
+    /**
+       Removes all values from the column.
+     */
+    void Clear();
+
+ private:
+    FieldSpec spec_;
+    std::size_t value_size_;
+    std::vector<char> data_;
+    std::vector<std::string> strings_;
+    std::vector<std::int64_t> indices_;
+    std::int64_t dense_size_;
+};
+
+/**
+   The fields decoded from a batch of records, stored by column.
+ */
+class Batch {
+ public:
+    explicit Batch(const std::vector<FieldSpec>& fields);
+
+    std::size_t NumRows() const { return num_rows_; }
+
+    /**
+       Marks the values appended since the last call as a complete row.
+     */
+    void FinishRow() { ++num_rows_; }
+
+    std::vector<Column>& Columns() { return columns_; }
+
+    const std::vector<Column>& Columns() const { return columns_; }
+
+    /**
+       Removes all rows from the batch.
+     */
+    void Clear();
+
+ private:
+    std::vector<Column> columns_;
+    std::size_t num_rows_;
+};
+
+/**
+   Options of a record format, by name, e.g. {"field_delim": ","}.
+ */
+using RecordDecoderOptions = std::map<std::string, std::string>;
+
+/**
+   Decodes the fields of records into a Batch.
+ */
+class RecordDecoder {
+ public:
+    explicit RecordDecoder(const std::vector<FieldSpec>& fields) : fields_(fields) {}
+
+    virtual ~RecordDecoder() {}
+
+    RecordDecoder(const RecordDecoder&) = delete;
+    RecordDecoder& operator=(const RecordDecoder&) = delete;
+
+    /**
+       Decodes a record and appends its fields to a new row of the batch, unless the
+       record holds no row, like a header line. Throws std::runtime_error if the record
+       cannot be decoded.
+
+       param [in] data: The record bytes.
+       param [in] size: The number of record bytes.
+       param [out] batch: The batch to append to. Must have been created with the
+                          fields of this decoder.
+     */
+    virtual void Decode(const char* data, std::size_t size, Batch* batch) = 0;
+
+    /**
+       Called once no records remain. Throws std::runtime_error if the records decoded
+       end partway through a row.
+     */
+    virtual void Finish() {}
+
+    const std::vector<FieldSpec>& Fields() const { return fields_; }
+
+ protected:
+    const std::vector<FieldSpec> fields_;
+};
+
+}  // namespace tensorflow
+}  // namespace sagemaker
+
+#endif  // SRC_PIPEMODE_OP_RECORDDECODER_RECORDDECODER_HPP_
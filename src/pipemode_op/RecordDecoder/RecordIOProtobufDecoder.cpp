@@ -0,0 +1,365 @@
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include "RecordIOProtobufDecoder.hpp"
+
+#include <cstring>
+#include <stdexcept>
+
+using sagemaker::tensorflow::Batch;
+using sagemaker::tensorflow::Column;
+using sagemaker::tensorflow::FieldKind;
+using sagemaker::tensorflow::FieldSpec;
+using sagemaker::tensorflow::RecordIOProtobufDecoder;
+
+// Field numbers of the aialgs.data protobuf messages
+#define RECORD_FEATURES 1
+#define RECORD_LABEL 2
+#define MAP_ENTRY_KEY 1
+#define MAP_ENTRY_VALUE 2
+#define VALUE_FLOAT32_TENSOR 2
+#define VALUE_FLOAT64_TENSOR 3
+#define VALUE_INT32_TENSOR 7
+#define VALUE_BYTES 9
+#define TENSOR_VALUES 1
+#define TENSOR_KEYS 2
+#define TENSOR_SHAPE 3
+#define BYTES_VALUE 1
+
+// Protobuf wire types
+#define WIRE_VARINT 0
+#define WIRE_FIXED64 1
+#define WIRE_LENGTH_DELIMITED 2
+#define WIRE_FIXED32 5
+
+namespace {
+
+/**
+   Reads the fields of a protobuf message.
+ */
+class WireReader {
+ public:
+    WireReader(const char* data, const char* end) : position_(data), end_(end) {}
+
+    bool AtEnd() const { return position_ == end_; }
+
+    /**
+       Reads the tag of the next field. Returns false at the end of the message.
+     */
+    bool Next(std::uint32_t* field_number, std::uint32_t* wire_type) {
+        if (AtEnd()) {
+            return false;
+        }
+        std::uint64_t tag = ReadVarint();
+        *field_number = tag >> 3;
+        *wire_type = tag & 7;
+        return true;
+    }
+
+    std::uint64_t ReadVarint() {
+        std::uint64_t value = 0;
+        for (int shift = 0; shift < 64; shift += 7) {
+            if (position_ == end_) {
+                throw std::runtime_error("Truncated protobuf varint");
+            }
+            std::uint8_t byte = *position_++;
+            value |= static_cast<std::uint64_t>(byte & 0x7f) << shift;
+            if (!(byte & 0x80)) {
+                return value;
+            }
+        }
+        throw std::runtime_error("Invalid protobuf varint");
+    }
+
+    /**
+       Reads a length delimited field, returning its first byte and setting end to
+       the byte after its last.
+     */
+    const char* ReadLengthDelimited(const char** end) {
+        std::uint64_t length = ReadVarint();
+        if (length > static_cast<std::uint64_t>(end_ - position_)) {
+            throw std::runtime_error("Truncated protobuf message");
+        }
+        const char* start = position_;
+        position_ += length;
+        *end = position_;
+        return start;
+    }
+
+    template <typename T>
+    T ReadFixed() {
+        if (static_cast<std::size_t>(end_ - position_) < sizeof(T)) {
+            throw std::runtime_error("Truncated protobuf message");
+        }
+        T value;
+        std::memcpy(&value, position_, sizeof(T));
+        position_ += sizeof(T);
+        return value;
+    }
+
+    void Skip(std::uint32_t wire_type) {
+        const char* end;
+        switch (wire_type) {
+            case WIRE_VARINT:
+                ReadVarint();
+                break;
+            case WIRE_FIXED64:
+                ReadFixed<std::uint64_t>();
+                break;
+            case WIRE_LENGTH_DELIMITED:
+                ReadLengthDelimited(&end);
+                break;
+            case WIRE_FIXED32:
+                ReadFixed<std::uint32_t>();
+                break;
+            default:
+                throw std::runtime_error("Unsupported protobuf wire type " + std::to_string(wire_type));
+        }
+    }
+
+ private:
+    const char* position_;
+    const char* end_;
+};
+
+/**
+   Reads the elements of a repeated fixed size field, packed or not, into values.
+ */
+template <typename T>
+void ReadRepeatedFixed(WireReader* reader, std::uint32_t wire_type, std::uint32_t element_wire_type,
+    std::vector<T>* values) {
+    if (wire_type == element_wire_type) {
+        values->push_back(reader->ReadFixed<T>());
+        return;
+    }
+    if (wire_type != WIRE_LENGTH_DELIMITED) {
+        throw std::runtime_error("Unexpected protobuf wire type " + std::to_string(wire_type));
+    }
+    const char* end;
+    const char* start = reader->ReadLengthDelimited(&end);
+    if ((end - start) % sizeof(T)) {
+        throw std::runtime_error("Invalid packed protobuf field");
+    }
+    std::size_t size = values->size();
+    values->resize(size + (end - start) / sizeof(T));
+    std::memcpy(values->data() + size, start, end - start);
+}
+
+/**
+   Reads the elements of a repeated varint field, packed or not, into values.
+ */
+template <typename T>
+void ReadRepeatedVarint(WireReader* reader, std::uint32_t wire_type, std::vector<T>* values) {
+    if (wire_type == WIRE_VARINT) {
+        values->push_back(static_cast<T>(reader->ReadVarint()));
+        return;
+    }
+    if (wire_type != WIRE_LENGTH_DELIMITED) {
+        throw std::runtime_error("Unexpected protobuf wire type " + std::to_string(wire_type));
+    }
+    const char* end;
+    const char* start = reader->ReadLengthDelimited(&end);
+    WireReader packed(start, end);
+    while (!packed.AtEnd()) {
+        values->push_back(static_cast<T>(packed.ReadVarint()));
+    }
+}
+
+}  // namespace
+
+RecordIOProtobufDecoder::RecordIOProtobufDecoder(const std::vector<FieldSpec>& fields):
+    RecordDecoder(fields), present_(fields.size()) {
+    for (const FieldSpec& field : fields) {
+        std::size_t separator = field.name.find('/');
+        std::string map = field.name.substr(0, separator);
+        if (separator == std::string::npos || (map != "features" && map != "label")) {
+            throw std::invalid_argument("Invalid RecordIO-protobuf field name: " + field.name);
+        }
+        field_keys_.push_back({static_cast<std::uint32_t>(map == "features" ? RECORD_FEATURES : RECORD_LABEL),
+            field.name.substr(separator + 1)});
+    }
+}
+
+void RecordIOProtobufDecoder::Decode(const char* data, std::size_t size, Batch* batch) {
+    std::fill(present_.begin(), present_.end(), false);
+    WireReader reader(data, data + size);
+    std::uint32_t field_number;
+    std::uint32_t wire_type;
+    while (reader.Next(&field_number, &wire_type)) {
+        bool is_map = field_number == RECORD_FEATURES || field_number == RECORD_LABEL;
+        if (is_map && wire_type == WIRE_LENGTH_DELIMITED) {
+            const char* end;
+            const char* start = reader.ReadLengthDelimited(&end);
+            DecodeMapEntry(field_number, start, end, batch);
+        } else {
+            reader.Skip(wire_type);
+        }
+    }
+    for (std::size_t i = 0; i < fields_.size(); i++) {
+        if (!present_[i] && fields_[i].kind == FieldKind::DENSE) {
+            throw std::runtime_error("Record is missing field " + fields_[i].name);
+        }
+    }
+    batch->FinishRow();
+}
+
+void RecordIOProtobufDecoder::DecodeMapEntry(std::uint32_t map, const char* data, const char* end, Batch* batch) {
+    WireReader reader(data, end);
+    const char* key = nullptr;
+    const char* key_end = nullptr;
+    const char* value = nullptr;
+    const char* value_end = nullptr;
+    std::uint32_t field_number;
+    std::uint32_t wire_type;
+    while (reader.Next(&field_number, &wire_type)) {
+        if (field_number == MAP_ENTRY_KEY && wire_type == WIRE_LENGTH_DELIMITED) {
+            key = reader.ReadLengthDelimited(&key_end);
+        } else if (field_number == MAP_ENTRY_VALUE && wire_type == WIRE_LENGTH_DELIMITED) {
+            value = reader.ReadLengthDelimited(&value_end);
+        } else {
+            reader.Skip(wire_type);
+        }
+    }
+    std::size_t key_size = key ? key_end - key : 0;
+    for (std::size_t i = 0; i < field_keys_.size(); i++) {
+        const FieldKey& field_key = field_keys_[i];
+        if (field_key.map == map && field_key.key.size() == key_size
+            && !std::memcmp(field_key.key.data(), key, key_size)) {
+            if (present_[i]) {
+                throw std::runtime_error("Record has more than one value for field " + fields_[i].name);
+            }
+            present_[i] = true;
+            if (value) {
+                DecodeValue(i, value, value_end, batch);
+            } else if (fields_[i].kind == FieldKind::DENSE) {
+                throw std::runtime_error("Record has no value for field " + fields_[i].name);
+            }
+            return;
+        }
+    }
+}
+
+void RecordIOProtobufDecoder::DecodeValue(std::size_t field, const char* data, const char* end, Batch* batch) {
+    WireReader reader(data, end);
+    std::uint32_t field_number;
+    std::uint32_t wire_type;
+    while (reader.Next(&field_number, &wire_type)) {
+        if (wire_type != WIRE_LENGTH_DELIMITED) {
+            reader.Skip(wire_type);
+            continue;
+        }
+        const char* value_end;
+        const char* value = reader.ReadLengthDelimited(&value_end);
+        switch (field_number) {
+            case VALUE_FLOAT32_TENSOR:
+                DecodeTensor(field_number, value, value_end);
+                AppendTensor(field, float32_values_, batch);
+                return;
+            case VALUE_FLOAT64_TENSOR:
+                DecodeTensor(field_number, value, value_end);
+                AppendTensor(field, float64_values_, batch);
+                return;
+            case VALUE_INT32_TENSOR:
+                DecodeTensor(field_number, value, value_end);
+                AppendTensor(field, int32_values_, batch);
+                return;
+            case VALUE_BYTES: {
+                Column& column = batch->Columns()[field];
+                WireReader bytes(value, value_end);
+                std::int64_t count = 0;
+                while (bytes.Next(&field_number, &wire_type)) {
+                    if (field_number == BYTES_VALUE && wire_type == WIRE_LENGTH_DELIMITED) {
+                        const char* bytes_end;
+                        const char* bytes_value = bytes.ReadLengthDelimited(&bytes_end);
+                        column.AppendString(bytes_value, bytes_end - bytes_value);
+                        if (fields_[field].kind == FieldKind::SPARSE) {
+                            column.AppendIndex(batch->NumRows(), count);
+                        }
+                        ++count;
+                    } else {
+                        bytes.Skip(wire_type);
+                    }
+                }
+                if (fields_[field].kind == FieldKind::DENSE && count != fields_[field].NumElements()) {
+                    throw std::runtime_error("Field " + fields_[field].name + " has " + std::to_string(count)
+                        + " values, expected " + std::to_string(fields_[field].NumElements()));
+                }
+                return;
+            }
+            default:
+                break;
+        }
+    }
+    throw std::runtime_error("Field " + fields_[field].name + " has no supported value");
+}
+
+void RecordIOProtobufDecoder::DecodeTensor(std::uint32_t value_type, const char* data, const char* end) {
+    float32_values_.clear();
+    float64_values_.clear();
+    int32_values_.clear();
+    keys_.clear();
+    shape_.clear();
+    WireReader reader(data, end);
+    std::uint32_t field_number;
+    std::uint32_t wire_type;
+    while (reader.Next(&field_number, &wire_type)) {
+        if (field_number == TENSOR_VALUES && value_type == VALUE_FLOAT32_TENSOR) {
+            ReadRepeatedFixed(&reader, wire_type, WIRE_FIXED32, &float32_values_);
+        } else if (field_number == TENSOR_VALUES && value_type == VALUE_FLOAT64_TENSOR) {
+            ReadRepeatedFixed(&reader, wire_type, WIRE_FIXED64, &float64_values_);
+        } else if (field_number == TENSOR_VALUES && value_type == VALUE_INT32_TENSOR) {
+            ReadRepeatedVarint(&reader, wire_type, &int32_values_);
+        } else if (field_number == TENSOR_KEYS) {
+            ReadRepeatedVarint(&reader, wire_type, &keys_);
+        } else if (field_number == TENSOR_SHAPE) {
+            ReadRepeatedVarint(&reader, wire_type, &shape_);
+        } else {
+            reader.Skip(wire_type);
+        }
+    }
+}
+
+template <typename T>
+void RecordIOProtobufDecoder::AppendTensor(std::size_t field, const std::vector<T>& values, Batch* batch) {
+    const FieldSpec& spec = fields_[field];
+    Column& column = batch->Columns()[field];
+    if (!keys_.empty() && keys_.size() != values.size()) {
+        throw std::runtime_error("Field " + spec.name + " has " + std::to_string(values.size()) + " values and "
+            + std::to_string(keys_.size()) + " keys");
+    }
+    if (spec.kind == FieldKind::DENSE) {
+        std::size_t num_elements = spec.NumElements();
+        if (!keys_.empty()) {
+            column.ScatterValues(values.data(), keys_.data(), values.size(), num_elements);
+            return;
+        }
+        if (values.size() != num_elements) {
+            throw std::runtime_error("Field " + spec.name + " has " + std::to_string(values.size())
+                + " values, expected " + std::to_string(num_elements));
+        }
+        column.AppendValues(values.data(), values.size());
+        return;
+    }
+    column.AppendValues(values.data(), values.size());
+    std::int64_t row = batch->NumRows();
+    for (std::size_t i = 0; i < values.size(); i++) {
+        column.AppendIndex(row, keys_.empty() ? i : keys_[i]);
+    }
+    if (!shape_.empty()) {
+        std::int64_t dense_size = 1;
+        for (std::uint64_t dim : shape_) {
+            dense_size *= dim;
+        }
+        column.ExtendDenseSize(dense_size);
+    }
+}
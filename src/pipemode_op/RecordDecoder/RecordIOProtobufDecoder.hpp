@@ -0,0 +1,74 @@
+#ifndef SRC_PIPEMODE_OP_RECORDDECODER_RECORDIOPROTOBUFDECODER_HPP_
+#define SRC_PIPEMODE_OP_RECORDDECODER_RECORDIOPROTOBUFDECODER_HPP_
+
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include <cstdint>
+#include <string>
+#include <vector>
+
+#include "RecordDecoder.hpp"
+
+namespace sagemaker {
+namespace tensorflow {
+
+/**
+   Decodes SageMaker RecordIO-protobuf records. Each record is an aialgs.data.Record
+   protobuf message, with maps of named features and labels. Each value in the maps is a
+   Float32Tensor, Float64Tensor, Int32Tensor or Bytes message.
+
+   Fields are named "features/<key>" or "label/<key>", after the map and key they are
+   read from. The values of a tensor with keys are scattered into DENSE fields; a tensor
+   without keys becomes a SPARSE field value with implicit keys 0..n-1. A DENSE field
+   must be present in every record, while a missing SPARSE field has no values.
+
+   The protobuf wire format is parsed directly, without the protobuf library.
+ */
+class RecordIOProtobufDecoder : public RecordDecoder {
+ public:
+    /**
+       Constructs a new RecordIOProtobufDecoder. Throws std::invalid_argument if a field
+       name does not start with "features/" or "label/".
+     */
+    explicit RecordIOProtobufDecoder(const std::vector<FieldSpec>& fields);
+
+    void Decode(const char* data, std::size_t size, Batch* batch) override;
+
+ private:
+    struct FieldKey {
+        std::uint32_t map;
+        std::string key;
+    };
+
+    void DecodeMapEntry(std::uint32_t map, const char* data, const char* end, Batch* batch);
+    void DecodeValue(std::size_t field, const char* data, const char* end, Batch* batch);
+    void DecodeTensor(std::uint32_t value_type, const char* data, const char* end);
+    template <typename T>
+    void AppendTensor(std::size_t field, const std::vector<T>& values, Batch* batch);
+
+    std::vector<FieldKey> field_keys_;
+    std::vector<bool> present_;
+
+    // The contents of the tensor being decoded, reused between records
+    std::vector<float> float32_values_;
+    std::vector<double> float64_values_;
+    std::vector<std::int32_t> int32_values_;
+    std::vector<std::uint64_t> keys_;
+    std::vector<std::uint64_t> shape_;
+};
+
+}  // namespace tensorflow
+}  // namespace sagemaker
+
+#endif  // SRC_PIPEMODE_OP_RECORDDECODER_RECORDIOPROTOBUFDECODER_HPP_
@@ -0,0 +1,142 @@
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include <algorithm>
+#include <cstdlib>
+#include <cstring>
+#include <stdexcept>
+#include <string>
+#include "ArrowStreamReader.hpp"
+
+using sagemaker::tensorflow::ArrowStreamReader;
+
+namespace {
+
+const std::int32_t ARROW_CONTINUATION_MARKER = -1;
+
+// The size of the first allocation of a message body, which grows as the body is read, so
+// that a corrupted body length fails as a truncated message rather than allocating it all
+const std::size_t ARROW_INITIAL_BODY_ALLOCATION = 1 << 20;
+
+// The position of the bodyLength field in the vtable of a flatbuffer Message, after the
+// vtable and table sizes and the version, header_type and header fields
+const std::size_t ARROW_BODY_LENGTH_VTABLE_POSITION = 10;
+
+template <typename T>
+T ReadMetadata(const std::string& metadata, std::int64_t position) {
+    T value;
+    if (position < 0 || static_cast<std::size_t>(position) + sizeof(T) > metadata.size()) {
+        throw std::runtime_error("Invalid Arrow message metadata");
+    }
+    std::memcpy(&value, metadata.data() + position, sizeof(T));
+    return value;
+}
+
+/**
+   Returns the bodyLength field of a flatbuffer Message.
+ */
+std::int64_t ReadBodyLength(const std::string& metadata) {
+    std::int64_t table = ReadMetadata<std::uint32_t>(metadata, 0);
+    std::int64_t vtable = table - ReadMetadata<std::int32_t>(metadata, table);
+    if (ReadMetadata<std::uint16_t>(metadata, vtable) <= ARROW_BODY_LENGTH_VTABLE_POSITION) {
+        return 0;
+    }
+    std::uint16_t field = ReadMetadata<std::uint16_t>(metadata, vtable + ARROW_BODY_LENGTH_VTABLE_POSITION);
+    std::int64_t body_length = field ? ReadMetadata<std::int64_t>(metadata, table + field) : 0;
+    if (body_length < 0) {
+        throw std::runtime_error("Invalid Arrow message body length: " + std::to_string(body_length));
+    }
+    return body_length;
+}
+
+/**
+   Allocates a message body of the specified size, aligned to ARROW_BODY_ALIGNMENT bytes.
+ */
+char* AllocateBody(std::size_t size) {
+    std::size_t allocation = (size + ARROW_BODY_ALIGNMENT - 1) / ARROW_BODY_ALIGNMENT * ARROW_BODY_ALIGNMENT;
+    char* data = static_cast<char*>(std::aligned_alloc(ARROW_BODY_ALIGNMENT, allocation));
+    if (!data) {
+        throw std::runtime_error("Unable to allocate Arrow message body of " + std::to_string(size) + " bytes");
+    }
+    return data;
+}
+
+}  // namespace
+
+bool ArrowStreamReader::ReadMessage(std::string* metadata, std::shared_ptr<char>* body, std::int64_t* body_size) {
+    std::int32_t metadata_size;
+    do {
+        std::size_t bytes_read = Read(&metadata_size, sizeof(metadata_size));
+        if (!bytes_read) {
+            return false;
+        }
+        if (bytes_read != sizeof(metadata_size)) {
+            throw std::runtime_error("Truncated Arrow message");
+        }
+        // Streams written before Arrow 0.15 have no continuation marker
+        if (metadata_size == ARROW_CONTINUATION_MARKER && Read(&metadata_size, sizeof(metadata_size))
+            != sizeof(metadata_size)) {
+            throw std::runtime_error("Truncated Arrow message");
+        }
+        if (metadata_size < 0) {
+            throw std::runtime_error("Invalid Arrow metadata size: " + std::to_string(metadata_size));
+        }
+        // A zero size marks the end of a stream, which may be followed by another stream
+    } while (!metadata_size);
+    metadata->resize(metadata_size);
+    if (Read(&(*metadata)[0], metadata_size) != static_cast<std::size_t>(metadata_size)) {
+        throw std::runtime_error("Truncated Arrow message");
+    }
+    *body_size = ReadBodyLength(*metadata);
+    body->reset();
+    if (*body_size) {
+        // The body length is untrusted, so the body is allocated as it is read
+        const std::size_t size = *body_size;
+        std::size_t capacity = std::min(size, ARROW_INITIAL_BODY_ALLOCATION);
+        body->reset(AllocateBody(capacity), std::free);
+        std::size_t bytes_read = 0;
+        while (true) {
+            std::size_t requested = capacity - bytes_read;
+            if (Read(body->get() + bytes_read, requested) != requested) {
+                throw std::runtime_error("Truncated Arrow message");
+            }
+            bytes_read = capacity;
+            if (bytes_read == size) {
+                break;
+            }
+            capacity = std::min(size, 2 * capacity);
+            char* grown = AllocateBody(capacity);
+            std::memcpy(grown, body->get(), bytes_read);
+            body->reset(grown, std::free);
+        }
+    }
+    return true;
+}
+
+bool ArrowStreamReader::ReadRecord(::tensorflow::tstring* storage) {
+    std::string metadata;
+    std::shared_ptr<char> body;
+    std::int64_t body_size;
+    if (!ReadMessage(&metadata, &body, &body_size)) {
+        return false;
+    }
+    std::int32_t prefix[2] = {ARROW_CONTINUATION_MARKER, static_cast<std::int32_t>(metadata.size())};
+    storage->resize_uninitialized(sizeof(prefix) + metadata.size() + body_size);
+    char* data = &(*storage)[0];
+    std::memcpy(data, prefix, sizeof(prefix));
+    std::memcpy(data + sizeof(prefix), metadata.data(), metadata.size());
+    if (body_size) {
+        std::memcpy(data + sizeof(prefix) + metadata.size(), body.get(), body_size);
+    }
+    return true;
+}
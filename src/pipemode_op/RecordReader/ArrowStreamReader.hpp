@@ -0,0 +1,61 @@
+#ifndef SRC_PIPEMODE_OP_RECORDREADER_ARROWSTREAMREADER_HPP_
+#define SRC_PIPEMODE_OP_RECORDREADER_ARROWSTREAMREADER_HPP_
+
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include <cstdint>
+#include <memory>
+#include <string>
+#include "RecordReader.hpp"
+#include "tensorflow/core/platform/tstring.h"
+
+namespace sagemaker {
+namespace tensorflow {
+
+// The alignment of the message bodies returned by ArrowStreamReader::ReadMessage
+#define ARROW_BODY_ALIGNMENT 64
+
+/**
+   A RecordReader that reads the messages of Apache Arrow IPC streams, defined here:
+   https://arrow.apache.org/docs/format/Columnar.html#ipc-streaming-format
+
+   Each message is a flatbuffer Message, its metadata, followed by a body. The end of
+   stream marker is skipped, so that the streams of several files concatenated into one
+   pipe are read as one sequence of messages.
+ */
+class ArrowStreamReader : public RecordReader {
+    using RecordReader::RecordReader;
+
+ public:
+    /**
+       Reads the next message as a record, encapsulated as in the stream: a continuation
+       marker, the size of the metadata, the metadata and the body.
+     */
+    bool ReadRecord(::tensorflow::tstring* storage) override;
+
+    /**
+       Reads the next message. Returns false if no messages remain. Throws
+       std::runtime_error if the stream is truncated or invalid.
+
+       param [out] metadata: The flatbuffer Message of the message.
+       param [out] body: The body of the message, aligned to ARROW_BODY_ALIGNMENT bytes.
+                         Null if the message has no body.
+       param [out] body_size: The number of bytes in the body.
+     */
+    bool ReadMessage(std::string* metadata, std::shared_ptr<char>* body, std::int64_t* body_size);
+};
+
+}  // namespace tensorflow
+}  // namespace sagemaker
+#endif  // SRC_PIPEMODE_OP_RECORDREADER_ARROWSTREAMREADER_HPP_
@@ -0,0 +1,453 @@
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include "BlockReader.hpp"
+
+#include <fcntl.h>
+#include <sys/mman.h>
+#include <sys/syscall.h>
+#include <unistd.h>
+#include <algorithm>
+#include <cerrno>
+#include <condition_variable>
+#include <cstring>
+#include <mutex>
+#include <stdexcept>
+#include <system_error>
+#include <thread>
+#include <utility>
+
+#if defined(__linux__) && defined(__NR_io_uring_setup) && __has_include(<linux/io_uring.h>)
+#include <linux/io_uring.h>
+#define PIPEMODE_WITH_IO_URING
+#endif
+
+using sagemaker::tensorflow::BlockRead;
+using sagemaker::tensorflow::BlockReader;
+using sagemaker::tensorflow::FileStream;
+
+namespace {
+
+/**
+   Reads the rest of a block with pread, retrying short reads until the block is full or
+   the end of the file is reached.
+ */
+void ReadBlock(BlockRead* read) {
+    while (read->result < static_cast<std::int64_t>(read->size)) {
+        ssize_t amount = pread(read->fd, read->buffer + read->result, read->size - read->result,
+            read->offset + read->result);
+        if (amount == -1) {
+            if (errno == EINTR) {
+                continue;
+            }
+            read->result = -errno;
+            return;
+        }
+        if (!amount) {
+            return;
+        }
+        read->result += amount;
+    }
+}
+
+class ThreadPoolBlockReader : public BlockReader {
+ public:
+    explicit ThreadPoolBlockReader(std::size_t num_threads) : stop_(false) {
+        for (std::size_t i = 0; i < std::max<std::size_t>(num_threads, 1); i++) {
+            threads_.emplace_back(&ThreadPoolBlockReader::Work, this);
+        }
+    }
+
+    ~ThreadPoolBlockReader() override {
+        {
+            std::lock_guard<std::mutex> lock(mutex_);
+            stop_ = true;
+        }
+        work_available_.notify_all();
+        for (std::thread& thread : threads_) {
+            thread.join();
+        }
+    }
+
+    void Submit(BlockRead* read) override {
+        {
+            std::lock_guard<std::mutex> lock(mutex_);
+            read->result = 0;
+            read->done = false;
+            queue_.push_back(read);
+        }
+        work_available_.notify_one();
+    }
+
+    void Wait(BlockRead* read) override {
+        std::unique_lock<std::mutex> lock(mutex_);
+        read_done_.wait(lock, [read] { return read->done; });
+    }
+
+    bool IsDone(BlockRead* read) override {
+        std::lock_guard<std::mutex> lock(mutex_);
+        return read->done;
+    }
+
+    std::string Name() const override {
+        return "threads";
+    }
+
+ private:
+    void Work() {
+        std::unique_lock<std::mutex> lock(mutex_);
+        while (true) {
+            work_available_.wait(lock, [this] { return stop_ || !queue_.empty(); });
+            if (queue_.empty()) {
+                return;
+            }
+            BlockRead* read = queue_.front();
+            queue_.pop_front();
+            lock.unlock();
+            ReadBlock(read);
+            lock.lock();
+            read->done = true;
+            read_done_.notify_all();
+        }
+    }
+
+    std::mutex mutex_;
+    std::condition_variable work_available_;
+    std::condition_variable read_done_;
+    std::deque<BlockRead*> queue_;
+    bool stop_;
+    std::vector<std::thread> threads_;
+};
+
+#ifdef PIPEMODE_WITH_IO_URING
+
+/**
+   A BlockReader that submits reads to an io_uring through the raw system calls.
+
+   Submissions and completions are handled under a mutex. One waiting thread at a time
+   blocks in io_uring_enter for completions, and wakes the other waiting threads once it
+   has reaped them, so that a completion cannot be reaped from under a blocked waiter.
+ */
+class IoUringBlockReader : public BlockReader {
+ public:
+    IoUringBlockReader() : ring_fd_(-1), in_flight_(0), waiting_(false) {}
+
+    ~IoUringBlockReader() override {
+        if (ring_fd_ >= 0) {
+            std::unique_lock<std::mutex> lock(mutex_);
+            while (in_flight_) {
+                Reap(&lock, true);
+            }
+        }
+        if (sqes_ != MAP_FAILED) {
+            munmap(sqes_, sqes_size_);
+        }
+        if (cq_ring_ != MAP_FAILED && cq_ring_ != sq_ring_) {
+            munmap(cq_ring_, cq_ring_size_);
+        }
+        if (sq_ring_ != MAP_FAILED) {
+            munmap(sq_ring_, sq_ring_size_);
+        }
+        if (ring_fd_ >= 0) {
+            close(ring_fd_);
+        }
+    }
+
+    /**
+       Sets up a ring of the specified depth. Returns false if io_uring, or reads
+       through it, are not supported.
+     */
+    bool Setup(std::size_t queue_depth) {
+        struct io_uring_params params;
+        std::memset(&params, 0, sizeof(params));
+        ring_fd_ = syscall(__NR_io_uring_setup, static_cast<unsigned>(queue_depth), &params);
+        // IORING_OP_READ is supported by every kernel with fast poll
+        if (ring_fd_ < 0 || !(params.features & IORING_FEAT_FAST_POLL)) {
+            return false;
+        }
+        sq_ring_size_ = params.sq_off.array + params.sq_entries * sizeof(unsigned);
+        cq_ring_size_ = params.cq_off.cqes + params.cq_entries * sizeof(struct io_uring_cqe);
+        bool single_mmap = params.features & IORING_FEAT_SINGLE_MMAP;
+        if (single_mmap) {
+            sq_ring_size_ = cq_ring_size_ = std::max(sq_ring_size_, cq_ring_size_);
+        }
+        sq_ring_ = mmap(nullptr, sq_ring_size_, PROT_READ | PROT_WRITE, MAP_SHARED | MAP_POPULATE, ring_fd_,
+            IORING_OFF_SQ_RING);
+        if (sq_ring_ == MAP_FAILED) {
+            return false;
+        }
+        cq_ring_ = single_mmap ? sq_ring_ : mmap(nullptr, cq_ring_size_, PROT_READ | PROT_WRITE,
+            MAP_SHARED | MAP_POPULATE, ring_fd_, IORING_OFF_CQ_RING);
+        if (cq_ring_ == MAP_FAILED) {
+            return false;
+        }
+        sqes_size_ = params.sq_entries * sizeof(struct io_uring_sqe);
+        sqes_ = mmap(nullptr, sqes_size_, PROT_READ | PROT_WRITE, MAP_SHARED | MAP_POPULATE, ring_fd_,
+            IORING_OFF_SQES);
+        if (sqes_ == MAP_FAILED) {
+            return false;
+        }
+        char* sq = static_cast<char*>(sq_ring_);
+        sq_tail_ = reinterpret_cast<unsigned*>(sq + params.sq_off.tail);
+        sq_mask_ = *reinterpret_cast<unsigned*>(sq + params.sq_off.ring_mask);
+        sq_array_ = reinterpret_cast<unsigned*>(sq + params.sq_off.array);
+        char* cq = static_cast<char*>(cq_ring_);
+        cq_head_ = reinterpret_cast<unsigned*>(cq + params.cq_off.head);
+        cq_tail_ = reinterpret_cast<unsigned*>(cq + params.cq_off.tail);
+        cq_mask_ = *reinterpret_cast<unsigned*>(cq + params.cq_off.ring_mask);
+        cqes_ = reinterpret_cast<struct io_uring_cqe*>(cq + params.cq_off.cqes);
+        // At most one entry per read in flight is queued, so completions never overflow
+        max_in_flight_ = params.sq_entries;
+        return true;
+    }
+
+    void Submit(BlockRead* read) override {
+        std::unique_lock<std::mutex> lock(mutex_);
+        while (in_flight_ == max_in_flight_) {
+            Reap(&lock, true);
+        }
+        read->result = 0;
+        read->done = false;
+        ++in_flight_;
+        Enqueue(read);
+    }
+
+    void Wait(BlockRead* read) override {
+        std::unique_lock<std::mutex> lock(mutex_);
+        while (!read->done) {
+            Reap(&lock, true);
+        }
+    }
+
+    bool IsDone(BlockRead* read) override {
+        std::unique_lock<std::mutex> lock(mutex_);
+        if (!read->done) {
+            Reap(&lock, false);
+        }
+        return read->done;
+    }
+
+    std::string Name() const override {
+        return "io_uring";
+    }
+
+ private:
+    /**
+       Queues a read of the rest of a block and submits it to the kernel.
+     */
+    void Enqueue(BlockRead* read) {
+        unsigned tail = *sq_tail_;
+        unsigned index = tail & sq_mask_;
+        struct io_uring_sqe* sqe = static_cast<struct io_uring_sqe*>(sqes_) + index;
+        std::memset(sqe, 0, sizeof(*sqe));
+        sqe->opcode = IORING_OP_READ;
+        sqe->fd = read->fd;
+        sqe->off = read->offset + read->result;
+        sqe->addr = reinterpret_cast<std::uint64_t>(read->buffer + read->result);
+        sqe->len = static_cast<std::uint32_t>(read->size - read->result);
+        sqe->user_data = reinterpret_cast<std::uint64_t>(read);
+        sq_array_[index] = index;
+        __atomic_store_n(sq_tail_, tail + 1, __ATOMIC_RELEASE);
+        while (syscall(__NR_io_uring_enter, ring_fd_, 1, 0, 0, nullptr, 0) == -1) {
+            if (errno != EINTR && errno != EAGAIN && errno != EBUSY) {
+                throw std::system_error(errno, std::system_category(), "io_uring_enter");
+            }
+        }
+    }
+
+    /**
+       Reaps the completions in the ring. If block is true and no completion is
+       available, waits for one, either in io_uring_enter or for the thread that is.
+     */
+    void Reap(std::unique_lock<std::mutex>* lock, bool block) {
+        if (waiting_) {
+            if (block) {
+                reaped_.wait(*lock);
+            }
+            return;
+        }
+        if (Drain() || !block) {
+            return;
+        }
+        waiting_ = true;
+        lock->unlock();
+        int result = syscall(__NR_io_uring_enter, ring_fd_, 0, 1, IORING_ENTER_GETEVENTS, nullptr, 0);
+        int error = errno;
+        lock->lock();
+        waiting_ = false;
+        Drain();
+        reaped_.notify_all();
+        if (result == -1 && error != EINTR && error != EAGAIN && error != EBUSY) {
+            throw std::system_error(error, std::system_category(), "io_uring_enter");
+        }
+    }
+
+    /**
+       Completes the reads whose completions are in the ring, and resubmits the rest of
+       short reads. Returns true if any completion was reaped.
+     */
+    bool Drain() {
+        unsigned head = *cq_head_;
+        unsigned tail = __atomic_load_n(cq_tail_, __ATOMIC_ACQUIRE);
+        if (head == tail) {
+            return false;
+        }
+        std::vector<BlockRead*> resubmit;
+        for (; head != tail; head++) {
+            const struct io_uring_cqe& cqe = cqes_[head & cq_mask_];
+            BlockRead* read = reinterpret_cast<BlockRead*>(cqe.user_data);
+            if (cqe.res == -EINTR || cqe.res == -EAGAIN) {
+                resubmit.push_back(read);
+                continue;
+            }
+            if (cqe.res > 0) {
+                read->result += cqe.res;
+                if (read->result < static_cast<std::int64_t>(read->size)) {
+                    resubmit.push_back(read);
+                    continue;
+                }
+            } else if (cqe.res < 0) {
+                read->result = cqe.res;
+            }
+            read->done = true;
+            --in_flight_;
+        }
+        __atomic_store_n(cq_head_, head, __ATOMIC_RELEASE);
+        for (BlockRead* read : resubmit) {
+            Enqueue(read);
+        }
+        reaped_.notify_all();
+        return true;
+    }
+
+    int ring_fd_;
+    void* sq_ring_ = MAP_FAILED;
+    void* cq_ring_ = MAP_FAILED;
+    void* sqes_ = MAP_FAILED;
+    std::size_t sq_ring_size_ = 0;
+    std::size_t cq_ring_size_ = 0;
+    std::size_t sqes_size_ = 0;
+    unsigned* sq_tail_ = nullptr;
+    unsigned sq_mask_ = 0;
+    unsigned* sq_array_ = nullptr;
+    unsigned* cq_head_ = nullptr;
+    unsigned* cq_tail_ = nullptr;
+    unsigned cq_mask_ = 0;
+    struct io_uring_cqe* cqes_ = nullptr;
+
+    std::mutex mutex_;
+    std::condition_variable reaped_;
+    std::size_t in_flight_;
+    std::size_t max_in_flight_ = 0;
+    // Whether a thread is blocked in io_uring_enter for completions
+    bool waiting_;
+};
+
+#endif  // PIPEMODE_WITH_IO_URING
+
+}  // namespace
+
+std::unique_ptr<BlockReader> sagemaker::tensorflow::CreateIoUringBlockReader(std::size_t queue_depth) {
+#ifdef PIPEMODE_WITH_IO_URING
+    std::unique_ptr<IoUringBlockReader> block_reader(new IoUringBlockReader());
+    if (block_reader->Setup(queue_depth)) {
+        return std::unique_ptr<BlockReader>(block_reader.release());
+    }
+#endif
+    return nullptr;
+}
+
+std::unique_ptr<BlockReader> sagemaker::tensorflow::CreateThreadPoolBlockReader(std::size_t num_threads) {
+    return std::unique_ptr<BlockReader>(new ThreadPoolBlockReader(num_threads));
+}
+
+std::unique_ptr<BlockReader> sagemaker::tensorflow::CreateBlockReader() {
+    std::unique_ptr<BlockReader> block_reader = CreateIoUringBlockReader();
+    if (!block_reader) {
+        block_reader = CreateThreadPoolBlockReader();
+    }
+    return block_reader;
+}
+
+FileStream::FileStream(const std::string& file_path, BlockReader* block_reader, std::size_t block_size,
+    std::size_t read_ahead_blocks)
+    : block_reader_(block_reader), fd_(open(file_path.c_str(), O_RDONLY | O_CLOEXEC)), file_path_(file_path),
+      block_size_(block_size), read_ahead_blocks_(std::max<std::size_t>(read_ahead_blocks, 1)) {
+    if (fd_ == -1) {
+        throw std::system_error(errno, std::system_category(), "Cannot open " + file_path_);
+    }
+    Fill();
+}
+
+FileStream::~FileStream() {
+    Finish();
+    close(fd_);
+}
+
+std::size_t FileStream::Read(void* dest, std::size_t nbytes) {
+    char* out = static_cast<char*>(dest);
+    std::size_t bytes_read = 0;
+    while (bytes_read < nbytes && !blocks_.empty()) {
+        Block& block = blocks_.front();
+        block_reader_->Wait(&block.read);
+        if (block.read.result < 0) {
+            throw std::system_error(-block.read.result, std::system_category(), "Cannot read " + file_path_);
+        }
+        std::size_t amount = std::min<std::size_t>(block.read.result - block.position, nbytes - bytes_read);
+        std::memcpy(out + bytes_read, block.data.get() + block.position, amount);
+        block.position += amount;
+        bytes_read += amount;
+        if (block.position == static_cast<std::size_t>(block.read.result)) {
+            end_of_file_ = block.position < block.read.size;
+            free_buffers_.push_back(std::move(block.data));
+            blocks_.pop_front();
+            if (end_of_file_) {
+                Finish();
+            } else {
+                Fill();
+            }
+        }
+    }
+    return bytes_read;
+}
+
+bool FileStream::Ready() {
+    return blocks_.empty() || block_reader_->IsDone(&blocks_.front().read);
+}
+
+void FileStream::Fill() {
+    while (!end_of_file_ && blocks_.size() < read_ahead_blocks_) {
+        blocks_.emplace_back();
+        Block& block = blocks_.back();
+        if (free_buffers_.empty()) {
+            block.data.reset(new char[block_size_]);
+        } else {
+            block.data = std::move(free_buffers_.back());
+            free_buffers_.pop_back();
+        }
+        block.read.fd = fd_;
+        block.read.offset = next_offset_;
+        block.read.buffer = block.data.get();
+        block.read.size = block_size_;
+        next_offset_ += block_size_;
+        block_reader_->Submit(&block.read);
+    }
+}
+
+void FileStream::Finish() {
+    // Blocks past the end of the file may still be in flight, and own their buffers
+    for (Block& block : blocks_) {
+        block_reader_->Wait(&block.read);
+    }
+    blocks_.clear();
+}
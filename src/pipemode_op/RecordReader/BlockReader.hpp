@@ -0,0 +1,159 @@
+#ifndef SRC_PIPEMODE_OP_RECORDREADER_BLOCKREADER_HPP_
+#define SRC_PIPEMODE_OP_RECORDREADER_BLOCKREADER_HPP_
+
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include <cstdint>
+#include <deque>
+#include <memory>
+#include <string>
+#include <vector>
+
+namespace sagemaker {
+namespace tensorflow {
+
+#define DEFAULT_FILE_BLOCK_SIZE (1 << 20)
+#define DEFAULT_FILE_READ_AHEAD_BLOCKS 2
+#define DEFAULT_BLOCK_READER_QUEUE_DEPTH 64
+#define DEFAULT_BLOCK_READER_THREADS 4
+
+/**
+   A read of a block of a file at an offset, submitted to a BlockReader.
+
+   The read fills the whole buffer unless it reaches the end of the file first. Once done,
+   result is the number of bytes read, or a negated errno value if the read failed.
+ */
+struct BlockRead {
+    int fd;
+    std::uint64_t offset;
+    char* buffer;
+    std::size_t size;
+    std::int64_t result = 0;
+    bool done = false;
+};
+
+/**
+   Reads blocks of files asynchronously, so that reads of several files can be in flight
+   at once.
+
+   Instances of this class are thread-safe. A BlockRead must remain valid until it is done.
+ */
+class BlockReader {
+ public:
+    virtual ~BlockReader() = default;
+
+    /**
+       Starts reading a block.
+     */
+    virtual void Submit(BlockRead* read) = 0;
+
+    /**
+       Blocks until a submitted read is done.
+     */
+    virtual void Wait(BlockRead* read) = 0;
+
+    /**
+       Returns true if a submitted read is done, without blocking.
+     */
+    virtual bool IsDone(BlockRead* read) = 0;
+
+    /**
+       Returns the name of the mechanism reads are made with.
+     */
+    virtual std::string Name() const = 0;
+};
+
+/**
+   Creates a BlockReader that reads through an io_uring submission queue of the
+   specified depth, or returns null if io_uring is not supported by the kernel.
+ */
+std::unique_ptr<BlockReader> CreateIoUringBlockReader(std::size_t queue_depth = DEFAULT_BLOCK_READER_QUEUE_DEPTH);
+
+/**
+   Creates a BlockReader that reads with pread on a pool of threads.
+ */
+std::unique_ptr<BlockReader> CreateThreadPoolBlockReader(std::size_t num_threads = DEFAULT_BLOCK_READER_THREADS);
+
+/**
+   Creates an io_uring BlockReader if io_uring is supported, and a thread pool
+   BlockReader otherwise.
+ */
+std::unique_ptr<BlockReader> CreateBlockReader();
+
+/**
+   Reads a file sequentially through a BlockReader, keeping a number of blocks ahead of
+   the reader in flight.
+
+   Instances of this class are not thread-safe.
+ */
+class FileStream {
+ public:
+    /**
+       Opens a file and starts reading its first blocks. Throws std::system_error if the
+       file cannot be opened.
+
+       param [in] file_path: The path of the file to read.
+       param [in] block_reader: The BlockReader blocks are read with. Must outlive this stream.
+       param [in] block_size: The size of each block.
+       param [in] read_ahead_blocks: The number of blocks kept in flight.
+     */
+    FileStream(const std::string& file_path, BlockReader* block_reader,
+        std::size_t block_size = DEFAULT_FILE_BLOCK_SIZE,
+        std::size_t read_ahead_blocks = DEFAULT_FILE_READ_AHEAD_BLOCKS);
+
+    FileStream(const FileStream&) = delete;
+    FileStream& operator=(const FileStream&) = delete;
+
+    /**
+       Waits for the reads in flight and closes the file.
+     */
+    ~FileStream();
+
+    /**
+       Reads bytes from the file, blocking until they are read. Returns fewer bytes than
+       requested only at the end of the file. Throws std::system_error if a read fails.
+     */
+    std::size_t Read(void* dest, std::size_t nbytes);
+
+    /**
+       Returns true if Read would return without waiting for a block to be read.
+     */
+    bool Ready();
+
+ private:
+    struct Block {
+        std::unique_ptr<char[]> data;
+        BlockRead read;
+        std::size_t position = 0;
+    };
+
+    void Fill();
+    void Finish();
+
+    BlockReader* block_reader_;
+    int fd_;
+    std::string file_path_;
+    std::size_t block_size_;
+    std::size_t read_ahead_blocks_;
+    std::uint64_t next_offset_ = 0;
+    // Set once a block ends before the end of its buffer, at the end of the file
+    bool end_of_file_ = false;
+    std::deque<Block> blocks_;
+    std::vector<std::unique_ptr<char[]>> free_buffers_;
+};
+
+}  // namespace tensorflow
+}  // namespace sagemaker
+
+#endif  // SRC_PIPEMODE_OP_RECORDREADER_BLOCKREADER_HPP_
@@ -0,0 +1,76 @@
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include "CancellationSignal.hpp"
+
+#include <poll.h>
+#include <sys/eventfd.h>
+#include <unistd.h>
+#include <cerrno>
+#include <cstdint>
+#include <system_error>
+
+using sagemaker::tensorflow::CancellationSignal;
+
+CancellationSignal::CancellationSignal() : event_fd_(eventfd(0, EFD_CLOEXEC | EFD_NONBLOCK)), cancelled_(false) {
+    if (event_fd_ == -1) {
+        throw std::system_error(errno, std::system_category());
+    }
+}
+
+CancellationSignal::~CancellationSignal() {
+    close(event_fd_);
+}
+
+void CancellationSignal::Cancel() {
+    if (cancelled_.exchange(true)) {
+        return;
+    }
+    // The counter stays non-zero, so the eventfd stays readable for every later wait
+    std::uint64_t one = 1;
+    if (write(event_fd_, &one, sizeof(one)) == -1 && errno != EAGAIN) {
+        throw std::system_error(errno, std::system_category());
+    }
+}
+
+void CancellationSignal::ThrowIfCancelled() const {
+    if (cancelled_) {
+        throw std::system_error(ECANCELED, std::system_category());
+    }
+}
+
+bool CancellationSignal::WaitReadable(int fd) const {
+    int events = Poll(fd, -1);
+    return events & POLLIN || !(events & POLLHUP);
+}
+
+void CancellationSignal::SleepFor(std::chrono::milliseconds duration) const {
+    Poll(-1, static_cast<int>(duration.count()));
+}
+
+int CancellationSignal::Poll(int fd, int timeout) const {
+    struct pollfd fds[2] = {{event_fd_, POLLIN, 0}, {fd, POLLIN, 0}};
+    while (true) {
+        ThrowIfCancelled();
+        int ready = poll(fds, fd < 0 ? 1 : 2, timeout);
+        if (ready == -1 && errno != EINTR) {
+            throw std::system_error(errno, std::system_category());
+        }
+        if (fds[0].revents) {
+            ThrowIfCancelled();
+        }
+        if (ready == 0 || fds[1].revents) {
+            return fds[1].revents;
+        }
+    }
+}
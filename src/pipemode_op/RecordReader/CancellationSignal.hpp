@@ -0,0 +1,88 @@
+#ifndef SRC_PIPEMODE_OP_RECORDREADER_CANCELLATIONSIGNAL_HPP_
+#define SRC_PIPEMODE_OP_RECORDREADER_CANCELLATIONSIGNAL_HPP_
+
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include <atomic>
+#include <chrono>
+
+namespace sagemaker {
+namespace tensorflow {
+
+/**
+   A signal that cancels the blocking waits of RecordReaders, such as a read of a FIFO
+   whose writer has not sent data yet, or a wait for a file to be created. The signal is an
+   eventfd, which readers poll together with the file they wait on, so that a wait ends as
+   soon as the signal is cancelled.
+
+   A wait that is cancelled throws a std::system_error with the error code ECANCELED.
+
+   Instances of this class are thread-safe: Cancel can be called on any thread, such as a
+   TensorFlow cancellation callback, while readers wait on other threads.
+ */
+class CancellationSignal {
+ public:
+    /**
+       Constructs a new CancellationSignal. Throws std::system_error if the eventfd cannot be
+       created.
+     */
+    CancellationSignal();
+
+    /**
+       Closes the eventfd. Readers must not wait on the signal after it is destroyed.
+     */
+    ~CancellationSignal();
+
+    CancellationSignal(const CancellationSignal&) = delete;
+    CancellationSignal& operator=(const CancellationSignal&) = delete;
+
+    /**
+       Cancels the signal, ending current and future waits on it.
+     */
+    void Cancel();
+
+    bool IsCancelled() const { return cancelled_; }
+
+    /**
+       Throws a std::system_error with the error code ECANCELED if the signal was cancelled.
+     */
+    void ThrowIfCancelled() const;
+
+    /**
+       Waits until fd is ready for reading, or has hung up. Returns true if it is ready for
+       reading, and false if it hung up with nothing left to read. Throws if the signal is
+       cancelled first.
+     */
+    bool WaitReadable(int fd) const;
+
+    /**
+       Sleeps for a duration, or until the signal is cancelled, in which case it throws.
+     */
+    void SleepFor(std::chrono::milliseconds duration) const;
+
+ private:
+    /**
+       Polls the eventfd, and fd unless it is negative, for up to timeout milliseconds, or
+       without a timeout if it is negative. Returns the events of fd.
+     */
+    int Poll(int fd, int timeout) const;
+
+    int event_fd_;
+    std::atomic<bool> cancelled_;
+};
+
+}  // namespace tensorflow
+}  // namespace sagemaker
+
+#endif  // SRC_PIPEMODE_OP_RECORDREADER_CANCELLATIONSIGNAL_HPP_
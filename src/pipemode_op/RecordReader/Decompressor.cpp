@@ -0,0 +1,432 @@
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include "Decompressor.hpp"
+
+#include <zlib.h>
+#ifdef PIPEMODE_WITH_ZSTD
+#include <zstd.h>
+#include <zstd_errors.h>
+#endif
+
+#include <algorithm>
+#include <climits>
+#include <cstring>
+#include <stdexcept>
+
+using sagemaker::tensorflow::Compression;
+using sagemaker::tensorflow::Decompressor;
+
+// The number of decompressed bytes the reader thread emits at a time
+#define DECOMPRESSED_BLOCK_SIZE 1048576
+
+// Larger frames are decompressed on the reader thread as they are read, rather than
+// buffered whole for a worker thread
+#define MAX_PARALLEL_FRAME_SIZE 67108864
+
+Compression sagemaker::tensorflow::ParseCompression(const std::string& name) {
+    if (name.empty()) {
+        return Compression::NONE;
+    } else if (name == "ZLIB") {
+        return Compression::ZLIB;
+    } else if (name == "GZIP") {
+        return Compression::GZIP;
+    } else if (name == "ZSTD") {
+#ifdef PIPEMODE_WITH_ZSTD
+        return Compression::ZSTD;
+#else
+        throw std::invalid_argument("PipeModeDataset was built without ZSTD support");
+#endif
+    }
+    throw std::invalid_argument("Invalid compression: " + name);
+}
+
+namespace sagemaker {
+namespace tensorflow {
+
+/**
+   Decompresses one frame of a compressed stream at a time.
+ */
+class FrameDecoder {
+ public:
+    virtual ~FrameDecoder() {}
+
+    /**
+       Prepares to decompress a new frame.
+     */
+    virtual void Reset() = 0;
+
+    /**
+       Decompresses bytes of the current frame.
+
+       param [in,out] in: The compressed bytes. Advanced past the bytes consumed.
+       param [in,out] in_size: The number of compressed bytes. Reduced by the number of bytes consumed.
+       param [out] out: The string decompressed bytes are appended to.
+       param [in] max_output: The maximum number of bytes to append.
+       return true if the end of the frame was reached, false otherwise.
+     */
+    virtual bool Decode(const char** in, std::size_t* in_size, std::string* out, std::size_t max_output) = 0;
+};
+
+}  // namespace tensorflow
+}  // namespace sagemaker
+
+using sagemaker::tensorflow::FrameDecoder;
+
+namespace {
+
+struct StopRequested {};
+
+class ZlibDecoder : public FrameDecoder {
+ public:
+    explicit ZlibDecoder(int window_bits) {
+        std::memset(&stream_, 0, sizeof(stream_));
+        if (inflateInit2(&stream_, window_bits) != Z_OK) {
+            throw std::runtime_error("Unable to initialize zlib decompression");
+        }
+    }
+
+    ~ZlibDecoder() override {
+        inflateEnd(&stream_);
+    }
+
+    void Reset() override {
+        inflateReset(&stream_);
+    }
+
+    bool Decode(const char** in, std::size_t* in_size, std::string* out, std::size_t max_output) override {
+        std::size_t input_size = std::min<std::size_t>(*in_size, UINT_MAX);
+        max_output = std::min<std::size_t>(max_output, UINT_MAX);
+        std::size_t start = out->size();
+        out->resize(start + max_output);
+        stream_.next_in = reinterpret_cast<Bytef*>(const_cast<char*>(*in));
+        stream_.avail_in = input_size;
+        stream_.next_out = reinterpret_cast<Bytef*>(&(*out)[start]);
+        stream_.avail_out = max_output;
+        int result = inflate(&stream_, Z_NO_FLUSH);
+        std::size_t consumed = input_size - stream_.avail_in;
+        *in += consumed;
+        *in_size -= consumed;
+        out->resize(start + max_output - stream_.avail_out);
+        if (result == Z_STREAM_END) {
+            return true;
+        }
+        if (result != Z_OK && result != Z_BUF_ERROR) {
+            throw std::runtime_error(std::string("Error decompressing zlib stream: ")
+                + (stream_.msg ? stream_.msg : zError(result)));
+        }
+        return false;
+    }
+
+ private:
+    z_stream stream_;
+};
+
+#ifdef PIPEMODE_WITH_ZSTD
+class ZstdDecoder : public FrameDecoder {
+ public:
+    ZstdDecoder() : context_(ZSTD_createDCtx()) {
+        if (!context_) {
+            throw std::runtime_error("Unable to initialize zstd decompression");
+        }
+    }
+
+    ~ZstdDecoder() override {
+        ZSTD_freeDCtx(context_);
+    }
+
+    void Reset() override {
+        ZSTD_DCtx_reset(context_, ZSTD_reset_session_only);
+    }
+
+    bool Decode(const char** in, std::size_t* in_size, std::string* out, std::size_t max_output) override {
+        std::size_t start = out->size();
+        out->resize(start + max_output);
+        ZSTD_inBuffer input = {*in, *in_size, 0};
+        ZSTD_outBuffer output = {&(*out)[start], max_output, 0};
+        std::size_t result = ZSTD_decompressStream(context_, &output, &input);
+        *in += input.pos;
+        *in_size -= input.pos;
+        out->resize(start + output.pos);
+        if (ZSTD_isError(result)) {
+            throw std::runtime_error(std::string("Error decompressing zstd stream: ") + ZSTD_getErrorName(result));
+        }
+        return result == 0;
+    }
+
+ private:
+    ZSTD_DCtx* context_;
+};
+#endif
+
+std::unique_ptr<FrameDecoder> CreateDecoder(Compression compression) {
+    switch (compression) {
+        case Compression::ZLIB:
+            return std::unique_ptr<FrameDecoder>(new ZlibDecoder(MAX_WBITS));
+        case Compression::GZIP:
+            return std::unique_ptr<FrameDecoder>(new ZlibDecoder(16 + MAX_WBITS));
+#ifdef PIPEMODE_WITH_ZSTD
+        case Compression::ZSTD:
+            return std::unique_ptr<FrameDecoder>(new ZstdDecoder());
+#endif
+        default:
+            throw std::invalid_argument("Unsupported compression");
+    }
+}
+
+void DecodeFrame(FrameDecoder* decoder, const std::string& input, std::string* output) {
+    decoder->Reset();
+    const char* in = input.data();
+    std::size_t in_size = input.size();
+    std::size_t max_output = std::max<std::size_t>(input.size() * 4, DECOMPRESSED_BLOCK_SIZE);
+    while (true) {
+        std::size_t previous_in_size = in_size;
+        std::size_t previous_out_size = output->size();
+        if (decoder->Decode(&in, &in_size, output, max_output)) {
+            return;
+        }
+        if (in_size == previous_in_size && output->size() == previous_out_size) {
+            throw std::runtime_error("Truncated compressed frame");
+        }
+    }
+}
+
+std::uint32_t ReadLittleEndian(const char* data, int nbytes) {
+    std::uint32_t value = 0;
+    for (int i = nbytes - 1; i >= 0; i--) {
+        value = (value << 8) | static_cast<unsigned char>(data[i]);
+    }
+    return value;
+}
+
+}  // namespace
+
+Decompressor::Decompressor(Compression compression, Source source, std::size_t num_threads,
+    std::size_t read_size):
+    compression_(compression),
+    source_(source),
+    read_size_(read_size),
+    max_blocks_(2 * std::max<std::size_t>(num_threads, 1) + 2) {
+    CreateDecoder(compression_);
+    threads_.emplace_back(&Decompressor::ReaderLoop, this);
+    for (std::size_t i = 0; i < std::max<std::size_t>(num_threads, 1); i++) {
+        threads_.emplace_back(&Decompressor::WorkerLoop, this);
+    }
+}
+
+Decompressor::~Decompressor() {
+    {
+        std::lock_guard<std::mutex> lock(mu_);
+        stopping_ = true;
+    }
+    block_added_.notify_all();
+    block_removed_.notify_all();
+    for (std::thread& thread : threads_) {
+        thread.join();
+    }
+}
+
+std::size_t Decompressor::Read(void* dest, std::size_t nbytes) {
+    std::size_t bytes_read = 0;
+    while (bytes_read < nbytes) {
+        if (!current_ || current_position_ == current_->output.size()) {
+            std::unique_lock<std::mutex> lock(mu_);
+            if (current_) {
+                blocks_.pop_front();
+                current_.reset();
+                block_removed_.notify_one();
+            }
+            block_ready_.wait(lock, [this] {
+                return blocks_.empty() ? end_of_stream_ : blocks_.front()->ready;
+            });
+            if (blocks_.empty()) {
+                if (error_) {
+                    std::rethrow_exception(error_);
+                }
+                break;
+            }
+            current_ = blocks_.front();
+            current_position_ = 0;
+            if (current_->error) {
+                std::rethrow_exception(current_->error);
+            }
+            continue;
+        }
+        std::size_t size = std::min(nbytes - bytes_read, current_->output.size() - current_position_);
+        std::memcpy(static_cast<char*>(dest) + bytes_read, current_->output.data() + current_position_, size);
+        current_position_ += size;
+        bytes_read += size;
+    }
+    return bytes_read;
+}
+
+void Decompressor::ReaderLoop() {
+    std::exception_ptr error;
+    try {
+        Split();
+    } catch (const StopRequested&) {
+    } catch (...) {
+        error = std::current_exception();
+    }
+    {
+        std::lock_guard<std::mutex> lock(mu_);
+        error_ = error;
+        end_of_stream_ = true;
+    }
+    block_ready_.notify_all();
+}
+
+void Decompressor::WorkerLoop() {
+    std::unique_ptr<FrameDecoder> decoder = CreateDecoder(compression_);
+    while (true) {
+        std::shared_ptr<Block> block;
+        {
+            std::unique_lock<std::mutex> lock(mu_);
+            block_added_.wait(lock, [this] { return stopping_ || !parallel_blocks_.empty(); });
+            if (stopping_) {
+                return;
+            }
+            block = parallel_blocks_.front();
+            parallel_blocks_.pop_front();
+        }
+        try {
+            DecodeFrame(decoder.get(), block->input, &block->output);
+        } catch (...) {
+            block->error = std::current_exception();
+        }
+        std::string().swap(block->input);
+        {
+            std::lock_guard<std::mutex> lock(mu_);
+            block->ready = true;
+        }
+        block_ready_.notify_all();
+    }
+}
+
+void Decompressor::Split() {
+    std::unique_ptr<FrameDecoder> decoder = CreateDecoder(compression_);
+    while (Fill(1)) {
+        std::size_t frame_size = FrameSize();
+        if (frame_size) {
+            // A truncated frame is left for the worker thread to report.
+            Fill(frame_size);
+            auto block = std::make_shared<Block>();
+            block->input.assign(input_, input_position_, frame_size);
+            input_position_ += frame_size;
+            Push(block, true);
+        } else {
+            StreamFrame(decoder.get());
+        }
+    }
+}
+
+void Decompressor::StreamFrame(FrameDecoder* decoder) {
+    decoder->Reset();
+    bool end_of_frame = false;
+    while (!end_of_frame) {
+        auto block = std::make_shared<Block>();
+        while (!end_of_frame && block->output.size() < DECOMPRESSED_BLOCK_SIZE) {
+            std::size_t available = input_.size() - input_position_;
+            const char* in = input_.data() + input_position_;
+            std::size_t in_size = available;
+            std::size_t previous_out_size = block->output.size();
+            end_of_frame = decoder->Decode(&in, &in_size, &block->output,
+                DECOMPRESSED_BLOCK_SIZE - block->output.size());
+            input_position_ += available - in_size;
+            if (!end_of_frame && in_size == available && block->output.size() == previous_out_size
+                && !Fill(available + 1)) {
+                throw std::runtime_error("Unexpected end of compressed stream");
+            }
+        }
+        block->ready = true;
+        Push(block, false);
+    }
+}
+
+bool Decompressor::Fill(std::size_t nbytes) {
+    if (input_position_) {
+        input_.erase(0, input_position_);
+        input_position_ = 0;
+    }
+    while (input_.size() < nbytes && !end_of_source_) {
+        std::size_t size = input_.size();
+        std::size_t read_size = std::max(read_size_, nbytes - size);
+        input_.resize(size + read_size);
+        std::size_t bytes_read = source_(&input_[size], read_size);
+        input_.resize(size + bytes_read);
+        if (!bytes_read) {
+            end_of_source_ = true;
+        }
+    }
+    return input_.size() >= nbytes;
+}
+
+std::size_t Decompressor::FrameSize() {
+    if (compression_ == Compression::GZIP) {
+        // A BGZF block is a gzip member with a "BC" extra subfield holding the member size - 1.
+        if (!Fill(12) || input_.compare(0, 3, "\x1f\x8b\x08") || !(input_[3] & 4)) {
+            return 0;
+        }
+        std::size_t extra_size = ReadLittleEndian(&input_[10], 2);
+        if (!Fill(12 + extra_size)) {
+            return 0;
+        }
+        for (std::size_t offset = 12; offset + 4 <= 12 + extra_size;) {
+            std::size_t field_size = ReadLittleEndian(&input_[offset + 2], 2);
+            if (input_[offset] == 'B' && input_[offset + 1] == 'C' && field_size == 2
+                && offset + 6 <= 12 + extra_size) {
+                return ReadLittleEndian(&input_[offset + 4], 2) + 1;
+            }
+            offset += 4 + field_size;
+        }
+        return 0;
+    }
+#ifdef PIPEMODE_WITH_ZSTD
+    if (compression_ == Compression::ZSTD) {
+        // Buffer the frame until its end is found, unless it is too large to buffer whole.
+        std::size_t required = read_size_;
+        while (true) {
+            Fill(required);
+            std::size_t frame_size = ZSTD_findFrameCompressedSize(input_.data(), input_.size());
+            if (!ZSTD_isError(frame_size)) {
+                return frame_size;
+            }
+            if (ZSTD_getErrorCode(frame_size) != ZSTD_error_srcSize_wrong || input_.size() < required
+                || input_.size() >= MAX_PARALLEL_FRAME_SIZE) {
+                return 0;
+            }
+            required = input_.size() * 2;
+        }
+    }
+#endif
+    return 0;
+}
+
+void Decompressor::Push(std::shared_ptr<Block> block, bool parallel) {
+    {
+        std::unique_lock<std::mutex> lock(mu_);
+        block_removed_.wait(lock, [this] { return stopping_ || blocks_.size() < max_blocks_; });
+        if (stopping_) {
+            throw StopRequested();
+        }
+        blocks_.push_back(block);
+        if (parallel) {
+            parallel_blocks_.push_back(block);
+        }
+    }
+    if (parallel) {
+        block_added_.notify_one();
+    } else {
+        block_ready_.notify_all();
+    }
+}
@@ -0,0 +1,149 @@
+#ifndef SRC_PIPEMODE_OP_RECORDREADER_DECOMPRESSOR_HPP_
+#define SRC_PIPEMODE_OP_RECORDREADER_DECOMPRESSOR_HPP_
+
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include <condition_variable>
+#include <cstdint>
+#include <deque>
+#include <exception>
+#include <functional>
+#include <memory>
+#include <mutex>
+#include <string>
+#include <thread>
+#include <vector>
+
+namespace sagemaker {
+namespace tensorflow {
+
+#define DEFAULT_DECOMPRESSION_THREADS 4
+
+/**
+   The compression of a stream of records.
+ */
+enum class Compression {
+    NONE,
+    ZLIB,
+    GZIP,
+    ZSTD
+};
+
+/**
+   Returns the Compression with the specified name, one of "", "ZLIB", "GZIP" or "ZSTD".
+   Throws std::invalid_argument if the name is not recognised, or if this library was
+   built without support for the compression.
+ */
+Compression ParseCompression(const std::string& name);
+
+class FrameDecoder;
+
+/**
+   Decompresses a stream of bytes in a pipeline of background threads.
+
+   A reader thread reads compressed bytes from a source and splits them into
+   frames: zstd frames, and gzip members that carry their compressed size in a
+   BGZF extra field. Frames are decompressed in parallel on a pool of worker
+   threads. Streams that cannot be split, such as zlib streams, single frame zstd
+   streams and plain gzip members, are decompressed on the reader thread, ahead of
+   the consumer.
+
+   Decompressed bytes are returned in stream order by Read. Instances of this class
+   are not thread-safe, and Read must be called from a single thread.
+ */
+class Decompressor {
+ public:
+    /**
+       A function that reads up to the specified number of bytes into a byte array,
+       returning the number of bytes read. Returns zero at the end of the stream.
+     */
+    using Source = std::function<std::size_t(void*, std::size_t)>;
+
+    /**
+       Constructs a new Decompressor and starts its threads.
+
+       param [in] compression: The compression of the source stream. Must not be NONE.
+       param [in] source: The function to read compressed bytes with.
+       param [in] num_threads: The number of threads that decompress frames in parallel.
+       param [in] read_size: The number of bytes to read from the source at a time.
+     */
+    Decompressor(Compression compression, Source source, std::size_t num_threads, std::size_t read_size);
+
+    Decompressor(const Decompressor&) = delete;
+    Decompressor& operator=(const Decompressor&) = delete;
+
+    /**
+       Stops and joins the threads of this Decompressor.
+     */
+    ~Decompressor();
+
+    /**
+       Reads decompressed bytes into a byte array, blocking until the specified number
+       of bytes is available or the stream ends.
+
+       param [out] dest: The byte array to write into.
+       param [in] nbytes: The number of bytes to read.
+       return the number of bytes read.
+     */
+    std::size_t Read(void* dest, std::size_t nbytes);
+
+ private:
+    struct Block {
+        std::string input;
+        std::string output;
+        bool ready = false;
+        std::exception_ptr error;
+    };
+
+    void ReaderLoop();
+    void WorkerLoop();
+    void Split();
+    void StreamFrame(FrameDecoder* decoder);
+    bool Fill(std::size_t nbytes);
+    std::size_t FrameSize();
+    void Push(std::shared_ptr<Block> block, bool parallel);
+
+    const Compression compression_;
+    Source source_;
+    const std::size_t read_size_;
+    const std::size_t max_blocks_;
+
+    // Compressed bytes read from the source but not yet assigned to a block. Only
+    // accessed by the reader thread.
+    std::string input_;
+    std::size_t input_position_ = 0;
+    bool end_of_source_ = false;
+
+    std::mutex mu_;
+    std::condition_variable block_ready_;
+    std::condition_variable block_added_;
+    std::condition_variable block_removed_;
+    // Blocks in stream order, removed by Read once their output is consumed
+    std::deque<std::shared_ptr<Block>> blocks_;
+    // Blocks waiting for a worker thread
+    std::deque<std::shared_ptr<Block>> parallel_blocks_;
+    bool end_of_stream_ = false;
+    bool stopping_ = false;
+    std::exception_ptr error_;
+
+    std::shared_ptr<Block> current_;
+    std::size_t current_position_ = 0;
+
+    std::vector<std::thread> threads_;
+};
+
+}  // namespace tensorflow
+}  // namespace sagemaker
+
+#endif  // SRC_PIPEMODE_OP_RECORDREADER_DECOMPRESSOR_HPP_
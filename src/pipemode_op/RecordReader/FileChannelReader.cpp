@@ -0,0 +1,179 @@
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include "FileChannelReader.hpp"
+
+#include <dirent.h>
+#include <sys/stat.h>
+#include <algorithm>
+#include <cerrno>
+#include <cstring>
+#include <stdexcept>
+#include <utility>
+
+using sagemaker::tensorflow::Compression;
+using sagemaker::tensorflow::CreateBlockReader;
+using sagemaker::tensorflow::FileChannelOptions;
+using sagemaker::tensorflow::FileChannelReader;
+using sagemaker::tensorflow::FileRecordReaderFactory;
+using sagemaker::tensorflow::FileStream;
+
+namespace {
+
+void ListDirectory(const std::string& directory, std::vector<std::string>* files) {
+    DIR* dir = opendir(directory.c_str());
+    if (!dir) {
+        throw std::runtime_error("Cannot list channel directory " + directory + ": " + std::strerror(errno));
+    }
+    std::vector<std::string> subdirectories;
+    while (struct dirent* entry = readdir(dir)) {
+        if (entry->d_name[0] == '.') {
+            continue;
+        }
+        std::string path = directory + "/" + entry->d_name;
+        struct stat info;
+        if (stat(path.c_str(), &info) != 0) {
+            continue;
+        }
+        if (S_ISDIR(info.st_mode)) {
+            subdirectories.push_back(path);
+        } else if (S_ISREG(info.st_mode)) {
+            files->push_back(path);
+        }
+    }
+    closedir(dir);
+    for (const std::string& subdirectory : subdirectories) {
+        ListDirectory(subdirectory, files);
+    }
+}
+
+}  // namespace
+
+FileChannelReader::FileChannelReader(const std::string& directory, FileRecordReaderFactory factory,
+    Compression compression, const FileChannelOptions& options)
+    : directory_(directory), factory_(std::move(factory)), compression_(compression), options_(options),
+      block_reader_(CreateBlockReader()) {
+    if (!options_.parallel_files || !options_.num_shards || options_.shard_index >= options_.num_shards) {
+        throw std::invalid_argument("A file channel requires parallel files, and a shard index below the number "
+            "of shards");
+    }
+}
+
+std::vector<std::string> FileChannelReader::ListFiles(const std::string& directory, std::uint32_t num_shards,
+    std::uint32_t shard_index) {
+    std::string root = directory;
+    while (root.size() > 1 && root.back() == '/') {
+        root.pop_back();
+    }
+    std::vector<std::string> files;
+    ListDirectory(root, &files);
+    std::sort(files.begin(), files.end());
+    std::vector<std::string> shard;
+    for (std::size_t i = shard_index; i < files.size(); i += num_shards) {
+        shard.push_back(std::move(files[i]));
+    }
+    return shard;
+}
+
+std::string FileChannelReader::BlockReaderName() const {
+    return block_reader_->Name();
+}
+
+std::size_t FileChannelReader::NumOpenFiles() const {
+    return slots_.size();
+}
+
+bool FileChannelReader::ReadRecord(::tensorflow::tstring* storage) {
+    std::size_t index;
+    return ReadNextSlot([storage](RecordReader* reader) { return reader->ReadRecord(storage); }, &index);
+}
+
+bool FileChannelReader::ReadRecordChunk(::tensorflow::tstring* storage, std::size_t max_bytes, bool* is_last) {
+    if (chunking_) {
+        slots_[current_].reader->ReadRecordChunk(storage, max_bytes, is_last);
+        if (*is_last) {
+            current_ = (current_ + 1) % slots_.size();
+            chunking_ = false;
+        }
+        return true;
+    }
+    std::size_t index;
+    if (!ReadNextSlot([storage, max_bytes, is_last](RecordReader* reader) {
+            return reader->ReadRecordChunk(storage, max_bytes, is_last);
+        }, &index)) {
+        return false;
+    }
+    if (!*is_last) {
+        current_ = index;
+        chunking_ = true;
+    }
+    return true;
+}
+
+bool FileChannelReader::ReadNextSlot(const std::function<bool(RecordReader*)>& read, std::size_t* index) {
+    if (!listed_) {
+        files_ = ListFiles(directory_, options_.num_shards, options_.shard_index);
+        listed_ = true;
+        while (slots_.size() < options_.parallel_files) {
+            Slot slot;
+            if (!OpenNextFile(&slot)) {
+                break;
+            }
+            slots_.push_back(std::move(slot));
+        }
+    }
+    while (!slots_.empty()) {
+        *index = NextSlot();
+        Slot& slot = slots_[*index];
+        if (read(slot.reader.get())) {
+            current_ = (*index + 1) % slots_.size();
+            return true;
+        }
+        // The exhausted file is replaced by the next file, which is read in its turn
+        current_ = *index;
+        if (!OpenNextFile(&slot)) {
+            slots_.erase(slots_.begin() + *index);
+            current_ = slots_.empty() ? 0 : *index % slots_.size();
+        }
+    }
+    return false;
+}
+
+bool FileChannelReader::OpenNextFile(Slot* slot) {
+    slot->reader.reset();
+    slot->stream.reset();
+    if (next_file_ == files_.size()) {
+        return false;
+    }
+    const std::string& file_path = files_[next_file_++];
+    slot->stream.reset(new FileStream(file_path, block_reader_.get(), options_.block_size,
+        options_.read_ahead_blocks));
+    slot->reader = factory_(file_path);
+    FileStream* stream = slot->stream.get();
+    slot->reader->SetFileSource([stream](void* dest, std::size_t nbytes) { return stream->Read(dest, nbytes); });
+    slot->reader->SetCompression(compression_);
+    return true;
+}
+
+std::size_t FileChannelReader::NextSlot() {
+    if (options_.deterministic || compression_ != Compression::NONE) {
+        return current_;
+    }
+    for (std::size_t i = 0; i < slots_.size(); i++) {
+        std::size_t index = (current_ + i) % slots_.size();
+        if (slots_[index].stream->Ready()) {
+            return index;
+        }
+    }
+    return current_;
+}
@@ -0,0 +1,161 @@
+#ifndef SRC_PIPEMODE_OP_RECORDREADER_FILECHANNELREADER_HPP_
+#define SRC_PIPEMODE_OP_RECORDREADER_FILECHANNELREADER_HPP_
+
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include <cstdint>
+#include <functional>
+#include <memory>
+#include <string>
+#include <vector>
+
+#include "BlockReader.hpp"
+#include "Decompressor.hpp"
+#include "RecordReader.hpp"
+
+namespace sagemaker {
+namespace tensorflow {
+
+#define DEFAULT_PARALLEL_FILES 4
+
+/**
+   Options of a FileChannelReader.
+ */
+struct FileChannelOptions {
+    // The number of files read at once
+    std::size_t parallel_files = DEFAULT_PARALLEL_FILES;
+    // Whether records are interleaved in a fixed order, rather than from whichever file is ready
+    bool deterministic = true;
+    // The channel's files are split into num_shards shards, of which shard_index is read
+    std::uint32_t num_shards = 1;
+    std::uint32_t shard_index = 0;
+    // The size of the blocks files are read in, and the number of blocks read ahead per file
+    std::size_t block_size = DEFAULT_FILE_BLOCK_SIZE;
+    std::size_t read_ahead_blocks = DEFAULT_FILE_READ_AHEAD_BLOCKS;
+};
+
+/**
+   Creates the RecordReader of a file of a channel.
+ */
+using FileRecordReaderFactory = std::function<std::unique_ptr<RecordReader>(const std::string& file_path)>;
+
+/**
+   Reads the records of every file of a SageMaker File or FastFile mode channel, the
+   directory /opt/ml/input/data/<channel>.
+
+   Several files are read at once, each through a FileStream whose blocks are read ahead
+   on a shared BlockReader, and records are interleaved from them one at a time. When
+   deterministic, the files are taken in turn, in the same order for every read of the
+   channel. Otherwise the next record is taken from the next file whose next block is
+   already read, and records are returned in the order they become available. Files of
+   compressed channels are decompressed on background threads, which read ahead of the
+   interleaving, so records of compressed channels are always interleaved in turn.
+
+   A file that is exhausted is replaced by the next file of the channel, until no file
+   remains. Files and directories whose names start with '.' are skipped.
+
+   Instances of this class are not thread-safe.
+ */
+class FileChannelReader {
+ public:
+    /**
+       Constructs a new FileChannelReader. The channel's files are listed when the first
+       record is read.
+
+       param [in] directory: The directory of the channel.
+       param [in] factory: Creates the RecordReader of each file.
+       param [in] compression: The compression of the channel's files.
+       param [in] options: The options of the reader.
+     */
+    FileChannelReader(const std::string& directory, FileRecordReaderFactory factory, Compression compression,
+        const FileChannelOptions& options = FileChannelOptions());
+
+    FileChannelReader(const FileChannelReader&) = delete;
+    FileChannelReader& operator=(const FileChannelReader&) = delete;
+
+    virtual ~FileChannelReader() = default;
+
+    /**
+       Reads the next record of the channel. Returns false if no records remain. Throws
+       std::runtime_error if the channel's directory cannot be listed or a file cannot be
+       read.
+
+       Virtual like RecordReader::ReadRecord, so that the op calls it through the vtable:
+       this library is built against the bundled tstring header, whose mangled name differs
+       from TensorFlow's.
+     */
+    virtual bool ReadRecord(::tensorflow::tstring* storage);
+
+    /**
+       Reads the next chunk of a record of the channel, like RecordReader::ReadRecordChunk.
+       Every chunk of a record is read from its file before a record of another file is
+       interleaved. Returns false if no records remain.
+     */
+    virtual bool ReadRecordChunk(::tensorflow::tstring* storage, std::size_t max_bytes, bool* is_last);
+
+    /**
+       Returns the sorted paths of the regular files under a directory, and its
+       subdirectories, that belong to a shard of the directory's files.
+     */
+    static std::vector<std::string> ListFiles(const std::string& directory, std::uint32_t num_shards = 1,
+        std::uint32_t shard_index = 0);
+
+    /**
+       Returns the name of the mechanism files are read with.
+     */
+    std::string BlockReaderName() const;
+
+    /**
+       Returns the number of files open, each with its own FileStream, which is up to
+       parallel_files once the first record is read, and 0 once no records remain.
+     */
+    std::size_t NumOpenFiles() const;
+
+ private:
+    struct Slot {
+        // Declared before the reader, which reads from the stream until it is destroyed
+        std::unique_ptr<FileStream> stream;
+        std::unique_ptr<RecordReader> reader;
+    };
+
+    bool OpenNextFile(Slot* slot);
+
+    /**
+       Reads from the reader of the next slot in turn, replacing the readers of exhausted
+       files, until read returns true. Returns false if no records remain.
+
+       param [out] index: Set to the index of the slot read from.
+     */
+    bool ReadNextSlot(const std::function<bool(RecordReader*)>& read, std::size_t* index);
+    std::size_t NextSlot();
+
+    const std::string directory_;
+    FileRecordReaderFactory factory_;
+    Compression compression_;
+    FileChannelOptions options_;
+    std::unique_ptr<BlockReader> block_reader_;
+    bool listed_ = false;
+    std::vector<std::string> files_;
+    std::size_t next_file_ = 0;
+    std::vector<Slot> slots_;
+    // The slot the next record is read from in turn
+    std::size_t current_ = 0;
+    // Whether the record of slot current_ is being chunked, so its next chunk is read before any other record
+    bool chunking_ = false;
+};
+
+}  // namespace tensorflow
+}  // namespace sagemaker
+
+#endif  // SRC_PIPEMODE_OP_RECORDREADER_FILECHANNELREADER_HPP_
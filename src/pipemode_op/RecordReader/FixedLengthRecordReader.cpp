@@ -0,0 +1,92 @@
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include <algorithm>
+#include <cstring>
+#include <stdexcept>
+#include <string>
+#include "FixedLengthRecordReader.hpp"
+
+using sagemaker::tensorflow::FixedLengthRecordReader;
+
+FixedLengthRecordReader::FixedLengthRecordReader(const std::string& file_path, std::size_t record_bytes,
+    std::size_t header_bytes, std::size_t footer_bytes)
+    : RecordReader(file_path), record_bytes_(record_bytes), header_bytes_(header_bytes),
+    footer_bytes_(footer_bytes), started_(false), finished_(false) {
+    if (!record_bytes_) {
+        throw std::invalid_argument("Fixed length records must have at least one byte");
+    }
+}
+
+bool FixedLengthRecordReader::ReadRecord(::tensorflow::tstring* storage) {
+    storage->resize_uninitialized(record_bytes_);
+    do {
+        if (!ReadRecords(storage->mdata(), 1)) {
+            storage->resize_uninitialized(0);
+            return false;
+        }
+    } while (!AcceptsSize(record_bytes_) || !AcceptsData(storage->data(), record_bytes_));
+    return true;
+}
+
+std::size_t FixedLengthRecordReader::ReadRecords(char* data, std::size_t max_records) {
+    if (!started_) {
+        started_ = true;
+        std::string edges(header_bytes_ + footer_bytes_, '\0');
+        std::size_t size = ReadFully(&edges[0], edges.size());
+        if (size < edges.size()) {
+            if (size) {
+                throw std::runtime_error("File ends in its header or footer");
+            }
+            // An empty file holds no records, and has no header or footer either
+            finished_ = true;
+        }
+        lookahead_ = edges.substr(header_bytes_);
+    }
+    if (finished_ || !max_records) {
+        return 0;
+    }
+    const std::size_t nbytes = max_records * record_bytes_;
+    std::size_t size = std::min(lookahead_.size(), nbytes);
+    std::memcpy(data, lookahead_.data(), size);
+    lookahead_.erase(0, size);
+    size += ReadFully(data + size, nbytes - size);
+
+    std::size_t pending = lookahead_.size();
+    lookahead_.resize(footer_bytes_);
+    lookahead_.resize(pending + ReadFully(&lookahead_[pending], footer_bytes_ - pending));
+    if (lookahead_.size() < footer_bytes_ || size < nbytes) {
+        // The file has ended. Its last footer_bytes bytes are the footer, which the
+        // lookahead only holds part of.
+        finished_ = true;
+        size -= footer_bytes_ - lookahead_.size();
+        lookahead_.clear();
+    }
+    if (size % record_bytes_) {
+        throw std::runtime_error("File ends in a partial record of " + std::to_string(size % record_bytes_)
+            + " bytes, not " + std::to_string(record_bytes_));
+    }
+    return size / record_bytes_;
+}
+
+std::size_t FixedLengthRecordReader::ReadFully(char* data, std::size_t nbytes) {
+    std::size_t size = 0;
+    while (size < nbytes) {
+        std::size_t read_amount = Read(data + size, nbytes - size);
+        if (!read_amount) {
+            break;
+        }
+        size += read_amount;
+    }
+    return size;
+}
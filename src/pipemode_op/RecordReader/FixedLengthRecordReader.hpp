@@ -0,0 +1,77 @@
+#ifndef SRC_PIPEMODE_OP_RECORDREADER_FIXEDLENGTHRECORDREADER_HPP_
+#define SRC_PIPEMODE_OP_RECORDREADER_FIXEDLENGTHRECORDREADER_HPP_
+
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include <string>
+#include "RecordReader.hpp"
+#include "tensorflow/core/platform/tstring.h"
+
+namespace sagemaker {
+namespace tensorflow {
+
+/**
+   A RecordReader that reads records of a fixed size, like TensorFlow's FixedLengthRecordDataset.
+
+   The file starts with header_bytes bytes and ends with footer_bytes bytes, which are skipped,
+   and holds records of record_bytes bytes in between. Records are framed by their size alone,
+   so that many records can be read into one buffer at once.
+ */
+class FixedLengthRecordReader : public RecordReader {
+ public:
+    /**
+       Constructs a new FixedLengthRecordReader. Throws std::invalid_argument if record_bytes is zero.
+
+       param [in] file_path: The path and name of the file to open.
+       param [in] record_bytes: The size of each record.
+       param [in] header_bytes: The number of bytes skipped at the start of the file.
+       param [in] footer_bytes: The number of bytes skipped at the end of the file.
+     */
+    FixedLengthRecordReader(const std::string& file_path, std::size_t record_bytes, std::size_t header_bytes = 0,
+        std::size_t footer_bytes = 0);
+
+    bool ReadRecord(::tensorflow::tstring* storage) override;
+
+    /**
+       Reads up to max_records records into a byte array, one after another, and returns the
+       number of records read, fewer only at the end of the file. Throws std::runtime_error if
+       the file ends in a partial record, or in its header or footer.
+
+       param [out] data: The byte array to write into, of at least max_records * record_bytes bytes.
+       param [in] max_records: The largest number of records to read.
+     */
+    std::size_t ReadRecords(char* data, std::size_t max_records);
+
+    std::size_t RecordBytes() const { return record_bytes_; }
+
+ private:
+    /**
+       Reads until nbytes bytes are read or the file ends, and returns the number of bytes read.
+     */
+    std::size_t ReadFully(char* data, std::size_t nbytes);
+
+    const std::size_t record_bytes_;
+    const std::size_t header_bytes_;
+    const std::size_t footer_bytes_;
+    bool started_;
+    bool finished_;
+
+    // The next footer_bytes bytes of the file, read ahead of the records, since they are the
+    // footer if the file ends after them
+    std::string lookahead_;
+};
+
+}  // namespace tensorflow
+}  // namespace sagemaker
+#endif  // SRC_PIPEMODE_OP_RECORDREADER_FIXEDLENGTHRECORDREADER_HPP_
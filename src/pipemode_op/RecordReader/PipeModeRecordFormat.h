@@ -0,0 +1,131 @@
+#ifndef SRC_PIPEMODE_OP_RECORDREADER_PIPEMODERECORDFORMAT_H_
+#define SRC_PIPEMODE_OP_RECORDREADER_PIPEMODERECORDFORMAT_H_
+
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+/*
+   The C ABI of record format plugins.
+
+   A plugin is a shared library that exports a function named PipeModeRecordFormats, of type
+   PipeModeRecordFormatsFn, which returns the record formats the library implements. Each format
+   splits the bytes of a channel into records. The bytes are read through a callback, after
+   they have been buffered and decompressed, and the records are returned like the records of
+   the built-in formats, so they can be cached and shuffled.
+
+   A plugin may also, or instead, export a function named PipeModeRecordTransforms, of type
+   PipeModeRecordTransformsFn, which returns the record transforms the library implements. A
+   transform rewrites each record after it is read, on the worker threads of a dataset's
+   parallel stage, before the record is decoded or returned.
+
+   This header only changes in ways that keep plugins built against it working: fields are only
+   appended to the structs a plugin returns, and each struct starts with the size the plugin
+   built it with, so that a field appended later is only read from plugins whose struct has it,
+   as PIPEMODE_STRUCT_HAS_FIELD checks. A change that cannot be made this way increments
+   PIPEMODE_RECORD_FORMAT_ABI_VERSION, and plugins built with another version are rejected when
+   they are loaded.
+ */
+
+#include <stddef.h>
+#include <stdint.h>
+
+#ifdef __cplusplus
+extern "C" {
+#endif
+
+#define PIPEMODE_RECORD_FORMAT_ABI_VERSION 1
+
+#define PIPEMODE_RECORD_FORMATS_SYMBOL "PipeModeRecordFormats"
+
+#define PIPEMODE_RECORD_TRANSFORMS_SYMBOL "PipeModeRecordTransforms"
+
+/* Whether the struct at ptr, of the struct type type, is large enough to have field. */
+#define PIPEMODE_STRUCT_HAS_FIELD(ptr, type, field) \
+    ((ptr)->struct_size >= offsetof(type, field) + sizeof((ptr)->field))
+
+/*
+   Reads up to size bytes of the channel into buffer. Returns the number of bytes read, which
+   is less than size only at the end of the channel, or -1 if the channel cannot be read.
+ */
+typedef int64_t (*PipeModeReadFn)(void* source, void* buffer, size_t size);
+
+typedef struct PipeModeRecordFormat {
+    /* The PIPEMODE_RECORD_FORMAT_ABI_VERSION the plugin was built with. */
+    uint32_t abi_version;
+
+    /* sizeof(PipeModeRecordFormat) where the plugin was built. */
+    size_t struct_size;
+
+    /* The record_format that selects this format. Must differ from the built-in formats. */
+    const char* name;
+
+    /* Creates the state of a reader of one channel. Returns NULL on failure. */
+    void* (*create_reader)(void);
+
+    /*
+       Reads the next record of a channel, calling read(source, ...) for the bytes of the
+       channel. Returns 1 and sets *data and *size to the record, which must remain valid
+       until the next call, or returns 0 at the end of the channel, or -1 on error, including
+       when read returns -1.
+     */
+    int (*read_record)(void* reader, PipeModeReadFn read, void* source, const char** data, size_t* size);
+
+    /* Returns a description of the last error of a reader, or NULL. May be NULL. */
+    const char* (*last_error)(void* reader);
+
+    /* Destroys the state of a reader. */
+    void (*destroy_reader)(void* reader);
+} PipeModeRecordFormat;
+
+/* Returns a NULL terminated array of the record formats of a plugin. */
+typedef const PipeModeRecordFormat* const* (*PipeModeRecordFormatsFn)(void);
+
+typedef struct PipeModeRecordTransform {
+    /* The PIPEMODE_RECORD_FORMAT_ABI_VERSION the plugin was built with. */
+    uint32_t abi_version;
+
+    /* sizeof(PipeModeRecordTransform) where the plugin was built. */
+    size_t struct_size;
+
+    /* The name that selects this transform. */
+    const char* name;
+
+    /*
+       Creates the state of the transform for one worker thread. A state is only used by one
+       thread at a time, while states of the same transform are used concurrently. Returns NULL
+       on failure.
+     */
+    void* (*create)(void);
+
+    /*
+       Transforms the record of size bytes at data. Returns 0 and sets *output and *output_size
+       to the transformed record, which must remain valid until the next call and may point into
+       the record itself, or returns -1 on error.
+     */
+    int (*transform)(void* state, const char* data, size_t size, const char** output, size_t* output_size);
+
+    /* Returns a description of the last error of a state, or NULL. May be NULL. */
+    const char* (*last_error)(void* state);
+
+    /* Destroys the state of the transform. */
+    void (*destroy)(void* state);
+} PipeModeRecordTransform;
+
+/* Returns a NULL terminated array of the record transforms of a plugin. */
+typedef const PipeModeRecordTransform* const* (*PipeModeRecordTransformsFn)(void);
+
+#ifdef __cplusplus
+}  // extern "C"
+#endif
+
+#endif  // SRC_PIPEMODE_OP_RECORDREADER_PIPEMODERECORDFORMAT_H_
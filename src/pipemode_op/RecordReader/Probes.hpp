@@ -0,0 +1,66 @@
+#ifndef SRC_PIPEMODE_OP_RECORDREADER_PROBES_HPP_
+#define SRC_PIPEMODE_OP_RECORDREADER_PROBES_HPP_
+
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+// USDT probes of the pipemode provider, which tools such as bpftrace attach to in a running
+// process. A probe is a single nop until a tool attaches to it, but its arguments are evaluated
+// every time the probe is reached, attached or not. Arguments must not have side effects, and a
+// probe whose arguments are expensive, e.g. because they take a lock, is guarded by
+// PIPEMODE_PROBE_ENABLED(name), which is true only while a tool is attached to the probe.
+//
+// Each probe has a semaphore, which tools increment while they are attached to it. The source
+// file that fires a probe defines its semaphore with PIPEMODE_PROBE_SEMAPHORE(name) at file
+// scope, and each probe is fired from one source file only.
+//
+// The probes are compiled in when the build finds the SystemTap SDT header, <sys/sdt.h>,
+// which defines PIPEMODE_WITH_USDT. Otherwise they compile to nothing.
+//
+//   pipe__open(const char* path, int fd)
+//       A RecordReader opened the pipe or file it reads.
+//   bytes__read(int fd, std::uint64_t bytes)
+//       A RecordReader read bytes from an open pipe or file.
+//   crc__failure(int is_data, std::uint64_t length)
+//       The CRC of a TFRecord header, or of a record's data if is_data, did not match.
+//   epoch__rollover(const char* state_file, int pipe_index)
+//       The pipe index of a channel, kept in state_file, was advanced to its next epoch's pipe.
+//   record__read__start(const char* channel)
+//       A PipeModeDataset iterator started reading its next element.
+//   record__read__end(const char* channel, std::uint64_t bytes, int end_of_sequence)
+//       A PipeModeDataset iterator read an element of bytes record bytes, or reached the end.
+//   queue__depth(const char* channel, std::uint64_t depth, std::uint64_t bytes)
+//       The records in an iterator's shuffle buffer, or the chunks pending in its parallel
+//       stage, and the bytes the iterator buffers, after it read an element.
+
+#if defined(PIPEMODE_WITH_USDT)
+#define _SDT_HAS_SEMAPHORES 1
+#include <sys/sdt.h>
+#include <cstdint>
+
+#define PIPEMODE_PROBE_SEMAPHORE(name) \
+    __extension__ std::uint16_t pipemode_##name##_semaphore __attribute__((section(".probes")))
+#define PIPEMODE_PROBE_ENABLED(name) __builtin_expect(pipemode_##name##_semaphore, 0)
+
+#define PIPEMODE_PROBE1(name, a1) DTRACE_PROBE1(pipemode, name, a1)
+#define PIPEMODE_PROBE2(name, a1, a2) DTRACE_PROBE2(pipemode, name, a1, a2)
+#define PIPEMODE_PROBE3(name, a1, a2, a3) DTRACE_PROBE3(pipemode, name, a1, a2, a3)
+#else
+#define PIPEMODE_PROBE_SEMAPHORE(name) static_assert(true, "")
+#define PIPEMODE_PROBE_ENABLED(name) false
+#define PIPEMODE_PROBE1(name, a1)
+#define PIPEMODE_PROBE2(name, a1, a2)
+#define PIPEMODE_PROBE3(name, a1, a2, a3)
+#endif
+
+#endif  // SRC_PIPEMODE_OP_RECORDREADER_PROBES_HPP_
@@ -0,0 +1,26 @@
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include "ReadTrace.hpp"
+
+namespace sagemaker {
+namespace tensorflow {
+
+std::atomic<const ReadTracer*> internal::read_tracer(nullptr);
+
+void SetReadTracer(const ReadTracer* tracer) {
+    internal::read_tracer.store(tracer, std::memory_order_release);
+}
+
+}  // namespace tensorflow
+}  // namespace sagemaker
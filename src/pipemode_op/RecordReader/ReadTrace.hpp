@@ -0,0 +1,92 @@
+#ifndef SRC_PIPEMODE_OP_RECORDREADER_READTRACE_HPP_
+#define SRC_PIPEMODE_OP_RECORDREADER_READTRACE_HPP_
+
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include <atomic>
+#include <cstdint>
+
+namespace sagemaker {
+namespace tensorflow {
+
+// The TensorFlow profiler TraceMe levels of the stages of reading records. The profiler
+// records the stages whose level is at most its host_tracer_level, which is 2 by default.
+#define TRACE_LEVEL_EPOCH_OPEN 1
+#define TRACE_LEVEL_PIPE_WAIT 1
+#define TRACE_LEVEL_READ 2
+#define TRACE_LEVEL_TENSOR_BUILD 2
+#define TRACE_LEVEL_HEADER_PARSE 3
+#define TRACE_LEVEL_CRC 3
+
+/**
+   Records the activities that ReadTraceScopes annotate, such as the TensorFlow profiler's
+   TraceMe activities. The readers do not depend on the profiler, so the PipeModeDataset op
+   installs a tracer that forwards to it.
+ */
+struct ReadTracer {
+    // Returns true if activities of a level are recorded. Called by every scope, so must be cheap.
+    bool (*active)(int level);
+    // Starts an activity, and returns its id, or 0 if it is not recorded
+    std::int64_t (*start)(const char* name, int level);
+    // Ends an activity started with a non-zero id
+    void (*end)(std::int64_t activity_id);
+};
+
+/**
+   Sets the tracer of every ReadTraceScope of the process.
+
+   param [in] tracer: The tracer. Must live until the process exits. Null stops tracing.
+ */
+void SetReadTracer(const ReadTracer* tracer);
+
+namespace internal {
+extern std::atomic<const ReadTracer*> read_tracer;
+}  // namespace internal
+
+/**
+   Annotates the scope of a stage of reading records as an activity of the tracer. While
+   tracing is off, constructing a scope only checks whether the tracer is active.
+ */
+class ReadTraceScope {
+ public:
+    /**
+       param [in] name: The name of the activity. Must outlive the scope.
+       param [in] level: The tracing level the activity is recorded at.
+     */
+    ReadTraceScope(const char* name, int level) {
+        const ReadTracer* tracer = internal::read_tracer.load(std::memory_order_acquire);
+        if (__builtin_expect(tracer && tracer->active(level), 0)) {
+            tracer_ = tracer;
+            activity_id_ = tracer->start(name, level);
+        }
+    }
+
+    ~ReadTraceScope() {
+        if (activity_id_) {
+            tracer_->end(activity_id_);
+        }
+    }
+
+    ReadTraceScope(const ReadTraceScope&) = delete;
+    ReadTraceScope& operator=(const ReadTraceScope&) = delete;
+
+ private:
+    const ReadTracer* tracer_ = nullptr;
+    std::int64_t activity_id_ = 0;
+};
+
+}  // namespace tensorflow
+}  // namespace sagemaker
+
+#endif  // SRC_PIPEMODE_OP_RECORDREADER_READTRACE_HPP_
@@ -0,0 +1,61 @@
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include "RecordFilter.hpp"
+
+#include <algorithm>
+#include <stdexcept>
+#include "tensorflow/core/lib/hash/crc32c.h"
+
+using sagemaker::tensorflow::RecordFilter;
+using sagemaker::tensorflow::RecordFilterOptions;
+
+RecordFilter::RecordFilter(const RecordFilterOptions& options)
+    : options_(options), split_(options.split_begin > 0.0 || options.split_end < 1.0), random_(options.seed),
+    sample_(0.0, 1.0) {
+    if (!(options.sample_rate > 0.0 && options.sample_rate <= 1.0)) {
+        throw std::invalid_argument("The sample rate must be greater than 0 and at most 1");
+    }
+    if (!(0.0 <= options.split_begin && options.split_begin < options.split_end && options.split_end <= 1.0)) {
+        throw std::invalid_argument("The split must be a non-empty range within [0, 1]");
+    }
+}
+
+bool RecordFilter::AcceptsSize(std::size_t size) {
+    // Every record takes a draw, so the sample of a stream does not depend on max_record_bytes
+    if (options_.sample_rate < 1.0 && sample_(random_) >= options_.sample_rate) {
+        return Reject(size);
+    }
+    if (options_.max_record_bytes && size > options_.max_record_bytes) {
+        return Reject(size);
+    }
+    return true;
+}
+
+bool RecordFilter::AcceptsData(const char* data, std::size_t size) {
+    if (!split_) {
+        return true;
+    }
+    std::size_t key_size = options_.split_key_bytes ? std::min(size, options_.split_key_bytes) : size;
+    double hash = ::tensorflow::crc32c::Value(data, key_size) / 4294967296.0;
+    if (hash < options_.split_begin || hash >= options_.split_end) {
+        return Reject(size);
+    }
+    return true;
+}
+
+bool RecordFilter::Reject(std::size_t size) {
+    stats_.rejected_records++;
+    stats_.rejected_bytes += size;
+    return false;
+}
@@ -0,0 +1,104 @@
+#ifndef SRC_PIPEMODE_OP_RECORDREADER_RECORDFILTER_HPP_
+#define SRC_PIPEMODE_OP_RECORDREADER_RECORDFILTER_HPP_
+
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include <cstdint>
+#include <random>
+
+namespace sagemaker {
+namespace tensorflow {
+
+/**
+   The records a RecordFilter keeps. The defaults keep every record.
+ */
+struct RecordFilterOptions {
+    // The probability that each record is kept
+    double sample_rate = 1.0;
+    // The seed of the random choice of records kept by sample_rate
+    std::uint64_t seed = 0;
+    // The size of the largest record kept, or zero to keep records of any size
+    std::size_t max_record_bytes = 0;
+    // The range of the hash of records that is kept, as fractions of the range of the hash
+    double split_begin = 0.0;
+    double split_end = 1.0;
+    // The number of bytes at the start of each record that are hashed, or zero to hash whole records
+    std::size_t split_key_bytes = 0;
+};
+
+/**
+   Counts the records a RecordFilter rejected.
+ */
+struct RecordFilterStats {
+    std::uint64_t rejected_records = 0;
+    std::uint64_t rejected_bytes = 0;
+};
+
+/**
+   Chooses the records RecordReaders return, so that rejected records are skipped as they
+   are read, rather than after they are copied into a tensor.
+
+   A record is kept if a Bernoulli draw at sample_rate keeps it, it is no larger than
+   max_record_bytes, and the CRC32C of its key, the first split_key_bytes bytes, falls in
+   [split_begin, split_end) of the range of the hash. The split depends only on the bytes of
+   records, so that datasets with complementary splits of a channel, such as a training and
+   a validation split, never share a record.
+
+   Readers call AcceptsSize once for each record, before they read its data if the record
+   format frames records by their size, and then AcceptsData if the record's size was
+   accepted and NeedsData is true.
+
+   Instances of this class are not thread-safe. The RecordReaders of the files of a File mode
+   channel share one RecordFilter, which they use from the thread that reads records.
+ */
+class RecordFilter {
+ public:
+    /**
+       Constructs a new RecordFilter. Throws std::invalid_argument if sample_rate is not in
+       (0, 1], or the split is not a non-empty range within [0, 1].
+     */
+    explicit RecordFilter(const RecordFilterOptions& options);
+
+    /**
+       Returns true if a record of size bytes is kept by the sample and by max_record_bytes.
+     */
+    bool AcceptsSize(std::size_t size);
+
+    /**
+       Returns true if the data of the records accepted by AcceptsSize must be checked by
+       AcceptsData.
+     */
+    bool NeedsData() const { return split_; }
+
+    /**
+       Returns true if the data of a record is kept by the split.
+     */
+    bool AcceptsData(const char* data, std::size_t size);
+
+    const RecordFilterStats& Stats() const { return stats_; }
+
+ private:
+    bool Reject(std::size_t size);
+
+    const RecordFilterOptions options_;
+    const bool split_;
+    std::mt19937_64 random_;
+    std::uniform_real_distribution<double> sample_;
+    RecordFilterStats stats_;
+};
+
+}  // namespace tensorflow
+}  // namespace sagemaker
+
+#endif  // SRC_PIPEMODE_OP_RECORDREADER_RECORDFILTER_HPP_
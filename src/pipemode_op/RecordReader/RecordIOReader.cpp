@@ -11,16 +11,23 @@
 // ANY KIND, either express or implied. See the License for the specific
 // language governing permissions and limitations under the License.
 
+#if defined(__SSE2__)
+#include <emmintrin.h>
+#endif
+
+#include <algorithm>
 #include <chrono>
 #include <cstring>
 #include <exception>
 #include <iostream>
 #include <stdexcept>
 #include <string>
+#include "ReadTrace.hpp"
 #include "RecordIOReader.hpp"
 #include "tensorflow/core/platform/tstring.h"
 
 using tensorflow::tstring;
+using sagemaker::tensorflow::ReadTraceScope;
 using sagemaker::tensorflow::RecordIOReader;
 
 std::uint32_t RECORD_IO_MAGIC = 0xced7230a;
@@ -33,6 +40,7 @@ struct RecordIOHeader {
 };
 
 inline void ValidateMagicNumber(const RecordIOHeader& header) {
+    ReadTraceScope trace("PipeModeDataset::ParseHeader", TRACE_LEVEL_HEADER_PARSE);
     if (header.magic_number != RECORD_IO_MAGIC) {
         throw std::runtime_error("Invalid magic number: " + std::to_string(header.magic_number));
     }
@@ -55,24 +63,160 @@ inline bool HasFollowingMultipartRecords(const RecordIOHeader& header) {
         GetRecordFlag(header) == RECORD_IO_CONTINUE_MULTIPART_RECORD_FLAG;
 }
 
+/**
+   Returns the offset of the first RecordIO magic number in data at or after start, or size if
+   there is none. Compares 16 positions at a time where SSE2 is available.
+ */
+std::size_t FindMagicNumber(const char* data, std::size_t size, std::size_t start) {
+    const char* magic = reinterpret_cast<const char*>(&RECORD_IO_MAGIC);
+    std::size_t position = start;
+#if defined(__SSE2__)
+    // Positions whose first two bytes match the magic number's are compared in full
+    const __m128i first = _mm_set1_epi8(magic[0]);
+    const __m128i second = _mm_set1_epi8(magic[1]);
+    for (; position + 17 <= size; position += 16) {
+        __m128i firsts = _mm_loadu_si128(reinterpret_cast<const __m128i*>(data + position));
+        __m128i seconds = _mm_loadu_si128(reinterpret_cast<const __m128i*>(data + position + 1));
+        unsigned int matches = _mm_movemask_epi8(_mm_and_si128(_mm_cmpeq_epi8(firsts, first),
+            _mm_cmpeq_epi8(seconds, second)));
+        for (; matches; matches &= matches - 1) {
+            std::size_t match = position + __builtin_ctz(matches);
+            if (!std::memcmp(data + match, magic, sizeof(RECORD_IO_MAGIC))) {
+                return match;
+            }
+        }
+    }
+#endif
+    for (; position + sizeof(RECORD_IO_MAGIC) <= size; position++) {
+        if (!std::memcmp(data + position, magic, sizeof(RECORD_IO_MAGIC))) {
+            return position;
+        }
+    }
+    return size;
+}
+
+/**
+   Returns the offset of the first header in data of a record, or of the first part of a
+   multipart record, or size if there is none.
+ */
+std::size_t FindRecordStart(const char* data, std::size_t size) {
+    for (std::size_t position = FindMagicNumber(data, size, 0); position + sizeof(RecordIOHeader) <= size;
+        position = FindMagicNumber(data, size, position + 1)) {
+        RecordIOHeader header;
+        std::memcpy(&header, data + position, sizeof(header));
+        if (GetRecordFlag(header) == 0 || GetRecordFlag(header) == RECORD_IO_START_MULTIPART_RECORD_FLAG) {
+            return position;
+        }
+    }
+    return size;
+}
+
 bool RecordIOReader::ReadRecord(::tensorflow::tstring* storage) {
-    std::size_t total_record_size = 0;
-    RecordIOHeader header;
+    bool accepted;
     do {
-        if (!Read(&header, sizeof(header))) {
+        std::size_t total_record_size = 0;
+        // Whether the size of the record has been filtered before its data was read
+        bool size_accepted = false;
+        accepted = true;
+        RecordIOHeader header;
+        do {
+            if (!Read(&header, sizeof(header))) {
+                return false;
+            }
+            if (header.magic_number != RECORD_IO_MAGIC && recovery_stats_) {
+                // Parts of a multipart record read before the corrupted header are dropped with it
+                std::string corrupted(reinterpret_cast<const char*>(&header), sizeof(header));
+                recovery_stats_->skipped_bytes += total_record_size
+                    + ScanToNextRecord(corrupted, sizeof(header), FindRecordStart);
+                recovery_stats_->resyncs++;
+                total_record_size = 0;
+                if (!Read(&header, sizeof(header))) {
+                    return false;
+                }
+            }
+            ValidateMagicNumber(header);
+            std::size_t expected_size = GetRecordSize(header);
+            std::size_t padded_expected_size = GetPaddedSize(expected_size);
+            if (!total_record_size && !HasFollowingMultipartRecords(header)) {
+                // A record of one part is skipped without storing its data if its size is rejected
+                size_accepted = AcceptsSize(expected_size);
+                if (!size_accepted) {
+                    Skip(padded_expected_size);
+                    accepted = false;
+                    break;
+                }
+            }
+            total_record_size += expected_size;
+            storage->resize_uninitialized(total_record_size);
+            Read(&((*storage)[total_record_size - expected_size]), expected_size);
+            static char ignore[4] = {0, 0, 0, 0};
+            std::size_t pad_amount = padded_expected_size - expected_size;
+            if (pad_amount) {
+                Read(&ignore, pad_amount);
+            }
+        } while (HasFollowingMultipartRecords(header));
+        if (accepted) {
+            accepted = (size_accepted || AcceptsSize(total_record_size))
+                && AcceptsData(storage->data(), total_record_size);
+        }
+    } while (!accepted);
+    return true;
+}
+
+bool RecordIOReader::ReadRecordChunk(::tensorflow::tstring* storage, std::size_t max_bytes, bool* is_last) {
+    if (!chunking_) {
+        if (!ReadPartHeader(true)) {
             return false;
         }
-        ValidateMagicNumber(header);
-        std::size_t expected_size = GetRecordSize(header);
-        std::size_t padded_expected_size = GetPaddedSize(expected_size);
-        total_record_size += expected_size;
-        storage->resize_uninitialized(total_record_size);
-        Read(&((*storage)[total_record_size - expected_size]), expected_size);
-        static char ignore[4] = {0, 0, 0, 0};
-        std::size_t pad_amount = padded_expected_size - expected_size;
-        if (pad_amount) {
-            Read(&ignore, pad_amount);
+        chunking_ = true;
+    }
+    std::size_t size = 0;
+    storage->resize_uninitialized(0);
+    while (true) {
+        std::size_t part_bytes = std::min(part_remaining_, max_bytes - size);
+        if (part_bytes) {
+            storage->resize_uninitialized(size + part_bytes);
+            if (Read(&((*storage)[size]), part_bytes) < part_bytes) {
+                throw std::runtime_error("Truncated RecordIO record");
+            }
+            size += part_bytes;
+            part_remaining_ -= part_bytes;
+        }
+        if (part_remaining_) {
+            break;
+        }
+        Skip(part_padding_);
+        part_padding_ = 0;
+        // The headers of the following parts are read ahead, so that the last chunk is known
+        if (!more_parts_) {
+            break;
         }
-    } while (HasFollowingMultipartRecords(header));
+        if (!ReadPartHeader(false)) {
+            throw std::runtime_error("Truncated RecordIO multipart record");
+        }
+    }
+    *is_last = !part_remaining_ && !more_parts_;
+    chunking_ = !*is_last;
+    return true;
+}
+
+bool RecordIOReader::ReadPartHeader(bool first_part) {
+    RecordIOHeader header;
+    if (!Read(&header, sizeof(header))) {
+        return false;
+    }
+    if (header.magic_number != RECORD_IO_MAGIC && recovery_stats_ && first_part) {
+        std::string corrupted(reinterpret_cast<const char*>(&header), sizeof(header));
+        recovery_stats_->skipped_bytes += ScanToNextRecord(corrupted, sizeof(header), FindRecordStart);
+        recovery_stats_->resyncs++;
+        if (!Read(&header, sizeof(header))) {
+            return false;
+        }
+    }
+    // Chunks of a record already returned cannot be dropped, so corrupted later parts are never skipped
+    ValidateMagicNumber(header);
+    part_remaining_ = GetRecordSize(header);
+    part_padding_ = GetPaddedSize(part_remaining_) - part_remaining_;
+    more_parts_ = HasFollowingMultipartRecords(header);
     return true;
 }
@@ -34,6 +34,29 @@ class RecordIOReader : public RecordReader {
 
  public:
     bool ReadRecord(::tensorflow::tstring* storage) override;
+
+    /**
+       Reads each chunk straight from the file, a part of a multipart record at a time, so
+       that no more than max_bytes bytes of a record are held at once.
+     */
+    bool ReadRecordChunk(::tensorflow::tstring* storage, std::size_t max_bytes, bool* is_last) override;
+
+ private:
+    /**
+       Reads the header of the next part of the record being chunked. Corrupted data before
+       the first part of a record is skipped if the reader recovers from it. Returns false if
+       no records remain.
+
+       param [in] first_part: Whether the part starts a record.
+     */
+    bool ReadPartHeader(bool first_part);
+
+    // Whether a record is being chunked, and the bytes left of the data and padding of its current part
+    bool chunking_ = false;
+    std::size_t part_remaining_ = 0;
+    std::size_t part_padding_ = 0;
+    // Whether more parts of the record being chunked follow its current part
+    bool more_parts_ = false;
 };
 
 }  // namespace tensorflow
@@ -21,9 +21,18 @@
 #include <iostream>
 #include <stdexcept>
 #include <system_error>
+#include <utility>
+#include "Probes.hpp"
+#include "ReadTrace.hpp"
 
+using sagemaker::tensorflow::Compression;
+using sagemaker::tensorflow::Decompressor;
+using sagemaker::tensorflow::ReadTraceScope;
 using sagemaker::tensorflow::RecordReader;
 
+PIPEMODE_PROBE_SEMAPHORE(pipe__open);
+PIPEMODE_PROBE_SEMAPHORE(bytes__read);
+
 bool RecordReader::WaitForFile() {
     auto sleep = std::chrono::seconds(0);
     while (sleep < file_creation_timeout_) {
@@ -32,48 +41,190 @@ bool RecordReader::WaitForFile() {
             return true;
         }
         sleep = sleep + std::chrono::seconds(1);
-        std::this_thread::sleep_for(sleep);
+        if (cancellation_) {
+            cancellation_->SleepFor(sleep);
+        } else {
+            std::this_thread::sleep_for(sleep);
+        }
     }
     return false;
 }
 
 int UNSET_FILE_DESCRIPTOR = -2;
+int UNOPENED_FILE_DESCRIPTOR = -3;
 
 RecordReader::RecordReader(const std::string& file_path, const std::size_t read_size,
     std::chrono::seconds file_creation_timeout):
-    fd_(UNSET_FILE_DESCRIPTOR),
+    fd_(UNOPENED_FILE_DESCRIPTOR),
     file_path_(file_path),
     read_size_(read_size),
-    file_creation_timeout_(file_creation_timeout)  {
-        if (WaitForFile()) {
-            fd_ = open(file_path_.c_str(), O_RDONLY);
-            if (-1 == fd_) {
-                throw std::system_error(errno, std::system_category());
-            }
-        }
+    file_creation_timeout_(file_creation_timeout)  {}
+
+void RecordReader::OpenFile() {
+    ReadTraceScope trace("PipeModeDataset::PipeWait", TRACE_LEVEL_PIPE_WAIT);
+    auto start = std::chrono::steady_clock::now();
+    fd_ = UNSET_FILE_DESCRIPTOR;
+    if (!WaitForFile()) {
+        CountBlocked(start);
+        return;
+    }
+    struct stat buffer;
+    polls_fd_ = cancellation_ && stat(file_path_.c_str(), &buffer) == 0 && S_ISFIFO(buffer.st_mode);
+    // Opening a FIFO blocks until its writer opens it, unless it is opened without blocking
+    fd_ = open(file_path_.c_str(), polls_fd_ ? O_RDONLY | O_NONBLOCK : O_RDONLY);
+    if (-1 == fd_) {
+        fd_ = UNSET_FILE_DESCRIPTOR;
+        throw std::system_error(errno, std::system_category());
     }
+    PIPEMODE_PROBE2(pipe__open, file_path_.c_str(), fd_);
+    CountBlocked(start);
+}
 
 RecordReader::~RecordReader() {
+    // Stop decompressing before the file is closed under the decompressor's reader thread.
+    decompressor_.reset();
     if (fd_ >= 0) {
         close(fd_);
     }
 }
 
+void RecordReader::SetCompression(Compression compression, std::size_t num_threads) {
+    if (compression == Compression::NONE) {
+        decompressor_.reset();
+        return;
+    }
+    decompressor_ = std::unique_ptr<Decompressor>(new Decompressor(compression,
+        [this](void* dest, std::size_t nbytes) { return ReadFile(dest, nbytes); }, num_threads, read_size_));
+}
+
+void RecordReader::SetFileSource(std::function<std::size_t(void*, std::size_t)> source) {
+    file_source_ = std::move(source);
+}
+
 std::size_t RecordReader::Read(void* dest, std::size_t nbytes) {
+    std::size_t unread = 0;
+    if (unread_position_ < unread_.size()) {
+        unread = std::min(nbytes, unread_.size() - unread_position_);
+        std::memcpy(dest, &unread_[unread_position_], unread);
+        unread_position_ += unread;
+        if (unread == nbytes) {
+            return unread;
+        }
+        dest = static_cast<char*>(dest) + unread;
+        nbytes -= unread;
+    }
+    if (decompressor_) {
+        return unread + decompressor_->Read(dest, nbytes);
+    }
+    return unread + ReadFile(dest, nbytes);
+}
+
+bool RecordReader::ReadRecordChunk(::tensorflow::tstring* storage, std::size_t max_bytes, bool* is_last) {
+    if (chunk_position_ == chunked_record_.size()) {
+        if (!ReadRecord(&chunked_record_)) {
+            return false;
+        }
+        chunk_position_ = 0;
+    }
+    std::size_t size = std::min(max_bytes, chunked_record_.size() - chunk_position_);
+    storage->assign(chunked_record_.data() + chunk_position_, size);
+    chunk_position_ += size;
+    *is_last = chunk_position_ == chunked_record_.size();
+    return true;
+}
+
+std::size_t RecordReader::Skip(std::size_t nbytes) {
+    if (!skip_buffer_) {
+        skip_buffer_.reset(new char[DEFAULT_READ_SIZE]);
+    }
+    std::size_t skipped = 0;
+    while (skipped < nbytes) {
+        std::size_t size = Read(skip_buffer_.get(), std::min<std::size_t>(nbytes - skipped, DEFAULT_READ_SIZE));
+        if (!size) {
+            break;
+        }
+        skipped += size;
+    }
+    return skipped;
+}
+
+std::size_t RecordReader::ScanToNextRecord(const std::string& corrupted, std::size_t header_size,
+    const std::function<std::size_t(const char*, std::size_t)>& find) {
+    std::string window = corrupted.substr(1);
+    std::size_t skipped = 1;
+    while (true) {
+        std::size_t size = window.size();
+        window.resize(size + RECOVERY_SCAN_SIZE);
+        window.resize(size + Read(&window[size], RECOVERY_SCAN_SIZE));
+        const bool end_of_file = window.size() < size + RECOVERY_SCAN_SIZE;
+        std::size_t found = find(window.data(), window.size());
+        if (found < window.size()) {
+            // The bytes from the header on are read again, before any bytes left from an earlier scan
+            unread_ = window.substr(found) + unread_.substr(unread_position_);
+            unread_position_ = 0;
+            skipped += found;
+            break;
+        }
+        if (end_of_file) {
+            skipped += window.size();
+            break;
+        }
+        // Keep the bytes a header that starts in this window may continue into
+        const std::size_t keep = std::min(window.size(), header_size - 1);
+        skipped += window.size() - keep;
+        window.erase(0, window.size() - keep);
+    }
+    std::cerr << "WARN: Skipped " << skipped << " bytes of corrupted data of " << file_path_
+        << " to reach the next record" << std::endl;
+    return skipped;
+}
+
+std::size_t RecordReader::ReadFile(void* dest, std::size_t nbytes) {
+    if (file_source_) {
+        return file_source_(dest, nbytes);
+    }
+    if (fd_ == UNOPENED_FILE_DESCRIPTOR) {
+        OpenFile();
+    }
     if (fd_ == UNSET_FILE_DESCRIPTOR) {
         throw std::runtime_error("File does not exist: " + file_path_);
     }
     std::size_t bytes_read = 0;
     while (nbytes) {
-        ssize_t read_amount = read(fd_, dest + bytes_read, std::min(nbytes, read_size_));
-        if (-1 == read_amount) {
+        ssize_t read_amount;
+        {
+            ReadTraceScope trace("PipeModeDataset::Read", TRACE_LEVEL_READ);
+            read_amount = read(fd_, dest + bytes_read, std::min(nbytes, read_size_));
+        }
+        if (-1 == read_amount && !(polls_fd_ && errno == EAGAIN)) {
             throw std::system_error(errno, std::system_category());
         }
-        if (!read_amount) {
+        if (read_amount <= 0) {
+            // A FIFO opened without blocking reads nothing both when it is empty and before its
+            // writer opens it, so only a hang up once the writer is gone ends the file
+            if (polls_fd_ && WaitForPipe()) {
+                continue;
+            }
             break;
         }
+        PIPEMODE_PROBE2(bytes__read, fd_, read_amount);
         bytes_read += read_amount;
         nbytes -= read_amount;
     }
     return bytes_read;
 }
+
+bool RecordReader::WaitForPipe() {
+    ReadTraceScope trace("PipeModeDataset::PipeWait", TRACE_LEVEL_PIPE_WAIT);
+    auto start = std::chrono::steady_clock::now();
+    bool readable = cancellation_->WaitReadable(fd_);
+    CountBlocked(start);
+    return readable;
+}
+
+void RecordReader::CountBlocked(std::chrono::steady_clock::time_point start) {
+    if (pipe_wait_stats_) {
+        pipe_wait_stats_->blocked_ns += std::chrono::duration_cast<std::chrono::nanoseconds>(
+            std::chrono::steady_clock::now() - start).count();
+    }
+}
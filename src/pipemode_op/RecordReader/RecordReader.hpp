@@ -14,13 +14,20 @@
 // ANY KIND, either express or implied. See the License for the specific
 // language governing permissions and limitations under the License.
 
+#include <atomic>
+#include <cstdint>
 #include <string>
 #include <stdexcept>
 #include <exception>
 #include <thread>
 #include <chrono>
+#include <functional>
+#include <memory>
 
 #include "tensorflow/core/platform/tstring.h"
+#include "CancellationSignal.hpp"
+#include "Decompressor.hpp"
+#include "RecordFilter.hpp"
 
 using tensorflow::tstring;
 
@@ -30,6 +37,32 @@ namespace tensorflow {
 #define DEFAULT_READ_SIZE 65536
 #define DEFAULT_FILE_CREATION_TIMEOUT std::chrono::seconds(120)
 
+// The number of bytes read at a time while scanning for the next record after corrupted data
+#define RECOVERY_SCAN_SIZE 65536
+
+/**
+   Counts the time RecordReaders spend blocked on the writer of their file, rather than
+   reading and framing records.
+ */
+struct PipeWaitStats {
+    // Nanoseconds spent waiting for the file to be created and opened, and, if the file is a
+    // FIFO, for its writer to send data. Decompression threads wait on the file too, so the
+    // count may be updated from several threads.
+    std::atomic<std::uint64_t> blocked_ns{0};
+};
+
+/**
+   Counts the corrupted data that RecordReaders skipped to recover from it.
+ */
+struct RecoveryStats {
+    // The records dropped because their data failed a check, while their framing was intact
+    std::uint64_t skipped_records = 0;
+    // The number of times a reader scanned forward to the next record, after corrupted framing
+    std::uint64_t resyncs = 0;
+    // The bytes skipped, by both
+    std::uint64_t skipped_bytes = 0;
+};
+
 /**
    An abstract record reader. Records are byte sequences read from a file. 
 
@@ -38,7 +71,8 @@ namespace tensorflow {
 class RecordReader {
  public:
     /**
-       Constructs a new RecordReader that reads records from a file.
+       Constructs a new RecordReader that reads records from a file. The file is opened by the
+       first read, after waiting for it to exist.
     
        param [in] file_path: The path and name of the file to open.
        param [in] read_size: The preferred number of bytes to read from the open file 
@@ -77,9 +111,82 @@ class RecordReader {
      */
     virtual bool ReadRecord(::tensorflow::tstring* storage) = 0;
 
+    /**
+       Reads the next chunk of a record: up to max_bytes bytes of the record that is being
+       read, or of the next record once the last chunk of a record was read. Every record has
+       at least one chunk, so empty records are read as one empty chunk.
+
+       This implementation reads each record whole with ReadRecord and returns it a chunk at
+       a time. Readers of formats that frame records by their size override it to read each
+       chunk straight from the file, so that records of any size are read with bounded memory.
+       Those readers do not filter records, since the first chunk of a record is returned
+       before the rest of its data is read.
+
+       param [out] storage: The string the chunk is written to.
+       param [in] max_bytes: The size of the largest chunk. Must be positive.
+       param [out] is_last: Set to true if the chunk is the last one of its record.
+       return true if a chunk was read, false if no records remain.
+     */
+    virtual bool ReadRecordChunk(::tensorflow::tstring* storage, std::size_t max_bytes, bool* is_last);
+
+    /**
+       Decompresses the file as it is read. Must be called before the first record is read.
+
+       param [in] compression: The compression of the file.
+       param [in] num_threads: The number of threads that decompress independent frames
+                               of the file in parallel.
+     */
+    void SetCompression(Compression compression, std::size_t num_threads = DEFAULT_DECOMPRESSION_THREADS);
+
+    /**
+       Reads the file's bytes from a source instead of the opened file, such as a FileStream
+       that reads the file ahead asynchronously. Must be called before SetCompression and
+       before the first record is read.
+
+       param [in] source: Reads up to the specified number of bytes into a byte array, and
+                          returns the number of bytes read, fewer only at the end of the file.
+     */
+    void SetFileSource(std::function<std::size_t(void*, std::size_t)> source);
+
+    /**
+       Recovers from corrupted data by skipping it, rather than throwing, if the record format
+       can find the next record after it: RecordIO and TFRecord readers scan forward to the
+       next plausible record header. Other readers ignore this.
+
+       param [in] stats: Counts the data skipped. Must outlive the reader. Null stops recovery.
+     */
+    void SetRecovery(RecoveryStats* stats) { recovery_stats_ = stats; }
+
+    /**
+       Skips the records the filter rejects, so that ReadRecord only returns records the filter
+       keeps. Readers of formats that frame records by their size skip the data of records
+       whose size is rejected without storing it.
+
+       param [in] filter: Chooses the records kept. Must outlive the reader. Null keeps every record.
+     */
+    void SetFilter(RecordFilter* filter) { filter_ = filter; }
+
+    /**
+       Ends blocking waits when the signal is cancelled, by throwing a std::system_error with
+       the error code ECANCELED: the wait for the file to be created, and, if the file is a
+       FIFO, reads that wait for its writer. Must be called before the first record is read.
+
+       param [in] cancellation: The signal. Must outlive the reader. Null makes waits uncancellable.
+     */
+    void SetCancellation(const CancellationSignal* cancellation) { cancellation_ = cancellation; }
+
+    /**
+       Counts the time spent blocked on the writer of the file: waiting for the file to be
+       created and opened, and, if the file is a FIFO whose reads are cancellable, for data.
+
+       param [in] stats: Counts the time blocked. Must outlive the reader. Null stops counting.
+     */
+    void SetPipeWaitStats(PipeWaitStats* stats) { pipe_wait_stats_ = stats; }
+
  protected:
     /**
-       Read bytes from the file into a byte array. 
+       Read bytes from the file into a byte array, decompressing them if the file is
+       compressed.
 
        param [out] data The byte array to write into.
        param [in] nbytes The number of bytes to read.
@@ -95,10 +202,77 @@ class RecordReader {
      */
     bool WaitForFile();
 
+    /**
+       Scans forward from corrupted data to the next plausible record header, and leaves the
+       bytes from the header on, if one is found, to be read again. Skips the rest of the file
+       otherwise. Returns the number of bytes skipped.
+
+       param [in] corrupted: Bytes read at the corrupted position. The scan starts at their second byte.
+       param [in] header_size: The size of a record header.
+       param [in] find: Returns the offset of the first plausible header that starts in the bytes
+                        of a window, and fits in it, or the window's size if none does.
+     */
+    std::size_t ScanToNextRecord(const std::string& corrupted, std::size_t header_size,
+        const std::function<std::size_t(const char*, std::size_t)>& find);
+
+    // Counts skipped data, if the reader recovers from corrupted data
+    RecoveryStats* recovery_stats_ = nullptr;
+
+    /**
+       Returns true if the filter, if any, keeps a record of size bytes. Called once for
+       each record, before its data is read if its size is known first.
+     */
+    bool AcceptsSize(std::size_t size) { return !filter_ || filter_->AcceptsSize(size); }
+
+    /**
+       Returns true if the filter, if any, keeps the data of a record whose size it kept.
+     */
+    bool AcceptsData(const char* data, std::size_t size) { return !filter_ || filter_->AcceptsData(data, size); }
+
+    /**
+       Reads and discards nbytes bytes. Returns the number of bytes skipped, which is less
+       than nbytes if the file ends first.
+     */
+    std::size_t Skip(std::size_t nbytes);
+
+    // Chooses the records returned, if records are filtered
+    RecordFilter* filter_ = nullptr;
+
  private:
+    /**
+       Read bytes from the file into a byte array without decompressing them.
+     */
+    std::size_t ReadFile(void* data, std::size_t nbytes);
+
+    /**
+       Waits for the file to exist and opens it. A FIFO is opened without blocking if reads are
+       cancellable, so that reads poll for its writer instead.
+     */
+    void OpenFile();
+
+    /**
+       Waits for the writer of a FIFO opened without blocking to send data, or to hang up.
+       Returns true if there is data to read.
+     */
+    bool WaitForPipe();
+
+    /**
+       Counts the time since start as time blocked on the writer of the file.
+     */
+    void CountBlocked(std::chrono::steady_clock::time_point start);
+
     // The file descriptor of the file being read
     int fd_;
 
+    // True if fd_ is a FIFO opened without blocking, whose reads must wait for data with poll
+    bool polls_fd_ = false;
+
+    // Ends blocking waits, if set
+    const CancellationSignal* cancellation_ = nullptr;
+
+    // Counts the time blocked on the writer of the file, if set
+    PipeWaitStats* pipe_wait_stats_ = nullptr;
+
     // The path of the file being read
     const std::string file_path_;
 
@@ -109,6 +283,23 @@ class RecordReader {
     // The number of seconds to wait for the file being read to exist. Measured from
     // the first invocation of Read. Defaults to 120 seconds.
     std::chrono::seconds file_creation_timeout_;
+
+    // Reads the file's bytes in place of the opened file, if set
+    std::function<std::size_t(void*, std::size_t)> file_source_;
+
+    // Decompresses the file being read, if it is compressed
+    std::unique_ptr<Decompressor> decompressor_;
+
+    // Bytes that were read while scanning for a record, to be read again from unread_position_
+    std::string unread_;
+    std::size_t unread_position_ = 0;
+
+    // The bytes skipped by Skip are read into this buffer, allocated by the first skip
+    std::unique_ptr<char[]> skip_buffer_;
+
+    // The record whose chunks the default ReadRecordChunk returns, and the offset of its next chunk
+    ::tensorflow::tstring chunked_record_;
+    std::size_t chunk_position_ = 0;
 };
 }  // namespace tensorflow
 }  // namespace sagemaker
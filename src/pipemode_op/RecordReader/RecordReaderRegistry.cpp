@@ -0,0 +1,297 @@
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include <dlfcn.h>
+
+#include <map>
+#include <stdexcept>
+#include <string>
+#include <utility>
+
+#include "ArrowStreamReader.hpp"
+#include "RecordIOReader.hpp"
+#include "RecordReaderRegistry.hpp"
+#include "TextLineRecordReader.hpp"
+#include "TFRecordReader.hpp"
+
+using sagemaker::tensorflow::ArrowStreamReader;
+using sagemaker::tensorflow::RecordIOReader;
+using sagemaker::tensorflow::RecordReader;
+using sagemaker::tensorflow::RecordReaderFactory;
+using sagemaker::tensorflow::RecordReaderRegistry;
+using sagemaker::tensorflow::RecordTransform;
+using sagemaker::tensorflow::RecordTransformFactory;
+using sagemaker::tensorflow::TextLineRecordReader;
+using sagemaker::tensorflow::TFRecordReader;
+
+namespace {
+
+/**
+   A RecordReader that splits records with a plugin record format.
+ */
+class PluginRecordReader : public RecordReader {
+ public:
+    PluginRecordReader(const std::string& file_path, const PipeModeRecordFormat* format)
+        : RecordReader(file_path), format_(format), reader_(format->create_reader()) {
+        if (!reader_) {
+            throw std::runtime_error(std::string("Cannot create a reader of record format ") + format->name);
+        }
+    }
+
+    ~PluginRecordReader() {
+        format_->destroy_reader(reader_);
+    }
+
+    bool ReadRecord(::tensorflow::tstring* storage) override {
+        const char* data;
+        std::size_t size;
+        // The plugin owns the records the filter rejects, so they are never copied
+        do {
+            if (!ReadPluginRecord(&data, &size)) {
+                return false;
+            }
+        } while (!AcceptsSize(size) || !AcceptsData(data, size));
+        storage->assign(data, size);
+        return true;
+    }
+
+ private:
+    /**
+       Reads the next record with the plugin. Returns false if no records remain.
+
+       param [out] data: Set to the record, which the plugin owns until the next call.
+       param [out] size: Set to the size of the record.
+     */
+    bool ReadPluginRecord(const char** data, std::size_t* size) {
+        read_error_.clear();
+        int result = format_->read_record(reader_, &PluginRecordReader::ReadSource, this, data, size);
+        if (result < 0) {
+            if (!read_error_.empty()) {
+                throw std::runtime_error(read_error_);
+            }
+            const char* error = format_->last_error ? format_->last_error(reader_) : nullptr;
+            throw std::runtime_error(std::string("Cannot read a record of format ") + format_->name
+                + (error ? ": " + std::string(error) : ""));
+        }
+        return result;
+    }
+
+    /**
+       The PipeModeReadFn of plugins. Exceptions cannot cross the plugin, so they are
+       rethrown once the plugin returns.
+     */
+    static std::int64_t ReadSource(void* source, void* buffer, std::size_t size) {
+        PluginRecordReader* reader = static_cast<PluginRecordReader*>(source);
+        try {
+            return reader->Read(buffer, size);
+        } catch (const std::exception& err) {
+            reader->read_error_ = err.what();
+            return -1;
+        }
+    }
+
+    const PipeModeRecordFormat* format_;
+    void* reader_;
+    std::string read_error_;
+};
+
+/**
+   A RecordTransform that rewrites records with a plugin record transform.
+ */
+class PluginRecordTransform : public RecordTransform {
+ public:
+    explicit PluginRecordTransform(const PipeModeRecordTransform* transform)
+        : transform_(transform), state_(transform->create()) {
+        if (!state_) {
+            throw std::runtime_error(std::string("Cannot create record transform ") + transform->name);
+        }
+    }
+
+    ~PluginRecordTransform() {
+        transform_->destroy(state_);
+    }
+
+    void Transform(const char* data, std::size_t size, const char** output, std::size_t* output_size) override {
+        if (transform_->transform(state_, data, size, output, output_size)) {
+            const char* error = transform_->last_error ? transform_->last_error(state_) : nullptr;
+            throw std::runtime_error(std::string("Cannot transform a record with ") + transform_->name
+                + (error ? ": " + std::string(error) : ""));
+        }
+    }
+
+ private:
+    const PipeModeRecordTransform* transform_;
+    void* state_;
+};
+
+/**
+   Adds a record format or transform to the maps of a registry, unless the same source has
+   registered it already. Throws std::invalid_argument if another one has the name.
+
+   param [in] kind: What is registered, for error messages, e.g. "Record format".
+ */
+template <typename Factory>
+void Insert(const std::string& kind, const std::string& name, Factory factory, const void* source,
+    std::map<std::string, Factory>* factories, std::map<std::string, const void*>* sources) {
+    auto registered = sources->find(name);
+    if (registered != sources->end()) {
+        if (source && registered->second == source) {
+            return;
+        }
+        throw std::invalid_argument(kind + " " + name + " is already registered");
+    }
+    (*factories)[name] = std::move(factory);
+    (*sources)[name] = source;
+}
+
+void CheckAbiVersion(const std::string& kind, const char* name, std::uint32_t abi_version) {
+    if (abi_version != PIPEMODE_RECORD_FORMAT_ABI_VERSION) {
+        throw std::invalid_argument(kind + " " + std::string(name ? name : "") + " was built for ABI version "
+            + std::to_string(abi_version) + ", not " + std::to_string(PIPEMODE_RECORD_FORMAT_ABI_VERSION));
+    }
+}
+
+template <typename Reader>
+RecordReaderFactory BuiltInFactory() {
+    return [](const std::string& file_path, std::uint32_t) {
+        return std::unique_ptr<RecordReader>(new Reader(file_path));
+    };
+}
+
+}  // namespace
+
+RecordReaderRegistry& RecordReaderRegistry::Global() {
+    static RecordReaderRegistry* registry = new RecordReaderRegistry();
+    return *registry;
+}
+
+RecordReaderRegistry::RecordReaderRegistry() {
+    Register("RecordIO", BuiltInFactory<RecordIOReader>());
+    Register("TextLine", BuiltInFactory<TextLineRecordReader>());
+    Register("ArrowStream", BuiltInFactory<ArrowStreamReader>());
+    Register("TFRecord", [](const std::string& file_path, std::uint32_t max_corrupted_records_to_skip) {
+        return std::unique_ptr<RecordReader>(new TFRecordReader(file_path, max_corrupted_records_to_skip));
+    });
+}
+
+void RecordReaderRegistry::Register(const std::string& name, RecordReaderFactory factory) {
+    std::lock_guard<std::mutex> lock(mu_);
+    Insert<RecordReaderFactory>("Record format", name, std::move(factory), nullptr, &factories_, &sources_);
+}
+
+void RecordReaderRegistry::Register(const PipeModeRecordFormat* format) {
+    CheckAbiVersion("Record format", format->name, format->abi_version);
+    // Every field of version 1 is required, so the struct must reach its last one
+    if (!PIPEMODE_STRUCT_HAS_FIELD(format, PipeModeRecordFormat, destroy_reader)) {
+        throw std::invalid_argument("Record format plugin structs must have a struct_size of at least "
+            + std::to_string(sizeof(PipeModeRecordFormat)));
+    }
+    if (!format->name || !format->create_reader || !format->read_record || !format->destroy_reader) {
+        throw std::invalid_argument("Record format plugins must have a name, create_reader, read_record and "
+            "destroy_reader");
+    }
+    std::lock_guard<std::mutex> lock(mu_);
+    Insert<RecordReaderFactory>("Record format", format->name,
+        [format](const std::string& file_path, std::uint32_t) {
+            return std::unique_ptr<RecordReader>(new PluginRecordReader(file_path, format));
+        }, format, &factories_, &sources_);
+}
+
+void RecordReaderRegistry::RegisterTransform(const std::string& name, RecordTransformFactory factory) {
+    std::lock_guard<std::mutex> lock(mu_);
+    Insert<RecordTransformFactory>("Record transform", name, std::move(factory), nullptr, &transforms_,
+        &transform_sources_);
+}
+
+void RecordReaderRegistry::RegisterTransform(const PipeModeRecordTransform* transform) {
+    CheckAbiVersion("Record transform", transform->name, transform->abi_version);
+    if (!PIPEMODE_STRUCT_HAS_FIELD(transform, PipeModeRecordTransform, destroy)) {
+        throw std::invalid_argument("Record transform plugin structs must have a struct_size of at least "
+            + std::to_string(sizeof(PipeModeRecordTransform)));
+    }
+    if (!transform->name || !transform->create || !transform->transform || !transform->destroy) {
+        throw std::invalid_argument("Record transform plugins must have a name, create, transform and destroy");
+    }
+    std::lock_guard<std::mutex> lock(mu_);
+    Insert<RecordTransformFactory>("Record transform", transform->name, [transform]() {
+        return std::unique_ptr<RecordTransform>(new PluginRecordTransform(transform));
+    }, transform, &transforms_, &transform_sources_);
+}
+
+void RecordReaderRegistry::LoadLibrary(const std::string& path) {
+    {
+        std::lock_guard<std::mutex> lock(mu_);
+        if (libraries_.count(path)) {
+            return;
+        }
+    }
+    // The library is never closed, since its readers and formats may be used until the process exits
+    void* library = dlopen(path.c_str(), RTLD_NOW | RTLD_LOCAL);
+    if (!library) {
+        throw std::invalid_argument("Cannot load record format library " + path + ": " + dlerror());
+    }
+    auto formats_fn = reinterpret_cast<PipeModeRecordFormatsFn>(dlsym(library, PIPEMODE_RECORD_FORMATS_SYMBOL));
+    auto transforms_fn = reinterpret_cast<PipeModeRecordTransformsFn>(
+        dlsym(library, PIPEMODE_RECORD_TRANSFORMS_SYMBOL));
+    if (!formats_fn && !transforms_fn) {
+        throw std::invalid_argument("Record format library " + path + " does not export "
+            + PIPEMODE_RECORD_FORMATS_SYMBOL + " or " + PIPEMODE_RECORD_TRANSFORMS_SYMBOL);
+    }
+    for (const PipeModeRecordFormat* const* format = formats_fn ? formats_fn() : nullptr; format && *format;
+        ++format) {
+        Register(*format);
+    }
+    for (const PipeModeRecordTransform* const* transform = transforms_fn ? transforms_fn() : nullptr;
+        transform && *transform; ++transform) {
+        RegisterTransform(*transform);
+    }
+    std::lock_guard<std::mutex> lock(mu_);
+    libraries_.insert(path);
+}
+
+bool RecordReaderRegistry::Contains(const std::string& name) const {
+    std::lock_guard<std::mutex> lock(mu_);
+    return factories_.count(name) > 0;
+}
+
+std::unique_ptr<RecordReader> RecordReaderRegistry::Create(const std::string& name, const std::string& file_path,
+    std::uint32_t max_corrupted_records_to_skip) const {
+    RecordReaderFactory factory;
+    {
+        std::lock_guard<std::mutex> lock(mu_);
+        auto registered = factories_.find(name);
+        if (registered == factories_.end()) {
+            throw std::invalid_argument("Unknown record format: " + name);
+        }
+        factory = registered->second;
+    }
+    return factory(file_path, max_corrupted_records_to_skip);
+}
+
+bool RecordReaderRegistry::ContainsTransform(const std::string& name) const {
+    std::lock_guard<std::mutex> lock(mu_);
+    return transforms_.count(name) > 0;
+}
+
+std::unique_ptr<RecordTransform> RecordReaderRegistry::CreateTransform(const std::string& name) const {
+    RecordTransformFactory factory;
+    {
+        std::lock_guard<std::mutex> lock(mu_);
+        auto registered = transforms_.find(name);
+        if (registered == transforms_.end()) {
+            throw std::invalid_argument("Unknown record transform: " + name);
+        }
+        factory = registered->second;
+    }
+    return factory();
+}
@@ -0,0 +1,125 @@
+#ifndef SRC_PIPEMODE_OP_RECORDREADER_RECORDREADERREGISTRY_HPP_
+#define SRC_PIPEMODE_OP_RECORDREADER_RECORDREADERREGISTRY_HPP_
+
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include <cstdint>
+#include <functional>
+#include <map>
+#include <memory>
+#include <mutex>
+#include <set>
+#include <string>
+
+#include "PipeModeRecordFormat.h"
+#include "RecordReader.hpp"
+#include "RecordTransform.hpp"
+
+namespace sagemaker {
+namespace tensorflow {
+
+/**
+   Creates a RecordReader of a record format.
+
+   param [in] file_path: The path of the file to read.
+   param [in] max_corrupted_records_to_skip: The number of consecutive corrupted records the
+                                             reader may skip, if the format detects them.
+ */
+using RecordReaderFactory = std::function<std::unique_ptr<RecordReader>(const std::string& file_path,
+    std::uint32_t max_corrupted_records_to_skip)>;
+
+/**
+   The record formats that RecordReaders can be created for, by name. Holds the built-in
+   formats, RecordIO, TFRecord, TextLine and ArrowStream, and the formats of plugin libraries
+   that implement the C ABI of PipeModeRecordFormat.h. Also holds the record transforms of
+   plugin libraries, by name.
+
+   Instances of this class are thread-safe.
+ */
+class RecordReaderRegistry {
+ public:
+    /**
+       Returns the registry shared by all datasets of the process.
+     */
+    static RecordReaderRegistry& Global();
+
+    RecordReaderRegistry();
+
+    RecordReaderRegistry(const RecordReaderRegistry&) = delete;
+    RecordReaderRegistry& operator=(const RecordReaderRegistry&) = delete;
+
+    /**
+       Registers a record format. Throws std::invalid_argument if a different format is
+       registered with the same name.
+     */
+    void Register(const std::string& name, RecordReaderFactory factory);
+
+    /**
+       Registers a record format implemented by a plugin. Throws std::invalid_argument if the
+       format was built for another ABI version, or if a different format is registered with
+       the same name. The format must outlive the registry.
+     */
+    void Register(const PipeModeRecordFormat* format);
+
+    /**
+       Registers a record transform. Throws std::invalid_argument if a different transform is
+       registered with the same name.
+     */
+    void RegisterTransform(const std::string& name, RecordTransformFactory factory);
+
+    /**
+       Registers a record transform implemented by a plugin. Throws std::invalid_argument if the
+       transform was built for another ABI version, or if a different transform is registered
+       with the same name. The transform must outlive the registry.
+     */
+    void RegisterTransform(const PipeModeRecordTransform* transform);
+
+    /**
+       Loads a plugin library and registers its record formats and transforms. Loading a library
+       again has no effect. Throws std::invalid_argument if the library cannot be loaded, exports
+       neither formats nor transforms, or if one of them cannot be registered.
+     */
+    void LoadLibrary(const std::string& path);
+
+    bool Contains(const std::string& name) const;
+
+    /**
+       Creates a RecordReader of the named record format. Throws std::invalid_argument if the
+       format is not registered.
+     */
+    std::unique_ptr<RecordReader> Create(const std::string& name, const std::string& file_path,
+        std::uint32_t max_corrupted_records_to_skip) const;
+
+    bool ContainsTransform(const std::string& name) const;
+
+    /**
+       Creates a RecordTransform of the named transform. Throws std::invalid_argument if the
+       transform is not registered.
+     */
+    std::unique_ptr<RecordTransform> CreateTransform(const std::string& name) const;
+
+ private:
+    mutable std::mutex mu_;
+    std::map<std::string, RecordReaderFactory> factories_;
+    std::map<std::string, RecordTransformFactory> transforms_;
+    // What registered each format and transform, to allow a plugin's to be registered twice
+    std::map<std::string, const void*> sources_;
+    std::map<std::string, const void*> transform_sources_;
+    std::set<std::string> libraries_;
+};
+
+}  // namespace tensorflow
+}  // namespace sagemaker
+
+#endif  // SRC_PIPEMODE_OP_RECORDREADER_RECORDREADERREGISTRY_HPP_
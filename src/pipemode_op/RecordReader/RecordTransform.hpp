@@ -0,0 +1,52 @@
+#ifndef SRC_PIPEMODE_OP_RECORDREADER_RECORDTRANSFORM_HPP_
+#define SRC_PIPEMODE_OP_RECORDREADER_RECORDTRANSFORM_HPP_
+
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include <cstddef>
+#include <functional>
+#include <memory>
+
+namespace sagemaker {
+namespace tensorflow {
+
+/**
+   Rewrites records after they are read, before they are decoded or returned. Each worker
+   thread of a dataset's parallel stage has its own RecordTransform, so a RecordTransform is
+   only used by one thread at a time.
+ */
+class RecordTransform {
+ public:
+    virtual ~RecordTransform() = default;
+
+    /**
+       Transforms a record. Throws std::runtime_error if the record cannot be transformed.
+
+       param [in] data: The record.
+       param [in] size: The size of the record.
+       param [out] output: Set to the transformed record, which remains valid until the next call.
+       param [out] output_size: Set to the size of the transformed record.
+     */
+    virtual void Transform(const char* data, std::size_t size, const char** output, std::size_t* output_size) = 0;
+};
+
+/**
+   Creates a RecordTransform for one worker thread.
+ */
+using RecordTransformFactory = std::function<std::unique_ptr<RecordTransform>()>;
+
+}  // namespace tensorflow
+}  // namespace sagemaker
+
+#endif  // SRC_PIPEMODE_OP_RECORDREADER_RECORDTRANSFORM_HPP_
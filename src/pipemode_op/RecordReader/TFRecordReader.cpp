@@ -11,31 +11,74 @@
 // ANY KIND, either express or implied. See the License for the specific
 // language governing permissions and limitations under the License.
 #include <iostream>
+#include <cstring>
 #include <string>
 #include <cstdio>
 #include "tensorflow/core/lib/hash/crc32c.h"
 #include "tensorflow/core/platform/tstring.h"
+#include "Probes.hpp"
+#include "ReadTrace.hpp"
 #include "TFRecordReader.hpp"
 
 using tensorflow::tstring;
+using sagemaker::tensorflow::ReadTraceScope;
 using sagemaker::tensorflow::TFRecordReader;
 
+PIPEMODE_PROBE_SEMAPHORE(crc__failure);
+
+// The size of the length of a record and of its masked CRC
+#define TFRECORD_HEADER_SIZE 12
+
+// The largest record length that is plausible while scanning for the next record after corrupted data
+#define TFRECORD_MAX_RECOVERED_LENGTH (std::uint64_t(1) << 32)
+
+inline bool LengthMatchesCrc(const std::uint64_t& length, const std::uint32_t masked_crc32_of_length) {
+    return tensorflow::crc32c::Unmask(masked_crc32_of_length)
+        == tensorflow::crc32c::Value(reinterpret_cast<const char*>(&(length)), sizeof(length));
+}
+
+inline bool DataMatchesCrc(const ::tensorflow::tstring* storage, const std::uint64_t& length,
+                           const std::uint32_t masked_crc32_of_data) {
+    ReadTraceScope trace("PipeModeDataset::Crc", TRACE_LEVEL_CRC);
+    if (tensorflow::crc32c::Unmask(masked_crc32_of_data) != tensorflow::crc32c::Value(storage->data(), length)) {
+        PIPEMODE_PROBE2(crc__failure, 1, length);
+        return false;
+    }
+    return true;
+}
+
 inline void ValidateLength(const std::uint64_t& length, const std::uint32_t masked_crc32_of_length) {
-    if (tensorflow::crc32c::Unmask(masked_crc32_of_length)
-        != tensorflow::crc32c::Value(reinterpret_cast<const char*>(&(length)), sizeof(length))) {
+    ReadTraceScope trace("PipeModeDataset::ParseHeader", TRACE_LEVEL_HEADER_PARSE);
+    if (!LengthMatchesCrc(length, masked_crc32_of_length)) {
+        PIPEMODE_PROBE2(crc__failure, 0, length);
         throw std::runtime_error("CRC check on header failed.");
     }
 }
 
 inline void ValidateData(const ::tensorflow::tstring* storage, const std::uint64_t& length,
                          const std::uint32_t masked_crc32_of_data) {
-    auto unmasked_crc = tensorflow::crc32c::Unmask(masked_crc32_of_data);
-    auto data_crc = tensorflow::crc32c::Value(storage->data(), length);
-    if (unmasked_crc != data_crc) {
+    if (!DataMatchesCrc(storage, length, masked_crc32_of_data)) {
         throw std::runtime_error("CRC check on data failed.");
     }
 }
 
+/**
+   Returns the offset of the first record header in data whose length is plausible and
+   matches its CRC, or size if there is none.
+ */
+std::size_t FindRecordHeader(const char* data, std::size_t size) {
+    for (std::size_t position = 0; position + TFRECORD_HEADER_SIZE <= size; position++) {
+        std::uint64_t length;
+        std::uint32_t masked_crc32_of_length;
+        std::memcpy(&length, data + position, sizeof(length));
+        std::memcpy(&masked_crc32_of_length, data + position + sizeof(length), sizeof(masked_crc32_of_length));
+        if (length < TFRECORD_MAX_RECOVERED_LENGTH && LengthMatchesCrc(length, masked_crc32_of_length)) {
+            return position;
+        }
+    }
+    return size;
+}
+
 bool TFRecordReader::ReadRecord(::tensorflow::tstring* storage) {
     int num_bad_recs = 0;
     while (true) {
@@ -46,13 +89,35 @@ bool TFRecordReader::ReadRecord(::tensorflow::tstring* storage) {
                 return false;
             }
             Read(&masked_crc32_of_length, sizeof(masked_crc32_of_length));
+            if (recovery_stats_ && !LengthMatchesCrc(length, masked_crc32_of_length)) {
+                PIPEMODE_PROBE2(crc__failure, 0, length);
+                std::string corrupted(reinterpret_cast<const char*>(&length), sizeof(length));
+                corrupted.append(reinterpret_cast<const char*>(&masked_crc32_of_length),
+                    sizeof(masked_crc32_of_length));
+                recovery_stats_->skipped_bytes += ScanToNextRecord(corrupted, TFRECORD_HEADER_SIZE, FindRecordHeader);
+                recovery_stats_->resyncs++;
+                continue;
+            }
             ValidateLength(length, masked_crc32_of_length);
+            if (!AcceptsSize(length)) {
+                // The data of a rejected record, and its CRC, are skipped without storing them
+                Skip(length + sizeof(std::uint32_t));
+                continue;
+            }
             storage->resize_uninitialized(length);
             Read(&((*storage)[0]), length);
 
             std::uint32_t footer;
             Read(&footer, sizeof(footer));
+            if (recovery_stats_ && !DataMatchesCrc(storage, length, footer)) {
+                recovery_stats_->skipped_records++;
+                recovery_stats_->skipped_bytes += TFRECORD_HEADER_SIZE + length + sizeof(footer);
+                continue;
+            }
             ValidateData(storage, length, footer);
+            if (!AcceptsData(storage->data(), length)) {
+                continue;
+            }
             if (num_bad_recs > 0) {
                 std::cout << "Data record parsed successfully, but previous "
                     << num_bad_recs << " recs failed CRC check";
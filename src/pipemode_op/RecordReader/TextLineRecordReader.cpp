@@ -47,6 +47,15 @@ void TextLineRecordReader::FillBuffer() {
 }
 
 bool TextLineRecordReader::ReadRecord(::tensorflow::tstring* data) {
+    while (ReadLine(data)) {
+        if (AcceptsSize(data->size()) && AcceptsData(data->data(), data->size())) {
+            return true;
+        }
+    }
+    return false;
+}
+
+bool TextLineRecordReader::ReadLine(::tensorflow::tstring* data) {
     data->resize_uninitialized(0);
     static const std::size_t STEP_SIZE = 1024;
     while (true) {
@@ -74,6 +74,12 @@ class TextLineRecordReader : public RecordReader {
     void FillBuffer();
 
  private:
+    /**
+       Reads the next line into data, whether or not the filter keeps it. Returns false if no
+       lines remain.
+     */
+    bool ReadLine(::tensorflow::tstring* data);
+
     const char delim_;
 
     // The read-ahead buffer
@@ -0,0 +1,48 @@
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include <chrono>
+#include <thread>
+#include <BufferWaitTime.hpp>
+#include "TestBufferWaitTime.hpp"
+
+using sagemaker::tensorflow::BufferWaitTime;
+using sagemaker::tensorflow::BufferWaitTimeTest;
+
+BufferWaitTimeTest::BufferWaitTimeTest() {}
+
+BufferWaitTimeTest::~BufferWaitTimeTest() {}
+
+void BufferWaitTimeTest::SetUp() {}
+
+void BufferWaitTimeTest::TearDown() {}
+
+TEST_F(BufferWaitTimeTest, test_empty_buffer) {
+    BufferWaitTime wait;
+    wait.Update(0);
+    std::this_thread::sleep_for(std::chrono::milliseconds(10));
+    wait.Update(0);
+    EXPECT_EQ(0, wait.Total().count());
+}
+
+TEST_F(BufferWaitTimeTest, test_records_waiting) {
+    BufferWaitTime wait;
+    wait.Update(3);
+    std::this_thread::sleep_for(std::chrono::milliseconds(20));
+    wait.Update(1);
+    std::this_thread::sleep_for(std::chrono::milliseconds(20));
+    wait.Update(0);
+    // Three records waited 20 ms and one record 20 ms more
+    EXPECT_GE(wait.Total(), std::chrono::milliseconds(80));
+    EXPECT_LT(wait.Total(), std::chrono::milliseconds(400));
+}
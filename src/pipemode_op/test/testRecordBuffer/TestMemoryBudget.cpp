@@ -0,0 +1,71 @@
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include <memory>
+#include <MemoryBudget.hpp>
+#include "TestMemoryBudget.hpp"
+
+using sagemaker::tensorflow::MemoryAccount;
+using sagemaker::tensorflow::MemoryBudget;
+using sagemaker::tensorflow::MemoryBudgetTest;
+
+MemoryBudgetTest::MemoryBudgetTest() {}
+
+MemoryBudgetTest::~MemoryBudgetTest() {}
+
+void MemoryBudgetTest::SetUp() {}
+
+void MemoryBudgetTest::TearDown() {}
+
+TEST_F(MemoryBudgetTest, test_unlimited) {
+    MemoryBudget budget;
+    MemoryAccount account(&budget);
+    account.Acquire(1 << 30);
+    EXPECT_FALSE(account.OverBudget());
+    EXPECT_EQ(1 << 30, budget.Used());
+}
+
+TEST_F(MemoryBudgetTest, test_fair_share) {
+    MemoryBudget budget(100);
+    MemoryAccount first(&budget);
+    MemoryAccount second(&budget);
+    first.Acquire(80);
+    EXPECT_FALSE(first.OverBudget());
+    second.Acquire(30);
+    // Only the account over its fair share of 50 bytes stops reading ahead
+    EXPECT_TRUE(first.OverBudget());
+    EXPECT_FALSE(second.OverBudget());
+    first.Release(40);
+    EXPECT_FALSE(first.OverBudget());
+    EXPECT_EQ(40, first.Used());
+    EXPECT_EQ(80, first.Peak());
+    EXPECT_EQ(70, budget.Used());
+}
+
+TEST_F(MemoryBudgetTest, test_destroyed_account_returns_bytes) {
+    MemoryBudget budget(100);
+    MemoryAccount account(&budget);
+    {
+        MemoryAccount other(&budget);
+        other.Acquire(90);
+        account.Acquire(20);
+        EXPECT_FALSE(account.OverBudget());
+        budget.SetLimit(60);
+        EXPECT_TRUE(other.OverBudget());
+        EXPECT_FALSE(account.OverBudget());
+    }
+    EXPECT_EQ(20, budget.Used());
+    EXPECT_FALSE(account.OverBudget());
+    account.Acquire(50);
+    EXPECT_TRUE(account.OverBudget());
+}
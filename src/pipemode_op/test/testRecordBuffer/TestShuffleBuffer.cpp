@@ -0,0 +1,142 @@
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include <algorithm>
+#include <stdexcept>
+#include <string>
+#include <vector>
+#include <ShuffleBuffer.hpp>
+#include "TestShuffleBuffer.hpp"
+
+using sagemaker::tensorflow::ShuffleBuffer;
+using sagemaker::tensorflow::ShuffleBufferTest;
+
+ShuffleBufferTest::ShuffleBufferTest() {}
+
+ShuffleBufferTest::~ShuffleBufferTest() {}
+
+void ShuffleBufferTest::SetUp() {}
+
+void ShuffleBufferTest::TearDown() {}
+
+std::string TakeRecord(ShuffleBuffer* buffer) {
+    const char* data;
+    std::size_t size = buffer->Take(&data);
+    return std::string(data, size);
+}
+
+std::vector<std::string> Shuffle(std::size_t capacity, std::uint64_t seed, int num_records) {
+    ShuffleBuffer buffer(capacity, seed);
+    std::vector<std::string> shuffled;
+    for (int i = 0; i < num_records; i++) {
+        std::string record = "record" + std::to_string(i);
+        while (!buffer.Fits(record.size())) {
+            shuffled.push_back(TakeRecord(&buffer));
+        }
+        buffer.Add(record.data(), record.size());
+    }
+    while (!buffer.Empty()) {
+        shuffled.push_back(TakeRecord(&buffer));
+    }
+    return shuffled;
+}
+
+TEST_F(ShuffleBufferTest, EmptyBuffer) {
+    ShuffleBuffer buffer(1024, 0);
+    EXPECT_TRUE(buffer.Empty());
+    const char* data;
+    EXPECT_THROW({
+        buffer.Take(&data);},
+        std::out_of_range);
+}
+
+TEST_F(ShuffleBufferTest, AddAndTake) {
+    ShuffleBuffer buffer(1024, 0);
+    buffer.Add("abc", 3);
+    EXPECT_EQ(1, buffer.NumRecords());
+    EXPECT_EQ("abc", TakeRecord(&buffer));
+    EXPECT_TRUE(buffer.Empty());
+}
+
+TEST_F(ShuffleBufferTest, EmptyRecord) {
+    ShuffleBuffer buffer(1024, 0);
+    buffer.Add("", 0);
+    EXPECT_EQ("", TakeRecord(&buffer));
+}
+
+TEST_F(ShuffleBufferTest, IndexCountsAgainstCapacity) {
+    // Each record takes its size plus a 16 byte index entry.
+    ShuffleBuffer buffer(64, 0);
+    EXPECT_TRUE(buffer.Fits(48));
+    EXPECT_FALSE(buffer.Fits(49));
+    buffer.Add("abcd", 4);
+    buffer.Add("abcd", 4);
+    EXPECT_TRUE(buffer.Fits(8));
+    EXPECT_FALSE(buffer.Fits(9));
+}
+
+TEST_F(ShuffleBufferTest, AddTooLargeRecord) {
+    ShuffleBuffer buffer(64, 0);
+    EXPECT_THROW({
+        buffer.Add(std::string(64, 'a').data(), 64);},
+        std::length_error);
+}
+
+TEST_F(ShuffleBufferTest, HolesAreReclaimed) {
+    ShuffleBuffer buffer(256, 0);
+    std::vector<std::string> expected;
+    for (int i = 0; buffer.Fits(10); i++) {
+        std::string record = std::to_string(1000000000 + i);
+        buffer.Add(record.data(), record.size());
+        expected.push_back(record);
+    }
+    std::vector<std::string> taken;
+    while (!buffer.Fits(10)) {
+        taken.push_back(TakeRecord(&buffer));
+    }
+    buffer.Add("abcdefghij", 10);
+    expected.push_back("abcdefghij");
+    while (!buffer.Empty()) {
+        taken.push_back(TakeRecord(&buffer));
+    }
+    std::sort(expected.begin(), expected.end());
+    std::sort(taken.begin(), taken.end());
+    EXPECT_EQ(expected, taken);
+}
+
+TEST_F(ShuffleBufferTest, ShuffleIsPermutation) {
+    std::vector<std::string> shuffled = Shuffle(512, 7, 1000);
+    ASSERT_EQ(1000, shuffled.size());
+    std::vector<std::string> sorted = shuffled;
+    std::sort(sorted.begin(), sorted.end());
+    std::vector<std::string> expected;
+    for (int i = 0; i < 1000; i++) {
+        expected.push_back("record" + std::to_string(i));
+    }
+    std::sort(expected.begin(), expected.end());
+    EXPECT_EQ(expected, sorted);
+}
+
+TEST_F(ShuffleBufferTest, ShuffleChangesOrder) {
+    std::vector<std::string> shuffled = Shuffle(512, 7, 1000);
+    std::vector<std::string> sequential = Shuffle(512, 7, 0);
+    for (int i = 0; i < 1000; i++) {
+        sequential.push_back("record" + std::to_string(i));
+    }
+    EXPECT_NE(sequential, shuffled);
+}
+
+TEST_F(ShuffleBufferTest, SameSeedSameOrder) {
+    EXPECT_EQ(Shuffle(512, 7, 1000), Shuffle(512, 7, 1000));
+    EXPECT_NE(Shuffle(512, 7, 1000), Shuffle(512, 8, 1000));
+}
@@ -0,0 +1,92 @@
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include <cstdint>
+#include <cstring>
+#include <SlabPool.hpp>
+#include "TestSlabPool.hpp"
+
+using sagemaker::tensorflow::SlabPool;
+using sagemaker::tensorflow::SlabPoolStats;
+using sagemaker::tensorflow::SlabPoolTest;
+
+SlabPoolTest::SlabPoolTest() {}
+
+SlabPoolTest::~SlabPoolTest() {}
+
+void SlabPoolTest::SetUp() {}
+
+void SlabPoolTest::TearDown() {}
+
+TEST_F(SlabPoolTest, test_size_classes) {
+    SlabPool pool;
+    std::size_t slab_size;
+    char* slab = pool.Allocate(1, &slab_size);
+    EXPECT_EQ(SLAB_POOL_MIN_SLAB_BYTES, slab_size);
+    pool.Release(slab, slab_size);
+    slab = pool.Allocate(100, &slab_size);
+    EXPECT_EQ(128, slab_size);
+    EXPECT_EQ(0, reinterpret_cast<std::uintptr_t>(slab) % SLAB_POOL_ALIGNMENT);
+    std::memset(slab, 'x', slab_size);
+    pool.Release(slab, slab_size);
+    slab = pool.Allocate(SLAB_POOL_MAX_SLAB_BYTES, &slab_size);
+    EXPECT_EQ(SLAB_POOL_MAX_SLAB_BYTES, slab_size);
+    pool.Release(slab, slab_size);
+    slab = pool.Allocate(SLAB_POOL_MAX_SLAB_BYTES + 1, &slab_size);
+    EXPECT_EQ(SLAB_POOL_MAX_SLAB_BYTES + 1, slab_size);
+    pool.Release(slab, slab_size);
+    SlabPoolStats stats = pool.Stats();
+    EXPECT_EQ(0, stats.hits);
+    EXPECT_EQ(4, stats.misses);
+    EXPECT_EQ(3, stats.recycled);
+}
+
+TEST_F(SlabPoolTest, test_reuse_released_slabs) {
+    SlabPool pool;
+    std::size_t slab_size;
+    char* first = pool.Allocate(100, &slab_size);
+    pool.Release(first, slab_size);
+    // Slabs of the same size class are reused, and of other size classes are not
+    EXPECT_EQ(first, pool.Allocate(120, &slab_size));
+    char* second = pool.Allocate(100, &slab_size);
+    EXPECT_NE(first, second);
+    char* large = pool.Allocate(1000, &slab_size);
+    pool.Release(large, slab_size);
+    pool.Release(second, 128);
+    pool.Release(first, 128);
+    SlabPoolStats stats = pool.Stats();
+    EXPECT_EQ(1, stats.hits);
+    EXPECT_EQ(3, stats.misses);
+    EXPECT_EQ(4, stats.recycled);
+}
+
+TEST_F(SlabPoolTest, test_max_free_bytes) {
+    SlabPool pool(256);
+    std::size_t slab_size;
+    char* first = pool.Allocate(128, &slab_size);
+    char* second = pool.Allocate(128, &slab_size);
+    char* third = pool.Allocate(128, &slab_size);
+    pool.Release(first, slab_size);
+    pool.Release(second, slab_size);
+    // Freed, since the pool keeps no more than 256 bytes of free slabs
+    pool.Release(third, slab_size);
+    EXPECT_EQ(2, pool.Stats().recycled);
+    first = pool.Allocate(128, &slab_size);
+    second = pool.Allocate(128, &slab_size);
+    third = pool.Allocate(128, &slab_size);
+    EXPECT_EQ(2, pool.Stats().hits);
+    EXPECT_EQ(4, pool.Stats().misses);
+    pool.Release(first, slab_size);
+    pool.Release(second, slab_size);
+    pool.Release(third, slab_size);
+}
@@ -0,0 +1,132 @@
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include <sys/stat.h>
+#include <memory>
+#include <stdexcept>
+#include <string>
+#include <RecordCache.hpp>
+#include "TestRecordCache.hpp"
+
+using sagemaker::tensorflow::RecordCacheReader;
+using sagemaker::tensorflow::RecordCacheTest;
+using sagemaker::tensorflow::RecordCacheWriter;
+
+RecordCacheTest::RecordCacheTest() {}
+
+RecordCacheTest::~RecordCacheTest() {}
+
+void RecordCacheTest::SetUp() {}
+
+void RecordCacheTest::TearDown() {}
+
+std::string CreateTemporaryDirectory() {
+    char mkdTemplate[] = "/tmp/tmpdir.XXXXXX";
+    return std::string(mkdtemp(mkdTemplate));
+}
+
+void WriteCache(const std::string& cache_dir, const std::string& channel, int num_records,
+    std::uint64_t max_bytes = 0) {
+    RecordCacheWriter writer(cache_dir, channel, max_bytes);
+    for (int i = 0; i < num_records; i++) {
+        std::string record = "record" + std::to_string(i);
+        writer.Append(record.data(), record.size());
+    }
+    writer.Finalize();
+}
+
+TEST_F(RecordCacheTest, MissingCache) {
+    std::string cache_dir = CreateTemporaryDirectory();
+    EXPECT_EQ(nullptr, RecordCacheReader::Open(cache_dir, "elizabeth"));
+}
+
+TEST_F(RecordCacheTest, UnfinalizedCacheIsNotPublished) {
+    std::string cache_dir = CreateTemporaryDirectory();
+    {
+        RecordCacheWriter writer(cache_dir, "elizabeth", 0);
+        writer.Append("abc", 3);
+    }
+    EXPECT_EQ(nullptr, RecordCacheReader::Open(cache_dir, "elizabeth"));
+}
+
+TEST_F(RecordCacheTest, ReadCompleteCache) {
+    std::string cache_dir = CreateTemporaryDirectory();
+    WriteCache(cache_dir, "elizabeth", 100);
+    std::unique_ptr<RecordCacheReader> reader = RecordCacheReader::Open(cache_dir, "elizabeth");
+    ASSERT_NE(nullptr, reader);
+    EXPECT_TRUE(reader->IsComplete());
+    EXPECT_EQ(100, reader->NumRecords());
+    const char* data;
+    for (int i = 99; i >= 0; i--) {
+        std::size_t size = reader->GetRecord(i, &data);
+        EXPECT_EQ("record" + std::to_string(i), std::string(data, size));
+    }
+}
+
+TEST_F(RecordCacheTest, ReadEmptyCache) {
+    std::string cache_dir = CreateTemporaryDirectory();
+    WriteCache(cache_dir, "elizabeth", 0);
+    std::unique_ptr<RecordCacheReader> reader = RecordCacheReader::Open(cache_dir, "elizabeth");
+    ASSERT_NE(nullptr, reader);
+    EXPECT_TRUE(reader->IsComplete());
+    EXPECT_EQ(0, reader->NumRecords());
+}
+
+TEST_F(RecordCacheTest, ReadEmptyRecord) {
+    std::string cache_dir = CreateTemporaryDirectory();
+    RecordCacheWriter writer(cache_dir, "elizabeth", 0);
+    writer.Append("", 0);
+    writer.Finalize();
+    std::unique_ptr<RecordCacheReader> reader = RecordCacheReader::Open(cache_dir, "elizabeth");
+    const char* data;
+    EXPECT_EQ(0, reader->GetRecord(0, &data));
+}
+
+TEST_F(RecordCacheTest, ReadOutOfRange) {
+    std::string cache_dir = CreateTemporaryDirectory();
+    WriteCache(cache_dir, "elizabeth", 3);
+    std::unique_ptr<RecordCacheReader> reader = RecordCacheReader::Open(cache_dir, "elizabeth");
+    const char* data;
+    EXPECT_THROW({
+        reader->GetRecord(3, &data);},
+        std::out_of_range);
+}
+
+TEST_F(RecordCacheTest, PartialCacheWithinBudget) {
+    std::string cache_dir = CreateTemporaryDirectory();
+    // The header and the first offset take 32 bytes, each record "recordN" adds 15 bytes.
+    WriteCache(cache_dir, "elizabeth", 10, 32 + 4 * 15);
+    std::unique_ptr<RecordCacheReader> reader = RecordCacheReader::Open(cache_dir, "elizabeth");
+    ASSERT_NE(nullptr, reader);
+    EXPECT_FALSE(reader->IsComplete());
+    EXPECT_EQ(4, reader->NumRecords());
+    const char* data;
+    std::size_t size = reader->GetRecord(3, &data);
+    EXPECT_EQ("record3", std::string(data, size));
+}
+
+TEST_F(RecordCacheTest, AppendFailsOnceBudgetIsExhausted) {
+    std::string cache_dir = CreateTemporaryDirectory();
+    RecordCacheWriter writer(cache_dir, "elizabeth", 64);
+    EXPECT_TRUE(writer.Append("abc", 3));
+    EXPECT_FALSE(writer.Append(std::string(100, 'a').data(), 100));
+    EXPECT_FALSE(writer.Append("abc", 3));
+}
+
+TEST_F(RecordCacheTest, TwoChannels) {
+    std::string cache_dir = CreateTemporaryDirectory();
+    WriteCache(cache_dir, "elizabeth", 3);
+    WriteCache(cache_dir, "george", 5);
+    EXPECT_EQ(3, RecordCacheReader::Open(cache_dir, "elizabeth")->NumRecords());
+    EXPECT_EQ(5, RecordCacheReader::Open(cache_dir, "george")->NumRecords());
+}
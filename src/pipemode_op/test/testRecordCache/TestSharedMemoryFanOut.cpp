@@ -0,0 +1,197 @@
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include <sys/mman.h>
+#include <sys/wait.h>
+#include <fcntl.h>
+#include <unistd.h>
+#include <stdexcept>
+#include <string>
+#include <thread>
+#include <SharedMemoryFanOut.hpp>
+#include "TestSharedMemoryFanOut.hpp"
+
+using sagemaker::tensorflow::FanOutRead;
+using sagemaker::tensorflow::SharedMemoryFanOut;
+using sagemaker::tensorflow::SharedMemoryFanOutTest;
+
+SharedMemoryFanOutTest::SharedMemoryFanOutTest() {}
+
+SharedMemoryFanOutTest::~SharedMemoryFanOutTest() {}
+
+void SharedMemoryFanOutTest::SetUp() {}
+
+void SharedMemoryFanOutTest::TearDown() {}
+
+namespace {
+
+std::string UniqueFanOutName() {
+    static int counter = 0;
+    return "/pipemode-fanout-test-" + std::to_string(getpid()) + "-" + std::to_string(counter++);
+}
+
+std::string FanOutRecord(int i) {
+    return "record" + std::string(i % 20, 'x') + std::to_string(i);
+}
+
+void Write(SharedMemoryFanOut* leader, std::uint32_t consumer, const std::string& record) {
+    while (!leader->TryWrite(consumer, record.data(), record.size())) {
+        std::this_thread::yield();
+    }
+}
+
+/**
+   Returns the next record of a consumer, or "<end>" at the end of an epoch.
+ */
+std::string Read(SharedMemoryFanOut* consumer) {
+    const char* data;
+    std::size_t size;
+    while (true) {
+        FanOutRead read = consumer->TryRead(&data, &size);
+        if (read == FanOutRead::RECORD) {
+            return std::string(data, size);
+        } else if (read == FanOutRead::END_OF_EPOCH) {
+            return "<end>";
+        }
+        std::this_thread::yield();
+    }
+}
+
+}  // namespace
+
+TEST_F(SharedMemoryFanOutTest, ReadWrittenRecords) {
+    std::string name = UniqueFanOutName();
+    SharedMemoryFanOut leader(name, 2, 0, 256);
+    SharedMemoryFanOut consumer(name, 2, 1, 256);
+    EXPECT_TRUE(leader.IsLeader());
+    EXPECT_FALSE(consumer.IsLeader());
+    EXPECT_EQ(2, consumer.NumConsumers());
+    // Records are read as they are written, so the ring wraps many times
+    for (int i = 0; i < 1000; i++) {
+        Write(&leader, 1, FanOutRecord(i));
+        EXPECT_EQ(FanOutRecord(i), Read(&consumer));
+    }
+    EXPECT_TRUE(leader.TryEndEpoch(1));
+    EXPECT_EQ("<end>", Read(&consumer));
+    const char* data;
+    std::size_t size;
+    EXPECT_EQ(FanOutRead::EMPTY, consumer.TryRead(&data, &size));
+}
+
+TEST_F(SharedMemoryFanOutTest, FullRingWaitsForConsumer) {
+    std::string name = UniqueFanOutName();
+    SharedMemoryFanOut leader(name, 2, 0, 64);
+    SharedMemoryFanOut consumer(name, 2, 1, 64);
+    // Each entry takes 16 bytes, and records leave 8 bytes for the end of an epoch
+    for (int i = 0; i < 3; i++) {
+        EXPECT_TRUE(leader.TryWrite(1, "abcd", 4));
+    }
+    EXPECT_FALSE(leader.TryWrite(1, "abcd", 4));
+    EXPECT_EQ("abcd", Read(&consumer));
+    // The record read stays in the ring until the next read
+    EXPECT_FALSE(leader.TryWrite(1, "abcd", 4));
+    EXPECT_EQ("abcd", Read(&consumer));
+    EXPECT_TRUE(leader.TryWrite(1, "efgh", 4));
+    EXPECT_THROW(leader.TryWrite(1, std::string(64, 'a').data(), 64), std::runtime_error);
+}
+
+TEST_F(SharedMemoryFanOutTest, EndOfEpochFitsInFullRing) {
+    std::string name = UniqueFanOutName();
+    SharedMemoryFanOut leader(name, 2, 0, 64);
+    SharedMemoryFanOut consumer(name, 2, 1, 64);
+    EXPECT_TRUE(leader.TryWrite(1, std::string(40, 'a').data(), 40));
+    EXPECT_FALSE(leader.TryWrite(1, "abcd", 4));
+    EXPECT_TRUE(leader.TryEndEpoch(1));
+    EXPECT_EQ(std::string(40, 'a'), Read(&consumer));
+    EXPECT_EQ("<end>", Read(&consumer));
+}
+
+TEST_F(SharedMemoryFanOutTest, SharedAcrossProcesses) {
+    std::string name = UniqueFanOutName();
+    SharedMemoryFanOut leader(name, 3, 0, 4096);
+    pid_t pids[2];
+    for (std::uint32_t consumer = 1; consumer < 3; consumer++) {
+        pids[consumer - 1] = fork();
+        if (pids[consumer - 1] == 0) {
+            bool matches = true;
+            {
+                SharedMemoryFanOut child(name, 3, consumer, 4096);
+                for (int i = consumer; i < 3000; i += 3) {
+                    matches = matches && FanOutRecord(i) == Read(&child);
+                }
+                matches = matches && "<end>" == Read(&child);
+            }
+            _exit(matches ? 0 : 1);
+        }
+    }
+    for (int i = 0; i < 3000; i++) {
+        if (i % 3) {
+            Write(&leader, i % 3, FanOutRecord(i));
+        }
+    }
+    for (std::uint32_t consumer = 1; consumer < 3; consumer++) {
+        while (!leader.TryEndEpoch(consumer)) {
+            std::this_thread::yield();
+        }
+    }
+    for (pid_t pid : pids) {
+        int status;
+        waitpid(pid, &status, 0);
+        EXPECT_TRUE(WIFEXITED(status));
+        EXPECT_EQ(0, WEXITSTATUS(status));
+    }
+}
+
+TEST_F(SharedMemoryFanOutTest, DetachedConsumerDiscardsRecords) {
+    std::string name = UniqueFanOutName();
+    SharedMemoryFanOut leader(name, 2, 0, 64);
+    {
+        SharedMemoryFanOut consumer(name, 2, 1, 64);
+    }
+    for (int i = 0; i < 10; i++) {
+        EXPECT_TRUE(leader.TryWrite(1, "abcd", 4));
+    }
+}
+
+TEST_F(SharedMemoryFanOutTest, LeaderExitIsReported) {
+    std::string name = UniqueFanOutName();
+    SharedMemoryFanOut consumer(name, 2, 1, 256);
+    {
+        SharedMemoryFanOut leader(name, 2, 0, 256);
+        Write(&leader, 1, "abcd");
+    }
+    // Records written before the leader exited are still read
+    EXPECT_EQ("abcd", Read(&consumer));
+    const char* data;
+    std::size_t size;
+    EXPECT_THROW(consumer.TryRead(&data, &size), std::runtime_error);
+}
+
+TEST_F(SharedMemoryFanOutTest, RemovedAfterLastDetach) {
+    std::string name = UniqueFanOutName();
+    {
+        SharedMemoryFanOut leader(name, 2, 0, 256);
+        SharedMemoryFanOut consumer(name, 2, 1, 256);
+    }
+    EXPECT_EQ(-1, shm_open(name.c_str(), O_RDWR, 0));
+}
+
+TEST_F(SharedMemoryFanOutTest, InvalidConsumers) {
+    std::string name = UniqueFanOutName();
+    EXPECT_THROW(SharedMemoryFanOut(name, 2, 2, 256), std::invalid_argument);
+    EXPECT_THROW(SharedMemoryFanOut(name, 1, 0, 256), std::invalid_argument);
+    SharedMemoryFanOut leader(name, 2, 0, 256);
+    EXPECT_THROW(SharedMemoryFanOut(name, 2, 0, 256), std::invalid_argument);
+    EXPECT_THROW(SharedMemoryFanOut(name, 3, 1, 256), std::invalid_argument);
+    EXPECT_THROW(SharedMemoryFanOut(name, 2, 1, 512), std::invalid_argument);
+}
@@ -0,0 +1,167 @@
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include <sys/mman.h>
+#include <sys/wait.h>
+#include <fcntl.h>
+#include <unistd.h>
+#include <memory>
+#include <stdexcept>
+#include <string>
+#include <SharedMemoryRecordCache.hpp>
+#include "TestSharedMemoryRecordCache.hpp"
+
+using sagemaker::tensorflow::SharedMemoryCacheCursor;
+using sagemaker::tensorflow::SharedMemoryCacheWriter;
+using sagemaker::tensorflow::SharedMemoryRecordCache;
+using sagemaker::tensorflow::SharedMemoryRecordCacheTest;
+
+SharedMemoryRecordCacheTest::SharedMemoryRecordCacheTest() {}
+
+SharedMemoryRecordCacheTest::~SharedMemoryRecordCacheTest() {}
+
+void SharedMemoryRecordCacheTest::SetUp() {}
+
+void SharedMemoryRecordCacheTest::TearDown() {}
+
+std::string UniqueName() {
+    static int counter = 0;
+    return "/pipemode-test-" + std::to_string(getpid()) + "-" + std::to_string(counter++);
+}
+
+std::string Record(int i) {
+    return "record" + std::to_string(i);
+}
+
+void WriteRecords(SharedMemoryRecordCache* cache, int first, int last) {
+    SharedMemoryCacheWriter writer(cache);
+    for (int i = first; i < last; i++) {
+        std::string record = Record(i);
+        writer.Append(i, record.data(), record.size());
+    }
+}
+
+std::string ReadRecord(SharedMemoryCacheCursor* cursor, int i) {
+    const char* data;
+    std::size_t size;
+    if (!cursor->Read(i, &data, &size)) {
+        return "<missing>";
+    }
+    return std::string(data, size);
+}
+
+TEST_F(SharedMemoryRecordCacheTest, ReadWrittenRecords) {
+    SharedMemoryRecordCache cache(UniqueName(), 1 << 20, 4096);
+    WriteRecords(&cache, 0, 1000);
+    SharedMemoryCacheCursor cursor(&cache);
+    for (int i = 0; i < 1000; i++) {
+        EXPECT_EQ(Record(i), ReadRecord(&cursor, i));
+    }
+    EXPECT_EQ(Record(3), ReadRecord(&cursor, 3));
+    EXPECT_EQ("<missing>", ReadRecord(&cursor, 1000));
+}
+
+TEST_F(SharedMemoryRecordCacheTest, UnsealedRecordsAreNotReadable) {
+    SharedMemoryRecordCache cache(UniqueName(), 1 << 20, 4096);
+    SharedMemoryCacheWriter writer(&cache);
+    writer.Append(0, "abc", 3);
+    SharedMemoryCacheCursor cursor(&cache);
+    EXPECT_EQ("<missing>", ReadRecord(&cursor, 0));
+    writer.Seal();
+    EXPECT_EQ("abc", ReadRecord(&cursor, 0));
+}
+
+TEST_F(SharedMemoryRecordCacheTest, NumRecords) {
+    SharedMemoryRecordCache cache(UniqueName(), 1 << 20);
+    EXPECT_EQ(-1, cache.NumRecords());
+    cache.SetNumRecords(10);
+    EXPECT_EQ(10, cache.NumRecords());
+}
+
+TEST_F(SharedMemoryRecordCacheTest, OversizedRecordIsNotCached) {
+    SharedMemoryRecordCache cache(UniqueName(), 1 << 16, 1024);
+    SharedMemoryCacheWriter writer(&cache);
+    std::string large(2048, 'a');
+    writer.Append(0, large.data(), large.size());
+    writer.Append(1, "abc", 3);
+    writer.Seal();
+    SharedMemoryCacheCursor cursor(&cache);
+    EXPECT_EQ("<missing>", ReadRecord(&cursor, 0));
+    EXPECT_EQ("abc", ReadRecord(&cursor, 1));
+}
+
+TEST_F(SharedMemoryRecordCacheTest, EvictsWhenFull) {
+    SharedMemoryRecordCache cache(UniqueName(), 1 << 16, 1024);
+    WriteRecords(&cache, 0, 10000);
+    SharedMemoryCacheCursor cursor(&cache);
+    EXPECT_EQ("<missing>", ReadRecord(&cursor, 0));
+    EXPECT_EQ(Record(9999), ReadRecord(&cursor, 9999));
+}
+
+TEST_F(SharedMemoryRecordCacheTest, PinnedSegmentsAreNotEvicted) {
+    SharedMemoryRecordCache cache(UniqueName(), 1 << 16, 1024);
+    WriteRecords(&cache, 0, 10);
+    SharedMemoryCacheCursor cursor(&cache);
+    const char* data;
+    std::size_t size;
+    ASSERT_TRUE(cursor.Read(0, &data, &size));
+    WriteRecords(&cache, 10, 10000);
+    EXPECT_EQ(Record(0), std::string(data, size));
+    EXPECT_EQ(Record(1), ReadRecord(&cursor, 1));
+}
+
+TEST_F(SharedMemoryRecordCacheTest, CachedRecordsAreNotDuplicated) {
+    SharedMemoryRecordCache cache(UniqueName(), 1 << 16, 1024);
+    WriteRecords(&cache, 0, 10);
+    WriteRecords(&cache, 0, 20);
+    SharedMemoryCacheCursor cursor(&cache);
+    for (int i = 0; i < 20; i++) {
+        EXPECT_EQ(Record(i), ReadRecord(&cursor, i));
+    }
+}
+
+TEST_F(SharedMemoryRecordCacheTest, SharedAcrossProcesses) {
+    std::string name = UniqueName();
+    SharedMemoryRecordCache cache(name, 1 << 20, 4096);
+    pid_t pid = fork();
+    if (pid == 0) {
+        {
+            SharedMemoryRecordCache child_cache(name, 1 << 20, 4096);
+            WriteRecords(&child_cache, 0, 100);
+            child_cache.SetNumRecords(100);
+        }
+        _exit(0);
+    }
+    int status;
+    waitpid(pid, &status, 0);
+    EXPECT_EQ(100, cache.NumRecords());
+    SharedMemoryCacheCursor cursor(&cache);
+    for (int i = 0; i < 100; i++) {
+        EXPECT_EQ(Record(i), ReadRecord(&cursor, i));
+    }
+}
+
+TEST_F(SharedMemoryRecordCacheTest, RemovedAfterLastDetach) {
+    std::string name = UniqueName();
+    {
+        SharedMemoryRecordCache cache(name, 1 << 20);
+        SharedMemoryRecordCache other(name, 1 << 20);
+    }
+    EXPECT_EQ(-1, shm_open(name.c_str(), O_RDWR, 0));
+}
+
+TEST_F(SharedMemoryRecordCacheTest, TooSmall) {
+    EXPECT_THROW({
+        SharedMemoryRecordCache cache(UniqueName(), 128);},
+        std::runtime_error);
+}
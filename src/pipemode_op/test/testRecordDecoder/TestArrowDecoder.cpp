@@ -0,0 +1,325 @@
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include <algorithm>
+#include <cstring>
+#include <map>
+#include <memory>
+#include <stdexcept>
+#include <string>
+#include <utility>
+#include <vector>
+#include <ArrowDecoder.hpp>
+#include "TestArrowDecoder.hpp"
+
+using sagemaker::tensorflow::ArrowDecoder;
+using sagemaker::tensorflow::ArrowDecoderTest;
+using sagemaker::tensorflow::Column;
+using sagemaker::tensorflow::FieldKind;
+using sagemaker::tensorflow::FieldSpec;
+using sagemaker::tensorflow::FieldType;
+
+ArrowDecoderTest::ArrowDecoderTest() {}
+
+ArrowDecoderTest::~ArrowDecoderTest() {}
+
+void ArrowDecoderTest::SetUp() {}
+
+void ArrowDecoderTest::TearDown() {}
+
+namespace {
+
+/**
+   A flatbuffer table, vector or string, written by FlatNode::Finish.
+ */
+struct FlatNode {
+    enum Kind { TABLE, TABLES, BYTES };
+
+    Kind kind;
+    // The scalar fields of a TABLE, by id
+    std::map<int, std::string> scalars;
+    // The table, vector and string fields of a TABLE, by id, or the elements of TABLES
+    std::map<int, std::shared_ptr<FlatNode>> children;
+    // The length and contents of BYTES
+    std::uint32_t length;
+    std::string bytes;
+
+    std::string Finish() const {
+        std::string buffer(4, '\0');
+        Patch(&buffer, 0, Write(&buffer));
+        return buffer;
+    }
+
+ private:
+    static void Patch(std::string* buffer, std::size_t position, std::size_t target) {
+        std::uint32_t offset = target - position;
+        std::memcpy(&(*buffer)[position], &offset, sizeof(offset));
+    }
+
+    std::size_t Write(std::string* buffer) const {
+        buffer->resize((buffer->size() + 7) / 8 * 8);
+        std::size_t position = buffer->size();
+        if (kind == BYTES) {
+            buffer->append(reinterpret_cast<const char*>(&length), sizeof(length));
+            buffer->append(bytes);
+            return position;
+        }
+        if (kind == TABLES) {
+            std::uint32_t size = children.size();
+            buffer->append(reinterpret_cast<const char*>(&size), sizeof(size));
+            buffer->resize(buffer->size() + 4 * size);
+            for (const auto& child : children) {
+                std::size_t slot = position + 4 + 4 * child.first;
+                Patch(buffer, slot, child.second->Write(buffer));
+            }
+            return position;
+        }
+        // The vtable, followed by the table, whose fields are 8 byte aligned
+        int num_fields = 0;
+        for (const auto& scalar : scalars) {
+            num_fields = std::max(num_fields, scalar.first + 1);
+        }
+        for (const auto& child : children) {
+            num_fields = std::max(num_fields, child.first + 1);
+        }
+        std::vector<std::uint16_t> vtable(2 + num_fields);
+        std::string table(8, '\0');
+        for (const auto& scalar : scalars) {
+            vtable[2 + scalar.first] = table.size();
+            table.append(scalar.second);
+            table.resize((table.size() + 7) / 8 * 8);
+        }
+        for (const auto& child : children) {
+            vtable[2 + child.first] = table.size();
+            table.resize(table.size() + 8);
+        }
+        vtable[0] = vtable.size() * 2;
+        vtable[1] = table.size();
+        std::size_t table_position = position + (vtable.size() * 2 + 7) / 8 * 8;
+        std::int32_t soffset = table_position - position;
+        std::memcpy(&table[0], &soffset, sizeof(soffset));
+        buffer->append(reinterpret_cast<const char*>(vtable.data()), vtable.size() * 2);
+        buffer->resize(table_position);
+        buffer->append(table);
+        for (const auto& child : children) {
+            std::size_t slot = table_position + vtable[2 + child.first];
+            Patch(buffer, slot, child.second->Write(buffer));
+        }
+        return table_position;
+    }
+};
+
+using Node = std::shared_ptr<FlatNode>;
+
+template <typename T>
+std::string Scalar(T value) {
+    return std::string(reinterpret_cast<const char*>(&value), sizeof(value));
+}
+
+Node Table(std::map<int, std::string> scalars, std::map<int, Node> children = {}) {
+    return Node(new FlatNode{FlatNode::TABLE, scalars, children});
+}
+
+Node Tables(std::vector<Node> elements) {
+    std::map<int, Node> children;
+    for (std::size_t i = 0; i < elements.size(); i++) {
+        children[i] = elements[i];
+    }
+    return Node(new FlatNode{FlatNode::TABLES, {}, children});
+}
+
+Node Bytes(std::uint32_t length, const std::string& bytes) {
+    return Node(new FlatNode{FlatNode::BYTES, {}, {}, length, bytes});
+}
+
+Node String(const std::string& text) {
+    return Bytes(text.size(), text + '\0');
+}
+
+// Arrow Type union ids
+const std::uint8_t INT_TYPE = 2;
+const std::uint8_t FLOAT_TYPE = 3;
+const std::uint8_t UTF8_TYPE = 5;
+const std::uint8_t BOOL_TYPE = 6;
+const std::uint8_t LIST_TYPE = 12;
+
+Node IntColumn(const std::string& name, std::int32_t bit_width, bool is_signed = true) {
+    return Table({{2, Scalar<std::uint8_t>(INT_TYPE)}}, {{0, String(name)},
+        {3, Table({{0, Scalar(bit_width)}, {1, Scalar<std::uint8_t>(is_signed)}})}});
+}
+
+Node FloatColumn(const std::string& name, std::int16_t precision) {
+    return Table({{2, Scalar<std::uint8_t>(FLOAT_TYPE)}}, {{0, String(name)}, {3, Table({{0, Scalar(precision)}})}});
+}
+
+Node TypeColumn(const std::string& name, std::uint8_t type, std::vector<Node> children = {}) {
+    return Table({{2, Scalar(type)}}, {{0, String(name)}, {3, Table({})}, {5, Tables(children)}});
+}
+
+std::string SchemaMessage(std::vector<Node> columns) {
+    return Table({{0, Scalar<std::int16_t>(4)}, {1, Scalar<std::uint8_t>(1)}},
+        {{2, Table({}, {{1, Tables(columns)}})}})->Finish();
+}
+
+/**
+   The body of a record batch, whose buffers are 8 byte aligned, and its metadata.
+ */
+struct RecordBatch {
+    std::string metadata;
+    std::string body;
+};
+
+/**
+   Builds a record batch message from the (length, null count) of each node and the
+   contents of each buffer.
+ */
+RecordBatch RecordBatchMessage(std::int64_t num_rows, std::vector<std::pair<std::int64_t, std::int64_t>> nodes,
+    std::vector<std::string> buffers) {
+    RecordBatch batch;
+    std::string node_structs;
+    for (const auto& node : nodes) {
+        node_structs += Scalar(node.first) + Scalar(node.second);
+    }
+    std::string buffer_structs;
+    for (const std::string& buffer : buffers) {
+        buffer_structs += Scalar<std::int64_t>(batch.body.size()) + Scalar<std::int64_t>(buffer.size());
+        batch.body += buffer;
+        batch.body.resize((batch.body.size() + 7) / 8 * 8);
+    }
+    batch.metadata = Table({{0, Scalar<std::int16_t>(4)}, {1, Scalar<std::uint8_t>(3)},
+        {3, Scalar<std::int64_t>(batch.body.size())}},
+        {{2, Table({{0, Scalar(num_rows)}}, {{1, Bytes(nodes.size(), node_structs)},
+            {2, Bytes(buffers.size(), buffer_structs)}})}})->Finish();
+    return batch;
+}
+
+template <typename T>
+std::string Values(std::vector<T> values) {
+    return std::string(reinterpret_cast<const char*>(values.data()), values.size() * sizeof(T));
+}
+
+FieldSpec ArrowField(const std::string& name, FieldType type) {
+    return FieldSpec{name, FieldKind::DENSE, type, {}};
+}
+
+FieldSpec ArrowDefaultField(const std::string& name, FieldType type, const std::string& default_value) {
+    FieldSpec spec = ArrowField(name, type);
+    spec.has_default = true;
+    spec.default_value = default_value;
+    return spec;
+}
+
+bool Decode(ArrowDecoder* decoder, const std::string& metadata, const std::string& body = "") {
+    return decoder->DecodeMessage(metadata.data(), metadata.size(), body.data(), body.size());
+}
+
+template <typename T>
+std::vector<T> ArrowValues(const Column& column) {
+    std::vector<T> values(column.NumValues());
+    std::memcpy(values.data(), column.Data(), values.size() * sizeof(T));
+    return values;
+}
+
+}  // namespace
+
+TEST_F(ArrowDecoderTest, test_shared_and_converted_values) {
+    std::vector<FieldSpec> fields = {ArrowField("x", FieldType::FLOAT32), ArrowField("y", FieldType::INT64)};
+    ArrowDecoder decoder(fields);
+    EXPECT_FALSE(Decode(&decoder, SchemaMessage({IntColumn("y", 16), FloatColumn("x", 1)})));
+    RecordBatch batch = RecordBatchMessage(3, {{3, 0}, {3, 0}},
+        {"", Values<std::int16_t>({1, -2, 3}), "", Values<float>({1.5, 2.5, 3.5})});
+    EXPECT_TRUE(Decode(&decoder, batch.metadata, batch.body));
+    EXPECT_EQ(3, decoder.NumRows());
+    const char* shared = decoder.SharedValues(0);
+    ASSERT_NE(nullptr, shared);
+    EXPECT_EQ(8, shared - batch.body.data());
+    EXPECT_EQ(std::vector<float>({1.5, 2.5, 3.5}), std::vector<float>(reinterpret_cast<const float*>(shared),
+        reinterpret_cast<const float*>(shared) + 3));
+    EXPECT_EQ(nullptr, decoder.SharedValues(1));
+    Column column(fields[1]);
+    decoder.CopyValues(1, &column);
+    EXPECT_EQ(std::vector<std::int64_t>({1, -2, 3}), ArrowValues<std::int64_t>(column));
+}
+
+TEST_F(ArrowDecoderTest, test_skip_nested_columns) {
+    std::vector<FieldSpec> fields = {ArrowField("x", FieldType::FLOAT64)};
+    ArrowDecoder decoder(fields);
+    Decode(&decoder, SchemaMessage({TypeColumn("list", LIST_TYPE, {IntColumn("item", 32)}),
+        TypeColumn("name", UTF8_TYPE), FloatColumn("x", 2)}));
+    RecordBatch batch = RecordBatchMessage(2, {{2, 0}, {3, 0}, {2, 0}, {2, 0}},
+        {"", Values<std::int32_t>({0, 1, 3}), "", Values<std::int32_t>({1, 2, 3}), "",
+            Values<std::int32_t>({0, 1, 2}), "ab", "", Values<double>({0.25, -0.5})});
+    EXPECT_TRUE(Decode(&decoder, batch.metadata, batch.body));
+    Column column(fields[0]);
+    decoder.CopyValues(0, &column);
+    EXPECT_EQ(std::vector<double>({0.25, -0.5}), ArrowValues<double>(column));
+}
+
+TEST_F(ArrowDecoderTest, test_null_values) {
+    std::vector<FieldSpec> fields = {ArrowDefaultField("x", FieldType::INT32, "-1"),
+        ArrowField("y", FieldType::FLOAT32)};
+    ArrowDecoder decoder(fields);
+    Decode(&decoder, SchemaMessage({IntColumn("x", 32), IntColumn("y", 8, false)}));
+    RecordBatch batch = RecordBatchMessage(3, {{3, 1}, {3, 1}},
+        {"\x05", Values<std::int32_t>({7, 0, 9}), "\x03", Values<std::uint8_t>({200, 201, 0})});
+    Decode(&decoder, batch.metadata, batch.body);
+    EXPECT_EQ(nullptr, decoder.SharedValues(0));
+    Column x(fields[0]);
+    decoder.CopyValues(0, &x);
+    EXPECT_EQ(std::vector<std::int32_t>({7, -1, 9}), ArrowValues<std::int32_t>(x));
+    Column y(fields[1]);
+    EXPECT_THROW(decoder.CopyValues(1, &y), std::runtime_error);
+}
+
+TEST_F(ArrowDecoderTest, test_strings_and_bools) {
+    std::vector<FieldSpec> fields = {ArrowDefaultField("name", FieldType::STRING, "none"),
+        ArrowField("flag", FieldType::FLOAT32)};
+    ArrowDecoder decoder(fields);
+    Decode(&decoder, SchemaMessage({TypeColumn("flag", BOOL_TYPE), TypeColumn("name", UTF8_TYPE)}));
+    RecordBatch batch = RecordBatchMessage(3, {{3, 0}, {3, 1}},
+        {"", "\x05", "\x03", Values<std::int32_t>({0, 4, 4, 4}), "bear"});
+    Decode(&decoder, batch.metadata, batch.body);
+    Column name(fields[0]);
+    decoder.CopyValues(0, &name);
+    EXPECT_EQ(std::vector<std::string>({"bear", "", "none"}), name.Strings());
+    Column flag(fields[1]);
+    decoder.CopyValues(1, &flag);
+    EXPECT_EQ(std::vector<float>({1, 0, 1}), ArrowValues<float>(flag));
+}
+
+TEST_F(ArrowDecoderTest, test_invalid_schemas) {
+    std::vector<FieldSpec> fields = {ArrowField("x", FieldType::STRING)};
+    ArrowDecoder decoder(fields);
+    RecordBatch batch = RecordBatchMessage(0, {{0, 0}}, {"", ""});
+    EXPECT_THROW(Decode(&decoder, batch.metadata, batch.body), std::runtime_error);
+    EXPECT_THROW(Decode(&decoder, SchemaMessage({TypeColumn("y", UTF8_TYPE)})), std::runtime_error);
+    EXPECT_THROW(Decode(&decoder, SchemaMessage({IntColumn("x", 32)})), std::runtime_error);
+    EXPECT_THROW(Decode(&decoder, SchemaMessage({FloatColumn("x", 0)})), std::runtime_error);
+    EXPECT_THROW(Decode(&decoder, "\x01\x02"), std::runtime_error);
+}
+
+TEST_F(ArrowDecoderTest, test_truncated_record_batch) {
+    std::vector<FieldSpec> fields = {ArrowField("x", FieldType::INT64)};
+    ArrowDecoder decoder(fields);
+    Decode(&decoder, SchemaMessage({IntColumn("x", 64)}));
+    RecordBatch batch = RecordBatchMessage(3, {{3, 0}}, {"", Values<std::int64_t>({1, 2})});
+    EXPECT_THROW(Decode(&decoder, batch.metadata, batch.body), std::runtime_error);
+}
+
+TEST_F(ArrowDecoderTest, test_invalid_fields) {
+    EXPECT_THROW(ArrowDecoder({FieldSpec{"x", FieldKind::DENSE, FieldType::INT64, {2}}}), std::invalid_argument);
+    EXPECT_THROW(ArrowDecoder({FieldSpec{"x", FieldKind::SPARSE, FieldType::INT64, {}}}), std::invalid_argument);
+    EXPECT_THROW(ArrowDecoder({ArrowDefaultField("x", FieldType::INT64, "a")}), std::invalid_argument);
+    EXPECT_THROW(ArrowDecoder({ArrowField("x", FieldType::INT64), ArrowField("x", FieldType::INT64)}),
+        std::invalid_argument);
+}
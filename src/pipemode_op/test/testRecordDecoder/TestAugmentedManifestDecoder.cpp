@@ -0,0 +1,83 @@
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include <stdexcept>
+#include <string>
+#include <vector>
+#include <AugmentedManifestDecoder.hpp>
+#include "TestAugmentedManifestDecoder.hpp"
+
+using sagemaker::tensorflow::AugmentedManifestDecoder;
+using sagemaker::tensorflow::AugmentedManifestDecoderTest;
+using sagemaker::tensorflow::Batch;
+using sagemaker::tensorflow::FieldKind;
+using sagemaker::tensorflow::FieldSpec;
+using sagemaker::tensorflow::FieldType;
+
+AugmentedManifestDecoderTest::AugmentedManifestDecoderTest() {}
+
+AugmentedManifestDecoderTest::~AugmentedManifestDecoderTest() {}
+
+void AugmentedManifestDecoderTest::SetUp() {}
+
+void AugmentedManifestDecoderTest::TearDown() {}
+
+namespace {
+
+std::vector<FieldSpec> Attributes(const std::vector<std::string>& names) {
+    std::vector<FieldSpec> fields;
+    for (const std::string& name : names) {
+        fields.push_back(FieldSpec{name, FieldKind::DENSE, FieldType::STRING, {}});
+    }
+    return fields;
+}
+
+void DecodeAttribute(AugmentedManifestDecoder* decoder, const std::string& record, Batch* batch) {
+    decoder->Decode(record.data(), record.size(), batch);
+}
+
+}  // namespace
+
+TEST_F(AugmentedManifestDecoderTest, GroupsAttributesIntoRows) {
+    std::vector<FieldSpec> fields = Attributes({"source-ref", "class"});
+    AugmentedManifestDecoder decoder(fields);
+    Batch batch(fields);
+    DecodeAttribute(&decoder, "image-0", &batch);
+    EXPECT_EQ(0, batch.NumRows());
+    DecodeAttribute(&decoder, "cat", &batch);
+    EXPECT_EQ(1, batch.NumRows());
+    DecodeAttribute(&decoder, "image-1", &batch);
+    DecodeAttribute(&decoder, "", &batch);
+    EXPECT_EQ(2, batch.NumRows());
+    decoder.Finish();
+    EXPECT_EQ(std::vector<std::string>({"image-0", "image-1"}), batch.Columns()[0].Strings());
+    EXPECT_EQ(std::vector<std::string>({"cat", ""}), batch.Columns()[1].Strings());
+}
+
+TEST_F(AugmentedManifestDecoderTest, MissingAttributes) {
+    std::vector<FieldSpec> fields = Attributes({"source-ref", "class", "box"});
+    AugmentedManifestDecoder decoder(fields);
+    Batch batch(fields);
+    DecodeAttribute(&decoder, "image-0", &batch);
+    DecodeAttribute(&decoder, "cat", &batch);
+    EXPECT_THROW(decoder.Finish(), std::runtime_error);
+    EXPECT_EQ(0, batch.NumRows());
+}
+
+TEST_F(AugmentedManifestDecoderTest, InvalidAttributes) {
+    EXPECT_THROW(AugmentedManifestDecoder(std::vector<FieldSpec>()), std::invalid_argument);
+    EXPECT_THROW(AugmentedManifestDecoder({FieldSpec{"class", FieldKind::DENSE, FieldType::INT64, {}}}),
+        std::invalid_argument);
+    EXPECT_THROW(AugmentedManifestDecoder({FieldSpec{"class", FieldKind::DENSE, FieldType::STRING, {2}}}),
+        std::invalid_argument);
+}
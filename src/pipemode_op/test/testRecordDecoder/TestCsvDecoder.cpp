@@ -0,0 +1,191 @@
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include <cmath>
+#include <cstdlib>
+#include <cstring>
+#include <limits>
+#include <stdexcept>
+#include <string>
+#include <vector>
+#include <CsvDecoder.hpp>
+#include <NumberParser.hpp>
+#include "TestCsvDecoder.hpp"
+
+using sagemaker::tensorflow::Batch;
+using sagemaker::tensorflow::Column;
+using sagemaker::tensorflow::CsvDecoder;
+using sagemaker::tensorflow::CsvDecoderTest;
+using sagemaker::tensorflow::FieldKind;
+using sagemaker::tensorflow::FieldSpec;
+using sagemaker::tensorflow::FieldType;
+using sagemaker::tensorflow::ParseDouble;
+using sagemaker::tensorflow::ParseInt64;
+using sagemaker::tensorflow::RecordDecoderOptions;
+
+CsvDecoderTest::CsvDecoderTest() {}
+
+CsvDecoderTest::~CsvDecoderTest() {}
+
+void CsvDecoderTest::SetUp() {}
+
+void CsvDecoderTest::TearDown() {}
+
+namespace {
+
+FieldSpec CsvColumn(const std::string& name, FieldType type) {
+    return FieldSpec{name, FieldKind::DENSE, type, {}};
+}
+
+FieldSpec CsvColumn(const std::string& name, FieldType type, const std::string& default_value) {
+    FieldSpec spec = CsvColumn(name, type);
+    spec.has_default = true;
+    spec.default_value = default_value;
+    return spec;
+}
+
+void DecodeLine(CsvDecoder* decoder, const std::string& line, Batch* batch) {
+    decoder->Decode(line.data(), line.size(), batch);
+}
+
+template <typename T>
+std::vector<T> ColumnValues(const Column& column) {
+    std::vector<T> values(column.NumValues());
+    std::memcpy(values.data(), column.Data(), values.size() * sizeof(T));
+    return values;
+}
+
+double Parsed(const std::string& text) {
+    double value;
+    EXPECT_TRUE(ParseDouble(text.data(), text.size(), &value)) << text;
+    return value;
+}
+
+}  // namespace
+
+TEST_F(CsvDecoderTest, test_parse_double_matches_strtod) {
+    std::vector<std::string> numbers = {"0", "-0", "1", "+1", "0.1", "-2.5", ".5", "5.", "3.14159", "1e10",
+        "1E-5", "2.5e+3", "123456789012345678", "0.000001", "1e22", "1e-22", "9007199254740993",
+        "12345678901234567890123", "1e23", "1e-300", "4.9e-324", "1.7976931348623157e308", "00012.5000",
+        "inf", "-inf"};
+    for (const std::string& number : numbers) {
+        EXPECT_EQ(std::strtod(number.c_str(), nullptr), Parsed(number)) << number;
+    }
+    EXPECT_TRUE(std::isnan(Parsed("nan")));
+}
+
+TEST_F(CsvDecoderTest, test_parse_double_rejects_invalid) {
+    double value;
+    for (std::string text : {"", "-", "1.2.3", "1e", "1e+", "abc", "1x", " 1", "1 ", "."}) {
+        EXPECT_FALSE(ParseDouble(text.data(), text.size(), &value)) << text;
+    }
+}
+
+TEST_F(CsvDecoderTest, test_parse_int64) {
+    std::int64_t value;
+    std::string text = "-9223372036854775808";
+    EXPECT_TRUE(ParseInt64(text.data(), text.size(), &value));
+    EXPECT_EQ(std::numeric_limits<std::int64_t>::min(), value);
+    text = "9223372036854775807";
+    EXPECT_TRUE(ParseInt64(text.data(), text.size(), &value));
+    EXPECT_EQ(std::numeric_limits<std::int64_t>::max(), value);
+    text = "+42";
+    EXPECT_TRUE(ParseInt64(text.data(), text.size(), &value));
+    EXPECT_EQ(42, value);
+    for (std::string invalid : {"", "-", "9223372036854775808", "1.5", "12a"}) {
+        EXPECT_FALSE(ParseInt64(invalid.data(), invalid.size(), &value)) << invalid;
+    }
+}
+
+TEST_F(CsvDecoderTest, test_decode_typed_columns) {
+    std::vector<FieldSpec> fields = {CsvColumn("0", FieldType::FLOAT32), CsvColumn("1", FieldType::FLOAT64),
+        CsvColumn("2", FieldType::INT32), CsvColumn("3", FieldType::INT64), CsvColumn("4", FieldType::STRING)};
+    CsvDecoder decoder(fields, {});
+    Batch batch(fields);
+    DecodeLine(&decoder, "1.5,0.25,7,-8000000000,abc", &batch);
+    DecodeLine(&decoder, "2,1e3,-7,8,def\r", &batch);
+    EXPECT_EQ(2, batch.NumRows());
+    EXPECT_EQ(std::vector<float>({1.5, 2}), ColumnValues<float>(batch.Columns()[0]));
+    EXPECT_EQ(std::vector<double>({0.25, 1000}), ColumnValues<double>(batch.Columns()[1]));
+    EXPECT_EQ(std::vector<std::int32_t>({7, -7}), ColumnValues<std::int32_t>(batch.Columns()[2]));
+    EXPECT_EQ(std::vector<std::int64_t>({-8000000000, 8}), ColumnValues<std::int64_t>(batch.Columns()[3]));
+    EXPECT_EQ(std::vector<std::string>({"abc", "def"}), batch.Columns()[4].Strings());
+}
+
+TEST_F(CsvDecoderTest, test_decode_selected_columns) {
+    std::vector<FieldSpec> fields = {CsvColumn("1", FieldType::INT64), CsvColumn("3", FieldType::STRING)};
+    CsvDecoder decoder(fields, {});
+    Batch batch(fields);
+    DecodeLine(&decoder, "not a number,1,skipped,x,ignored,also ignored", &batch);
+    EXPECT_EQ(std::vector<std::int64_t>({1}), ColumnValues<std::int64_t>(batch.Columns()[0]));
+    EXPECT_EQ(std::vector<std::string>({"x"}), batch.Columns()[1].Strings());
+}
+
+TEST_F(CsvDecoderTest, test_decode_defaults) {
+    std::vector<FieldSpec> fields = {CsvColumn("0", FieldType::FLOAT32, "-1"),
+        CsvColumn("1", FieldType::STRING, "none"), CsvColumn("2", FieldType::INT32, "9")};
+    CsvDecoder decoder(fields, {{"na_value", "NA"}});
+    Batch batch(fields);
+    DecodeLine(&decoder, ",NA", &batch);
+    DecodeLine(&decoder, "NA,b,", &batch);
+    EXPECT_EQ(std::vector<float>({-1, -1}), ColumnValues<float>(batch.Columns()[0]));
+    EXPECT_EQ(std::vector<std::string>({"none", "b"}), batch.Columns()[1].Strings());
+    EXPECT_EQ(std::vector<std::int32_t>({9, 9}), ColumnValues<std::int32_t>(batch.Columns()[2]));
+}
+
+TEST_F(CsvDecoderTest, test_decode_quoted_fields) {
+    std::vector<FieldSpec> fields = {CsvColumn("0", FieldType::STRING), CsvColumn("1", FieldType::FLOAT32)};
+    CsvDecoder decoder(fields, {{"field_delim", "\t"}});
+    Batch batch(fields);
+    DecodeLine(&decoder, "\"a\t\"\"b\"\"\"\t\"2.5\"", &batch);
+    EXPECT_EQ(std::vector<std::string>({"a\t\"b\""}), batch.Columns()[0].Strings());
+    EXPECT_EQ(std::vector<float>({2.5}), ColumnValues<float>(batch.Columns()[1]));
+    EXPECT_THROW(DecodeLine(&decoder, "\"unterminated\t1", &batch), std::runtime_error);
+    EXPECT_THROW(DecodeLine(&decoder, "\"a\"b\t1", &batch), std::runtime_error);
+}
+
+TEST_F(CsvDecoderTest, test_decode_skips_repeated_header) {
+    std::vector<FieldSpec> fields = {CsvColumn("0", FieldType::INT64)};
+    CsvDecoder decoder(fields, {{"header", "true"}});
+    Batch batch(fields);
+    DecodeLine(&decoder, "id\r", &batch);
+    DecodeLine(&decoder, "1", &batch);
+    DecodeLine(&decoder, "id", &batch);
+    DecodeLine(&decoder, "2", &batch);
+    EXPECT_EQ(2, batch.NumRows());
+    EXPECT_EQ(std::vector<std::int64_t>({1, 2}), ColumnValues<std::int64_t>(batch.Columns()[0]));
+}
+
+TEST_F(CsvDecoderTest, test_decode_invalid_values_throw) {
+    std::vector<FieldSpec> fields = {CsvColumn("0", FieldType::INT32), CsvColumn("1", FieldType::FLOAT32)};
+    CsvDecoder decoder(fields, {});
+    Batch batch(fields);
+    EXPECT_THROW(DecodeLine(&decoder, "3000000000,1", &batch), std::runtime_error);
+    EXPECT_THROW(DecodeLine(&decoder, "1,x", &batch), std::runtime_error);
+    EXPECT_THROW(DecodeLine(&decoder, "1", &batch), std::runtime_error);
+}
+
+TEST_F(CsvDecoderTest, test_invalid_fields_and_options_throw) {
+    std::vector<FieldSpec> unordered = {CsvColumn("1", FieldType::INT32), CsvColumn("0", FieldType::INT32)};
+    EXPECT_THROW(CsvDecoder(unordered, {}), std::invalid_argument);
+    std::vector<FieldSpec> named = {CsvColumn("x", FieldType::INT32)};
+    EXPECT_THROW(CsvDecoder(named, {}), std::invalid_argument);
+    std::vector<FieldSpec> shaped = {FieldSpec{"0", FieldKind::DENSE, FieldType::INT32, {2}}};
+    EXPECT_THROW(CsvDecoder(shaped, {}), std::invalid_argument);
+    std::vector<FieldSpec> bad_default = {CsvColumn("0", FieldType::INT32, "x")};
+    EXPECT_THROW(CsvDecoder(bad_default, {}), std::invalid_argument);
+    std::vector<FieldSpec> fields = {CsvColumn("0", FieldType::INT32)};
+    EXPECT_THROW(CsvDecoder(fields, {{"field_delim", ",,"}}), std::invalid_argument);
+    EXPECT_THROW(CsvDecoder(fields, {{"header", "yes"}}), std::invalid_argument);
+    EXPECT_THROW(CsvDecoder(fields, {{"quote", "'"}}), std::invalid_argument);
+}
@@ -0,0 +1,112 @@
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include <cstdint>
+#include <cstring>
+#include <stdexcept>
+#include <string>
+#include <vector>
+#include <FixedLengthDecoder.hpp>
+#include "TestFixedLengthDecoder.hpp"
+
+using sagemaker::tensorflow::Batch;
+using sagemaker::tensorflow::Column;
+using sagemaker::tensorflow::FieldKind;
+using sagemaker::tensorflow::FieldSpec;
+using sagemaker::tensorflow::FieldType;
+using sagemaker::tensorflow::FixedLengthDecoder;
+using sagemaker::tensorflow::FixedLengthDecoderTest;
+using sagemaker::tensorflow::RecordDecoderOptions;
+
+FixedLengthDecoderTest::FixedLengthDecoderTest() {}
+
+FixedLengthDecoderTest::~FixedLengthDecoderTest() {}
+
+void FixedLengthDecoderTest::SetUp() {}
+
+void FixedLengthDecoderTest::TearDown() {}
+
+namespace {
+
+std::vector<FieldSpec> ValuesAndLabel() {
+    return {FieldSpec{"values", FieldKind::DENSE, FieldType::FLOAT32, {3}},
+        FieldSpec{"label", FieldKind::DENSE, FieldType::INT64, {}}};
+}
+
+template <typename T>
+std::string Bytes(const std::vector<T>& values) {
+    return std::string(reinterpret_cast<const char*>(values.data()), values.size() * sizeof(T));
+}
+
+// A record with a 2 byte header, three floats, a label and a 1 byte footer
+std::string Record(float first, std::int64_t label) {
+    return "hh" + Bytes(std::vector<float>{first, first + 1, first + 2}) + Bytes(std::vector<std::int64_t>{label})
+        + "f";
+}
+
+template <typename T>
+std::vector<T> Values(const char* data, std::size_t count) {
+    std::vector<T> values(count);
+    std::memcpy(values.data(), data, count * sizeof(T));
+    return values;
+}
+
+}  // namespace
+
+TEST_F(FixedLengthDecoderTest, test_record_bytes) {
+    FixedLengthDecoder decoder(ValuesAndLabel(), {{"record_header_bytes", "2"}, {"record_footer_bytes", "1"},
+        {"header_bytes", "16"}, {"footer_bytes", "4"}});
+    EXPECT_EQ(23, decoder.RecordBytes());
+    EXPECT_EQ(16, decoder.HeaderBytes());
+    EXPECT_EQ(4, decoder.FooterBytes());
+    EXPECT_FALSE(decoder.IsContiguous());
+    EXPECT_TRUE(FixedLengthDecoder({ValuesAndLabel()[0]}, {{"header_bytes", "8"}}).IsContiguous());
+}
+
+TEST_F(FixedLengthDecoderTest, test_decode) {
+    FixedLengthDecoder decoder(ValuesAndLabel(), {{"record_header_bytes", "2"}, {"record_footer_bytes", "1"}});
+    Batch batch(ValuesAndLabel());
+    for (std::int64_t i = 0; i < 2; i++) {
+        std::string record = Record(i * 10, i);
+        decoder.Decode(record.data(), record.size(), &batch);
+    }
+    EXPECT_EQ(2, batch.NumRows());
+    EXPECT_EQ(std::vector<float>({0, 1, 2, 10, 11, 12}), Values<float>(batch.Columns()[0].Data(), 6));
+    EXPECT_EQ(std::vector<std::int64_t>({0, 1}), Values<std::int64_t>(batch.Columns()[1].Data(), 2));
+    EXPECT_THROW(decoder.Decode("hh", 2, &batch), std::runtime_error);
+}
+
+TEST_F(FixedLengthDecoderTest, test_decode_records) {
+    FixedLengthDecoder decoder(ValuesAndLabel(), {{"record_header_bytes", "2"}, {"record_footer_bytes", "1"}});
+    std::string records = Record(0, 7) + Record(10, 8) + Record(20, 9);
+    std::vector<float> values(9);
+    std::vector<std::int64_t> labels(3);
+    decoder.DecodeRecords(records.data(), 3, {reinterpret_cast<char*>(values.data()),
+        reinterpret_cast<char*>(labels.data())});
+    EXPECT_EQ(std::vector<float>({0, 1, 2, 10, 11, 12, 20, 21, 22}), values);
+    EXPECT_EQ(std::vector<std::int64_t>({7, 8, 9}), labels);
+}
+
+TEST_F(FixedLengthDecoderTest, test_invalid_config) {
+    std::vector<FieldSpec> fields = ValuesAndLabel();
+    EXPECT_THROW(FixedLengthDecoder(fields, {{"delimiter", ","}}), std::invalid_argument);
+    EXPECT_THROW(FixedLengthDecoder(fields, {{"header_bytes", "-1"}}), std::invalid_argument);
+    EXPECT_THROW(FixedLengthDecoder(fields, {{"footer_bytes", "x"}}), std::invalid_argument);
+    EXPECT_THROW(FixedLengthDecoder({}, {}), std::invalid_argument);
+    EXPECT_THROW(FixedLengthDecoder({FieldSpec{"s", FieldKind::DENSE, FieldType::STRING, {}}}, {}),
+        std::invalid_argument);
+    EXPECT_THROW(FixedLengthDecoder({FieldSpec{"v", FieldKind::SPARSE, FieldType::FLOAT32, {}}}, {}),
+        std::invalid_argument);
+    fields[1].has_default = true;
+    EXPECT_THROW(FixedLengthDecoder(fields, {}), std::invalid_argument);
+}
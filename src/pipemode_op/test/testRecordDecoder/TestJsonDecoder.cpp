@@ -0,0 +1,164 @@
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include <cstring>
+#include <stdexcept>
+#include <string>
+#include <vector>
+#include <JsonDecoder.hpp>
+#include "TestJsonDecoder.hpp"
+
+using sagemaker::tensorflow::Batch;
+using sagemaker::tensorflow::Column;
+using sagemaker::tensorflow::FieldKind;
+using sagemaker::tensorflow::FieldSpec;
+using sagemaker::tensorflow::FieldType;
+using sagemaker::tensorflow::JsonDecoder;
+using sagemaker::tensorflow::JsonDecoderTest;
+
+JsonDecoderTest::JsonDecoderTest() {}
+
+JsonDecoderTest::~JsonDecoderTest() {}
+
+void JsonDecoderTest::SetUp() {}
+
+void JsonDecoderTest::TearDown() {}
+
+namespace {
+
+FieldSpec JsonField(const std::string& path, FieldType type, std::vector<std::int64_t> shape = {}) {
+    return FieldSpec{path, FieldKind::DENSE, type, shape};
+}
+
+FieldSpec JsonDefaultField(const std::string& path, FieldType type, const std::string& default_value) {
+    FieldSpec spec = JsonField(path, type);
+    spec.has_default = true;
+    spec.default_value = default_value;
+    return spec;
+}
+
+FieldSpec JsonListField(const std::string& path, FieldType type) {
+    return FieldSpec{path, FieldKind::SPARSE, type, {}};
+}
+
+void DecodeJson(JsonDecoder* decoder, const std::string& line, Batch* batch) {
+    decoder->Decode(line.data(), line.size(), batch);
+}
+
+template <typename T>
+std::vector<T> JsonValues(const Column& column) {
+    std::vector<T> values(column.NumValues());
+    std::memcpy(values.data(), column.Data(), values.size() * sizeof(T));
+    return values;
+}
+
+}  // namespace
+
+TEST_F(JsonDecoderTest, test_decode_scalars) {
+    std::vector<FieldSpec> fields = {JsonField("id", FieldType::INT64), JsonField("score", FieldType::FLOAT32),
+        JsonField("name", FieldType::STRING), JsonField("active", FieldType::INT32)};
+    JsonDecoder decoder(fields);
+    Batch batch(fields);
+    DecodeJson(&decoder, "{\"id\": 7, \"score\": 1.5, \"name\": \"bear\", \"active\": true}", &batch);
+    DecodeJson(&decoder, " {\"active\":false,\"name\":\"cat\",\"score\":\"-2e1\",\"id\":8}\r", &batch);
+    EXPECT_EQ(2, batch.NumRows());
+    EXPECT_EQ(std::vector<std::int64_t>({7, 8}), JsonValues<std::int64_t>(batch.Columns()[0]));
+    EXPECT_EQ(std::vector<float>({1.5, -20}), JsonValues<float>(batch.Columns()[1]));
+    EXPECT_EQ(std::vector<std::string>({"bear", "cat"}), batch.Columns()[2].Strings());
+    EXPECT_EQ(std::vector<std::int32_t>({1, 0}), JsonValues<std::int32_t>(batch.Columns()[3]));
+}
+
+TEST_F(JsonDecoderTest, test_decode_nested_paths_and_skips_other_values) {
+    std::vector<FieldSpec> fields = {JsonField("user.id", FieldType::INT64),
+        JsonField("user.address.city", FieldType::STRING)};
+    JsonDecoder decoder(fields);
+    Batch batch(fields);
+    DecodeJson(&decoder, "{\"skipped\": {\"user\": {\"id\": 1}, \"list\": [1, \"]}\", {\"a\": null}]},"
+        " \"user\": {\"name\": \"x\\\"}\", \"address\": {\"city\": \"Paris\", \"zip\": 75001}, \"id\": 2},"
+        " \"tail\": [[]]}", &batch);
+    EXPECT_EQ(std::vector<std::int64_t>({2}), JsonValues<std::int64_t>(batch.Columns()[0]));
+    EXPECT_EQ(std::vector<std::string>({"Paris"}), batch.Columns()[1].Strings());
+}
+
+TEST_F(JsonDecoderTest, test_decode_dense_arrays) {
+    std::vector<FieldSpec> fields = {JsonField("vector", FieldType::FLOAT64, {2}),
+        JsonField("matrix", FieldType::INT32, {2, 2})};
+    JsonDecoder decoder(fields);
+    Batch batch(fields);
+    DecodeJson(&decoder, "{\"vector\": [0.5, 1], \"matrix\": [[1, 2], [3, 4]]}", &batch);
+    EXPECT_EQ(std::vector<double>({0.5, 1}), JsonValues<double>(batch.Columns()[0]));
+    EXPECT_EQ(std::vector<std::int32_t>({1, 2, 3, 4}), JsonValues<std::int32_t>(batch.Columns()[1]));
+    EXPECT_THROW(DecodeJson(&decoder, "{\"vector\": [1], \"matrix\": [1, 2, 3, 4]}", &batch), std::runtime_error);
+}
+
+TEST_F(JsonDecoderTest, test_decode_lists) {
+    std::vector<FieldSpec> fields = {JsonListField("tags", FieldType::STRING)};
+    JsonDecoder decoder(fields);
+    Batch batch(fields);
+    DecodeJson(&decoder, "{\"tags\": [\"a\", \"b\"]}", &batch);
+    DecodeJson(&decoder, "{\"tags\": null}", &batch);
+    DecodeJson(&decoder, "{\"tags\": \"c\"}", &batch);
+    DecodeJson(&decoder, "{}", &batch);
+    EXPECT_EQ(4, batch.NumRows());
+    EXPECT_EQ(std::vector<std::string>({"a", "b", "c"}), batch.Columns()[0].Strings());
+    EXPECT_EQ(std::vector<std::int64_t>({0, 0, 0, 1, 2, 0}), batch.Columns()[0].Indices());
+    EXPECT_EQ(2, batch.Columns()[0].DenseSize());
+}
+
+TEST_F(JsonDecoderTest, test_decode_defaults) {
+    std::vector<FieldSpec> fields = {JsonDefaultField("a", FieldType::FLOAT32, "-1"),
+        JsonDefaultField("b", FieldType::STRING, "none")};
+    JsonDecoder decoder(fields);
+    Batch batch(fields);
+    DecodeJson(&decoder, "{\"a\": null}", &batch);
+    EXPECT_EQ(std::vector<float>({-1}), JsonValues<float>(batch.Columns()[0]));
+    EXPECT_EQ(std::vector<std::string>({"none"}), batch.Columns()[1].Strings());
+}
+
+TEST_F(JsonDecoderTest, test_decode_escaped_strings) {
+    std::vector<FieldSpec> fields = {JsonField("text", FieldType::STRING)};
+    JsonDecoder decoder(fields);
+    Batch batch(fields);
+    DecodeJson(&decoder, "{\"te\\u0078t\": \"a\\\\b\\n\\u00e9\\ud83d\\ude00\\/\"}", &batch);
+    EXPECT_EQ(std::vector<std::string>({"a\\b\n\xc3\xa9\xf0\x9f\x98\x80/"}), batch.Columns()[0].Strings());
+}
+
+TEST_F(JsonDecoderTest, test_skips_blank_lines) {
+    std::vector<FieldSpec> fields = {JsonField("a", FieldType::INT32)};
+    JsonDecoder decoder(fields);
+    Batch batch(fields);
+    DecodeJson(&decoder, "  \r", &batch);
+    EXPECT_EQ(0, batch.NumRows());
+}
+
+TEST_F(JsonDecoderTest, test_invalid_records_throw) {
+    std::vector<FieldSpec> fields = {JsonField("a", FieldType::INT32)};
+    JsonDecoder decoder(fields);
+    Batch batch(fields);
+    for (std::string line : {"{}", "[1]", "{\"a\": 1", "{\"a\": 1} x", "{\"a\": \"x\"}", "{\"a\": 1, \"a\": 2}",
+            "{\"a\": {\"b\": 1}}", "{\"a\": 1.5}", "{\"b\": \"unterminated}", "{a: 1}"}) {
+        EXPECT_THROW(DecodeJson(&decoder, line, &batch), std::runtime_error) << line;
+    }
+}
+
+TEST_F(JsonDecoderTest, test_invalid_fields_throw) {
+    for (std::vector<FieldSpec> fields : std::vector<std::vector<FieldSpec>>({
+            {JsonField("", FieldType::INT32)},
+            {JsonField("a..b", FieldType::INT32)},
+            {JsonField("a", FieldType::INT32), JsonField("a", FieldType::INT32)},
+            {JsonField("a", FieldType::INT32), JsonField("a.b", FieldType::INT32)},
+            {JsonField("a.b", FieldType::INT32), JsonField("a", FieldType::INT32)},
+            {JsonDefaultField("a", FieldType::INT32, "x")}})) {
+        EXPECT_THROW(JsonDecoder decoder(fields), std::invalid_argument) << fields[0].name;
+    }
+}
@@ -0,0 +1,111 @@
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include <chrono>
+#include <functional>
+#include <future>
+#include <memory>
+#include <stdexcept>
+#include <thread>
+#include <vector>
+#include <ParallelStage.hpp>
+#include "TestParallelStage.hpp"
+
+using sagemaker::tensorflow::ParallelStage;
+using sagemaker::tensorflow::ParallelStageTest;
+
+ParallelStageTest::ParallelStageTest() {}
+
+ParallelStageTest::~ParallelStageTest() {}
+
+void ParallelStageTest::SetUp() {}
+
+void ParallelStageTest::TearDown() {}
+
+namespace {
+
+class FunctionTask : public ParallelStage::Task {
+ public:
+    FunctionTask(int id, std::function<void()> function) : id(id), worker(-1), function_(function) {}
+
+    void Run(std::size_t worker) override {
+        function_();
+        this->worker = worker;
+    }
+
+    int id;
+    int worker;
+
+ private:
+    std::function<void()> function_;
+};
+
+int NextId(ParallelStage* stage) {
+    std::unique_ptr<ParallelStage::Task> task = stage->Next();
+    return task ? static_cast<FunctionTask*>(task.get())->id : -1;
+}
+
+}  // namespace
+
+TEST_F(ParallelStageTest, test_deterministic_order) {
+    ParallelStage stage(4, true);
+    EXPECT_EQ(4, stage.NumThreads());
+    for (int i = 0; i < 20; i++) {
+        // Earlier tasks take longer, so they finish after later tasks
+        stage.Submit(std::unique_ptr<ParallelStage::Task>(new FunctionTask(i, [i] {
+            std::this_thread::sleep_for(std::chrono::milliseconds(20 - i));
+        })));
+    }
+    EXPECT_EQ(20, stage.NumPending());
+    for (int i = 0; i < 20; i++) {
+        std::unique_ptr<ParallelStage::Task> task = stage.Next();
+        FunctionTask* function_task = static_cast<FunctionTask*>(task.get());
+        EXPECT_EQ(i, function_task->id);
+        EXPECT_GE(function_task->worker, 0);
+        EXPECT_LT(function_task->worker, 4);
+    }
+    EXPECT_EQ(nullptr, stage.Next());
+}
+
+TEST_F(ParallelStageTest, test_completion_order) {
+    ParallelStage stage(2, false);
+    std::promise<void> release;
+    std::shared_future<void> released = release.get_future().share();
+    stage.Submit(std::unique_ptr<ParallelStage::Task>(new FunctionTask(0, [released] { released.wait(); })));
+    stage.Submit(std::unique_ptr<ParallelStage::Task>(new FunctionTask(1, [] {})));
+    EXPECT_EQ(1, NextId(&stage));
+    release.set_value();
+    EXPECT_EQ(0, NextId(&stage));
+    EXPECT_EQ(-1, NextId(&stage));
+}
+
+TEST_F(ParallelStageTest, test_task_error) {
+    ParallelStage stage(2, true);
+    stage.Submit(std::unique_ptr<ParallelStage::Task>(new FunctionTask(0, [] {
+        throw std::runtime_error("Corrupted record");
+    })));
+    stage.Submit(std::unique_ptr<ParallelStage::Task>(new FunctionTask(1, [] {})));
+    EXPECT_THROW(stage.Next(), std::runtime_error);
+    EXPECT_EQ(1, NextId(&stage));
+    EXPECT_THROW(ParallelStage(0, true), std::invalid_argument);
+}
+
+TEST_F(ParallelStageTest, test_stop_with_pending_tasks) {
+    std::unique_ptr<ParallelStage> stage(new ParallelStage(1, true));
+    for (int i = 0; i < 100; i++) {
+        stage->Submit(std::unique_ptr<ParallelStage::Task>(new FunctionTask(i, [] {
+            std::this_thread::sleep_for(std::chrono::milliseconds(1));
+        })));
+    }
+    stage.reset();
+}
@@ -0,0 +1,217 @@
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include <cstring>
+#include <stdexcept>
+#include <string>
+#include <vector>
+#include <RecordIOProtobufDecoder.hpp>
+#include "TestRecordIOProtobufDecoder.hpp"
+
+using sagemaker::tensorflow::Batch;
+using sagemaker::tensorflow::Column;
+using sagemaker::tensorflow::FieldKind;
+using sagemaker::tensorflow::FieldSpec;
+using sagemaker::tensorflow::FieldType;
+using sagemaker::tensorflow::RecordIOProtobufDecoder;
+using sagemaker::tensorflow::RecordIOProtobufDecoderTest;
+
+RecordIOProtobufDecoderTest::RecordIOProtobufDecoderTest() {}
+
+RecordIOProtobufDecoderTest::~RecordIOProtobufDecoderTest() {}
+
+void RecordIOProtobufDecoderTest::SetUp() {}
+
+void RecordIOProtobufDecoderTest::TearDown() {}
+
+std::string Varint(std::uint64_t value) {
+    std::string bytes;
+    while (value >= 0x80) {
+        bytes += static_cast<char>((value & 0x7f) | 0x80);
+        value >>= 7;
+    }
+    bytes += static_cast<char>(value);
+    return bytes;
+}
+
+std::string LengthDelimited(int field_number, const std::string& data) {
+    return Varint(field_number << 3 | 2) + Varint(data.size()) + data;
+}
+
+std::string PackedVarints(int field_number, const std::vector<std::int64_t>& values) {
+    std::string packed;
+    for (std::int64_t value : values) {
+        packed += Varint(value);
+    }
+    return values.empty() ? "" : LengthDelimited(field_number, packed);
+}
+
+template <typename T>
+std::string PackedFixed(int field_number, const std::vector<T>& values) {
+    return LengthDelimited(field_number, std::string(reinterpret_cast<const char*>(values.data()),
+        values.size() * sizeof(T)));
+}
+
+std::string Float32Value(const std::vector<float>& values, const std::vector<std::int64_t>& keys = {},
+    const std::vector<std::int64_t>& shape = {}) {
+    return LengthDelimited(2, PackedFixed(1, values) + PackedVarints(2, keys) + PackedVarints(3, shape));
+}
+
+std::string Int32Value(const std::vector<std::int64_t>& values) {
+    return LengthDelimited(7, PackedVarints(1, values));
+}
+
+std::string BytesValue(const std::vector<std::string>& values) {
+    std::string bytes;
+    for (const std::string& value : values) {
+        bytes += LengthDelimited(1, value);
+    }
+    return LengthDelimited(9, bytes);
+}
+
+std::string Entry(int map, const std::string& key, const std::string& value) {
+    return LengthDelimited(map, LengthDelimited(1, key) + LengthDelimited(2, value));
+}
+
+FieldSpec Dense(const std::string& name, FieldType type, std::vector<std::int64_t> shape) {
+    return FieldSpec{name, FieldKind::DENSE, type, shape};
+}
+
+FieldSpec Sparse(const std::string& name, FieldType type) {
+    return FieldSpec{name, FieldKind::SPARSE, type, {}};
+}
+
+template <typename T>
+std::vector<T> Values(const Column& column) {
+    const T* data = reinterpret_cast<const T*>(column.Data());
+    return std::vector<T>(data, data + column.NumValues());
+}
+
+void Decode(RecordIOProtobufDecoder* decoder, const std::string& record, Batch* batch) {
+    decoder->Decode(record.data(), record.size(), batch);
+}
+
+TEST_F(RecordIOProtobufDecoderTest, DenseFeatures) {
+    std::vector<FieldSpec> fields = {Dense("features/values", FieldType::FLOAT32, {3})};
+    RecordIOProtobufDecoder decoder(fields);
+    Batch batch(fields);
+    Decode(&decoder, Entry(1, "values", Float32Value({1, 2, 3})), &batch);
+    Decode(&decoder, Entry(1, "values", Float32Value({4, 5, 6})), &batch);
+    EXPECT_EQ(2, batch.NumRows());
+    EXPECT_EQ(std::vector<float>({1, 2, 3, 4, 5, 6}), Values<float>(batch.Columns()[0]));
+}
+
+TEST_F(RecordIOProtobufDecoderTest, ConvertsValues) {
+    std::vector<FieldSpec> fields = {Dense("features/values", FieldType::INT64, {2})};
+    RecordIOProtobufDecoder decoder(fields);
+    Batch batch(fields);
+    Decode(&decoder, Entry(1, "values", Float32Value({1, 2})), &batch);
+    EXPECT_EQ(std::vector<std::int64_t>({1, 2}), Values<std::int64_t>(batch.Columns()[0]));
+}
+
+TEST_F(RecordIOProtobufDecoderTest, NegativeInt32Label) {
+    std::vector<FieldSpec> fields = {Dense("label/values", FieldType::INT32, {})};
+    RecordIOProtobufDecoder decoder(fields);
+    Batch batch(fields);
+    Decode(&decoder, Entry(2, "values", Int32Value({-7})), &batch);
+    EXPECT_EQ(std::vector<std::int32_t>({-7}), Values<std::int32_t>(batch.Columns()[0]));
+}
+
+TEST_F(RecordIOProtobufDecoderTest, UnpackedFloat64Values) {
+    std::vector<FieldSpec> fields = {Dense("features/values", FieldType::FLOAT64, {2})};
+    RecordIOProtobufDecoder decoder(fields);
+    Batch batch(fields);
+    std::string tensor;
+    for (double value : {1.5, 2.5}) {
+        tensor += Varint(1 << 3 | 1) + std::string(reinterpret_cast<const char*>(&value), 8);
+    }
+    Decode(&decoder, Entry(1, "values", LengthDelimited(3, tensor)), &batch);
+    EXPECT_EQ(std::vector<double>({1.5, 2.5}), Values<double>(batch.Columns()[0]));
+}
+
+TEST_F(RecordIOProtobufDecoderTest, KeysAreScatteredIntoDenseFields) {
+    std::vector<FieldSpec> fields = {Dense("features/values", FieldType::FLOAT32, {4})};
+    RecordIOProtobufDecoder decoder(fields);
+    Batch batch(fields);
+    Decode(&decoder, Entry(1, "values", Float32Value({1, 2}, {3, 1}, {4})), &batch);
+    EXPECT_EQ(std::vector<float>({0, 2, 0, 1}), Values<float>(batch.Columns()[0]));
+}
+
+TEST_F(RecordIOProtobufDecoderTest, SparseFeatures) {
+    std::vector<FieldSpec> fields = {Sparse("features/values", FieldType::FLOAT32)};
+    RecordIOProtobufDecoder decoder(fields);
+    Batch batch(fields);
+    Decode(&decoder, Entry(1, "values", Float32Value({1, 2}, {3, 10}, {100})), &batch);
+    Decode(&decoder, "", &batch);
+    Decode(&decoder, Entry(1, "values", Float32Value({3}, {5}, {100})), &batch);
+    const Column& column = batch.Columns()[0];
+    EXPECT_EQ(3, batch.NumRows());
+    EXPECT_EQ(std::vector<float>({1, 2, 3}), Values<float>(column));
+    EXPECT_EQ(std::vector<std::int64_t>({0, 3, 0, 10, 2, 5}), column.Indices());
+    EXPECT_EQ(100, column.DenseSize());
+}
+
+TEST_F(RecordIOProtobufDecoderTest, BytesFeatures) {
+    std::vector<FieldSpec> fields = {Dense("features/image", FieldType::STRING, {})};
+    RecordIOProtobufDecoder decoder(fields);
+    Batch batch(fields);
+    Decode(&decoder, Entry(1, "image", BytesValue({"abc"})), &batch);
+    EXPECT_EQ(std::vector<std::string>({"abc"}), batch.Columns()[0].Strings());
+}
+
+TEST_F(RecordIOProtobufDecoderTest, FeaturesAndLabels) {
+    std::vector<FieldSpec> fields = {
+        Dense("label/values", FieldType::FLOAT32, {}),
+        Dense("features/values", FieldType::FLOAT32, {2})};
+    RecordIOProtobufDecoder decoder(fields);
+    Batch batch(fields);
+    std::string record = Entry(1, "values", Float32Value({1, 2})) + Entry(1, "other", Float32Value({9}))
+        + Entry(2, "values", Float32Value({3})) + LengthDelimited(3, "uid");
+    Decode(&decoder, record, &batch);
+    EXPECT_EQ(std::vector<float>({3}), Values<float>(batch.Columns()[0]));
+    EXPECT_EQ(std::vector<float>({1, 2}), Values<float>(batch.Columns()[1]));
+}
+
+TEST_F(RecordIOProtobufDecoderTest, MissingDenseField) {
+    std::vector<FieldSpec> fields = {Dense("features/values", FieldType::FLOAT32, {2})};
+    RecordIOProtobufDecoder decoder(fields);
+    Batch batch(fields);
+    EXPECT_THROW({
+        Decode(&decoder, Entry(2, "values", Float32Value({1, 2})), &batch);},
+        std::runtime_error);
+}
+
+TEST_F(RecordIOProtobufDecoderTest, WrongNumberOfValues) {
+    std::vector<FieldSpec> fields = {Dense("features/values", FieldType::FLOAT32, {2})};
+    RecordIOProtobufDecoder decoder(fields);
+    Batch batch(fields);
+    EXPECT_THROW({
+        Decode(&decoder, Entry(1, "values", Float32Value({1, 2, 3})), &batch);},
+        std::runtime_error);
+}
+
+TEST_F(RecordIOProtobufDecoderTest, TruncatedRecord) {
+    std::vector<FieldSpec> fields = {Dense("features/values", FieldType::FLOAT32, {2})};
+    RecordIOProtobufDecoder decoder(fields);
+    Batch batch(fields);
+    std::string record = Entry(1, "values", Float32Value({1, 2}));
+    EXPECT_THROW({
+        Decode(&decoder, record.substr(0, record.size() - 1), &batch);},
+        std::runtime_error);
+}
+
+TEST_F(RecordIOProtobufDecoderTest, InvalidFieldName) {
+    EXPECT_THROW({
+        RecordIOProtobufDecoder decoder({Dense("values", FieldType::FLOAT32, {2})});},
+        std::invalid_argument);
+}
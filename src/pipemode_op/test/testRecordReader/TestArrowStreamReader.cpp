@@ -0,0 +1,121 @@
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include <cstdint>
+#include <cstring>
+#include <memory>
+#include <string>
+#include <ArrowStreamReader.hpp>
+#include "common.hpp"
+#include "TestArrowStreamReader.hpp"
+#include "tensorflow/core/platform/tstring.h"
+
+using sagemaker::tensorflow::ArrowStreamReader;
+using sagemaker::tensorflow::ArrowStreamReaderTest;
+
+ArrowStreamReaderTest::ArrowStreamReaderTest() {}
+
+ArrowStreamReaderTest::~ArrowStreamReaderTest() {}
+
+void ArrowStreamReaderTest::SetUp() {}
+
+void ArrowStreamReaderTest::TearDown() {}
+
+namespace {
+
+template <typename T>
+std::string Bytes(T value) {
+    return std::string(reinterpret_cast<const char*>(&value), sizeof(value));
+}
+
+/**
+   Returns a flatbuffer Message with only a bodyLength field.
+ */
+std::string ArrowMetadata(std::int64_t body_length) {
+    // The root offset, the vtable of the version, header_type, header and bodyLength fields,
+    // and the table, whose bodyLength is 8 bytes after its start
+    return Bytes<std::uint32_t>(16) + Bytes<std::uint16_t>(12) + Bytes<std::uint16_t>(16) + std::string(6, '\0')
+        + Bytes<std::uint16_t>(8) + Bytes<std::int32_t>(12) + std::string(4, '\0') + Bytes(body_length);
+}
+
+std::string ArrowMessage(const std::string& body, bool continuation = true) {
+    std::string metadata = ArrowMetadata(body.size());
+    return (continuation ? Bytes<std::int32_t>(-1) : "") + Bytes<std::int32_t>(metadata.size()) + metadata + body;
+}
+
+std::unique_ptr<ArrowStreamReader> MakeArrowStreamReader(const std::string& data) {
+    return std::unique_ptr<ArrowStreamReader>(new ArrowStreamReader(CreateChannel(CreateTemporaryDirectory(),
+        "elizabeth", data, 0), 4, std::chrono::seconds(120)));
+}
+
+}  // namespace
+
+TEST_F(ArrowStreamReaderTest, ReadMessages) {
+    std::string end_of_stream = Bytes<std::int32_t>(-1) + Bytes<std::int32_t>(0);
+    auto reader = MakeArrowStreamReader(ArrowMessage("") + ArrowMessage("12345678") + end_of_stream
+        + ArrowMessage("abcdefgh", false) + end_of_stream);
+    std::string metadata;
+    std::shared_ptr<char> body;
+    std::int64_t body_size;
+    EXPECT_TRUE(reader->ReadMessage(&metadata, &body, &body_size));
+    EXPECT_EQ(ArrowMetadata(0), metadata);
+    EXPECT_EQ(0, body_size);
+    EXPECT_TRUE(reader->ReadMessage(&metadata, &body, &body_size));
+    EXPECT_EQ(8, body_size);
+    EXPECT_EQ("12345678", std::string(body.get(), body_size));
+    EXPECT_EQ(0, reinterpret_cast<std::uintptr_t>(body.get()) % ARROW_BODY_ALIGNMENT);
+    EXPECT_TRUE(reader->ReadMessage(&metadata, &body, &body_size));
+    EXPECT_EQ("abcdefgh", std::string(body.get(), body_size));
+    EXPECT_FALSE(reader->ReadMessage(&metadata, &body, &body_size));
+}
+
+TEST_F(ArrowStreamReaderTest, ReadRecordReturnsEncapsulatedMessage) {
+    auto reader = MakeArrowStreamReader(ArrowMessage("12345678", false));
+    tensorflow::tstring storage;
+    EXPECT_TRUE(reader->ReadRecord(&storage));
+    EXPECT_EQ(ArrowMessage("12345678"), std::string(storage));
+    EXPECT_FALSE(reader->ReadRecord(&storage));
+}
+
+TEST_F(ArrowStreamReaderTest, TruncatedMessage) {
+    std::string message = ArrowMessage("12345678");
+    auto reader = MakeArrowStreamReader(message.substr(0, message.size() - 1));
+    tensorflow::tstring storage;
+    EXPECT_THROW(reader->ReadRecord(&storage), std::runtime_error);
+}
+
+TEST_F(ArrowStreamReaderTest, InvalidMetadata) {
+    auto reader = MakeArrowStreamReader(Bytes<std::int32_t>(4) + Bytes<std::uint32_t>(100));
+    tensorflow::tstring storage;
+    EXPECT_THROW(reader->ReadRecord(&storage), std::runtime_error);
+}
+
+TEST_F(ArrowStreamReaderTest, TruncatedMessageWithHugeBodyLength) {
+    std::string metadata = ArrowMetadata(std::int64_t(1) << 40);
+    auto reader = MakeArrowStreamReader(Bytes<std::int32_t>(-1) + Bytes<std::int32_t>(metadata.size()) + metadata
+        + "12345678");
+    tensorflow::tstring storage;
+    EXPECT_THROW(reader->ReadRecord(&storage), std::runtime_error);
+}
+
+TEST_F(ArrowStreamReaderTest, ReadBodyLargerThanFirstAllocation) {
+    std::string body(3 << 20, 'a');
+    body[body.size() - 1] = 'z';
+    auto reader = MakeArrowStreamReader(ArrowMessage(body));
+    std::string metadata;
+    std::shared_ptr<char> message_body;
+    std::int64_t body_size;
+    EXPECT_TRUE(reader->ReadMessage(&metadata, &message_body, &body_size));
+    EXPECT_EQ(body, std::string(message_body.get(), body_size));
+    EXPECT_EQ(0, reinterpret_cast<std::uintptr_t>(message_body.get()) % ARROW_BODY_ALIGNMENT);
+}
@@ -0,0 +1,171 @@
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include <fcntl.h>
+#include <unistd.h>
+#include <cerrno>
+#include <fstream>
+#include <memory>
+#include <string>
+#include <system_error>
+#include <thread>
+#include <utility>
+#include <vector>
+#include <BlockReader.hpp>
+#include "common.hpp"
+#include "TestBlockReader.hpp"
+
+using sagemaker::tensorflow::BlockRead;
+using sagemaker::tensorflow::BlockReader;
+using sagemaker::tensorflow::BlockReaderTest;
+using sagemaker::tensorflow::CreateIoUringBlockReader;
+using sagemaker::tensorflow::CreateThreadPoolBlockReader;
+using sagemaker::tensorflow::FileStream;
+
+BlockReaderTest::BlockReaderTest() {}
+
+BlockReaderTest::~BlockReaderTest() {}
+
+void BlockReaderTest::SetUp() {}
+
+void BlockReaderTest::TearDown() {}
+
+namespace {
+
+std::string WriteFile(const std::string& data) {
+    std::string path = CreateTemporaryDirectory() + "/file";
+    std::ofstream file(path, std::ios::binary);
+    file << data;
+    return path;
+}
+
+std::string TestData(std::size_t size) {
+    std::string data(size, 0);
+    for (std::size_t i = 0; i < size; i++) {
+        data[i] = static_cast<char>('a' + i % 23);
+    }
+    return data;
+}
+
+std::vector<std::unique_ptr<BlockReader>> BlockReaders() {
+    std::vector<std::unique_ptr<BlockReader>> block_readers;
+    block_readers.push_back(CreateThreadPoolBlockReader(2));
+    // io_uring is not available on every kernel, or may be disabled
+    std::unique_ptr<BlockReader> io_uring = CreateIoUringBlockReader(4);
+    if (io_uring) {
+        block_readers.push_back(std::move(io_uring));
+    }
+    return block_readers;
+}
+
+}  // namespace
+
+TEST_F(BlockReaderTest, ReadBlocks) {
+    std::string data = TestData(1000);
+    std::string path = WriteFile(data);
+    int fd = open(path.c_str(), O_RDONLY);
+    for (auto& block_reader : BlockReaders()) {
+        char buffers[3][400];
+        BlockRead reads[3];
+        for (std::size_t i = 0; i < 3; i++) {
+            reads[i] = {fd, i * 400, buffers[i], 400};
+            block_reader->Submit(&reads[i]);
+        }
+        for (std::size_t i = 0; i < 3; i++) {
+            block_reader->Wait(&reads[i]);
+            EXPECT_TRUE(block_reader->IsDone(&reads[i]));
+        }
+        EXPECT_EQ(400, reads[0].result) << block_reader->Name();
+        EXPECT_EQ(400, reads[1].result);
+        EXPECT_EQ(200, reads[2].result);
+        EXPECT_EQ(data, std::string(buffers[0], 400) + std::string(buffers[1], 400) + std::string(buffers[2], 200));
+    }
+    close(fd);
+}
+
+TEST_F(BlockReaderTest, ReadError) {
+    for (auto& block_reader : BlockReaders()) {
+        char buffer[16];
+        BlockRead read = {-1, 0, buffer, sizeof(buffer)};
+        block_reader->Submit(&read);
+        block_reader->Wait(&read);
+        EXPECT_EQ(-EBADF, read.result) << block_reader->Name();
+    }
+}
+
+TEST_F(BlockReaderTest, MoreReadsThanQueueDepth) {
+    std::string data = TestData(64 * 10);
+    std::string path = WriteFile(data);
+    int fd = open(path.c_str(), O_RDONLY);
+    for (auto& block_reader : BlockReaders()) {
+        std::vector<std::thread> threads;
+        std::vector<std::string> results(4);
+        for (std::size_t t = 0; t < results.size(); t++) {
+            threads.emplace_back([&, t]() {
+                std::vector<char> buffers(64 * 10);
+                std::vector<BlockRead> reads(10);
+                for (std::size_t i = 0; i < reads.size(); i++) {
+                    reads[i] = {fd, i * 64, buffers.data() + i * 64, 64};
+                    block_reader->Submit(&reads[i]);
+                }
+                for (BlockRead& read : reads) {
+                    block_reader->Wait(&read);
+                }
+                results[t].assign(buffers.data(), buffers.size());
+            });
+        }
+        for (std::thread& thread : threads) {
+            thread.join();
+        }
+        for (const std::string& result : results) {
+            EXPECT_EQ(data, result) << block_reader->Name();
+        }
+    }
+    close(fd);
+}
+
+TEST_F(BlockReaderTest, FileStream) {
+    std::string data = TestData(1000);
+    std::string path = WriteFile(data);
+    for (auto& block_reader : BlockReaders()) {
+        FileStream stream(path, block_reader.get(), 64, 3);
+        std::string result;
+        char buffer[100];
+        std::size_t amount;
+        while ((amount = stream.Read(buffer, sizeof(buffer))) > 0) {
+            result.append(buffer, amount);
+            if (amount < sizeof(buffer)) {
+                break;
+            }
+        }
+        EXPECT_EQ(data, result) << block_reader->Name();
+        EXPECT_TRUE(stream.Ready());
+        EXPECT_EQ(0, stream.Read(buffer, sizeof(buffer)));
+    }
+}
+
+TEST_F(BlockReaderTest, FileStreamBlockMultiple) {
+    std::string data = TestData(128);
+    std::string path = WriteFile(data);
+    for (auto& block_reader : BlockReaders()) {
+        FileStream stream(path, block_reader.get(), 64, 1);
+        char buffer[200];
+        EXPECT_EQ(128, stream.Read(buffer, sizeof(buffer)));
+        EXPECT_EQ(data, std::string(buffer, 128));
+    }
+}
+
+TEST_F(BlockReaderTest, FileStreamMissingFile) {
+    std::unique_ptr<BlockReader> block_reader = CreateThreadPoolBlockReader(1);
+    EXPECT_THROW(FileStream(CreateTemporaryDirectory() + "/missing", block_reader.get()), std::system_error);
+}
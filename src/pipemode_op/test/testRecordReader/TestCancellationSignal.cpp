@@ -0,0 +1,129 @@
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include <sys/stat.h>
+#include <fcntl.h>
+#include <unistd.h>
+#include <cerrno>
+#include <chrono>
+#include <functional>
+#include <memory>
+#include <string>
+#include <system_error>
+#include <thread>
+#include <CancellationSignal.hpp>
+#include <TextLineRecordReader.hpp>
+#include "common.hpp"
+#include "TestCancellationSignal.hpp"
+#include "tensorflow/core/platform/tstring.h"
+
+using sagemaker::tensorflow::CancellationSignal;
+using sagemaker::tensorflow::CancellationSignalTest;
+using sagemaker::tensorflow::TextLineRecordReader;
+
+CancellationSignalTest::CancellationSignalTest() {}
+
+CancellationSignalTest::~CancellationSignalTest() {}
+
+void CancellationSignalTest::SetUp() {}
+
+void CancellationSignalTest::TearDown() {}
+
+namespace {
+
+/**
+   Cancels the signal after a delay, on another thread.
+ */
+std::thread CancelAfter(CancellationSignal* cancellation, std::chrono::milliseconds delay) {
+    return std::thread([cancellation, delay]() {
+        std::this_thread::sleep_for(delay);
+        cancellation->Cancel();
+    });
+}
+
+int ErrorCode(const std::function<void()>& fn) {
+    try {
+        fn();
+    } catch (const std::system_error& err) {
+        return err.code().value();
+    }
+    return 0;
+}
+
+std::string CreateFifo() {
+    std::string path = CreateTemporaryDirectory() + "/fifo";
+    if (mkfifo(path.c_str(), 0600)) {
+        throw std::system_error(errno, std::system_category());
+    }
+    return path;
+}
+
+}  // namespace
+
+TEST_F(CancellationSignalTest, test_sleep_for_is_cancelled) {
+    CancellationSignal cancellation;
+    std::thread canceller = CancelAfter(&cancellation, std::chrono::milliseconds(20));
+    auto start = std::chrono::steady_clock::now();
+    EXPECT_EQ(ECANCELED, ErrorCode([&cancellation]() { cancellation.SleepFor(std::chrono::seconds(60)); }));
+    EXPECT_LT(std::chrono::steady_clock::now() - start, std::chrono::seconds(5));
+    canceller.join();
+    EXPECT_TRUE(cancellation.IsCancelled());
+    EXPECT_EQ(ECANCELED, ErrorCode([&cancellation]() { cancellation.ThrowIfCancelled(); }));
+}
+
+TEST_F(CancellationSignalTest, test_wait_readable) {
+    CancellationSignal cancellation;
+    int fds[2];
+    ASSERT_EQ(0, pipe(fds));
+    ASSERT_EQ(1, write(fds[1], "a", 1));
+    EXPECT_TRUE(cancellation.WaitReadable(fds[0]));
+    char data;
+    ASSERT_EQ(1, read(fds[0], &data, 1));
+    close(fds[1]);
+    EXPECT_FALSE(cancellation.WaitReadable(fds[0]));
+    close(fds[0]);
+}
+
+TEST_F(CancellationSignalTest, test_read_fifo_without_writer_is_cancelled) {
+    CancellationSignal cancellation;
+    TextLineRecordReader reader(CreateFifo());
+    reader.SetCancellation(&cancellation);
+    std::thread canceller = CancelAfter(&cancellation, std::chrono::milliseconds(50));
+    tensorflow::tstring record;
+    auto start = std::chrono::steady_clock::now();
+    EXPECT_EQ(ECANCELED, ErrorCode([&reader, &record]() { reader.ReadRecord(&record); }));
+    EXPECT_LT(std::chrono::steady_clock::now() - start, std::chrono::seconds(5));
+    canceller.join();
+}
+
+TEST_F(CancellationSignalTest, test_read_fifo_waits_for_writer) {
+    CancellationSignal cancellation;
+    std::string path = CreateFifo();
+    TextLineRecordReader reader(path);
+    reader.SetCancellation(&cancellation);
+    std::thread writer([path]() {
+        std::this_thread::sleep_for(std::chrono::milliseconds(50));
+        int fd = open(path.c_str(), O_WRONLY);
+        EXPECT_EQ(4, write(fd, "abc\n", 4));
+        std::this_thread::sleep_for(std::chrono::milliseconds(50));
+        EXPECT_EQ(3, write(fd, "def", 3));
+        close(fd);
+    });
+    tensorflow::tstring record;
+    EXPECT_TRUE(reader.ReadRecord(&record));
+    EXPECT_EQ("abc", std::string(record));
+    EXPECT_TRUE(reader.ReadRecord(&record));
+    EXPECT_EQ("def", std::string(record));
+    EXPECT_FALSE(reader.ReadRecord(&record));
+    writer.join();
+}
@@ -0,0 +1,227 @@
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include <zlib.h>
+#ifdef PIPEMODE_WITH_ZSTD
+#include <zstd.h>
+#endif
+#include <algorithm>
+#include <cstring>
+#include <memory>
+#include <stdexcept>
+#include <string>
+#include <Decompressor.hpp>
+#include <TextLineRecordReader.hpp>
+#include "common.hpp"
+#include "TestDecompressor.hpp"
+#include "tensorflow/core/platform/tstring.h"
+
+using sagemaker::tensorflow::Compression;
+using sagemaker::tensorflow::Decompressor;
+using sagemaker::tensorflow::DecompressorTest;
+using sagemaker::tensorflow::ParseCompression;
+using sagemaker::tensorflow::TextLineRecordReader;
+using tensorflow::tstring;
+
+DecompressorTest::DecompressorTest() {}
+
+DecompressorTest::~DecompressorTest() {}
+
+void DecompressorTest::SetUp() {}
+
+void DecompressorTest::TearDown() {}
+
+std::string MakeData(std::size_t size) {
+    std::string data;
+    for (std::size_t i = 0; data.size() < size; i++) {
+        data += "line" + std::to_string(i * 7919 % 100003) + "\n";
+    }
+    data.resize(size);
+    return data;
+}
+
+std::string Deflate(const std::string& data, int window_bits) {
+    z_stream stream;
+    std::memset(&stream, 0, sizeof(stream));
+    deflateInit2(&stream, Z_DEFAULT_COMPRESSION, Z_DEFLATED, window_bits, 8, Z_DEFAULT_STRATEGY);
+    std::string compressed(deflateBound(&stream, data.size()), '\0');
+    stream.next_in = reinterpret_cast<Bytef*>(const_cast<char*>(data.data()));
+    stream.avail_in = data.size();
+    stream.next_out = reinterpret_cast<Bytef*>(&compressed[0]);
+    stream.avail_out = compressed.size();
+    deflate(&stream, Z_FINISH);
+    compressed.resize(stream.total_out);
+    deflateEnd(&stream);
+    return compressed;
+}
+
+std::string Gzip(const std::string& data) {
+    return Deflate(data, 16 + MAX_WBITS);
+}
+
+std::string LittleEndian(std::uint32_t value, int nbytes) {
+    std::string bytes;
+    for (int i = 0; i < nbytes; i++) {
+        bytes += static_cast<char>((value >> (8 * i)) & 0xff);
+    }
+    return bytes;
+}
+
+std::string Bgzf(const std::string& data, std::size_t block_size) {
+    std::string compressed;
+    for (std::size_t offset = 0; offset <= data.size(); offset += block_size) {
+        // The last, empty, block is the BGZF end of file marker.
+        std::string block = data.substr(std::min(offset, data.size()), block_size);
+        std::string deflated = Deflate(block, -MAX_WBITS);
+        compressed += std::string("\x1f\x8b\x08\x04\0\0\0\0\0\xff\x06\0BC\x02\0", 16);
+        compressed += LittleEndian(18 + deflated.size() + 8 - 1, 2);
+        compressed += deflated;
+        compressed += LittleEndian(crc32(0, reinterpret_cast<const Bytef*>(block.data()), block.size()), 4);
+        compressed += LittleEndian(block.size(), 4);
+    }
+    return compressed;
+}
+
+Decompressor::Source StringSource(const std::string& data) {
+    auto position = std::make_shared<std::size_t>(0);
+    return [data, position](void* dest, std::size_t nbytes) {
+        std::size_t size = std::min(nbytes, data.size() - *position);
+        std::memcpy(dest, data.data() + *position, size);
+        *position += size;
+        return size;
+    };
+}
+
+std::string Decompress(Compression compression, const std::string& compressed, std::size_t read_size = 7919) {
+    Decompressor decompressor(compression, StringSource(compressed), 3, 4096);
+    std::string result;
+    std::string buffer(read_size, '\0');
+    while (std::size_t size = decompressor.Read(&buffer[0], read_size)) {
+        result.append(buffer, 0, size);
+    }
+    return result;
+}
+
+TEST_F(DecompressorTest, ParseCompression) {
+    EXPECT_EQ(Compression::NONE, ParseCompression(""));
+    EXPECT_EQ(Compression::GZIP, ParseCompression("GZIP"));
+    EXPECT_EQ(Compression::ZLIB, ParseCompression("ZLIB"));
+    EXPECT_THROW({
+        ParseCompression("LZ4");},
+        std::invalid_argument);
+}
+
+TEST_F(DecompressorTest, Gzip) {
+    std::string data = MakeData(3000000);
+    EXPECT_EQ(data, Decompress(Compression::GZIP, Gzip(data)));
+}
+
+TEST_F(DecompressorTest, EmptyStream) {
+    EXPECT_EQ("", Decompress(Compression::GZIP, ""));
+}
+
+TEST_F(DecompressorTest, ConcatenatedGzipMembers) {
+    std::string data = MakeData(100000);
+    EXPECT_EQ(data + data, Decompress(Compression::GZIP, Gzip(data) + Gzip(data)));
+}
+
+TEST_F(DecompressorTest, Bgzf) {
+    std::string data = MakeData(3000000);
+    EXPECT_EQ(data, Decompress(Compression::GZIP, Bgzf(data, 65280)));
+}
+
+TEST_F(DecompressorTest, BgzfFollowedByGzip) {
+    std::string data = MakeData(200000);
+    EXPECT_EQ(data + data, Decompress(Compression::GZIP, Bgzf(data, 65280) + Gzip(data)));
+}
+
+TEST_F(DecompressorTest, Zlib) {
+    std::string data = MakeData(3000000);
+    EXPECT_EQ(data, Decompress(Compression::ZLIB, Deflate(data, MAX_WBITS), 1));
+}
+
+TEST_F(DecompressorTest, TruncatedGzip) {
+    std::string compressed = Gzip(MakeData(100000));
+    EXPECT_THROW({
+        Decompress(Compression::GZIP, compressed.substr(0, compressed.size() / 2));},
+        std::runtime_error);
+}
+
+TEST_F(DecompressorTest, TruncatedBgzf) {
+    std::string compressed = Bgzf(MakeData(100000), 65280);
+    EXPECT_THROW({
+        Decompress(Compression::GZIP, compressed.substr(0, compressed.size() / 2));},
+        std::runtime_error);
+}
+
+TEST_F(DecompressorTest, CorruptGzip) {
+    std::string compressed = Gzip(MakeData(100000));
+    std::fill(compressed.begin() + 100, compressed.begin() + 200, 'x');
+    EXPECT_THROW({
+        Decompress(Compression::GZIP, compressed);},
+        std::runtime_error);
+}
+
+TEST_F(DecompressorTest, StopsBeforeEndOfStream) {
+    std::string data = MakeData(3000000);
+    Decompressor decompressor(Compression::GZIP, StringSource(Bgzf(data, 65280)), 3, 4096);
+    char buffer[10];
+    EXPECT_EQ(10, decompressor.Read(buffer, 10));
+    EXPECT_EQ(data.substr(0, 10), std::string(buffer, 10));
+}
+
+TEST_F(DecompressorTest, ReadCompressedRecords) {
+    std::string channel_directory = CreateTemporaryDirectory();
+    std::string data = MakeData(1000000);
+    TextLineRecordReader reader(CreateChannel(channel_directory, "elizabeth", Gzip(data), 0));
+    reader.SetCompression(Compression::GZIP);
+    tstring record;
+    std::string records;
+    while (reader.ReadRecord(&record)) {
+        records += std::string(record) + "\n";
+    }
+    EXPECT_EQ(data, records.substr(0, data.size()));
+}
+
+#ifdef PIPEMODE_WITH_ZSTD
+std::string Zstd(const std::string& data) {
+    std::string compressed(ZSTD_compressBound(data.size()), '\0');
+    compressed.resize(ZSTD_compress(&compressed[0], compressed.size(), data.data(), data.size(), 3));
+    return compressed;
+}
+
+TEST_F(DecompressorTest, ParseZstd) {
+    EXPECT_EQ(Compression::ZSTD, ParseCompression("ZSTD"));
+}
+
+TEST_F(DecompressorTest, ZstdSingleFrame) {
+    std::string data = MakeData(3000000);
+    EXPECT_EQ(data, Decompress(Compression::ZSTD, Zstd(data)));
+}
+
+TEST_F(DecompressorTest, ZstdMultipleFrames) {
+    std::string data = MakeData(3000000);
+    std::string compressed;
+    for (std::size_t offset = 0; offset < data.size(); offset += 100000) {
+        compressed += Zstd(data.substr(offset, 100000));
+    }
+    EXPECT_EQ(data, Decompress(Compression::ZSTD, compressed));
+}
+
+TEST_F(DecompressorTest, TruncatedZstd) {
+    std::string compressed = Zstd(MakeData(100000));
+    EXPECT_THROW({
+        Decompress(Compression::ZSTD, compressed.substr(0, compressed.size() / 2));},
+        std::runtime_error);
+}
+#endif
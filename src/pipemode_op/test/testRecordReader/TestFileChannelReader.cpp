@@ -0,0 +1,199 @@
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include <sys/stat.h>
+#include <algorithm>
+#include <fstream>
+#include <memory>
+#include <stdexcept>
+#include <string>
+#include <utility>
+#include <vector>
+#include <FileChannelReader.hpp>
+#include <TextLineRecordReader.hpp>
+#include "common.hpp"
+#include "TestFileChannelReader.hpp"
+#include "tensorflow/core/platform/tstring.h"
+
+using sagemaker::tensorflow::Compression;
+using sagemaker::tensorflow::FileChannelOptions;
+using sagemaker::tensorflow::FileChannelReader;
+using sagemaker::tensorflow::FileChannelReaderTest;
+using sagemaker::tensorflow::RecordReader;
+using sagemaker::tensorflow::TextLineRecordReader;
+
+FileChannelReaderTest::FileChannelReaderTest() {}
+
+FileChannelReaderTest::~FileChannelReaderTest() {}
+
+void FileChannelReaderTest::SetUp() {}
+
+void FileChannelReaderTest::TearDown() {}
+
+namespace {
+
+void WriteFile(const std::string& path, const std::string& data) {
+    std::ofstream file(path, std::ios::binary);
+    file << data;
+}
+
+std::unique_ptr<RecordReader> CreateTextLineReader(const std::string& file_path) {
+    return std::unique_ptr<RecordReader>(new TextLineRecordReader(file_path));
+}
+
+std::vector<std::string> ReadAll(FileChannelReader* reader) {
+    std::vector<std::string> records;
+    tensorflow::tstring record;
+    while (reader->ReadRecord(&record)) {
+        records.emplace_back(record.data(), record.size());
+    }
+    return records;
+}
+
+FileChannelOptions Options(std::size_t parallel_files, bool deterministic) {
+    FileChannelOptions options;
+    options.parallel_files = parallel_files;
+    options.deterministic = deterministic;
+    options.block_size = 4;
+    return options;
+}
+
+}  // namespace
+
+TEST_F(FileChannelReaderTest, ListFiles) {
+    std::string directory = CreateTemporaryDirectory();
+    mkdir((directory + "/sub").c_str(), 0755);
+    mkdir((directory + "/.hidden").c_str(), 0755);
+    WriteFile(directory + "/b", "");
+    WriteFile(directory + "/a", "");
+    WriteFile(directory + "/sub/c", "");
+    WriteFile(directory + "/.skipped", "");
+    WriteFile(directory + "/.hidden/d", "");
+
+    EXPECT_EQ(std::vector<std::string>({directory + "/a", directory + "/b", directory + "/sub/c"}),
+        FileChannelReader::ListFiles(directory + "/"));
+    EXPECT_EQ(std::vector<std::string>({directory + "/a", directory + "/sub/c"}),
+        FileChannelReader::ListFiles(directory, 2, 0));
+    EXPECT_EQ(std::vector<std::string>({directory + "/b"}), FileChannelReader::ListFiles(directory, 2, 1));
+    EXPECT_THROW(FileChannelReader::ListFiles(directory + "/missing"), std::runtime_error);
+}
+
+TEST_F(FileChannelReaderTest, InterleaveInTurn) {
+    std::string directory = CreateTemporaryDirectory();
+    WriteFile(directory + "/0", "a1\na2\na3\n");
+    WriteFile(directory + "/1", "b1\n");
+    WriteFile(directory + "/2", "c1\nc2\n");
+    WriteFile(directory + "/3", "");
+    WriteFile(directory + "/4", "e1\ne2\n");
+
+    FileChannelReader reader(directory, CreateTextLineReader, Compression::NONE, Options(2, true));
+    // The exhausted file 1 is replaced by file 2, and file 2 by the empty file 3 and then file 4
+    EXPECT_EQ(std::vector<std::string>({"a1", "b1", "a2", "c1", "a3", "c2", "e1", "e2"}), ReadAll(&reader));
+    tensorflow::tstring record;
+    EXPECT_FALSE(reader.ReadRecord(&record));
+}
+
+TEST_F(FileChannelReaderTest, NumOpenFiles) {
+    std::string directory = CreateTemporaryDirectory();
+    WriteFile(directory + "/0", "a1\na2\n");
+    WriteFile(directory + "/1", "b1\n");
+    WriteFile(directory + "/2", "c1\n");
+
+    FileChannelReader reader(directory, CreateTextLineReader, Compression::NONE, Options(2, true));
+    EXPECT_EQ(0, reader.NumOpenFiles());
+    tensorflow::tstring record;
+    EXPECT_TRUE(reader.ReadRecord(&record));
+    EXPECT_EQ(2, reader.NumOpenFiles());
+    // File 1 is replaced by file 2, and then file 2 is exhausted
+    EXPECT_TRUE(reader.ReadRecord(&record));
+    EXPECT_TRUE(reader.ReadRecord(&record));
+    EXPECT_TRUE(reader.ReadRecord(&record));
+    EXPECT_EQ(std::string("c1"), std::string(record));
+    EXPECT_FALSE(reader.ReadRecord(&record));
+    EXPECT_EQ(0, reader.NumOpenFiles());
+}
+
+TEST_F(FileChannelReaderTest, ReadRecordChunks) {
+    std::string directory = CreateTemporaryDirectory();
+    WriteFile(directory + "/0", "abcdef\nx\n");
+    WriteFile(directory + "/1", "123456\n");
+
+    FileChannelReader reader(directory, CreateTextLineReader, Compression::NONE, Options(2, true));
+    using Chunks = std::vector<std::pair<std::string, bool>>;
+    Chunks chunks;
+    tensorflow::tstring chunk;
+    bool is_last;
+    while (reader.ReadRecordChunk(&chunk, 4, &is_last)) {
+        chunks.emplace_back(std::string(chunk), is_last);
+    }
+    // Every chunk of a record is read before the next file's record
+    EXPECT_EQ(Chunks({{"abcd", false}, {"ef", true}, {"1234", false},
+        {"56", true}, {"x", true}}), chunks);
+}
+
+TEST_F(FileChannelReaderTest, OneFileAtATime) {
+    std::string directory = CreateTemporaryDirectory();
+    WriteFile(directory + "/0", "a1\na2\n");
+    WriteFile(directory + "/1", "b1\nb2\n");
+
+    FileChannelReader reader(directory, CreateTextLineReader, Compression::NONE, Options(1, true));
+    EXPECT_EQ(std::vector<std::string>({"a1", "a2", "b1", "b2"}), ReadAll(&reader));
+}
+
+TEST_F(FileChannelReaderTest, Sloppy) {
+    std::string directory = CreateTemporaryDirectory();
+    std::vector<std::string> expected;
+    for (int i = 0; i < 6; i++) {
+        std::string data;
+        for (int j = 0; j < 50; j++) {
+            std::string record = std::to_string(i) + "-" + std::to_string(j);
+            data += record + "\n";
+            expected.push_back(record);
+        }
+        WriteFile(directory + "/" + std::to_string(i), data);
+    }
+
+    FileChannelReader reader(directory, CreateTextLineReader, Compression::NONE, Options(3, false));
+    std::vector<std::string> records = ReadAll(&reader);
+    std::sort(records.begin(), records.end());
+    std::sort(expected.begin(), expected.end());
+    EXPECT_EQ(expected, records);
+}
+
+TEST_F(FileChannelReaderTest, Shard) {
+    std::string directory = CreateTemporaryDirectory();
+    WriteFile(directory + "/0", "a\n");
+    WriteFile(directory + "/1", "b\n");
+    WriteFile(directory + "/2", "c\n");
+
+    FileChannelOptions options = Options(4, true);
+    options.num_shards = 2;
+    options.shard_index = 1;
+    FileChannelReader reader(directory, CreateTextLineReader, Compression::NONE, options);
+    EXPECT_EQ(std::vector<std::string>({"b"}), ReadAll(&reader));
+
+    options.shard_index = 2;
+    EXPECT_THROW(FileChannelReader(directory, CreateTextLineReader, Compression::NONE, options),
+        std::invalid_argument);
+}
+
+TEST_F(FileChannelReaderTest, EmptyChannel) {
+    FileChannelReader reader(CreateTemporaryDirectory(), CreateTextLineReader, Compression::NONE);
+    EXPECT_TRUE(ReadAll(&reader).empty());
+}
+
+TEST_F(FileChannelReaderTest, MissingChannel) {
+    FileChannelReader reader(CreateTemporaryDirectory() + "/missing", CreateTextLineReader, Compression::NONE);
+    tensorflow::tstring record;
+    EXPECT_THROW(reader.ReadRecord(&record), std::runtime_error);
+}
@@ -0,0 +1,91 @@
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include <stdexcept>
+#include <string>
+#include <vector>
+#include <FixedLengthRecordReader.hpp>
+#include "common.hpp"
+#include "TestFixedLengthRecordReader.hpp"
+#include "tensorflow/core/platform/tstring.h"
+
+using sagemaker::tensorflow::FixedLengthRecordReader;
+using sagemaker::tensorflow::FixedLengthRecordReaderTest;
+
+FixedLengthRecordReaderTest::FixedLengthRecordReaderTest() {}
+
+FixedLengthRecordReaderTest::~FixedLengthRecordReaderTest() {}
+
+void FixedLengthRecordReaderTest::SetUp() {}
+
+void FixedLengthRecordReaderTest::TearDown() {}
+
+namespace {
+
+std::string CreateFile(const std::string& data) {
+    return CreateChannel(CreateTemporaryDirectory(), "elizabeth", data, 0);
+}
+
+}  // namespace
+
+TEST_F(FixedLengthRecordReaderTest, ReadRecord) {
+    FixedLengthRecordReader reader(CreateFile("aaabbbccc"), 3);
+    tensorflow::tstring data;
+    std::vector<std::string> records;
+    while (reader.ReadRecord(&data)) {
+        records.emplace_back(data);
+    }
+    EXPECT_EQ(std::vector<std::string>({"aaa", "bbb", "ccc"}), records);
+    EXPECT_EQ(0, data.size());
+}
+
+TEST_F(FixedLengthRecordReaderTest, ReadRecordsSkipsHeaderAndFooter) {
+    FixedLengthRecordReader reader(CreateFile("HHHHaaabbbcccdddeeeFF"), 3, 4, 2);
+    char buffer[6];
+    EXPECT_EQ(2, reader.ReadRecords(buffer, 2));
+    EXPECT_EQ("aaabbb", std::string(buffer, 6));
+    EXPECT_EQ(2, reader.ReadRecords(buffer, 2));
+    EXPECT_EQ("cccddd", std::string(buffer, 6));
+    EXPECT_EQ(1, reader.ReadRecords(buffer, 2));
+    EXPECT_EQ("eee", std::string(buffer, 3));
+    EXPECT_EQ(0, reader.ReadRecords(buffer, 2));
+}
+
+TEST_F(FixedLengthRecordReaderTest, FooterLongerThanRecords) {
+    FixedLengthRecordReader reader(CreateFile("aabbFFFFF"), 2, 0, 5);
+    char buffer[2];
+    EXPECT_EQ(1, reader.ReadRecords(buffer, 1));
+    EXPECT_EQ("aa", std::string(buffer, 2));
+    EXPECT_EQ(1, reader.ReadRecords(buffer, 1));
+    EXPECT_EQ("bb", std::string(buffer, 2));
+    EXPECT_EQ(0, reader.ReadRecords(buffer, 1));
+}
+
+TEST_F(FixedLengthRecordReaderTest, EmptyFile) {
+    FixedLengthRecordReader reader(CreateFile(""), 2, 4, 4);
+    char buffer[2];
+    EXPECT_EQ(0, reader.ReadRecords(buffer, 1));
+}
+
+TEST_F(FixedLengthRecordReaderTest, PartialRecord) {
+    FixedLengthRecordReader reader(CreateFile("HaabbcF"), 2, 1, 1);
+    char buffer[6];
+    EXPECT_THROW(reader.ReadRecords(buffer, 3), std::runtime_error);
+}
+
+TEST_F(FixedLengthRecordReaderTest, TruncatedHeader) {
+    FixedLengthRecordReader reader(CreateFile("HHH"), 2, 4);
+    char buffer[2];
+    EXPECT_THROW(reader.ReadRecords(buffer, 1), std::runtime_error);
+    EXPECT_THROW(FixedLengthRecordReader(CreateFile(""), 0), std::invalid_argument);
+}
@@ -0,0 +1,96 @@
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include <string>
+#include <vector>
+#include <ReadTrace.hpp>
+#include <RecordIOReader.hpp>
+#include "common.hpp"
+#include "TestReadTrace.hpp"
+#include "tensorflow/core/platform/tstring.h"
+
+using sagemaker::tensorflow::ReadTraceScope;
+using sagemaker::tensorflow::ReadTraceTest;
+using sagemaker::tensorflow::ReadTracer;
+using sagemaker::tensorflow::RecordIOReader;
+using sagemaker::tensorflow::SetReadTracer;
+
+ReadTraceTest::ReadTraceTest() {}
+
+ReadTraceTest::~ReadTraceTest() {}
+
+void ReadTraceTest::SetUp() {}
+
+void ReadTraceTest::TearDown() {
+    SetReadTracer(nullptr);
+}
+
+namespace {
+
+int trace_level = 0;
+std::vector<std::string> activities;
+std::int64_t open_activities = 0;
+
+/**
+   A tracer that records the names of the activities of its level and below.
+ */
+const ReadTracer TEST_READ_TRACER = {
+    [](int level) { return level <= trace_level; },
+    [](const char* name, int level) {
+        activities.push_back(name);
+        return ++open_activities;
+    },
+    [](std::int64_t activity_id) { open_activities--; }
+};
+
+void StartTracing(int level) {
+    trace_level = level;
+    activities.clear();
+    open_activities = 0;
+    SetReadTracer(&TEST_READ_TRACER);
+}
+
+}  // namespace
+
+TEST_F(ReadTraceTest, RecordsActivitiesOfActiveLevels) {
+    StartTracing(TRACE_LEVEL_READ);
+    {
+        ReadTraceScope read("read", TRACE_LEVEL_READ);
+        ReadTraceScope crc("crc", TRACE_LEVEL_CRC);
+        EXPECT_EQ(1, open_activities);
+    }
+    EXPECT_EQ(0, open_activities);
+    EXPECT_EQ(std::vector<std::string>({"read"}), activities);
+}
+
+TEST_F(ReadTraceTest, NoTracer) {
+    StartTracing(TRACE_LEVEL_CRC);
+    SetReadTracer(nullptr);
+    {
+        ReadTraceScope read("read", TRACE_LEVEL_READ);
+    }
+    EXPECT_TRUE(activities.empty());
+}
+
+TEST_F(ReadTraceTest, TracesReaderStages) {
+    std::string record("\x0a\x23\xd7\xce\x04\x00\x00\x00" "bear", 12);
+    RecordIOReader reader(CreateChannel(CreateTemporaryDirectory(), "elizabeth", record, 0), 100,
+        std::chrono::seconds(1));
+    StartTracing(TRACE_LEVEL_HEADER_PARSE);
+    tensorflow::tstring storage;
+    EXPECT_TRUE(reader.ReadRecord(&storage));
+    EXPECT_EQ("bear", storage);
+    EXPECT_EQ(0, open_activities);
+    EXPECT_EQ(std::vector<std::string>({"PipeModeDataset::PipeWait", "PipeModeDataset::Read",
+        "PipeModeDataset::ParseHeader", "PipeModeDataset::Read"}), activities);
+}
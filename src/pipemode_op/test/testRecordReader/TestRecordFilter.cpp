@@ -0,0 +1,144 @@
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include <algorithm>
+#include <memory>
+#include <stdexcept>
+#include <string>
+#include <vector>
+#include <RecordFilter.hpp>
+#include <TextLineRecordReader.hpp>
+#include "common.hpp"
+#include "TestRecordFilter.hpp"
+#include "tensorflow/core/platform/tstring.h"
+
+using sagemaker::tensorflow::RecordFilter;
+using sagemaker::tensorflow::RecordFilterOptions;
+using sagemaker::tensorflow::RecordFilterTest;
+using sagemaker::tensorflow::TextLineRecordReader;
+
+RecordFilterTest::RecordFilterTest() {}
+
+RecordFilterTest::~RecordFilterTest() {}
+
+void RecordFilterTest::SetUp() {}
+
+void RecordFilterTest::TearDown() {}
+
+namespace {
+
+std::vector<std::string> Filter(const RecordFilterOptions& options, const std::vector<std::string>& records) {
+    RecordFilter filter(options);
+    std::vector<std::string> kept;
+    for (const std::string& record : records) {
+        if (filter.AcceptsSize(record.size()) && filter.AcceptsData(record.data(), record.size())) {
+            kept.push_back(record);
+        }
+    }
+    return kept;
+}
+
+std::vector<std::string> MakeRecords(int num_records) {
+    std::vector<std::string> records;
+    for (int i = 0; i < num_records; i++) {
+        records.push_back("record" + std::to_string(i));
+    }
+    return records;
+}
+
+}  // namespace
+
+TEST_F(RecordFilterTest, test_sample_rate) {
+    std::vector<std::string> records = MakeRecords(10000);
+    RecordFilterOptions options;
+    options.sample_rate = 0.25;
+    options.seed = 7;
+    std::vector<std::string> sampled = Filter(options, records);
+    EXPECT_GT(sampled.size(), 2250);
+    EXPECT_LT(sampled.size(), 2750);
+    EXPECT_EQ(sampled, Filter(options, records));
+    options.seed = 8;
+    EXPECT_NE(sampled, Filter(options, records));
+}
+
+TEST_F(RecordFilterTest, test_max_record_bytes) {
+    RecordFilterOptions options;
+    options.max_record_bytes = 3;
+    RecordFilter filter(options);
+    EXPECT_TRUE(filter.AcceptsSize(3));
+    EXPECT_FALSE(filter.AcceptsSize(4));
+    EXPECT_FALSE(filter.NeedsData());
+    EXPECT_EQ(1, filter.Stats().rejected_records);
+    EXPECT_EQ(4, filter.Stats().rejected_bytes);
+}
+
+TEST_F(RecordFilterTest, test_complementary_splits) {
+    std::vector<std::string> records = MakeRecords(1000);
+    RecordFilterOptions train;
+    train.split_end = 0.8;
+    RecordFilterOptions validation;
+    validation.split_begin = 0.8;
+    std::vector<std::string> train_records = Filter(train, records);
+    std::vector<std::string> validation_records = Filter(validation, records);
+    EXPECT_EQ(records.size(), train_records.size() + validation_records.size());
+    EXPECT_GT(train_records.size(), 700);
+    EXPECT_LT(train_records.size(), 900);
+    for (const std::string& record : validation_records) {
+        EXPECT_EQ(train_records.end(), std::find(train_records.begin(), train_records.end(), record));
+    }
+}
+
+TEST_F(RecordFilterTest, test_split_key_bytes) {
+    // Records with the same key are kept or rejected together
+    std::vector<std::string> records;
+    for (int key = 0; key < 100; key++) {
+        for (int i = 0; i < 3; i++) {
+            records.push_back(std::to_string(1000 + key) + "-" + std::to_string(i));
+        }
+    }
+    RecordFilterOptions options;
+    options.split_end = 0.5;
+    options.split_key_bytes = 4;
+    std::vector<std::string> kept = Filter(options, records);
+    EXPECT_FALSE(kept.empty());
+    EXPECT_EQ(0, kept.size() % 3);
+    for (std::size_t i = 0; i < kept.size(); i += 3) {
+        EXPECT_EQ(kept[i].substr(0, 4), kept[i + 2].substr(0, 4));
+    }
+}
+
+TEST_F(RecordFilterTest, test_invalid_options) {
+    RecordFilterOptions options;
+    options.sample_rate = 0;
+    EXPECT_THROW(RecordFilter filter(options), std::invalid_argument);
+    options.sample_rate = 1;
+    options.split_begin = 0.5;
+    options.split_end = 0.5;
+    EXPECT_THROW(RecordFilter filter(options), std::invalid_argument);
+}
+
+TEST_F(RecordFilterTest, test_reader_skips_rejected_records) {
+    RecordFilterOptions options;
+    options.max_record_bytes = 3;
+    RecordFilter filter(options);
+    std::unique_ptr<TextLineRecordReader> reader(new TextLineRecordReader(
+        CreateChannel(CreateTemporaryDirectory(), "elizabeth", "abc\nlong line\nde\nanother long line", 0)));
+    reader->SetFilter(&filter);
+    tensorflow::tstring data;
+    EXPECT_TRUE(reader->ReadRecord(&data));
+    EXPECT_EQ("abc", data);
+    EXPECT_TRUE(reader->ReadRecord(&data));
+    EXPECT_EQ("de", data);
+    EXPECT_FALSE(reader->ReadRecord(&data));
+    EXPECT_EQ(2, filter.Stats().rejected_records);
+}
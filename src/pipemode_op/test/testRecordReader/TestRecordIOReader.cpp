@@ -17,6 +17,7 @@
 #include <fstream>
 #include <memory>
 #include <string>
+#include <utility>
 #include <vector>
 #include <RecordReader.hpp>
 #include <RecordIOReader.hpp>
@@ -145,3 +146,77 @@ TEST_F(RecordIOReaderTest, TestManyRecords) {
         EXPECT_EQ(input, result);
     }
 }
+
+TEST_F(RecordIOReaderTest, TestRecoverFromCorruptedData) {
+    // Garbage between records, spanning more than one scan window, is skipped along with the
+    // part of the multipart record it cuts off
+    std::string garbage(RECOVERY_SCAN_SIZE + 100, 'x');
+    std::string encoded = ToRecordIO("hello") + garbage + ToRecordIO("world") + "not a magic number";
+    sagemaker::tensorflow::RecoveryStats stats;
+    std::unique_ptr<RecordIOReader> ptr = MakeRecordIOReader(
+        CreateChannel(CreateTemporaryDirectory(), "elizabeth", encoded, 0), 4);
+    ptr->SetRecovery(&stats);
+    tensorflow::tstring storage;
+    EXPECT_TRUE(ptr->ReadRecord(&storage));
+    EXPECT_EQ("hello", storage);
+    EXPECT_TRUE(ptr->ReadRecord(&storage));
+    EXPECT_EQ("world", storage);
+    EXPECT_FALSE(ptr->ReadRecord(&storage));
+    EXPECT_EQ(0, stats.skipped_records);
+    EXPECT_EQ(2, stats.resyncs);
+    EXPECT_EQ(garbage.size() + std::string("not a magic number").size(), stats.skipped_bytes);
+}
+
+TEST_F(RecordIOReaderTest, TestFailOnCorruptedDataWithoutRecovery) {
+    std::string encoded = ToRecordIO("hello") + "not a magic number" + ToRecordIO("world");
+    std::unique_ptr<RecordIOReader> ptr = MakeRecordIOReader(
+        CreateChannel(CreateTemporaryDirectory(), "elizabeth", encoded, 0), 4);
+    tensorflow::tstring storage;
+    ptr->ReadRecord(&storage);
+    EXPECT_EQ("hello", storage);
+    EXPECT_THROW({
+        ptr->ReadRecord(&storage);},
+        std::runtime_error);
+}
+
+TEST_F(RecordIOReaderTest, TestFilterRecords) {
+    sagemaker::tensorflow::RecordFilterOptions options;
+    options.max_record_bytes = 5;
+    sagemaker::tensorflow::RecordFilter filter(options);
+    std::string encoded = ToRecordIO("hello") + ToRecordIO(std::string(100000, 'x')) + ToRecordIO("world!")
+        + ToRecordIO("bye");
+    std::unique_ptr<RecordIOReader> ptr = MakeRecordIOReader(
+        CreateChannel(CreateTemporaryDirectory(), "elizabeth", encoded, 0), 4);
+    ptr->SetFilter(&filter);
+    tensorflow::tstring storage;
+    EXPECT_TRUE(ptr->ReadRecord(&storage));
+    EXPECT_EQ("hello", storage);
+    EXPECT_TRUE(ptr->ReadRecord(&storage));
+    EXPECT_EQ("bye", storage);
+    EXPECT_FALSE(ptr->ReadRecord(&storage));
+    EXPECT_EQ(2, filter.Stats().rejected_records);
+    EXPECT_EQ(100006, filter.Stats().rejected_bytes);
+}
+
+std::string ToRecordIOPart(const std::string& data, std::uint32_t flag) {
+    std::string encoded = ToRecordIO(data);
+    std::uint32_t size_and_flag = data.size() | (flag << 29);
+    encoded.replace(4, 4, reinterpret_cast<const char*>(&size_and_flag), 4);
+    return encoded;
+}
+
+TEST_F(RecordIOReaderTest, TestReadRecordChunks) {
+    std::string encoded = ToRecordIO("abcdefghij") + ToRecordIO("") + ToRecordIOPart("abc", 1)
+        + ToRecordIOPart("defg", 2) + ToRecordIOPart("hi", 3) + ToRecordIO("z");
+    std::unique_ptr<RecordIOReader> ptr = MakeRecordIOReader(
+        CreateChannel(CreateTemporaryDirectory(), "elizabeth", encoded, 0), 4);
+    using Chunks = std::vector<std::pair<std::string, bool>>;
+    Chunks chunks;
+    tensorflow::tstring storage;
+    bool is_last;
+    while (ptr->ReadRecordChunk(&storage, 4, &is_last)) {
+        chunks.emplace_back(std::string(storage), is_last);
+    }
+    EXPECT_EQ(Chunks({{"abcd", false}, {"efgh", false}, {"ij", true},
+        {"", true}, {"abcd", false}, {"efgh", false}, {"i", true}, {"z", true}}), chunks);
+}
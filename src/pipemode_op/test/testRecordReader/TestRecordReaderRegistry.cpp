@@ -0,0 +1,206 @@
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+#include <cstdint>
+#include <memory>
+#include <stdexcept>
+#include <string>
+#include <RecordReaderRegistry.hpp>
+#include <TextLineRecordReader.hpp>
+#include "common.hpp"
+#include "TestRecordReaderRegistry.hpp"
+#include "tensorflow/core/platform/tstring.h"
+
+using sagemaker::tensorflow::RecordReader;
+using sagemaker::tensorflow::RecordReaderRegistry;
+using sagemaker::tensorflow::RecordReaderRegistryTest;
+using sagemaker::tensorflow::RecordTransform;
+using sagemaker::tensorflow::TextLineRecordReader;
+
+RecordReaderRegistryTest::RecordReaderRegistryTest() {}
+
+RecordReaderRegistryTest::~RecordReaderRegistryTest() {}
+
+void RecordReaderRegistryTest::SetUp() {}
+
+void RecordReaderRegistryTest::TearDown() {}
+
+namespace {
+
+std::string LengthPrefixed(const std::string& record) {
+    std::uint32_t length = record.size();
+    return std::string(reinterpret_cast<const char*>(&length), sizeof(length)) + record;
+}
+
+std::string CreateTestChannel(const std::string& data) {
+    return CreateChannel(CreateTemporaryDirectory(), "elizabeth", data, 0);
+}
+
+void* CreateNothing() {
+    return nullptr;
+}
+
+int ReadNothing(void* reader, PipeModeReadFn read, void* source, const char** data, size_t* size) {
+    return 0;
+}
+
+void DestroyNothing(void* reader) {}
+
+void* CreateState() {
+    static int state;
+    return &state;
+}
+
+int FailTransform(void* state, const char* data, size_t size, const char** output, size_t* output_size) {
+    return -1;
+}
+
+const char* TransformError(void* state) {
+    return "Bad record";
+}
+
+std::string Transform(RecordTransform* transform, const std::string& record) {
+    const char* output;
+    std::size_t output_size;
+    transform->Transform(record.data(), record.size(), &output, &output_size);
+    return std::string(output, output_size);
+}
+
+}  // namespace
+
+TEST_F(RecordReaderRegistryTest, BuiltInFormats) {
+    RecordReaderRegistry registry;
+    for (const std::string& name : {"RecordIO", "TFRecord", "TextLine", "ArrowStream"}) {
+        EXPECT_TRUE(registry.Contains(name));
+    }
+    EXPECT_FALSE(registry.Contains("LengthPrefixed"));
+    EXPECT_THROW(registry.Create("LengthPrefixed", CreateTestChannel(""), 0), std::invalid_argument);
+
+    std::unique_ptr<RecordReader> reader = registry.Create("TextLine", CreateTestChannel("a\nb\n"), 0);
+    EXPECT_NE(nullptr, dynamic_cast<TextLineRecordReader*>(reader.get()));
+}
+
+TEST_F(RecordReaderRegistryTest, RegisterTwice) {
+    RecordReaderRegistry registry;
+    EXPECT_THROW(registry.Register("TextLine", [](const std::string& file_path, std::uint32_t) {
+        return std::unique_ptr<RecordReader>(new TextLineRecordReader(file_path));
+    }), std::invalid_argument);
+
+    PipeModeRecordFormat format = {PIPEMODE_RECORD_FORMAT_ABI_VERSION, sizeof(PipeModeRecordFormat), "Nothing",
+        CreateNothing, ReadNothing, nullptr, DestroyNothing};
+    registry.Register(&format);
+    registry.Register(&format);
+    PipeModeRecordFormat other = format;
+    EXPECT_THROW(registry.Register(&other), std::invalid_argument);
+}
+
+TEST_F(RecordReaderRegistryTest, RejectsOtherAbiVersion) {
+    RecordReaderRegistry registry;
+    PipeModeRecordFormat format = {PIPEMODE_RECORD_FORMAT_ABI_VERSION + 1, sizeof(PipeModeRecordFormat), "Nothing",
+        CreateNothing, ReadNothing, nullptr, DestroyNothing};
+    EXPECT_THROW(registry.Register(&format), std::invalid_argument);
+    EXPECT_FALSE(registry.Contains("Nothing"));
+}
+
+TEST_F(RecordReaderRegistryTest, RejectsSmallerStruct) {
+    RecordReaderRegistry registry;
+    PipeModeRecordFormat format = {PIPEMODE_RECORD_FORMAT_ABI_VERSION, offsetof(PipeModeRecordFormat, destroy_reader),
+        "Nothing", CreateNothing, ReadNothing, nullptr, DestroyNothing};
+    EXPECT_THROW(registry.Register(&format), std::invalid_argument);
+    EXPECT_FALSE(registry.Contains("Nothing"));
+    PipeModeRecordTransform transform = {PIPEMODE_RECORD_FORMAT_ABI_VERSION, 0, "Failing", CreateState,
+        FailTransform, TransformError, DestroyNothing};
+    EXPECT_THROW(registry.RegisterTransform(&transform), std::invalid_argument);
+    EXPECT_FALSE(registry.ContainsTransform("Failing"));
+}
+
+TEST_F(RecordReaderRegistryTest, FailedReaderCreation) {
+    RecordReaderRegistry registry;
+    PipeModeRecordFormat format = {PIPEMODE_RECORD_FORMAT_ABI_VERSION, sizeof(PipeModeRecordFormat), "Nothing",
+        CreateNothing, ReadNothing, nullptr, DestroyNothing};
+    registry.Register(&format);
+    EXPECT_THROW(registry.Create("Nothing", CreateTestChannel(""), 0), std::runtime_error);
+}
+
+TEST_F(RecordReaderRegistryTest, LoadLibrary) {
+    RecordReaderRegistry registry;
+    registry.LoadLibrary(LENGTH_PREFIXED_PLUGIN_PATH);
+    registry.LoadLibrary(LENGTH_PREFIXED_PLUGIN_PATH);
+    ASSERT_TRUE(registry.Contains("LengthPrefixed"));
+
+    std::unique_ptr<RecordReader> reader = registry.Create("LengthPrefixed",
+        CreateTestChannel(LengthPrefixed("first") + LengthPrefixed("") + LengthPrefixed("third")), 0);
+    tensorflow::tstring storage;
+    EXPECT_TRUE(reader->ReadRecord(&storage));
+    EXPECT_EQ("first", storage);
+    EXPECT_TRUE(reader->ReadRecord(&storage));
+    EXPECT_EQ("", storage);
+    EXPECT_TRUE(reader->ReadRecord(&storage));
+    EXPECT_EQ("third", storage);
+    EXPECT_FALSE(reader->ReadRecord(&storage));
+}
+
+TEST_F(RecordReaderRegistryTest, PluginReadError) {
+    RecordReaderRegistry registry;
+    registry.LoadLibrary(LENGTH_PREFIXED_PLUGIN_PATH);
+    std::string data = LengthPrefixed("truncated");
+    std::unique_ptr<RecordReader> reader = registry.Create("LengthPrefixed",
+        CreateTestChannel(data.substr(0, data.size() - 1)), 0);
+    tensorflow::tstring storage;
+    try {
+        reader->ReadRecord(&storage);
+        FAIL() << "Expected std::runtime_error";
+    } catch (const std::runtime_error& err) {
+        EXPECT_EQ("Cannot read a record of format LengthPrefixed: Truncated record", std::string(err.what()));
+    }
+}
+
+TEST_F(RecordReaderRegistryTest, LoadMissingLibrary) {
+    RecordReaderRegistry registry;
+    EXPECT_THROW(registry.LoadLibrary("/nonexistent/libformat.so"), std::invalid_argument);
+}
+
+TEST_F(RecordReaderRegistryTest, LoadLibraryTransforms) {
+    RecordReaderRegistry registry;
+    EXPECT_FALSE(registry.ContainsTransform("Reverse"));
+    EXPECT_THROW(registry.CreateTransform("Reverse"), std::invalid_argument);
+    registry.LoadLibrary(LENGTH_PREFIXED_PLUGIN_PATH);
+    ASSERT_TRUE(registry.ContainsTransform("Reverse"));
+    EXPECT_FALSE(registry.Contains("Reverse"));
+
+    std::unique_ptr<RecordTransform> transform = registry.CreateTransform("Reverse");
+    EXPECT_EQ("cba", Transform(transform.get(), "abc"));
+    EXPECT_EQ("", Transform(transform.get(), ""));
+    EXPECT_EQ("54321", Transform(transform.get(), "12345"));
+}
+
+TEST_F(RecordReaderRegistryTest, PluginTransformError) {
+    RecordReaderRegistry registry;
+    PipeModeRecordTransform failing = {PIPEMODE_RECORD_FORMAT_ABI_VERSION, sizeof(PipeModeRecordTransform),
+        "Failing", CreateState, FailTransform, TransformError, DestroyNothing};
+    registry.RegisterTransform(&failing);
+    registry.RegisterTransform(&failing);
+    PipeModeRecordTransform other = failing;
+    EXPECT_THROW(registry.RegisterTransform(&other), std::invalid_argument);
+    other.abi_version++;
+    other.name = "Other";
+    EXPECT_THROW(registry.RegisterTransform(&other), std::invalid_argument);
+
+    std::unique_ptr<RecordTransform> transform = registry.CreateTransform("Failing");
+    try {
+        Transform(transform.get(), "abc");
+        FAIL() << "Expected std::runtime_error";
+    } catch (const std::runtime_error& err) {
+        EXPECT_EQ("Cannot transform a record with Failing: Bad record", std::string(err.what()));
+    }
+}
@@ -153,3 +153,44 @@ TEST_F(TFRecordReaderTest, SkipCorruptRecords) {
         reader->ReadRecord(&record);},
         std::runtime_error);
 }
+
+TEST_F(TFRecordReaderTest, RecoverFromCorruptedData) {
+    // A record whose data fails its CRC is dropped, and garbage where a header should be is
+    // scanned past to the next header whose length matches its CRC
+    std::string rec1 = ToTFRecord("hello");
+    std::string rec2 = ToTFRecord("world");
+    std::string corrupted = rec2;
+    corrupted[corrupted.length() - 1] = 'x';
+    std::string garbage(RECOVERY_SCAN_SIZE + 100, 'x');
+    std::string encoded = rec1 + corrupted + garbage + rec2;
+    sagemaker::tensorflow::RecoveryStats stats;
+    std::unique_ptr<TFRecordReader> reader = MakeTFRecordReader(
+        CreateChannel(CreateTemporaryDirectory(), "elizabeth", encoded, 0), 4);
+    reader->SetRecovery(&stats);
+    tensorflow::tstring record;
+    EXPECT_TRUE(reader->ReadRecord(&record));
+    EXPECT_EQ("hello", record);
+    EXPECT_TRUE(reader->ReadRecord(&record));
+    EXPECT_EQ("world", record);
+    EXPECT_FALSE(reader->ReadRecord(&record));
+    EXPECT_EQ(1, stats.skipped_records);
+    EXPECT_EQ(1, stats.resyncs);
+    EXPECT_EQ(corrupted.size() + garbage.size(), stats.skipped_bytes);
+}
+
+TEST_F(TFRecordReaderTest, FilterRecords) {
+    sagemaker::tensorflow::RecordFilterOptions options;
+    options.max_record_bytes = 5;
+    sagemaker::tensorflow::RecordFilter filter(options);
+    std::string encoded = ToTFRecord("hello") + ToTFRecord(std::string(100000, 'x')) + ToTFRecord("bye");
+    std::unique_ptr<TFRecordReader> reader = MakeTFRecordReader(
+        CreateChannel(CreateTemporaryDirectory(), "elizabeth", encoded, 0), 4);
+    reader->SetFilter(&filter);
+    tensorflow::tstring record;
+    EXPECT_TRUE(reader->ReadRecord(&record));
+    EXPECT_EQ("hello", record);
+    EXPECT_TRUE(reader->ReadRecord(&record));
+    EXPECT_EQ("bye", record);
+    EXPECT_FALSE(reader->ReadRecord(&record));
+    EXPECT_EQ(1, filter.Stats().rejected_records);
+}
@@ -0,0 +1,128 @@
+// Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+//
+// Licensed under the Apache License, Version 2.0 (the "License"). You
+// may not use this file except in compliance with the License. A copy of
+// the License is located at
+//
+//     http://aws.amazon.com/apache2.0/
+//
+// or in the "license" file accompanying this file. This file is
+// distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+// ANY KIND, either express or implied. See the License for the specific
+// language governing permissions and limitations under the License.
+
+/*
+   A record format plugin used by the tests of RecordReaderRegistry. Each record is
+   prefixed by its length, a little endian uint32. The plugin also implements a record
+   transform, Reverse, which reverses the bytes of each record.
+ */
+
+#include <stdlib.h>
+#include <string.h>
+
+#include "PipeModeRecordFormat.h"
+
+typedef struct {
+    char* record;
+    size_t capacity;
+    const char* error;
+} LengthPrefixedReader;
+
+static void* CreateReader(void) {
+    return calloc(1, sizeof(LengthPrefixedReader));
+}
+
+static int ReadRecord(void* state, PipeModeReadFn read, void* source, const char** data, size_t* size) {
+    LengthPrefixedReader* reader = (LengthPrefixedReader*) state;
+    unsigned char prefix[4];
+    int64_t bytes_read = read(source, prefix, sizeof(prefix));
+    if (bytes_read == 0) {
+        return 0;
+    }
+    if (bytes_read != sizeof(prefix)) {
+        reader->error = bytes_read < 0 ? "Cannot read channel" : "Truncated length prefix";
+        return -1;
+    }
+    size_t length = prefix[0] | (prefix[1] << 8) | (prefix[2] << 16) | ((size_t) prefix[3] << 24);
+    if (length > reader->capacity) {
+        char* record = (char*) realloc(reader->record, length);
+        if (!record) {
+            reader->error = "Out of memory";
+            return -1;
+        }
+        reader->record = record;
+        reader->capacity = length;
+    }
+    if (read(source, reader->record, length) != (int64_t) length) {
+        reader->error = "Truncated record";
+        return -1;
+    }
+    *data = reader->record;
+    *size = length;
+    return 1;
+}
+
+static const char* LastError(void* state) {
+    return ((LengthPrefixedReader*) state)->error;
+}
+
+static void DestroyReader(void* state) {
+    LengthPrefixedReader* reader = (LengthPrefixedReader*) state;
+    free(reader->record);
+    free(reader);
+}
+
+static const PipeModeRecordFormat kLengthPrefixed = {
+    PIPEMODE_RECORD_FORMAT_ABI_VERSION, sizeof(PipeModeRecordFormat), "LengthPrefixed",
+    CreateReader, ReadRecord, LastError, DestroyReader
+};
+
+static const PipeModeRecordFormat* const kFormats[] = {&kLengthPrefixed, NULL};
+
+const PipeModeRecordFormat* const* PipeModeRecordFormats(void) {
+    return kFormats;
+}
+
+typedef struct {
+    char* record;
+    size_t capacity;
+} ReverseState;
+
+static void* CreateReverse(void) {
+    return calloc(1, sizeof(ReverseState));
+}
+
+static int Reverse(void* state, const char* data, size_t size, const char** output, size_t* output_size) {
+    ReverseState* reverse = (ReverseState*) state;
+    if (size > reverse->capacity) {
+        char* record = (char*) realloc(reverse->record, size);
+        if (!record) {
+            return -1;
+        }
+        reverse->record = record;
+        reverse->capacity = size;
+    }
+    for (size_t i = 0; i < size; i++) {
+        reverse->record[i] = data[size - 1 - i];
+    }
+    *output = reverse->record;
+    *output_size = size;
+    return 0;
+}
+
+static void DestroyReverse(void* state) {
+    ReverseState* reverse = (ReverseState*) state;
+    free(reverse->record);
+    free(reverse);
+}
+
+static const PipeModeRecordTransform kReverse = {
+    PIPEMODE_RECORD_FORMAT_ABI_VERSION, sizeof(PipeModeRecordTransform), "Reverse",
+    CreateReverse, Reverse, NULL, DestroyReverse
+};
+
+static const PipeModeRecordTransform* const kTransforms[] = {&kReverse, NULL};
+
+const PipeModeRecordTransform* const* PipeModeRecordTransforms(void) {
+    return kTransforms;
+}
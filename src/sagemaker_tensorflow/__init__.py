@@ -12,6 +12,14 @@
 #  permissions and limitations under the License.
 from __future__ import absolute_import
 
-from sagemaker_tensorflow.pipemode import PipeModeDataset, PipeModeDatasetException
+from sagemaker_tensorflow.reader import PipeModeReader, PipeModeReaderException, RecordBatch
 
-__all__ = [PipeModeDataset, PipeModeDatasetException]
+__all__ = ['PipeModeDataset', 'PipeModeDatasetException', 'PipeModeReader', 'PipeModeReaderException', 'RecordBatch']
+
+
+def __getattr__(name):
+    # The PipeModeDataset imports TensorFlow, which users of the PipeModeReader may not have installed
+    if name in ('PipeModeDataset', 'PipeModeDatasetException'):
+        from sagemaker_tensorflow import pipemode
+        return getattr(pipemode, name)
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
@@ -22,6 +22,35 @@ from tensorflow.python.framework import ops
 from tensorflow.python.framework import tensor_shape
 from tensorflow.python.framework import tensor_spec
 from tensorflow.python.framework import dtypes
+from tensorflow.python.data.util import structure
+
+# Record formats whose records are decoded into batches of fields, rather than returned as strings
+_BATCHED_RECORD_FORMATS = ('RecordIO-protobuf', 'CSV', 'JSONLines', 'FixedLength')
+
+# Record formats whose elements are dicts of fields
+_DECODED_RECORD_FORMATS = _BATCHED_RECORD_FORMATS + ('ArrowStream',)
+
+# Record formats whose readers can find the next record after corrupted data
+_RECOVERABLE_RECORD_FORMATS = ('RecordIO', 'RecordIO-protobuf', 'TFRecord')
+
+# The number of files of a File or FastFile mode channel read at once, by default
+_DEFAULT_PARALLEL_FILES = 4
+
+# The size of the ring buffer of each consumer of a shared memory fan-out, by default
+_DEFAULT_FANOUT_RING_BYTES = 64 * 1024 * 1024
+
+_FIELD_DTYPES = (tf.float32, tf.float64, tf.int32, tf.int64, tf.string)
+
+# The dtypes of the values of ragged batches of records
+_RAGGED_DTYPES = (tf.uint8, tf.int8, tf.int16, tf.int32, tf.int64, tf.float32, tf.float64)
+
+
+def _makedirs(path):
+    try:
+        os.makedirs(path)
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            raise
 
 
 def _load_plugin():
@@ -35,6 +64,85 @@ class PipeModeDatasetException(Exception):
     pass
 
 
+def _parse_fields(prefix, specs, defaults=False, ragged=False):
+    """Return (name, kind, dtype, shape, default) tuples for a dict of tf.io feature specs.
+
+    If defaults is True, fields may have scalar default values. If ragged is True, fields may be flat
+    tf.io.RaggedFeatures.
+    """
+    return [_parse_field(prefix + name, spec, defaults, ragged) for name, spec in specs.items()]
+
+
+def _parse_field(name, spec, defaults, ragged):
+    if spec.dtype not in _FIELD_DTYPES:
+        raise PipeModeDatasetException("Unsupported dtype for field {}: {}".format(name, spec.dtype))
+    if isinstance(spec, tf.io.FixedLenFeature):
+        shape = tensor_shape.TensorShape(spec.shape)
+        if not shape.is_fully_defined():
+            raise PipeModeDatasetException("Field {} must have a fully defined shape".format(name))
+        return (name, 'dense', spec.dtype, shape, _field_default(name, spec, defaults))
+    if isinstance(spec, tf.io.VarLenFeature):
+        return (name, 'sparse', spec.dtype, tensor_shape.TensorShape(None), None)
+    if ragged and isinstance(spec, tf.io.RaggedFeature) and not spec.partitions and spec.value_key is None:
+        return (name, 'ragged', spec.dtype, tensor_shape.TensorShape(None), None)
+    raise PipeModeDatasetException("Field {} must be a FixedLenFeature or VarLenFeature{}".format(
+        name, ", or a RaggedFeature without partitions" if ragged else ""))
+
+
+def _field_default(name, spec, allow_default):
+    """Return the text of the default value of a FixedLenFeature, or None if it has none."""
+    if spec.default_value is None:
+        return None
+    if not allow_default:
+        raise PipeModeDatasetException("Field {} cannot have a default value".format(name))
+    if not isinstance(spec.default_value, (int, float, str, bytes)):
+        raise PipeModeDatasetException("The default value of field {} must be a scalar".format(name))
+    if spec.dtype == tf.string:
+        return spec.default_value
+    return repr(int(spec.default_value)) if spec.dtype.is_integer else repr(float(spec.default_value))
+
+
+def _csv_field(column, record_default):
+    """Return the field tuple of a CSV column, given a dtype or a default value of the column."""
+    if isinstance(record_default, dtypes.DType):
+        dtype, default = record_default, None
+    elif isinstance(record_default, (str, bytes)):
+        dtype, default = tf.string, record_default
+    elif isinstance(record_default, int) and not isinstance(record_default, bool):
+        dtype, default = tf.int32, repr(record_default)
+    elif isinstance(record_default, float):
+        dtype, default = tf.float32, repr(record_default)
+    else:
+        raise PipeModeDatasetException("Invalid record default for column {}: {!r}".format(column, record_default))
+    if dtype not in _FIELD_DTYPES:
+        raise PipeModeDatasetException("Unsupported dtype for column {}: {}".format(column, dtype))
+    return (str(column), 'dense', dtype, tensor_shape.TensorShape([]), default)
+
+
+def _flat_field_specs(fields):
+    """Return the TensorSpecs of the tensors the PipeModeDataset op outputs for fields."""
+    specs = []
+    for _, kind, dtype, shape, _ in fields:
+        if kind == 'dense':
+            specs.append(tensor_spec.TensorSpec([None] + shape.as_list(), dtype))
+        else:
+            specs += [tensor_spec.TensorSpec([None, 2], tf.int64), tensor_spec.TensorSpec([None], dtype),
+                      tensor_spec.TensorSpec([2], tf.int64)]
+    return tuple(specs)
+
+
+class _FieldDataset(dataset_ops.DatasetSource):
+    """The flat tuple of field tensors output by the PipeModeDataset op."""
+
+    def __init__(self, variant_tensor, element_spec):
+        self._element_spec = element_spec
+        super(_FieldDataset, self).__init__(variant_tensor)
+
+    @property
+    def element_spec(self):
+        return self._element_spec
+
+
 class PipeModeDataset(dataset_ops.Dataset):
     """A SageMaker Pipe Mode TensorFlow Dataset."""
 
@@ -43,13 +151,58 @@ class PipeModeDataset(dataset_ops.Dataset):
     def __init__(self, channel, record_format='RecordIO',
                  state_dir='/opt/ml/pipe_state', pipe_dir='/opt/ml/input/data',
                  config_dir='/opt/ml/input/config', benchmark=False, benchmark_records_interval=0,
-                 max_corrupted_records_to_skip=0):
+                 max_corrupted_records_to_skip=0, cache_dir=None, cache_max_bytes=0, cache_shuffle=False,
+                 seed=None, shm_cache_name=None, shm_cache_bytes=0, shuffle_buffer_bytes=0,
+                 compression=None, batch_size=None, features=None, labels=None, record_defaults=None,
+                 select_cols=None, header=False, field_delim=',', na_value='', record_format_library=None,
+                 parallel_files=None, deterministic=None, num_shards=None, shard_index=None, header_bytes=0,
+                 footer_bytes=0, record_header_bytes=0, record_footer_bytes=0, ragged_dtype=None,
+                 num_parallel_calls=None, transforms=None, recover_corrupted_records=False,
+                 pool_buffers=False, sample_rate=None, max_record_bytes=None, split=None, split_key_bytes=None,
+                 max_chunk_bytes=None, memory_budget_bytes=None, fanout_name=None, fanout_consumers=None,
+                 fanout_index=None, fanout_ring_bytes=None, fanout_policy='round_robin', attribute_names=None):
         """Create a Dataset for reading from a SageMaker PipeMode channel.
 
-        Supports records encoded using either RecordIO, TFRecord, or new line text encoding.
+        File and FastFile mode channels are read as well. Their records are read from every file under
+        pipe_dir/channel, several files at once, with io_uring where the kernel supports it and a pool of reader
+        threads otherwise.
+
+        Supports records encoded using either RecordIO, TFRecord, or new line text encoding. The channel's data may
+        be compressed with GZIP, ZLIB or ZSTD.
+
+        Records in the SageMaker RecordIO-protobuf format are decoded into batches of tensors. Each element of the
+        Dataset is a dict of the decoded features, or a tuple of a dict of features and a dict of labels if labels
+        are decoded.
+
+        Lines of CSV records are parsed into batches of column tensors. Each element of the Dataset is a tuple with
+        one Tensor of shape [batch_size] per selected column.
+
+        Lines of JSONLines records are JSON objects, whose requested fields are extracted into batches of tensors.
+        Each element of the Dataset is a dict of the decoded features, keyed by their field paths.
+
+        Records that are not decoded can be batched into a tf.RaggedTensor of shape [batch_size, None] by setting
+        batch_size and ragged_dtype. Each row is the bytes of one record, reinterpreted as values of ragged_dtype,
+        and the values of a whole batch are held in one contiguous Tensor, rather than one string per record.
+
+        FixedLength records are binary records of one size, like those of tf.data.FixedLengthRecordDataset. Each
+        record holds the values of the requested features one after another, and each element of the Dataset is a
+        dict of the features of a batch of records. Records are read from a pipe a batch at a time, straight into
+        the feature's Tensor when records hold a single feature, without creating a string Tensor per record.
+
+        An ArrowStream channel holds Apache Arrow IPC streams. Each element of the Dataset is one Arrow record
+        batch, a dict of the requested columns, each a Tensor of shape [num_rows]. Numeric columns are returned
+        without copying their values when they are stored in the stream as they would be in a Tensor.
+
+        With num_parallel_calls, records are decoded on a pool of native worker threads inside the op, rather than
+        on the thread that reads them. Records are read in chunks, one batch per chunk, and each worker applies the
+        transforms of record_format_library to the records of a chunk and decodes them into an element, without
+        the per-element overhead of Dataset.map. Elements of records that are not batched are decoded 64 records
+        to a chunk.
 
         Args:
-            record_format: The record format to use. One of 'RecordIO', 'TFRecord', or 'TextLine'
+            record_format: The record format to use. One of 'RecordIO', 'TFRecord', 'TextLine',
+                    'RecordIO-protobuf', 'CSV', 'JSONLines', 'FixedLength' or 'ArrowStream', or a format of
+                    record_format_library.
             channel: The name of the SageMaker channel.
             pipe_dir: The directory to read SageMaker Channels from.
             state_dir: The directory where pipe index state is persisted.
@@ -63,12 +216,179 @@ class PipeModeDataset(dataset_ops.Dataset):
                     Metrics are emitted to stdout.
             max_corrupted_records_to_skip: the number of corrupted records encountered in sequence that it's ok to
                     skip. Only applicable for record_format='TFRecord'.
+            recover_corrupted_records: Controls whether corrupted data is skipped rather than failing the Iterator.
+                    If True, a reader that finds a corrupted record header scans forward to the next plausible
+                    header: the next RecordIO magic number, or the next TFRecord length that matches its CRC. A
+                    TFRecord record whose data fails its CRC is dropped. The records and bytes skipped are logged
+                    to stderr and, with benchmark, printed with the Iterator's totals. Only applicable for
+                    record_format 'RecordIO', 'RecordIO-protobuf' and 'TFRecord'.
+            cache_dir: A local directory to cache the records of the channel in. If set, the first Iterator created
+                    from this Dataset writes every record it reads to the cache. Iterators created after the cache
+                    is complete replay records from the cache instead of reading from the channel's pipe. The cache
+                    is named by the channel and by the options that decide which records are read, such as
+                    record_format, compression, split and the File mode shard, so differently configured datasets
+                    of a channel that share cache_dir keep separate caches. A cache that cannot be read is ignored,
+                    and replaced by the next Iterator that reads the channel. If None, records are not cached.
+            cache_max_bytes: The maximum number of bytes the cache may occupy on disk. If the channel does not fit,
+                    only a prefix of the channel's records is cached and later Iterators read the remaining records
+                    from the pipe. If zero, the cache size is unlimited.
+            cache_shuffle: Controls whether cached records are replayed in a random order. Each Iterator replays
+                    the cache in a different order. Records read from the pipe after a partial cache are not shuffled.
+            seed: The random seed used to order cached records and to shuffle records in the shuffle buffer. Each
+                    Iterator created from this Dataset uses a different seed derived from it. If None, a random seed
+                    is used.
+            shm_cache_name: The name of a shared memory record cache. PipeModeDatasets in different processes on
+                    the same host that use the same name share one cache, held in a POSIX shared memory object.
+                    Records are read from the cache when it holds them, and from the pipe otherwise. All
+                    PipeModeDatasets that share a cache must read identical data. If None, no shared memory cache
+                    is used.
+            shm_cache_bytes: The size in bytes of the shared memory record cache. Only used by the process that
+                    creates the cache. When the cache is full, the least recently used records are evicted.
+            shuffle_buffer_bytes: The size in bytes of a buffer that records are shuffled in before they are returned.
+                    Records are added to the buffer until it is full, and each returned record is chosen at random
+                    from the buffer. Records larger than the buffer are returned as they are read. Unlike
+                    Dataset.shuffle, the buffer is bounded by bytes rather than by a number of records, and records
+                    are shuffled before a Tensor is created for them. If zero, records are not shuffled.
+            compression: The compression of the channel's data. One of 'GZIP', 'ZLIB' or 'ZSTD', or None if the
+                    data is not compressed. Data is decompressed on background threads ahead of the record reader.
+                    BGZF files and zstd streams of multiple frames are decompressed in parallel, one block or frame
+                    per thread.
+            batch_size: The number of records decoded into each element. Required for record_formats
+                    'RecordIO-protobuf', 'CSV', 'JSONLines' and 'FixedLength', and for ragged batches of records.
+                    The last element has fewer records if the number of records is not divisible by batch_size.
+            features: A dict of the features to decode from the features map of each RecordIO-protobuf record,
+                    from feature key to a tf.io.FixedLenFeature or tf.io.VarLenFeature. FixedLenFeatures are
+                    decoded into a dense Tensor of shape [batch_size] + shape, and must be present in every
+                    record. VarLenFeatures are decoded into a SparseTensor of shape [batch_size, n], where n is the
+                    largest shape of the feature in the batch; the keys of the RecordIO-protobuf tensor are the
+                    column indices.
+
+                    For record_format 'JSONLines', a dict of the fields to extract from each JSON object, from a dot
+                    separated path of object keys, such as 'user.id', to a tf.io.FixedLenFeature,
+                    tf.io.VarLenFeature or tf.io.RaggedFeature. A FixedLenFeature takes a scalar or an array with
+                    exactly as many values as its shape, and may have a scalar default_value for objects where the
+                    field is missing or null. VarLenFeatures and RaggedFeatures take arrays of any length, and are
+                    decoded into a SparseTensor or a RaggedTensor of shape [batch_size, None]. Values that are not
+                    on the path of a field are skipped without being decoded.
+
+                    For record_format 'ArrowStream', a dict of the columns to decode from each record batch, from
+                    column name to a scalar tf.io.FixedLenFeature. Numeric features are read from integer,
+                    floating point and boolean columns, and tf.string features from utf8 and binary columns. A
+                    FixedLenFeature may have a default_value for null values. ArrowStream channels cannot be cached
+                    or shuffled.
+
+                    For record_format 'FixedLength', a dict of the features each record holds, in the order they
+                    are stored, from feature name to a tf.io.FixedLenFeature of a numeric dtype without a default
+                    value. Values are stored in native byte order, which is little-endian on x86 and Arm hosts.
+            labels: A dict of the labels to decode from the label map of each RecordIO-protobuf record, in the
+                    same form as features. If None, no labels are decoded.
+            record_defaults: A list with one entry per selected CSV column: either a default value of the column,
+                    whose type sets the type of the column (int for tf.int32, float for tf.float32, str for
+                    tf.string), or a tf.DType for a column that must have a value in every line. Required for
+                    record_format 'CSV'.
+            select_cols: The increasing, zero based indices of the CSV columns to decode. Other columns are
+                    skipped without being parsed. If None, the first len(record_defaults) columns are decoded.
+            header: Controls whether the CSV files of the channel start with a header line. If True, the first
+                    line of the channel and every later line equal to it are skipped, which skips the header of
+                    each file of the channel. Cannot be set with shuffle_buffer_bytes, cache_shuffle or
+                    fanout_name, since then lines do not reach the decoder in the order of the channel.
+            field_delim: The character that separates CSV columns.
+            na_value: The text of a missing CSV value. Empty and missing values take the column's default value.
+            record_format_library: The path of a shared library that implements more record formats, through the
+                    C ABI declared in PipeModeRecordFormat.h. The library is loaded once per process, and its
+                    formats can then be used as record_format. Their records are returned as strings, and can be
+                    cached and shuffled like the records of the built-in formats.
+            parallel_files: The number of files of a File or FastFile mode channel read at once. Records are
+                    interleaved from the files one at a time, and each exhausted file is replaced by the next file
+                    of the channel, in sorted order. Defaults to 4. Only applicable to File and FastFile mode
+                    channels, like the arguments below.
+            deterministic: Controls whether records are interleaved from the files read at once in turn. If False,
+                    each record is taken from the next file whose data is ready, so that a slow file does not hold
+                    back the others, and the order of records may differ between Iterators. Records of
+                    compressed channels are always interleaved in turn. With num_parallel_calls, also controls
+                    whether elements are returned in the order of their records; if False, each element is
+                    returned as soon as it is decoded. Defaults to True. Only applicable to File and FastFile
+                    mode channels and to datasets decoded in parallel.
+            num_shards: The number of shards the files of the channel are split into, such as the number of
+                    training processes. Files are assigned to shards in turn. Defaults to 1.
+            shard_index: The shard of the channel's files to read, from 0 to num_shards - 1. Defaults to 0.
+            header_bytes: The number of bytes skipped at the start of each pipe or file of a 'FixedLength' channel.
+            footer_bytes: The number of bytes skipped at the end of each pipe or file of a 'FixedLength' channel.
+            record_header_bytes: The number of bytes before the features of each 'FixedLength' record.
+            record_footer_bytes: The number of bytes after the features of each 'FixedLength' record.
+            ragged_dtype: The dtype of the values of ragged batches of records. One of tf.uint8, tf.int8, tf.int16,
+                    tf.int32, tf.int64, tf.float32 or tf.float64. Values are read in native byte order, and each
+                    record must be a whole number of values. Only applicable to record formats whose records are not
+                    decoded, and requires batch_size. If None, each element is one record, as a scalar string.
+            num_parallel_calls: The number of native threads that transform and decode records in parallel, or
+                    tf.data.AUTOTUNE for one thread per CPU core. Not applicable to record_format 'ArrowStream'
+                    or to CSV records with a header. If None, records are decoded on the thread that reads them,
+                    or on one worker thread if transforms are set.
+            transforms: A list of the names of record transforms of record_format_library, which are applied in
+                    order to each record after it is read, and before it is decoded or returned. Transforms run
+                    on the worker threads of num_parallel_calls, and records are cached and shuffled before they
+                    are transformed.
+            pool_buffers: Controls whether the buffers of the tensors of batched elements, which are batches of
+                    decoded fields, ragged batches and batches of FixedLength records, are allocated from a pool of
+                    size-classed slabs, which are kept for reuse when the tensors are freed rather than returned to
+                    malloc. The pool is shared by the datasets of the process, and keeps up to 64 MiB of free
+                    slabs. Elements of single records or record chunks are not pooled, since a tf.string record
+                    longer than 22 bytes allocates its bytes itself. The bytes of the strings in a batch of decoded
+                    fields are allocated the same way. With benchmark, the Iterator prints how often the pool had a
+                    free slab to hand out.
+            sample_rate: The probability that each record of the channel is kept, greater than 0 and at most 1.
+                    Each Iterator draws its sample with a seed derived from seed, so with a seed the same records
+                    are kept by each run. Records are filtered as they are read, before they are shuffled or
+                    decoded. Since each Iterator keeps different records, a sample_rate below 1 cannot be set with
+                    cache_dir or shm_cache_name. If None, every record is kept.
+            max_record_bytes: The size of the largest record kept. Larger records are skipped without being
+                    copied. If None, records of any size are kept.
+            split: A (begin, end) pair of fractions, with 0 <= begin < end <= 1. A record is kept if the CRC32C
+                    hash of its bytes, as a fraction of the range of the hash, falls in [begin, end). The split
+                    depends only on the bytes of records, so datasets with complementary splits of a channel, such
+                    as (0, 0.9) and (0.9, 1), never share a record. If None, records are not split.
+            split_key_bytes: The number of bytes at the start of each record that split hashes, so that records
+                    with the same key prefix fall in the same split. If None, whole records are hashed.
+            max_chunk_bytes: If set, each record is returned as a sequence of chunks of up to max_chunk_bytes
+                    bytes, rather than as one string. Each element is then a dict of the 'chunk', the 'record_id'
+                    of its record, counted from zero by each Iterator, the 'chunk_index' of the chunk in its
+                    record, and 'is_last', which is True for the last chunk of each record. RecordIO records,
+                    including multipart records, are read a chunk at a time, so records larger than memory
+                    can be streamed; records of other formats are read whole and then split. Records read in
+                    chunks cannot be decoded, batched, transformed, cached, shuffled or filtered.
+            memory_budget_bytes: The number of bytes the records buffered by the shuffle buffer, the chunks
+                    read ahead for num_parallel_calls and the blocks read ahead of File mode channels may take,
+                    across every Iterator of every PipeModeDataset of the process. The budget is shared fairly:
+                    an Iterator holding more than its share stops reading ahead, and serves the records it has
+                    buffered, until it is back within the budget. The budget is process-wide, so the dataset
+                    created last sets it; 0 removes the limit. If None, the budget is left unchanged, and no
+                    budget is set by default. Each Iterator reports its buffered bytes when benchmark is set.
+            fanout_name: The name of a shared memory fan-out, through which one process reads the channel and
+                    distributes its records to the other processes on the host, such as one process per GPU.
+                    Every process creates a PipeModeDataset with the same fanout_name and fanout_consumers, and
+                    its own fanout_index. The process with fanout_index 0 is the leader: it reads the channel,
+                    keeps its own records, and writes the others to a POSIX shared memory ring buffer per
+                    consumer. The other processes never open the channel. Each epoch of the leader ends the
+                    epoch of every consumer. If None, every process reads the channel itself.
+            fanout_consumers: The number of processes records are distributed to, including the leader.
+            fanout_index: The index of this process among the consumers, from 0 to fanout_consumers - 1.
+            fanout_ring_bytes: The size in bytes of the ring buffer of each consumer. The leader waits while a
+                    consumer's ring is full. Records larger than a ring cannot be distributed. Defaults to 64 MiB.
+            fanout_policy: How records are distributed: 'round_robin', or 'hash' to give each record to the
+                    consumer chosen by the CRC32C hash of its bytes.
+            attribute_names: The names of the attributes of an Augmented Manifest File channel, in the order they
+                    appear in each line of the manifest, e.g. ['source-ref', 'class']. SageMaker writes the
+                    attributes of each line as consecutive records, and every group of len(attribute_names)
+                    records is returned as one element, a dict from attribute name to a string Tensor. With
+                    batch_size, each element holds a batch of samples, and each Tensor has shape [batch_size].
+                    Requires record_format 'RecordIO'. The records of samples are read in order, so they cannot
+                    be shuffled as they are read, filtered, decoded in parallel or distributed by a fan-out. The
+                    files of a File or FastFile mode channel are read one at a time, and parallel_files cannot be
+                    more than 1.
         """
-        try:
-            os.makedirs(state_dir)
-        except OSError as e:
-            if e.errno != errno.EEXIST:
-                raise
+        _makedirs(state_dir)
+        if cache_dir:
+            _makedirs(cache_dir)
         self.record_format = record_format
         self.channel = channel
         self.pipe_dir = pipe_dir
@@ -76,46 +396,409 @@ class PipeModeDataset(dataset_ops.Dataset):
         self.benchmark = benchmark
         self.benchmark_records_interval = benchmark_records_interval
         self.max_corrupted_records_to_skip = max_corrupted_records_to_skip
+        self.cache_dir = cache_dir or ''
+        self.cache_max_bytes = cache_max_bytes
+        self.cache_shuffle = cache_shuffle
+        self.seed = -1 if seed is None else seed
+        self.shm_cache_name = '/' + shm_cache_name.lstrip('/') if shm_cache_name else ''
+        self.shm_cache_bytes = shm_cache_bytes
+        self.shuffle_buffer_bytes = shuffle_buffer_bytes
+        self.compression = compression or ''
+        self.batch_size = batch_size or 0
+        self.features = features
+        self.labels = labels
+        self.record_defaults = record_defaults
+        self.select_cols = select_cols
+        self.header = header
+        self.field_delim = field_delim
+        self.na_value = na_value
+        self.record_format_library = record_format_library or ''
+        self.parallel_files = parallel_files
+        self.deterministic = deterministic
+        self.num_shards = num_shards
+        self.shard_index = shard_index
+        self.fixed_length_bytes = {'header_bytes': header_bytes, 'footer_bytes': footer_bytes,
+                                   'record_header_bytes': record_header_bytes,
+                                   'record_footer_bytes': record_footer_bytes}
+        self.ragged_dtype = None if ragged_dtype is None else tf.as_dtype(ragged_dtype)
+        self.num_parallel_calls = num_parallel_calls
+        self.transforms = list(transforms or [])
+        self.recover_corrupted_records = recover_corrupted_records
+        self.pool_buffers = pool_buffers
+        self.sample_rate = sample_rate
+        self.max_record_bytes = max_record_bytes
+        self.split = split
+        self.split_key_bytes = split_key_bytes
+        self.max_chunk_bytes = max_chunk_bytes
+        self.memory_budget_bytes = memory_budget_bytes
+        self.fanout_name = '/' + fanout_name.lstrip('/') if fanout_name else ''
+        self.fanout_consumers = fanout_consumers
+        self.fanout_index = fanout_index
+        self.fanout_ring_bytes = fanout_ring_bytes
+        self.fanout_policy = fanout_policy
+        self.attribute_names = list(attribute_names or [])
         with open(os.path.join(config_dir, 'inputdataconfig.json')) as f:
             self.input_data_config = json.load(f)
         self._validate_input_data_config()
+        self._validate_file_config()
+        self._validate_parallel_config()
+        self._validate_filter_config()
+        self._validate_chunk_config()
+        self._validate_fanout_config()
 
         if self.max_corrupted_records_to_skip > 0 and record_format != 'TFRecord':
             raise PipeModeDatasetException("max_corrupted_records_to_skip can only be set for record_format='TFRecord'")
+        if self.recover_corrupted_records and record_format not in _RECOVERABLE_RECORD_FORMATS:
+            raise PipeModeDatasetException("recover_corrupted_records can only be set for record_format 'RecordIO', "
+                                           "'RecordIO-protobuf' and 'TFRecord'")
+        if self.memory_budget_bytes is not None and self.memory_budget_bytes < 0:
+            raise PipeModeDatasetException("memory_budget_bytes must not be negative")
+        if self.compression not in ('', 'GZIP', 'ZLIB', 'ZSTD'):
+            raise PipeModeDatasetException("Invalid compression: {}".format(compression))
+        self._validate_cache_config()
+        self._fields = self._parse_field_config()
 
-        super(PipeModeDataset, self).__init__(variant_tensor=self._as_variant_tensor())
+        variant_tensor = self._as_variant_tensor()
+        self._structure = None
+        decoded = None
+        if self._fields:
+            decoded = _FieldDataset(variant_tensor, _flat_field_specs(self._fields)).map(self._to_structure)
+        elif self.max_chunk_bytes:
+            chunk_specs = (tensor_spec.TensorSpec([], tf.string), tensor_spec.TensorSpec([], tf.int64),
+                           tensor_spec.TensorSpec([], tf.int64), tensor_spec.TensorSpec([], tf.bool))
+            decoded = _FieldDataset(variant_tensor, chunk_specs).map(
+                lambda chunk, record_id, chunk_index, is_last: {'chunk': chunk, 'record_id': record_id,
+                                                                'chunk_index': chunk_index, 'is_last': is_last})
+        elif self.ragged_dtype is not None:
+            ragged_specs = (tensor_spec.TensorSpec([None], self.ragged_dtype), tensor_spec.TensorSpec([None], tf.int64))
+            decoded = _FieldDataset(variant_tensor, ragged_specs).map(
+                lambda values, row_splits: tf.RaggedTensor.from_row_splits(values, row_splits, validate=False))
+        if decoded is not None:
+            self._structure = decoded.element_spec
+            variant_tensor = decoded._variant_tensor
+        super(PipeModeDataset, self).__init__(variant_tensor=variant_tensor)
 
     def _as_variant_tensor(self):
-        return self._tf_plugin.pipe_mode_dataset(self.benchmark, self.record_format, self.state_dir, self.channel,
+        # Defaults are passed for every field or, if no field has one, for none of them
+        has_defaults = any(field[4] is not None for field in self._fields)
+        # Augmented manifest samples are decoded from RecordIO records, and unbatched samples are read as batches of
+        # one
+        record_format = 'AugmentedManifest' if self.attribute_names else self.record_format
+        batch_size = self.batch_size or (1 if self.attribute_names else 0)
+        return self._tf_plugin.pipe_mode_dataset(self.benchmark, record_format, self.state_dir, self.channel,
                                                  self.pipe_dir, self.benchmark_records_interval,
-                                                 self.max_corrupted_records_to_skip)
+                                                 self.max_corrupted_records_to_skip, self.cache_dir,
+                                                 self.cache_max_bytes, self.cache_shuffle, self.seed,
+                                                 self.shm_cache_name, self.shm_cache_bytes,
+                                                 self.shuffle_buffer_bytes, self.compression, batch_size,
+                                                 self.record_format_library, self.file_mode,
+                                                 self._parallel_files(),
+                                                 self.deterministic is not False, self.num_shards or 1,
+                                                 self.shard_index or 0, self.num_parallel_calls or 0,
+                                                 self.recover_corrupted_records, self.pool_buffers,
+                                                 self.max_chunk_bytes or 0,
+                                                 -1 if self.memory_budget_bytes is None
+                                                 else self.memory_budget_bytes,
+                                                 self.fanout_name, self.fanout_consumers or 0, self.fanout_index or 0,
+                                                 self.fanout_ring_bytes or _DEFAULT_FANOUT_RING_BYTES,
+                                                 self.fanout_policy,
+                                                 field_names=[field[0] for field in self._fields],
+                                                 field_kinds=['sparse' if field[1] == 'ragged' else field[1]
+                                                              for field in self._fields],
+                                                 field_types=[field[2] for field in self._fields],
+                                                 field_shapes=[field[3] for field in self._fields],
+                                                 field_defaults=[field[4] or '' for field in self._fields]
+                                                 if has_defaults else [],
+                                                 field_has_defaults=[field[4] is not None for field in self._fields]
+                                                 if has_defaults else [],
+                                                 record_options=self._record_options(),
+                                                 ragged_dtype=self.ragged_dtype or tf.uint8,
+                                                 transforms=self.transforms,
+                                                 filter_options=self._filter_options())
 
     def _inputs(self):
         return []
 
+    def _record_options(self):
+        if self.record_format == 'FixedLength':
+            return ['{}={}'.format(name, value) for name, value in sorted(self.fixed_length_bytes.items())]
+        if self.record_format != 'CSV':
+            return []
+        return ['field_delim=' + self.field_delim, 'na_value=' + self.na_value,
+                'header=' + ('true' if self.header else 'false')]
+
+    def _filter_options(self):
+        options = []
+        if self.sample_rate is not None:
+            options.append('sample_rate={!r}'.format(float(self.sample_rate)))
+        if self.max_record_bytes is not None:
+            options.append('max_record_bytes={}'.format(self.max_record_bytes))
+        if self.split is not None:
+            options += ['split_begin={!r}'.format(float(self.split[0])), 'split_end={!r}'.format(float(self.split[1]))]
+        if self.split_key_bytes is not None:
+            options.append('split_key_bytes={}'.format(self.split_key_bytes))
+        return options
+
+    def _parse_field_config(self):
+        self._validate_field_config()
+        if self.attribute_names:
+            return self._parse_attribute_fields()
+        if self.record_format not in _DECODED_RECORD_FORMATS:
+            return []
+        if self.record_format == 'ArrowStream':
+            return self._parse_arrow_fields()
+        if self.batch_size <= 0:
+            raise PipeModeDatasetException("batch_size must be set for record_format '{}'".format(self.record_format))
+        if self.record_format == 'CSV':
+            return self._parse_csv_fields()
+        if self.record_format == 'FixedLength':
+            return self._parse_fixed_length_fields()
+        if not self.features and not self.labels:
+            raise PipeModeDatasetException("features must be set for record_format '{}'".format(self.record_format))
+        if self.record_format == 'JSONLines':
+            return _parse_fields('', self.features, defaults=True, ragged=True)
+        return _parse_fields('features/', self.features or {}) + _parse_fields('label/', self.labels or {})
+
+    def _parallel_files(self):
+        if self.parallel_files is not None:
+            return self.parallel_files
+        # The records of a sample are consecutive records of one file, which interleaving files would separate
+        return 1 if self.attribute_names else _DEFAULT_PARALLEL_FILES
+
+    def _validate_field_config(self):
+        """Checks that only the arguments of the record format are set."""
+        feature_formats = ('RecordIO-protobuf', 'JSONLines', 'FixedLength', 'ArrowStream')
+        if self.record_format not in feature_formats and self.features is not None:
+            raise PipeModeDatasetException("features can only be set for record_formats 'RecordIO-protobuf', "
+                                           "'JSONLines', 'FixedLength' and 'ArrowStream'")
+        if self.record_format != 'RecordIO-protobuf' and self.labels is not None:
+            raise PipeModeDatasetException("labels can only be set for record_format 'RecordIO-protobuf'")
+        csv_config = (self.record_defaults, self.select_cols, self.header or None)
+        if self.record_format != 'CSV' and any(value is not None for value in csv_config):
+            raise PipeModeDatasetException("record_defaults, select_cols and header can only be set for "
+                                           "record_format 'CSV'")
+        if self.record_format != 'FixedLength' and any(self.fixed_length_bytes.values()):
+            raise PipeModeDatasetException("header_bytes, footer_bytes, record_header_bytes and record_footer_bytes "
+                                           "can only be set for record_format 'FixedLength'")
+        if self.ragged_dtype is not None:
+            self._validate_ragged_config()
+        elif self.record_format not in _BATCHED_RECORD_FORMATS and self.batch_size and not self.attribute_names:
+            formats = ", ".join(repr(record_format) for record_format in _BATCHED_RECORD_FORMATS)
+            raise PipeModeDatasetException("batch_size can only be set for record_formats {}, or with "
+                                           "ragged_dtype".format(formats))
+
+    def _validate_ragged_config(self):
+        if self.record_format in _DECODED_RECORD_FORMATS:
+            raise PipeModeDatasetException("ragged_dtype cannot be set for record_format '{}', whose records are "
+                                           "decoded".format(self.record_format))
+        if self.ragged_dtype not in _RAGGED_DTYPES:
+            raise PipeModeDatasetException("Unsupported ragged_dtype: {}".format(self.ragged_dtype))
+        if self.batch_size <= 0:
+            raise PipeModeDatasetException("batch_size must be set with ragged_dtype")
+
+    def _parse_attribute_fields(self):
+        if self.record_format != 'RecordIO' or self.ragged_dtype is not None:
+            raise PipeModeDatasetException("attribute_names can only be set for record_format 'RecordIO', without "
+                                           "ragged_dtype")
+        if not all(isinstance(name, str) for name in self.attribute_names) \
+                or len(set(self.attribute_names)) != len(self.attribute_names):
+            raise PipeModeDatasetException("attribute_names must be a list of distinct names")
+        if self.shuffle_buffer_bytes or self.cache_shuffle or self._filter_options() or self.fanout_name \
+                or self.num_parallel_calls is not None or self.transforms or self.max_chunk_bytes \
+                or (self.parallel_files or 1) > 1:
+            raise PipeModeDatasetException("Augmented manifest samples cannot be shuffled as they are read, filtered, "
+                                           "decoded in parallel, distributed by a fan-out, read in chunks or read "
+                                           "from more than one file at once")
+        return [(name, 'dense', tf.string, tensor_shape.TensorShape([]), None) for name in self.attribute_names]
+
+    def _parse_arrow_fields(self):
+        if not self.features:
+            raise PipeModeDatasetException("features must be set for record_format 'ArrowStream'")
+        if self.cache_dir or self.shm_cache_name or self.shuffle_buffer_bytes:
+            raise PipeModeDatasetException("cache_dir, shm_cache_name and shuffle_buffer_bytes cannot be set for "
+                                           "record_format 'ArrowStream'")
+        fields = _parse_fields('', self.features, defaults=True)
+        for name, kind, _, shape, _ in fields:
+            if kind != 'dense' or shape.rank != 0:
+                raise PipeModeDatasetException("ArrowStream field {} must be a scalar FixedLenFeature".format(name))
+        return fields
+
+    def _parse_fixed_length_fields(self):
+        if not self.features:
+            raise PipeModeDatasetException("features must be set for record_format 'FixedLength'")
+        if any(value < 0 for value in self.fixed_length_bytes.values()):
+            raise PipeModeDatasetException("header_bytes, footer_bytes, record_header_bytes and record_footer_bytes "
+                                           "must not be negative")
+        fields = _parse_fields('', self.features)
+        for name, kind, dtype, _, _ in fields:
+            if kind != 'dense' or dtype == tf.string:
+                raise PipeModeDatasetException("FixedLength field {} must be a numeric FixedLenFeature".format(name))
+        return fields
+
+    def _parse_csv_fields(self):
+        if not self.record_defaults:
+            raise PipeModeDatasetException("record_defaults must be set for record_format 'CSV'")
+        select_cols = list(range(len(self.record_defaults)) if self.select_cols is None else self.select_cols)
+        if len(select_cols) != len(self.record_defaults):
+            raise PipeModeDatasetException("select_cols and record_defaults must have the same length")
+        if select_cols != sorted(set(select_cols)) or select_cols[0] < 0:
+            raise PipeModeDatasetException("select_cols must be increasing column indices")
+        if self.header and (self.shuffle_buffer_bytes or self.cache_shuffle):
+            raise PipeModeDatasetException("header cannot be set with shuffle_buffer_bytes or cache_shuffle, "
+                                           "which move header lines")
+        return [_csv_field(column, default) for column, default in zip(select_cols, self.record_defaults)]
+
+    def _to_structure(self, *tensors):
+        """Builds an element of this Dataset from the flat tensors output by the PipeModeDataset op."""
+        tensors = iter(tensors)
+        decoded = {}
+        for name, kind, _, _, _ in self._fields:
+            if kind == 'dense':
+                decoded[name] = next(tensors)
+            else:
+                decoded[name] = tf.SparseTensor(next(tensors), next(tensors), next(tensors))
+            if kind == 'ragged':
+                decoded[name] = tf.RaggedTensor.from_sparse(decoded[name])
+        if self.attribute_names:
+            return decoded if self.batch_size else {name: value[0] for name, value in decoded.items()}
+        if self.record_format == 'CSV':
+            return tuple(decoded[field[0]] for field in self._fields)
+        if self.record_format in ('JSONLines', 'FixedLength', 'ArrowStream'):
+            return decoded
+        features = {name: decoded['features/' + name] for name in self.features or {}}
+        if self.labels is None:
+            return features
+        return features, {name: decoded['label/' + name] for name in self.labels}
+
+    def _validate_cache_config(self):
+        if (self.cache_max_bytes or self.cache_shuffle) and not self.cache_dir:
+            raise PipeModeDatasetException("cache_max_bytes and cache_shuffle can only be set with cache_dir")
+        if self.shm_cache_name and self.cache_dir:
+            raise PipeModeDatasetException("cache_dir and shm_cache_name cannot both be set")
+        if bool(self.shm_cache_name) != bool(self.shm_cache_bytes):
+            raise PipeModeDatasetException("shm_cache_name and shm_cache_bytes must be set together")
+
     def _validate_input_data_config(self):
         if self.channel not in self.input_data_config:
             raise PipeModeDatasetException("Channel {} not found in Training Job InputDataConfig".format(self.channel))
-        if self.input_data_config[self.channel].get('TrainingInputMode', "").lower() != "pipe":
-            raise PipeModeDatasetException("Channel {} is not a PipeMode channel".format(self.channel))
+        input_mode = self.input_data_config[self.channel].get('TrainingInputMode', "").lower()
+        if input_mode not in ("pipe", "file", "fastfile"):
+            raise PipeModeDatasetException("Channel {} is not a Pipe, File or FastFile mode channel"
+                                           .format(self.channel))
+        self.file_mode = input_mode != "pipe"
+
+    def _validate_file_config(self):
+        file_options = (self.parallel_files, self.num_shards, self.shard_index)
+        if not self.file_mode:
+            if any(option is not None for option in file_options):
+                raise PipeModeDatasetException("parallel_files, num_shards and shard_index can only be set for File "
+                                               "and FastFile mode channels")
+            return
+        if self.record_format == 'ArrowStream':
+            raise PipeModeDatasetException("record_format='ArrowStream' cannot be read from File mode channels")
+        if self.parallel_files is not None and self.parallel_files < 1:
+            raise PipeModeDatasetException("parallel_files must be positive")
+        if self.num_shards is not None and self.num_shards < 1:
+            raise PipeModeDatasetException("num_shards must be positive")
+        if not 0 <= (self.shard_index or 0) < (self.num_shards or 1):
+            raise PipeModeDatasetException("shard_index must be between 0 and num_shards - 1")
+
+    def _validate_parallel_config(self):
+        parallel = self.num_parallel_calls is not None or self.transforms
+        if self.deterministic is not None and not self.file_mode and not parallel:
+            raise PipeModeDatasetException("deterministic can only be set for File and FastFile mode channels, or "
+                                           "with num_parallel_calls or transforms")
+        if not parallel:
+            return
+        if self.num_parallel_calls is not None and self.num_parallel_calls < 1 \
+                and self.num_parallel_calls != tf.data.AUTOTUNE:
+            raise PipeModeDatasetException("num_parallel_calls must be positive or tf.data.AUTOTUNE")
+        if self.record_format == 'ArrowStream':
+            raise PipeModeDatasetException("record_format='ArrowStream' cannot be decoded in parallel")
+        if self.header:
+            raise PipeModeDatasetException("CSV records with a header cannot be decoded in parallel")
+        if not all(isinstance(transform, str) for transform in self.transforms):
+            raise PipeModeDatasetException("transforms must be a list of transform names")
+
+    def _validate_filter_config(self):
+        if self.sample_rate is not None and not 0 < self.sample_rate <= 1:
+            raise PipeModeDatasetException("sample_rate must be greater than 0 and at most 1")
+        if self.max_record_bytes is not None and self.max_record_bytes < 1:
+            raise PipeModeDatasetException("max_record_bytes must be positive")
+        if self.split is not None and (len(self.split) != 2 or not 0 <= self.split[0] < self.split[1] <= 1):
+            raise PipeModeDatasetException("split must be a (begin, end) pair with 0 <= begin < end <= 1")
+        if self.split_key_bytes is not None and (self.split is None or self.split_key_bytes < 1):
+            raise PipeModeDatasetException("split_key_bytes must be positive and can only be set with split")
+        if self.sample_rate is not None and self.sample_rate < 1 and (self.cache_dir or self.shm_cache_name):
+            raise PipeModeDatasetException("sample_rate cannot be set with cache_dir or shm_cache_name, since each "
+                                           "Iterator draws a different sample")
+        if not self._filter_options():
+            return
+        if self.record_format == 'ArrowStream':
+            raise PipeModeDatasetException("record_format='ArrowStream' cannot be filtered")
+        if self.header:
+            raise PipeModeDatasetException("CSV records with a header cannot be filtered")
+
+    def _validate_chunk_config(self):
+        if self.max_chunk_bytes is None:
+            return
+        if self.max_chunk_bytes < 1:
+            raise PipeModeDatasetException("max_chunk_bytes must be positive")
+        if self.record_format in _DECODED_RECORD_FORMATS or self.batch_size or self.ragged_dtype is not None:
+            raise PipeModeDatasetException("Records read in chunks cannot be decoded or batched")
+        if self.num_parallel_calls is not None or self.transforms:
+            raise PipeModeDatasetException("Records read in chunks cannot be transformed or decoded in parallel")
+        if self.cache_dir or self.shm_cache_name or self.shuffle_buffer_bytes:
+            raise PipeModeDatasetException("Records read in chunks cannot be cached or shuffled")
+        if self._filter_options():
+            raise PipeModeDatasetException("Records read in chunks cannot be filtered")
+
+    def _validate_fanout_config(self):
+        if not self.fanout_name:
+            if self.fanout_consumers is not None or self.fanout_index is not None or self.fanout_ring_bytes:
+                raise PipeModeDatasetException("fanout_consumers, fanout_index and fanout_ring_bytes can only be "
+                                               "set with fanout_name")
+            return
+        if self.fanout_consumers is None or self.fanout_consumers < 2 or self.fanout_index is None \
+                or not 0 <= self.fanout_index < self.fanout_consumers:
+            raise PipeModeDatasetException("fanout_consumers must be at least 2, and fanout_index below it")
+        if self.fanout_ring_bytes is not None and self.fanout_ring_bytes < 64:
+            raise PipeModeDatasetException("fanout_ring_bytes must be at least 64")
+        if self.fanout_policy not in ('round_robin', 'hash'):
+            raise PipeModeDatasetException("fanout_policy must be 'round_robin' or 'hash'")
+        if self.cache_dir or self.shm_cache_name or self.max_chunk_bytes:
+            raise PipeModeDatasetException("Records distributed by a fan-out cannot be cached or read in chunks")
+        if self.header:
+            raise PipeModeDatasetException("CSV records with a header cannot be distributed by a fan-out")
+        # Only the leader reads the channel, so it filters the records of every consumer
+        if self.fanout_index and self._filter_options():
+            raise PipeModeDatasetException("Only the leader of a fan-out, fanout_index 0, can filter records")
 
     @property
     def output_classes(self):
         """The return type of this Dataset."""
+        if self._structure is not None:
+            return structure.get_legacy_output_classes(self._structure)
         return ops.Tensor
 
     @property
     def output_shapes(self):
         """The shape of the output Tensor."""
+        if self._structure is not None:
+            return structure.get_legacy_output_shapes(self._structure)
         return tensor_shape.TensorShape([])
 
     @property
     def output_types(self):
         """The type of data stored in the output Tensor."""
+        if self._structure is not None:
+            return structure.get_legacy_output_types(self._structure)
         return dtypes.string
 
     @property
     def element_spec(self):
+        if self._structure is not None:
+            return self._structure
         return tensor_spec.TensorSpec(
             shape=self.output_shapes,
             dtype=self.output_types,
@@ -0,0 +1,192 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Reads SageMaker channels into NumPy batches without TensorFlow."""
+from __future__ import absolute_import
+
+import asyncio
+import importlib
+import json
+import os
+
+import numpy as np
+
+# The record formats a PipeModeReader frames records in
+_RECORD_FORMATS = ('RecordIO', 'TFRecord', 'TextLine')
+
+_DEFAULT_PARALLEL_FILES = 4
+
+_native_module = None
+
+
+def _native():
+    """Return the _pipemode_reader extension module, importing it on first use."""
+    global _native_module
+    if _native_module is None:
+        _native_module = importlib.import_module('sagemaker_tensorflow._pipemode_reader')
+    return _native_module
+
+
+class PipeModeReaderException(Exception):
+    """An error using a PipeModeReader."""
+
+    pass
+
+
+class RecordBatch(object):
+    """A batch of records, held in two NumPy arrays.
+
+    Attributes:
+        values: A uint8 array of the bytes of the records, one after another.
+        offsets: An int64 array of len(batch) + 1 offsets into values. Record i is values[offsets[i]:offsets[i + 1]].
+    """
+
+    def __init__(self, values, offsets):
+        self.values = values
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        """Return a record as a read-only memoryview of values, without copying it."""
+        if not -len(self) <= index < len(self):
+            raise IndexError("record index out of range")
+        index %= len(self)
+        return memoryview(self.values)[self.offsets[index]:self.offsets[index + 1]]
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def to_list(self):
+        """Return the records as a list of bytes."""
+        return [bytes(record) for record in self]
+
+
+class PipeModeReader(object):
+    """Reads the records of a SageMaker channel in batches of NumPy arrays, without TensorFlow.
+
+    Each iteration over a PipeModeReader reads one pass over the channel: the channel's next pipe in Pipe mode, or all
+    of its files in File and FastFile mode. Records are read and framed by the same native readers as the
+    PipeModeDataset, with the GIL released, so other Python threads run while records are read.
+
+    Iterate with ``for batch in reader`` in synchronous code, and with ``async for batch in reader`` in asyncio code,
+    where each batch is read on the event loop's default executor.
+    """
+
+    def __init__(self, channel, record_format='RecordIO', state_dir='/opt/ml/pipe_state',
+                 pipe_dir='/opt/ml/input/data', config_dir='/opt/ml/input/config', batch_size=1024,
+                 max_batch_bytes=0, max_corrupted_records_to_skip=0, compression=None, record_format_library=None,
+                 parallel_files=None, deterministic=None, num_shards=None, shard_index=None):
+        """Create a reader of a SageMaker channel.
+
+        Args:
+            channel: The name of the SageMaker channel.
+            record_format: The record format to use. One of 'RecordIO', 'TFRecord' or 'TextLine', or a format of
+                    record_format_library.
+            state_dir: The directory where pipe index state is persisted.
+            pipe_dir: The directory to read SageMaker Channels from.
+            config_dir: The path for SageMaker input data config.
+            batch_size: The largest number of records in a batch.
+            max_batch_bytes: If not zero, a batch ends once its records take at least this many bytes.
+            max_corrupted_records_to_skip: the number of corrupted records encountered in sequence that it's ok to
+                    skip. Only applicable for record_format='TFRecord'.
+            compression: The compression of the channel's data. One of 'GZIP', 'ZLIB' or 'ZSTD', or None if the
+                    data is not compressed.
+            record_format_library: The path of a shared library that implements more record formats, through the
+                    C ABI declared in PipeModeRecordFormat.h.
+            parallel_files: The number of files of a File or FastFile mode channel read at once. Defaults to 4.
+            deterministic: Controls whether records are interleaved from the files read at once in turn. Defaults
+                    to True.
+            num_shards: The number of shards the files of the channel are split into. Defaults to 1.
+            shard_index: The shard of the channel's files to read. Defaults to 0.
+        """
+        self.channel = channel
+        self.record_format = record_format
+        self.state_dir = state_dir
+        self.pipe_dir = pipe_dir
+        self.batch_size = batch_size
+        self.max_batch_bytes = max_batch_bytes
+        self.max_corrupted_records_to_skip = max_corrupted_records_to_skip
+        self.compression = compression or ''
+        self.record_format_library = record_format_library or ''
+        with open(os.path.join(config_dir, 'inputdataconfig.json')) as f:
+            input_data_config = json.load(f)
+        if channel not in input_data_config:
+            raise PipeModeReaderException("Channel {} not found in Training Job InputDataConfig".format(channel))
+        input_mode = input_data_config[channel].get('TrainingInputMode', "").lower()
+        if input_mode not in ("pipe", "file", "fastfile"):
+            raise PipeModeReaderException("Channel {} is not a Pipe, File or FastFile mode channel".format(channel))
+        self.file_mode = input_mode != "pipe"
+        file_options = (parallel_files, deterministic, num_shards, shard_index)
+        if not self.file_mode and any(option is not None for option in file_options):
+            raise PipeModeReaderException("parallel_files, deterministic, num_shards and shard_index can only be "
+                                          "set for File and FastFile mode channels")
+        self.parallel_files = _DEFAULT_PARALLEL_FILES if parallel_files is None else parallel_files
+        self.deterministic = deterministic is not False
+        self.num_shards = 1 if num_shards is None else num_shards
+        self.shard_index = shard_index or 0
+        self._validate()
+
+    def _validate(self):
+        if self.record_format not in _RECORD_FORMATS and not self.record_format_library:
+            raise PipeModeReaderException("Invalid record format: {}".format(self.record_format))
+        if self.max_corrupted_records_to_skip > 0 and self.record_format != 'TFRecord':
+            raise PipeModeReaderException("max_corrupted_records_to_skip can only be set for record_format='TFRecord'")
+        if self.compression not in ('', 'GZIP', 'ZLIB', 'ZSTD'):
+            raise PipeModeReaderException("Invalid compression: {}".format(self.compression))
+        if self.batch_size < 1 or self.max_batch_bytes < 0:
+            raise PipeModeReaderException("batch_size must be positive, and max_batch_bytes must not be negative")
+        if self.parallel_files < 1 or self.num_shards < 1 or not 0 <= self.shard_index < self.num_shards:
+            raise PipeModeReaderException("parallel_files and num_shards must be positive, and shard_index must be "
+                                          "between 0 and num_shards - 1")
+
+    def open(self):
+        """Open the next pass over the channel, and return its native reader."""
+        if not self.file_mode:
+            os.makedirs(self.state_dir, exist_ok=True)
+        return _native().Reader(self.record_format, self.channel, self.pipe_dir, self.state_dir,
+                                compression=self.compression,
+                                max_corrupted_records_to_skip=self.max_corrupted_records_to_skip,
+                                file_mode=self.file_mode, parallel_files=self.parallel_files,
+                                deterministic=self.deterministic, num_shards=self.num_shards,
+                                shard_index=self.shard_index, record_format_library=self.record_format_library)
+
+    def _read_batch(self, reader):
+        batch = reader.read_batch(self.batch_size, self.max_batch_bytes)
+        if batch is None:
+            return None
+        values, offsets = batch
+        return RecordBatch(np.frombuffer(values, dtype=np.uint8), np.frombuffer(offsets, dtype=np.int64))
+
+    def __iter__(self):
+        reader = self.open()
+        try:
+            while True:
+                batch = self._read_batch(reader)
+                if batch is None:
+                    return
+                yield batch
+        finally:
+            reader.close()
+
+    async def __aiter__(self):
+        loop = asyncio.get_running_loop()
+        reader = await loop.run_in_executor(None, self.open)
+        try:
+            while True:
+                batch = await loop.run_in_executor(None, self._read_batch, reader)
+                if batch is None:
+                    return
+                yield batch
+        finally:
+            reader.close()
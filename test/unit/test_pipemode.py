@@ -11,14 +11,17 @@
 # ANY KIND, either express or implied. See the License for the specific
 # language governing permissions and limitations under the License.
 
+import gzip
 import json
 import os
+import shutil
 import tempfile
 import tensorflow as tf
 import sys
 import pytest
 from sagemaker_tensorflow import PipeModeDataset, PipeModeDatasetException
 import struct
+import zlib
 
 _kmagic = 0xced7230a
 
@@ -49,11 +52,11 @@ def write_to_channel(channel, records):
             write_recordio(f, record)
     return channel, directory
 
-def write_config(directory, channel):
+def write_config(directory, channel, input_mode="Pipe"):
     configpath = os.path.join(directory, 'inputdataconfig.json')
     input_data_config = {
         channel: {
-            "TrainingInputMode": "Pipe"
+            "TrainingInputMode": input_mode
         }
     }
     with open(configpath, 'w') as f:
@@ -93,6 +96,24 @@ def test_invalid_data():
         iter(dataset).get_next()
 
 
+def test_recover_corrupted_records():
+    channel, directory = write_to_channel("A", [])
+    with open(os.path.join(directory, channel + "_0"), 'wb') as f:
+        write_recordio(f, b"bear")
+        f.write(b"adfsafasfd")
+        write_recordio(f, b"bunny")
+    dataset = PipeModeDataset(channel, pipe_dir=directory, state_dir=directory, config_dir=directory,
+                              recover_corrupted_records=True)
+    assert [b"bear", b"bunny"] == [record.numpy() for record in dataset]
+
+
+def test_recover_corrupted_records_invalid_format():
+    channel, directory = write_to_channel("A", [b"bear"])
+    with pytest.raises(PipeModeDatasetException):
+        PipeModeDataset(channel, record_format='TextLine', pipe_dir=directory, state_dir=directory,
+                        config_dir=directory, recover_corrupted_records=True)
+
+
 def test_out_of_range():
     channel, directory = write_to_channel("A", [b"bear", b"bunny", b"truck"])
     dataset = PipeModeDataset(channel, pipe_dir=directory, state_dir=directory, config_dir=directory)
@@ -147,3 +168,980 @@ def test_benchmark_records_interval_disabled(capfd):
     assert it.get_next() == b"bear"
     out, err = capfd.readouterr()
     assert 'Iterator records' not in out
+
+
+
+def test_benchmark_epoch_summary(capfd):
+    channel, directory = write_to_channel("A", [b"bear", b"bunny"])
+    with open(os.path.join(directory, channel + "_1"), 'wb') as f:
+        write_recordio(f, b"truck")
+    dataset = PipeModeDataset(channel, pipe_dir=directory, state_dir=directory, config_dir=directory,
+                              benchmark=True, shuffle_buffer_bytes=1024, seed=7)
+    assert [b"bear", b"bunny"] == sorted(dataset.as_numpy_iterator())
+    out, err = capfd.readouterr()
+    assert 'epoch pipe_blocked_ms: ' in out
+    assert 'epoch buffer_wait_ms: ' in out
+    assert 'epoch gap_ms: ' not in out
+    assert 1 == len([line for line in out.splitlines() if line.endswith('epoch bound: producer')
+                     or line.endswith('epoch bound: consumer')])
+    assert [b"truck"] == list(dataset.as_numpy_iterator())
+    out, err = capfd.readouterr()
+    assert 'epoch gap_ms: ' in out
+
+
+def test_benchmark_totals_keep_read_time(capfd):
+    channel, directory = write_to_channel("A", [b"bear"])
+    dataset = PipeModeDataset(channel, pipe_dir=directory, state_dir=directory, config_dir=directory,
+                              benchmark=True, benchmark_records_interval=1)
+    it = iter(dataset)
+    assert it.get_next() == b"bear"
+    del it
+    out, err = capfd.readouterr()
+    assert 'Iterator records read_time_ns: ' in out
+    assert 'Iterator total read_time_ms: ' in out
+    assert 'Iterator total pipe_blocked_ms: ' in out
+    assert 'Iterator total framing_ms: ' in out
+    assert 'Iterator total buffer_wait_ms: ' in out
+
+
+def pooled_buffer_hits(out):
+    hits = [line for line in out.splitlines() if 'total pooled_buffer_hits: ' in line]
+    assert 1 == len(hits)
+    return int(hits[0].split(': ')[1])
+
+
+def test_pooled_buffers(capfd):
+    records = [b"record-%d" % i * (i % 7) for i in range(200)]
+    channel, directory = write_to_channel("A", records)
+    dataset = PipeModeDataset(channel, pipe_dir=directory, state_dir=directory, config_dir=directory, batch_size=4,
+                              ragged_dtype=tf.uint8, benchmark=True, pool_buffers=True)
+    it = iter(dataset)
+    assert records == [bytes(row) for _ in range(50) for row in it.get_next().to_list()]
+    del it
+    out, err = capfd.readouterr()
+    assert pooled_buffer_hits(out) > 0
+
+
+def test_pooled_buffers_skip_single_records(capfd):
+    records = [b"record-%d" % i * (i % 7) for i in range(200)]
+    channel, directory = write_to_channel("A", records)
+    dataset = PipeModeDataset(channel, pipe_dir=directory, state_dir=directory, config_dir=directory,
+                              benchmark=True, pool_buffers=True)
+    it = iter(dataset)
+    assert records == [it.get_next().numpy() for _ in records]
+    del it
+    out, err = capfd.readouterr()
+    assert 0 == pooled_buffer_hits(out)
+
+
+def test_pooled_ragged_batches():
+    tokens = [[i] * (i % 5) for i in range(100)]
+    channel, directory = write_to_channel("A", [struct.pack('{}i'.format(len(row)), *row) for row in tokens])
+    dataset = PipeModeDataset(channel, pipe_dir=directory, state_dir=directory, config_dir=directory, batch_size=8,
+                              ragged_dtype=tf.int32, num_parallel_calls=2, pool_buffers=True)
+    assert tokens == [row for batch in dataset for row in batch.to_list()]
+
+
+def read_filtered(records, **kwargs):
+    channel, directory = write_to_channel("A", records)
+    dataset = PipeModeDataset(channel, pipe_dir=directory, state_dir=directory, config_dir=directory, **kwargs)
+    return [record.numpy() for record in dataset]
+
+
+def test_sample_rate():
+    records = [str(i).encode() for i in range(1000)]
+    sampled = read_filtered(records, sample_rate=0.5, seed=7)
+    assert 400 < len(sampled) < 600
+    assert sampled == [record for record in records if record in set(sampled)]
+    assert sampled == read_filtered(records, sample_rate=0.5, seed=7)
+
+
+def test_max_record_bytes():
+    assert [b"a", b"ccc"] == read_filtered([b"a", b"b" * 10, b"ccc"], max_record_bytes=3)
+
+
+def test_complementary_splits():
+    records = [str(i).encode() for i in range(200)]
+    train = read_filtered(records, split=(0, 0.8))
+    validation = read_filtered(records, split=(0.8, 1))
+    assert records == sorted(train + validation, key=records.index)
+    assert len(validation) < len(train)
+
+
+def test_split_key_bytes():
+    records = [b"k" + str(i % 10).encode() + b"-" + str(i).encode() for i in range(100)]
+    kept = read_filtered(records, split=(0, 0.5), split_key_bytes=2)
+    assert {record[:2] for record in kept}.isdisjoint(
+        {record[:2] for record in read_filtered(records, split=(0.5, 1), split_key_bytes=2)})
+
+
+def test_filter_invalid_config():
+    channel, directory = write_to_channel("A", [b"bear"])
+    for kwargs in [{'sample_rate': 0}, {'sample_rate': 1.5}, {'max_record_bytes': 0}, {'split': (0.5, 0.5)},
+                   {'split': (0, 2)}, {'split_key_bytes': 4}, {'split': (0, 0.5), 'split_key_bytes': 0},
+                   {'sample_rate': 0.5, 'cache_dir': tempfile.mkdtemp()},
+                   {'sample_rate': 0.5, 'shm_cache_name': 'sampled', 'shm_cache_bytes': 1 << 20}]:
+        with pytest.raises(PipeModeDatasetException):
+            PipeModeDataset(channel, pipe_dir=directory, state_dir=directory, config_dir=directory, **kwargs)
+
+
+def test_max_chunk_bytes():
+    channel, directory = write_to_channel("A", [b"abcdefghij", b"", b"xyz"])
+    dataset = PipeModeDataset(channel, pipe_dir=directory, state_dir=directory, config_dir=directory,
+                              max_chunk_bytes=4)
+    chunks = [(chunk['chunk'].numpy(), chunk['record_id'].numpy(), chunk['chunk_index'].numpy(),
+               chunk['is_last'].numpy()) for chunk in dataset]
+    assert [(b"abcd", 0, 0, False), (b"efgh", 0, 1, False), (b"ij", 0, 2, True), (b"", 1, 0, True),
+            (b"xyz", 2, 0, True)] == chunks
+
+
+def test_max_chunk_bytes_invalid_config():
+    channel, directory = write_to_channel("A", [b"bear"])
+    for kwargs in [{'max_chunk_bytes': 0}, {'max_chunk_bytes': 4, 'batch_size': 2, 'ragged_dtype': tf.uint8},
+                   {'max_chunk_bytes': 4, 'shuffle_buffer_bytes': 1024}, {'max_chunk_bytes': 4, 'sample_rate': 0.5},
+                   {'max_chunk_bytes': 4, 'num_parallel_calls': 2}]:
+        with pytest.raises(PipeModeDatasetException):
+            PipeModeDataset(channel, pipe_dir=directory, state_dir=directory, config_dir=directory, **kwargs)
+
+
+def test_memory_budget():
+    records = [str(i).encode() * 50 for i in range(100)]
+    try:
+        channel, directory = write_to_channel("A", records)
+        dataset = PipeModeDataset(channel, pipe_dir=directory, state_dir=directory, config_dir=directory,
+                                  shuffle_buffer_bytes=4096, seed=7, memory_budget_bytes=512)
+        assert sorted(records) == sorted([record.numpy() for record in dataset])
+        channel, directory = write_to_channel("A", records)
+        dataset = PipeModeDataset(channel, pipe_dir=directory, state_dir=directory, config_dir=directory,
+                                  num_parallel_calls=2, memory_budget_bytes=512)
+        assert records == [record.numpy() for record in dataset]
+    finally:
+        # The budget is process-wide, so the other tests read without one
+        PipeModeDataset(channel, pipe_dir=directory, state_dir=directory, config_dir=directory,
+                        memory_budget_bytes=0)
+
+
+def test_memory_budget_invalid_config():
+    channel, directory = write_to_channel("A", [b"bear"])
+    with pytest.raises(PipeModeDatasetException):
+        PipeModeDataset(channel, pipe_dir=directory, state_dir=directory, config_dir=directory,
+                        memory_budget_bytes=-1)
+
+
+def test_cache_replays_records():
+    channel, directory = write_to_channel("A", [b"bear", b"bunny"])
+    cache_dir = tempfile.mkdtemp()
+    dataset = PipeModeDataset(channel, pipe_dir=directory, state_dir=directory, config_dir=directory,
+                              cache_dir=cache_dir)
+    assert [b"bear", b"bunny"] == [record.numpy() for record in dataset]
+    # The second epoch is served from the cache, so no A_1 pipe is needed.
+    assert [b"bear", b"bunny"] == [record.numpy() for record in dataset]
+    assert not os.path.exists(os.path.join(directory, channel + "_1"))
+
+
+def test_cache_shuffle():
+    records = [str(i).encode() for i in range(100)]
+    channel, directory = write_to_channel("A", records)
+    dataset = PipeModeDataset(channel, pipe_dir=directory, state_dir=directory, config_dir=directory,
+                              cache_dir=tempfile.mkdtemp(), cache_shuffle=True, seed=7)
+    assert records == [record.numpy() for record in dataset]
+    replayed = [record.numpy() for record in dataset]
+    assert records != replayed
+    assert sorted(records) == sorted(replayed)
+
+
+def test_partial_cache_reads_remaining_records_from_pipe():
+    channel, directory = write_to_channel("A", [b"a" * 10, b"b" * 10, b"c" * 10])
+    # Room for the index header plus two records
+    dataset = PipeModeDataset(channel, pipe_dir=directory, state_dir=directory, config_dir=directory,
+                              cache_dir=tempfile.mkdtemp(), cache_max_bytes=24 + 3 * 8 + 20)
+    assert [b"a" * 10, b"b" * 10, b"c" * 10] == [record.numpy() for record in dataset]
+
+    with open(os.path.join(directory, channel + "_1"), 'wb') as f:
+        write_recordio(f, b"a" * 10)
+        write_recordio(f, b"b" * 10)
+        write_recordio(f, b"d" * 10)
+    assert [b"a" * 10, b"b" * 10, b"d" * 10] == [record.numpy() for record in dataset]
+
+
+def test_cache_is_not_shared_by_differently_configured_datasets():
+    records = [str(i).encode() for i in range(200)]
+    cache_dir = tempfile.mkdtemp()
+    splits = []
+    for split in [(0, 0.5), (0.5, 1)]:
+        channel, directory = write_to_channel("A", records)
+        dataset = PipeModeDataset(channel, pipe_dir=directory, state_dir=directory, config_dir=directory,
+                                  cache_dir=cache_dir, split=split)
+        splits.append([record.numpy() for record in dataset])
+        assert splits[-1] == [record.numpy() for record in dataset]
+    assert not set(splits[0]) & set(splits[1])
+    assert records == sorted(splits[0] + splits[1], key=records.index)
+
+
+def test_corrupted_cache_is_read_from_pipe():
+    channel, directory = write_to_channel("A", [b"bear", b"bunny"])
+    cache_dir = tempfile.mkdtemp()
+    dataset = PipeModeDataset(channel, pipe_dir=directory, state_dir=directory, config_dir=directory,
+                              cache_dir=cache_dir)
+    assert [b"bear", b"bunny"] == [record.numpy() for record in dataset]
+    for name in os.listdir(cache_dir):
+        if name.endswith(".records"):
+            with open(os.path.join(cache_dir, name), 'r+b') as f:
+                f.truncate(3)
+    with open(os.path.join(directory, channel + "_1"), 'wb') as f:
+        write_recordio(f, b"bear")
+        write_recordio(f, b"bunny")
+    assert [b"bear", b"bunny"] == [record.numpy() for record in dataset]
+    # The second epoch replaced the corrupted cache
+    assert [b"bear", b"bunny"] == [record.numpy() for record in dataset]
+
+
+def test_unwritable_cache_raises_error():
+    channel, directory = write_to_channel("A", [b"bear"])
+    cache_dir = tempfile.mkdtemp()
+    dataset = PipeModeDataset(channel, pipe_dir=directory, state_dir=directory, config_dir=directory,
+                              cache_dir=cache_dir)
+    shutil.rmtree(cache_dir)
+    with pytest.raises(tf.errors.InternalError):
+        next(iter(dataset))
+
+
+def test_cache_options_require_cache_dir():
+    channel, directory = write_to_channel("A", [b"bear"])
+    with pytest.raises(PipeModeDatasetException):
+        PipeModeDataset(channel, pipe_dir=directory, state_dir=directory, config_dir=directory, cache_shuffle=True)
+
+
+def test_shm_cache_replays_records():
+    channel, directory = write_to_channel("A", [b"bear", b"bunny"])
+    shm_cache_name = "pipemode-test-{}".format(os.getpid())
+    dataset = PipeModeDataset(channel, pipe_dir=directory, state_dir=directory, config_dir=directory,
+                              shm_cache_name=shm_cache_name, shm_cache_bytes=1 << 20)
+    assert [b"bear", b"bunny"] == [record.numpy() for record in dataset]
+    # The second epoch is served from shared memory, so no A_1 pipe is needed.
+    assert [b"bear", b"bunny"] == [record.numpy() for record in dataset]
+
+    other_channel, other_directory = write_to_channel("B", [b"bear", b"bunny"])
+    other = PipeModeDataset(other_channel, pipe_dir=other_directory, state_dir=other_directory,
+                            config_dir=other_directory, shm_cache_name=shm_cache_name, shm_cache_bytes=1 << 20)
+    os.remove(os.path.join(other_directory, other_channel + "_0"))
+    assert [b"bear", b"bunny"] == [record.numpy() for record in other]
+
+
+def test_shm_cache_requires_size():
+    channel, directory = write_to_channel("A", [b"bear"])
+    with pytest.raises(PipeModeDatasetException):
+        PipeModeDataset(channel, pipe_dir=directory, state_dir=directory, config_dir=directory,
+                        shm_cache_name="pipemode-test")
+
+
+def fanout(channel, directory, name, index, **kwargs):
+    return PipeModeDataset(channel, pipe_dir=directory, state_dir=directory, config_dir=directory,
+                           fanout_name=name, fanout_consumers=3, fanout_index=index, fanout_ring_bytes=4096,
+                           **kwargs)
+
+
+def test_fanout_round_robin():
+    records = [b"record-%d" % i for i in range(30)]
+    channel, directory = write_to_channel("A", records)
+    name = "pipemode-fanout-round-robin-{}".format(os.getpid())
+    leader = fanout(channel, directory, name, 0)
+    consumers = [fanout(channel, directory, name, index) for index in (1, 2)]
+    # The leader reads the whole pipe, writing the records of the consumers to their rings
+    assert records[0::3] == [record.numpy() for record in leader]
+    assert records[1::3] == [record.numpy() for record in consumers[0]]
+    assert records[2::3] == [record.numpy() for record in consumers[1]]
+    assert not os.path.exists(os.path.join(directory, channel + "_1"))
+
+
+def test_fanout_leader_stopped_early_ends_epoch():
+    records = [b"record-%d" % i for i in range(30)]
+    next_records = [b"next-" + record for record in records]
+    channel, directory = write_to_channel("A", records)
+    with open(os.path.join(directory, channel + "_1"), 'wb') as f:
+        for record in next_records:
+            write_recordio(f, record)
+    name = "pipemode-fanout-stopped-early-{}".format(os.getpid())
+    leader = fanout(channel, directory, name, 0)
+    consumers = [fanout(channel, directory, name, index) for index in (1, 2)]
+    # Destroying the leader's Iterator before the end of the pipe ends the epoch of every consumer
+    assert records[0::3][:2] == [record.numpy() for record in leader.take(2)]
+    for index, consumer in enumerate(consumers, 1):
+        epoch = [record.numpy() for record in consumer]
+        assert epoch and epoch == records[index::3][:len(epoch)]
+    assert next_records[0::3] == [record.numpy() for record in leader]
+    assert next_records[1::3] == [record.numpy() for record in consumers[0]]
+    assert next_records[2::3] == [record.numpy() for record in consumers[1]]
+
+
+def test_fanout_hash():
+    records = [b"record-%d" % i for i in range(30)]
+    channel, directory = write_to_channel("A", records)
+    name = "pipemode-fanout-hash-{}".format(os.getpid())
+    datasets = [fanout(channel, directory, name, index, fanout_policy='hash') for index in range(3)]
+    read = [[record.numpy() for record in dataset] for dataset in datasets]
+    assert sorted(records) == sorted(record for consumer in read for record in consumer)
+    # The consumer of a record depends only on its bytes
+    channel, directory = write_to_channel("A", records)
+    other_name = "pipemode-fanout-hash-other-{}".format(os.getpid())
+    leader = fanout(channel, directory, other_name, 0, fanout_policy='hash')
+    assert read[0] == [record.numpy() for record in leader]
+
+
+def test_fanout_invalid_config():
+    channel, directory = write_to_channel("A", [b"bear"])
+    for kwargs in [{'fanout_consumers': 1, 'fanout_index': 0}, {'fanout_consumers': 2, 'fanout_index': 2},
+                   {'fanout_consumers': 2, 'fanout_index': 0, 'fanout_policy': 'random'},
+                   {'fanout_consumers': 2, 'fanout_index': 0, 'fanout_ring_bytes': 8},
+                   {'fanout_consumers': 2, 'fanout_index': 1, 'sample_rate': 0.5}]:
+        with pytest.raises(PipeModeDatasetException):
+            PipeModeDataset(channel, pipe_dir=directory, state_dir=directory, config_dir=directory,
+                            fanout_name="pipemode-fanout-test", **kwargs)
+    with pytest.raises(PipeModeDatasetException):
+        PipeModeDataset(channel, pipe_dir=directory, state_dir=directory, config_dir=directory, fanout_index=0)
+
+
+def test_fanout_rejects_csv_header():
+    channel, directory = write_text_channel("A", b"a\n1\n")
+    with pytest.raises(PipeModeDatasetException):
+        PipeModeDataset(channel, record_format='CSV', pipe_dir=directory, state_dir=directory,
+                        config_dir=directory, batch_size=1, record_defaults=[0], header=True,
+                        fanout_name="pipemode-fanout-test", fanout_consumers=2, fanout_index=0)
+
+
+def test_profiler_traces_read_stages():
+    channel, directory = write_to_channel("A", [b"bear", b"cat"])
+    logdir = tempfile.mkdtemp()
+    tf.profiler.experimental.start(logdir, options=tf.profiler.experimental.ProfilerOptions(host_tracer_level=3))
+    try:
+        dataset = PipeModeDataset(channel, pipe_dir=directory, state_dir=directory, config_dir=directory)
+        assert [b"bear", b"cat"] == [record.numpy() for record in dataset]
+    finally:
+        tf.profiler.experimental.stop()
+    traces = b""
+    for root, _, files in os.walk(logdir):
+        for name in files:
+            with open(os.path.join(root, name), 'rb') as f:
+                traces += f.read()
+    for stage in [b"OpenEpoch", b"PipeWait", b"Read", b"ParseHeader"]:
+        assert b"PipeModeDataset::" + stage in traces
+
+
+def test_shuffle_buffer():
+    records = [str(i).encode() for i in range(100)]
+    shuffled = []
+    for _ in range(2):
+        channel, directory = write_to_channel("A", records)
+        dataset = PipeModeDataset(channel, pipe_dir=directory, state_dir=directory, config_dir=directory,
+                                  shuffle_buffer_bytes=1024, seed=7)
+        shuffled.append([record.numpy() for record in dataset])
+    assert records != shuffled[0]
+    assert sorted(records) == sorted(shuffled[0])
+    assert shuffled[0] == shuffled[1]
+
+
+def test_shuffle_buffer_passes_through_large_records():
+    channel, directory = write_to_channel("A", [b"a" * 100, b"b" * 1000, b"c" * 100])
+    dataset = PipeModeDataset(channel, pipe_dir=directory, state_dir=directory, config_dir=directory,
+                              shuffle_buffer_bytes=512)
+    assert sorted([b"a" * 100, b"b" * 1000, b"c" * 100]) == sorted([record.numpy() for record in dataset])
+
+
+def write_compressed_channel(channel, records, compress):
+    channel, directory = write_to_channel(channel, records)
+    path = os.path.join(directory, channel + "_0")
+    with open(path, 'rb') as f:
+        data = f.read()
+    with open(path, 'wb') as f:
+        f.write(compress(data))
+    return channel, directory
+
+
+@pytest.mark.parametrize("compression, compress", [
+    ("GZIP", gzip.compress),
+    ("ZLIB", zlib.compress),
+])
+def test_compressed_channel(compression, compress):
+    records = [str(i).encode() * 100 for i in range(1000)]
+    channel, directory = write_compressed_channel("A", records, compress)
+    dataset = PipeModeDataset(channel, pipe_dir=directory, state_dir=directory, config_dir=directory,
+                              compression=compression)
+    assert records == [record.numpy() for record in dataset]
+
+
+def test_zstd_compressed_channel():
+    zstandard = pytest.importorskip("zstandard")
+    records = [str(i).encode() * 100 for i in range(1000)]
+    channel, directory = write_compressed_channel("A", records, zstandard.ZstdCompressor().compress)
+    dataset = PipeModeDataset(channel, pipe_dir=directory, state_dir=directory, config_dir=directory,
+                              compression="ZSTD")
+    assert records == [record.numpy() for record in dataset]
+
+
+def test_invalid_compression():
+    channel, directory = write_to_channel("A", [b"bear"])
+    with pytest.raises(PipeModeDatasetException):
+        PipeModeDataset(channel, pipe_dir=directory, state_dir=directory, config_dir=directory, compression="LZ4")
+
+
+def test_ragged_batches():
+    records = [b"bear", b"", b"caterpillar", b"dolphin", b"elephant"]
+    channel, directory = write_to_channel("A", records)
+    dataset = PipeModeDataset(channel, pipe_dir=directory, state_dir=directory, config_dir=directory, batch_size=2,
+                              ragged_dtype=tf.uint8)
+    batches = list(dataset)
+    assert isinstance(batches[0], tf.RaggedTensor)
+    assert tf.uint8 == batches[0].dtype
+    assert [0, 4, 4] == batches[0].row_splits.numpy().tolist()
+    assert records == [bytes(row) for batch in batches for row in batch.to_list()]
+
+
+def test_ragged_numeric_batches():
+    tokens = [[1, 2, 3], [4], [], [5, 6]]
+    channel, directory = write_to_channel("A", [struct.pack('{}i'.format(len(row)), *row) for row in tokens])
+    dataset = PipeModeDataset(channel, pipe_dir=directory, state_dir=directory, config_dir=directory, batch_size=3,
+                              ragged_dtype=tf.int32)
+    assert [tokens[:3], tokens[3:]] == [batch.to_list() for batch in dataset]
+
+
+def test_ragged_batch_grows():
+    records = [bytes([i % 256]) * 40000 for i in range(5)]
+    channel, directory = write_to_channel("A", records)
+    dataset = PipeModeDataset(channel, pipe_dir=directory, state_dir=directory, config_dir=directory, batch_size=5,
+                              ragged_dtype=tf.uint8)
+    assert records == [bytes(row) for row in next(iter(dataset)).to_list()]
+
+
+def test_ragged_partial_value():
+    channel, directory = write_to_channel("A", [b"abc"])
+    dataset = PipeModeDataset(channel, pipe_dir=directory, state_dir=directory, config_dir=directory, batch_size=1,
+                              ragged_dtype=tf.int16)
+    with pytest.raises(tf.errors.InternalError):
+        list(dataset)
+
+
+def test_ragged_invalid_config():
+    channel, directory = write_to_channel("A", [b"bear"])
+    with pytest.raises(PipeModeDatasetException):
+        PipeModeDataset(channel, pipe_dir=directory, state_dir=directory, config_dir=directory, ragged_dtype=tf.uint8)
+    with pytest.raises(PipeModeDatasetException):
+        PipeModeDataset(channel, pipe_dir=directory, state_dir=directory, config_dir=directory, batch_size=2,
+                        ragged_dtype=tf.string)
+    with pytest.raises(PipeModeDatasetException):
+        PipeModeDataset(channel, record_format='CSV', pipe_dir=directory, state_dir=directory, config_dir=directory,
+                        batch_size=2, record_defaults=[0], ragged_dtype=tf.uint8)
+    with pytest.raises(PipeModeDatasetException):
+        PipeModeDataset(channel, pipe_dir=directory, state_dir=directory, config_dir=directory, batch_size=2)
+
+
+def _varint(value):
+    encoded = b""
+    while value >= 0x80:
+        encoded += struct.pack('B', (value & 0x7f) | 0x80)
+        value >>= 7
+    return encoded + struct.pack('B', value)
+
+
+def _length_delimited(field_number, data):
+    return _varint(field_number << 3 | 2) + _varint(len(data)) + data
+
+
+def _float32_tensor(values, keys=None, shape=None):
+    tensor = _length_delimited(1, struct.pack('{}f'.format(len(values)), *values))
+    if keys:
+        tensor += _length_delimited(2, b"".join(_varint(key) for key in keys))
+    if shape:
+        tensor += _length_delimited(3, b"".join(_varint(dim) for dim in shape))
+    return _length_delimited(2, tensor)
+
+
+def _protobuf_record(features, label=None):
+    """Encodes an aialgs.data.Record with Float32Tensor values."""
+    record = b""
+    for map_field, entries in ((1, features), (2, label or {})):
+        for key, value in entries.items():
+            record += _length_delimited(map_field, _length_delimited(1, key.encode()) + _length_delimited(2, value))
+    return record
+
+
+def test_recordio_protobuf_dense_features_and_labels():
+    records = [_protobuf_record({"values": _float32_tensor([i, i + 1.5])}, {"values": _float32_tensor([i % 2])})
+               for i in range(5)]
+    channel, directory = write_to_channel("A", records)
+    dataset = PipeModeDataset(channel, record_format='RecordIO-protobuf', pipe_dir=directory, state_dir=directory,
+                              config_dir=directory, batch_size=2,
+                              features={"values": tf.io.FixedLenFeature([2], tf.float32)},
+                              labels={"values": tf.io.FixedLenFeature([], tf.int32)})
+    batches = list(dataset)
+    assert [2, 2, 1] == [len(labels["values"]) for _, labels in batches]
+    features, labels = batches[0]
+    assert [[0, 1.5], [1, 2.5]] == features["values"].numpy().tolist()
+    assert [0, 1] == labels["values"].numpy().tolist()
+    assert tf.int32 == labels["values"].dtype
+
+
+def test_recordio_protobuf_sparse_features():
+    records = [_protobuf_record({"values": _float32_tensor([1, 2], keys=[3, 7], shape=[10])}),
+               _protobuf_record({"values": _float32_tensor([3], keys=[0], shape=[10])})]
+    channel, directory = write_to_channel("A", records)
+    dataset = PipeModeDataset(channel, record_format='RecordIO-protobuf', pipe_dir=directory, state_dir=directory,
+                              config_dir=directory, batch_size=4,
+                              features={"values": tf.io.VarLenFeature(tf.float32)})
+    features = next(iter(dataset))
+    assert isinstance(features["values"], tf.SparseTensor)
+    assert [[0, 3], [0, 7], [1, 0]] == features["values"].indices.numpy().tolist()
+    assert [1, 2, 3] == features["values"].values.numpy().tolist()
+    assert [2, 10] == features["values"].dense_shape.numpy().tolist()
+
+
+def test_recordio_protobuf_missing_feature():
+    channel, directory = write_to_channel("A", [_protobuf_record({"other": _float32_tensor([1])})])
+    dataset = PipeModeDataset(channel, record_format='RecordIO-protobuf', pipe_dir=directory, state_dir=directory,
+                              config_dir=directory, batch_size=1,
+                              features={"values": tf.io.FixedLenFeature([1], tf.float32)})
+    with pytest.raises(tf.errors.InternalError):
+        list(dataset)
+
+
+def test_recordio_protobuf_requires_batch_size():
+    channel, directory = write_to_channel("A", [b"bear"])
+    with pytest.raises(PipeModeDatasetException):
+        PipeModeDataset(channel, record_format='RecordIO-protobuf', pipe_dir=directory, state_dir=directory,
+                        config_dir=directory, features={"values": tf.io.FixedLenFeature([1], tf.float32)})
+    with pytest.raises(PipeModeDatasetException):
+        PipeModeDataset(channel, pipe_dir=directory, state_dir=directory, config_dir=directory, batch_size=2)
+
+
+def test_augmented_manifest_samples():
+    channel, directory = write_to_channel("A", [b"s3://bucket/a.jpg", b"1", b"s3://bucket/b.jpg", b"0"])
+    dataset = PipeModeDataset(channel, pipe_dir=directory, state_dir=directory, config_dir=directory,
+                              attribute_names=['source-ref', 'class'])
+    samples = [{name: value.numpy() for name, value in sample.items()} for sample in dataset]
+    assert [{'source-ref': b"s3://bucket/a.jpg", 'class': b"1"},
+            {'source-ref': b"s3://bucket/b.jpg", 'class': b"0"}] == samples
+
+
+def test_augmented_manifest_batches():
+    records = [attribute for i in range(5) for attribute in [b"image" + str(i).encode(), str(i).encode()]]
+    channel, directory = write_to_channel("A", records)
+    dataset = PipeModeDataset(channel, pipe_dir=directory, state_dir=directory, config_dir=directory,
+                              attribute_names=['source-ref', 'class'], batch_size=2)
+    batches = [batch['class'].numpy().tolist() for batch in dataset]
+    assert [[b"0", b"1"], [b"2", b"3"], [b"4"]] == batches
+
+
+def test_augmented_manifest_incomplete_sample():
+    channel, directory = write_to_channel("A", [b"s3://bucket/a.jpg", b"1", b"s3://bucket/b.jpg"])
+    dataset = PipeModeDataset(channel, pipe_dir=directory, state_dir=directory, config_dir=directory,
+                              attribute_names=['source-ref', 'class'])
+    with pytest.raises(tf.errors.InternalError):
+        list(dataset)
+
+
+def test_augmented_manifest_invalid_config():
+    channel, directory = write_to_channel("A", [b"bear"])
+    for kwargs in [{'record_format': 'TFRecord'}, {'attribute_names': ['a', 'a']}, {'shuffle_buffer_bytes': 1024},
+                   {'sample_rate': 0.5}, {'ragged_dtype': tf.int64}]:
+        kwargs = dict({'attribute_names': ['a', 'b']}, **kwargs)
+        with pytest.raises(PipeModeDatasetException):
+            PipeModeDataset(channel, pipe_dir=directory, state_dir=directory, config_dir=directory, **kwargs)
+
+
+def write_text_channel(channel, text):
+    directory = tempfile.mkdtemp()
+    write_config(directory, channel)
+    with open(os.path.join(directory, channel + "_0"), 'wb') as f:
+        f.write(text)
+    return channel, directory
+
+
+def test_csv_columns():
+    # Two files concatenated into the pipe, each with its own header
+    text = b"id,name,score,skipped\n1,bear,0.5,x\n2,,,y\nid,name,score,skipped\n3,\"cat, grey\",NA,z\n"
+    channel, directory = write_text_channel("A", text)
+    dataset = PipeModeDataset(channel, record_format='CSV', pipe_dir=directory, state_dir=directory,
+                              config_dir=directory, batch_size=2, header=True, na_value='NA',
+                              record_defaults=[tf.int64, "unknown", -1.0], select_cols=[0, 1, 2])
+    batches = [[column.numpy().tolist() for column in batch] for batch in dataset]
+    assert [[[1, 2], [b"bear", b"unknown"], [0.5, -1.0]], [[3], [b"cat, grey"], [-1.0]]] == batches
+    assert (tf.int64, tf.string, tf.float32) == tuple(spec.dtype for spec in dataset.element_spec)
+
+
+def test_csv_select_cols():
+    channel, directory = write_text_channel("A", b"a,1,b,2\nc,3,d,4\n")
+    dataset = PipeModeDataset(channel, record_format='CSV', pipe_dir=directory, state_dir=directory,
+                              config_dir=directory, batch_size=8, record_defaults=[tf.int32, tf.int32],
+                              select_cols=[1, 3])
+    ones, threes = next(iter(dataset))
+    assert [1, 3] == ones.numpy().tolist()
+    assert [2, 4] == threes.numpy().tolist()
+
+
+def test_csv_missing_required_value():
+    channel, directory = write_text_channel("A", b"1,\n")
+    dataset = PipeModeDataset(channel, record_format='CSV', pipe_dir=directory, state_dir=directory,
+                              config_dir=directory, batch_size=1, record_defaults=[tf.int32, tf.int32])
+    with pytest.raises(tf.errors.InternalError):
+        list(dataset)
+
+
+def test_csv_invalid_config():
+    channel, directory = write_text_channel("A", b"1\n")
+    with pytest.raises(PipeModeDatasetException):
+        PipeModeDataset(channel, record_format='CSV', pipe_dir=directory, state_dir=directory,
+                        config_dir=directory, batch_size=1)
+    with pytest.raises(PipeModeDatasetException):
+        PipeModeDataset(channel, record_format='CSV', pipe_dir=directory, state_dir=directory,
+                        config_dir=directory, batch_size=1, record_defaults=[0, 0], select_cols=[1, 0])
+    with pytest.raises(PipeModeDatasetException):
+        PipeModeDataset(channel, record_format='CSV', pipe_dir=directory, state_dir=directory,
+                        config_dir=directory, batch_size=1, record_defaults=[0], header=True,
+                        shuffle_buffer_bytes=1024)
+    with pytest.raises(PipeModeDatasetException):
+        PipeModeDataset(channel, record_format='TextLine', pipe_dir=directory, state_dir=directory,
+                        config_dir=directory, record_defaults=[0])
+
+
+def test_json_lines_fields():
+    text = (b'{"id": 1, "user": {"name": "bear", "skipped": {"deep": [1, 2]}}, "tags": ["a", "b"], "v": [1, 2]}\n'
+            b'\n'
+            b'{"v": [3.5, 4], "tags": [], "id": 2, "extra": "x"}\n')
+    channel, directory = write_text_channel("A", text)
+    dataset = PipeModeDataset(channel, record_format='JSONLines', pipe_dir=directory, state_dir=directory,
+                              config_dir=directory, batch_size=4,
+                              features={"id": tf.io.FixedLenFeature([], tf.int64),
+                                        "user.name": tf.io.FixedLenFeature([], tf.string, default_value="none"),
+                                        "tags": tf.io.RaggedFeature(tf.string),
+                                        "v": tf.io.FixedLenFeature([2], tf.float32)})
+    features = next(iter(dataset))
+    assert [1, 2] == features["id"].numpy().tolist()
+    assert [b"bear", b"none"] == features["user.name"].numpy().tolist()
+    assert isinstance(features["tags"], tf.RaggedTensor)
+    assert [[b"a", b"b"], []] == features["tags"].to_list()
+    assert [[1, 2], [3.5, 4]] == features["v"].numpy().tolist()
+
+
+def test_json_lines_missing_field():
+    channel, directory = write_text_channel("A", b'{"other": 1}\n')
+    dataset = PipeModeDataset(channel, record_format='JSONLines', pipe_dir=directory, state_dir=directory,
+                              config_dir=directory, batch_size=1, features={"id": tf.io.FixedLenFeature([], tf.int64)})
+    with pytest.raises(tf.errors.InternalError):
+        list(dataset)
+
+
+def test_json_lines_invalid_config():
+    channel, directory = write_text_channel("A", b'{}\n')
+    with pytest.raises(PipeModeDatasetException):
+        PipeModeDataset(channel, record_format='JSONLines', pipe_dir=directory, state_dir=directory,
+                        config_dir=directory, batch_size=1, features={"id": tf.io.FixedLenFeature([], tf.int64)},
+                        labels={"id": tf.io.FixedLenFeature([], tf.int64)})
+    with pytest.raises(PipeModeDatasetException):
+        PipeModeDataset(channel, record_format='JSONLines', pipe_dir=directory, state_dir=directory,
+                        config_dir=directory, batch_size=1,
+                        features={"id": tf.io.FixedLenFeature([], tf.int64, default_value=[1])})
+
+
+def write_arrow_channel(channel, tables):
+    pa = pytest.importorskip("pyarrow")
+    sink = pa.BufferOutputStream()
+    for table in tables:
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table, max_chunksize=2)
+    return write_text_channel(channel, sink.getvalue().to_pybytes())
+
+
+def test_arrow_stream_columns():
+    pa = pytest.importorskip("pyarrow")
+    tables = [pa.table({"x": pa.array([1.5, 2.5, 3.5], pa.float32()), "y": pa.array([1, None, 3], pa.int16()),
+                        "name": ["a", "b", None], "skipped": [[1], [2, 3], []]}),
+              pa.table({"name": ["c"], "x": pa.array([4.5], pa.float32()), "y": pa.array([4], pa.int16())})]
+    channel, directory = write_arrow_channel("A", tables)
+    dataset = PipeModeDataset(channel, record_format='ArrowStream', pipe_dir=directory, state_dir=directory,
+                              config_dir=directory,
+                              features={"x": tf.io.FixedLenFeature([], tf.float32),
+                                        "y": tf.io.FixedLenFeature([], tf.int64, default_value=-1),
+                                        "name": tf.io.FixedLenFeature([], tf.string, default_value="none")})
+    batches = list(dataset)
+    assert [[1.5, 2.5], [3.5], [4.5]] == [batch["x"].numpy().tolist() for batch in batches]
+    assert [[1, -1], [3], [4]] == [batch["y"].numpy().tolist() for batch in batches]
+    assert [[b"a", b"b"], [b"none"], [b"c"]] == [batch["name"].numpy().tolist() for batch in batches]
+
+
+def test_arrow_stream_missing_column():
+    pa = pytest.importorskip("pyarrow")
+    channel, directory = write_arrow_channel("A", [pa.table({"x": [1.5]})])
+    dataset = PipeModeDataset(channel, record_format='ArrowStream', pipe_dir=directory, state_dir=directory,
+                              config_dir=directory, features={"y": tf.io.FixedLenFeature([], tf.float32)})
+    with pytest.raises(tf.errors.InternalError):
+        list(dataset)
+
+
+def test_arrow_stream_huge_body_length():
+    # A flatbuffer Message with only a bodyLength field, of 2^40 bytes, followed by 8 bytes of body
+    metadata = struct.pack('<IHH6sHi4sq', 16, 12, 16, b'', 8, 12, b'', 1 << 40)
+    channel, directory = write_text_channel("A", struct.pack('<ii', -1, len(metadata)) + metadata + b"12345678")
+    dataset = PipeModeDataset(channel, record_format='ArrowStream', pipe_dir=directory, state_dir=directory,
+                              config_dir=directory, features={"x": tf.io.FixedLenFeature([], tf.float32)})
+    with pytest.raises(tf.errors.InternalError):
+        list(dataset)
+
+
+def test_arrow_stream_invalid_config():
+    channel, directory = write_text_channel("A", b'')
+    with pytest.raises(PipeModeDatasetException):
+        PipeModeDataset(channel, record_format='ArrowStream', pipe_dir=directory, state_dir=directory,
+                        config_dir=directory, batch_size=1, features={"x": tf.io.FixedLenFeature([], tf.float32)})
+    with pytest.raises(PipeModeDatasetException):
+        PipeModeDataset(channel, record_format='ArrowStream', pipe_dir=directory, state_dir=directory,
+                        config_dir=directory, features={"x": tf.io.FixedLenFeature([2], tf.float32)})
+    with pytest.raises(PipeModeDatasetException):
+        PipeModeDataset(channel, record_format='ArrowStream', pipe_dir=directory, state_dir=directory,
+                        config_dir=directory, shuffle_buffer_bytes=1024,
+                        features={"x": tf.io.FixedLenFeature([], tf.float32)})
+
+
+def fixed_length_records(values, labels):
+    return b"".join(b"hh" + struct.pack('3f', *value) + struct.pack('q', label) for value, label in zip(values, labels))
+
+
+def test_fixed_length_fields():
+    values = [[i, i + 0.5, -i] for i in range(5)]
+    channel, directory = write_text_channel("A", b"HEAD" + fixed_length_records(values, range(5)) + b"FT")
+    dataset = PipeModeDataset(channel, record_format='FixedLength', pipe_dir=directory, state_dir=directory,
+                              config_dir=directory, batch_size=2, header_bytes=4, footer_bytes=2,
+                              record_header_bytes=2,
+                              features={"values": tf.io.FixedLenFeature([3], tf.float32),
+                                        "label": tf.io.FixedLenFeature([], tf.int64)})
+    batches = list(dataset)
+    assert [2, 2, 1] == [len(batch["label"]) for batch in batches]
+    assert tf.float32 == batches[0]["values"].dtype
+    assert values == [value for batch in batches for value in batch["values"].numpy().tolist()]
+    assert list(range(5)) == [label for batch in batches for label in batch["label"].numpy().tolist()]
+
+
+def test_fixed_length_single_field():
+    channel, directory = write_text_channel("A", b"H" + struct.pack('12i', *range(12)))
+    dataset = PipeModeDataset(channel, record_format='FixedLength', pipe_dir=directory, state_dir=directory,
+                              config_dir=directory, batch_size=2, header_bytes=1,
+                              features={"pixels": tf.io.FixedLenFeature([2, 2], tf.int32)})
+    assert [[[[0, 1], [2, 3]], [[4, 5], [6, 7]]], [[[8, 9], [10, 11]]]] == \
+        [batch["pixels"].numpy().tolist() for batch in dataset]
+
+
+def test_fixed_length_shuffle_buffer():
+    values = [[i, i, i] for i in range(20)]
+    channel, directory = write_text_channel("A", fixed_length_records(values, range(20)))
+    dataset = PipeModeDataset(channel, record_format='FixedLength', pipe_dir=directory, state_dir=directory,
+                              config_dir=directory, batch_size=8, record_header_bytes=2,
+                              shuffle_buffer_bytes=200, seed=3,
+                              features={"values": tf.io.FixedLenFeature([3], tf.float32),
+                                        "label": tf.io.FixedLenFeature([], tf.int64)})
+    batches = list(dataset)
+    labels = [label for batch in batches for label in batch["label"].numpy().tolist()]
+    assert list(range(20)) == sorted(labels)
+    assert list(range(20)) != labels
+    assert [[label] * 3 for label in labels] == [value for batch in batches for value in batch["values"].numpy().tolist()]
+
+
+def test_fixed_length_file_channel():
+    directory = tempfile.mkdtemp()
+    write_config(directory, "A", "File")
+    os.makedirs(os.path.join(directory, "A"))
+    for index in range(2):
+        with open(os.path.join(directory, "A", "part-{}".format(index)), 'wb') as f:
+            f.write(b"HH" + struct.pack('2d', index, index + 0.5) + b"F")
+    dataset = PipeModeDataset("A", record_format='FixedLength', pipe_dir=directory, state_dir=directory,
+                              config_dir=directory, batch_size=4, header_bytes=2, footer_bytes=1,
+                              features={"x": tf.io.FixedLenFeature([], tf.float64)})
+    assert [0, 1, 0.5, 1.5] == next(iter(dataset))["x"].numpy().tolist()
+
+
+def test_fixed_length_partial_record():
+    channel, directory = write_text_channel("A", struct.pack('3f', 1, 2, 3))
+    dataset = PipeModeDataset(channel, record_format='FixedLength', pipe_dir=directory, state_dir=directory,
+                              config_dir=directory, batch_size=4,
+                              features={"x": tf.io.FixedLenFeature([2], tf.float32)})
+    with pytest.raises(tf.errors.InternalError):
+        list(dataset)
+
+
+def test_fixed_length_invalid_config():
+    channel, directory = write_text_channel("A", b'')
+    with pytest.raises(PipeModeDatasetException):
+        PipeModeDataset(channel, record_format='FixedLength', pipe_dir=directory, state_dir=directory,
+                        config_dir=directory, batch_size=1, features={"x": tf.io.FixedLenFeature([], tf.string)})
+    with pytest.raises(PipeModeDatasetException):
+        PipeModeDataset(channel, record_format='FixedLength', pipe_dir=directory, state_dir=directory,
+                        config_dir=directory, batch_size=1, features={"x": tf.io.VarLenFeature(tf.float32)})
+    with pytest.raises(PipeModeDatasetException):
+        PipeModeDataset(channel, record_format='FixedLength', pipe_dir=directory, state_dir=directory,
+                        config_dir=directory, batch_size=1, header_bytes=-1,
+                        features={"x": tf.io.FixedLenFeature([], tf.float32)})
+    with pytest.raises(PipeModeDatasetException):
+        PipeModeDataset(channel, record_format='FixedLength', pipe_dir=directory, state_dir=directory,
+                        config_dir=directory, features={"x": tf.io.FixedLenFeature([], tf.float32)})
+    with pytest.raises(PipeModeDatasetException):
+        PipeModeDataset(channel, pipe_dir=directory, state_dir=directory, config_dir=directory, header_bytes=4)
+
+
+def test_unknown_record_format():
+    channel, directory = write_text_channel("A", b'')
+    with pytest.raises(tf.errors.InvalidArgumentError):
+        PipeModeDataset(channel, record_format='LengthPrefixed', pipe_dir=directory, state_dir=directory,
+                        config_dir=directory)
+
+
+def test_missing_record_format_library():
+    channel, directory = write_text_channel("A", b'')
+    with pytest.raises(tf.errors.InvalidArgumentError):
+        PipeModeDataset(channel, record_format='LengthPrefixed', pipe_dir=directory, state_dir=directory,
+                        config_dir=directory, record_format_library=os.path.join(directory, 'missing.so'))
+
+
+def test_parallel_csv_batches():
+    text = b"".join(b"%d,%d\n" % (i, i * i) for i in range(1000))
+    channel, directory = write_text_channel("A", text)
+    dataset = PipeModeDataset(channel, record_format='CSV', pipe_dir=directory, state_dir=directory,
+                              config_dir=directory, batch_size=7, record_defaults=[tf.int64, tf.int64],
+                              num_parallel_calls=4)
+    batches = [(ids.numpy().tolist(), squares.numpy().tolist()) for ids, squares in dataset]
+    assert 143 == len(batches)
+    assert list(range(1000)) == [i for ids, _ in batches for i in ids]
+    assert [i * i for i in range(1000)] == [square for _, squares in batches for square in squares]
+
+
+def test_parallel_records_not_deterministic():
+    records = [b"record-%d" % i for i in range(500)]
+    channel, directory = write_to_channel("A", records)
+    dataset = PipeModeDataset(channel, pipe_dir=directory, state_dir=directory, config_dir=directory,
+                              num_parallel_calls=tf.data.AUTOTUNE, deterministic=False)
+    assert sorted(records) == sorted(record.numpy() for record in dataset)
+
+
+def test_parallel_ragged_batches():
+    tokens = [[i] * (i % 5) for i in range(100)]
+    channel, directory = write_to_channel("A", [struct.pack('{}i'.format(len(row)), *row) for row in tokens])
+    dataset = PipeModeDataset(channel, pipe_dir=directory, state_dir=directory, config_dir=directory, batch_size=8,
+                              ragged_dtype=tf.int32, num_parallel_calls=3)
+    assert tokens == [row for batch in dataset for row in batch.to_list()]
+
+
+def test_parallel_decode_error():
+    channel, directory = write_text_channel("A", b"1\n2\nx\n4\n")
+    dataset = PipeModeDataset(channel, record_format='CSV', pipe_dir=directory, state_dir=directory,
+                              config_dir=directory, batch_size=1, record_defaults=[tf.int32], num_parallel_calls=2)
+    with pytest.raises(tf.errors.InternalError):
+        list(dataset)
+
+
+def test_parallel_invalid_config():
+    channel, directory = write_text_channel("A", b"1\n")
+    with pytest.raises(PipeModeDatasetException):
+        PipeModeDataset(channel, pipe_dir=directory, state_dir=directory, config_dir=directory, num_parallel_calls=0)
+    with pytest.raises(PipeModeDatasetException):
+        PipeModeDataset(channel, pipe_dir=directory, state_dir=directory, config_dir=directory, deterministic=False)
+    with pytest.raises(PipeModeDatasetException):
+        PipeModeDataset(channel, record_format='CSV', pipe_dir=directory, state_dir=directory,
+                        config_dir=directory, batch_size=1, record_defaults=[0], header=True, num_parallel_calls=2)
+    with pytest.raises(PipeModeDatasetException):
+        PipeModeDataset(channel, record_format='ArrowStream', pipe_dir=directory, state_dir=directory,
+                        config_dir=directory, features={'x': tf.io.FixedLenFeature([], tf.int64)},
+                        num_parallel_calls=2)
+    with pytest.raises(tf.errors.InvalidArgumentError):
+        PipeModeDataset(channel, pipe_dir=directory, state_dir=directory, config_dir=directory,
+                        transforms=['Reverse'])
+
+
+def write_file_channel(channel, files, input_mode="File"):
+    directory = tempfile.mkdtemp()
+    write_config(directory, channel, input_mode)
+    for name, records in files.items():
+        path = os.path.join(directory, channel, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            for record in records:
+                write_recordio(f, record)
+    return channel, directory
+
+
+def test_augmented_manifest_file_channel():
+    channel, directory = write_file_channel("A", {
+        "part-0": [b"s3://bucket/a.jpg", b"1", b"s3://bucket/b.jpg", b"0"],
+        "part-1": [b"s3://bucket/c.jpg", b"1"],
+    })
+    dataset = PipeModeDataset(channel, pipe_dir=directory, state_dir=directory, config_dir=directory,
+                              attribute_names=['source-ref', 'class'])
+    samples = [(sample['source-ref'].numpy(), sample['class'].numpy()) for sample in dataset]
+    assert [(b"s3://bucket/a.jpg", b"1"), (b"s3://bucket/b.jpg", b"0"), (b"s3://bucket/c.jpg", b"1")] == samples
+    with pytest.raises(PipeModeDatasetException):
+        PipeModeDataset(channel, pipe_dir=directory, state_dir=directory, config_dir=directory,
+                        attribute_names=['source-ref', 'class'], parallel_files=2)
+
+
+@pytest.mark.parametrize("input_mode", ["File", "FastFile"])
+def test_file_channel(input_mode):
+    channel, directory = write_file_channel("A", {
+        "part-0": [b"a0", b"a1", b"a2"],
+        "part-1": [b"b0"],
+        "nested/part-2": [b"c0", b"c1"],
+    }, input_mode)
+    dataset = PipeModeDataset(channel, pipe_dir=directory, state_dir=directory, config_dir=directory,
+                              parallel_files=2)
+    # nested/part-2 sorts first, and replaces part-1 once it is exhausted
+    assert [b"c0", b"a0", b"c1", b"a1", b"b0", b"a2"] == [record.numpy() for record in dataset]
+    # Every iterator reads all of the channel's files
+    assert 6 == len(list(dataset))
+
+
+def test_file_channel_shards():
+    files = {"part-{}".format(i): [str(i).encode()] for i in range(5)}
+    channel, directory = write_file_channel("A", files)
+    shards = [[record.numpy() for record in PipeModeDataset(channel, pipe_dir=directory, state_dir=directory,
+                                                            config_dir=directory, num_shards=2, shard_index=index)]
+              for index in range(2)]
+    assert [[b"0", b"2", b"4"], [b"1", b"3"]] == shards
+
+
+def test_file_channel_not_deterministic():
+    files = {"part-{}".format(i): [str(i * 100 + j).encode() for j in range(100)] for i in range(6)}
+    channel, directory = write_file_channel("A", files)
+    dataset = PipeModeDataset(channel, pipe_dir=directory, state_dir=directory, config_dir=directory,
+                              parallel_files=3, deterministic=False)
+    assert sorted(record for records in files.values() for record in records) == \
+        sorted(record.numpy() for record in dataset)
+
+
+def test_compressed_file_channel():
+    records = [str(i).encode() * 100 for i in range(100)]
+    channel, directory = write_file_channel("A", {"part-0": records[:50], "part-1": records[50:]})
+    for name in ("part-0", "part-1"):
+        path = os.path.join(directory, channel, name)
+        with open(path, 'rb') as f:
+            data = f.read()
+        with open(path, 'wb') as f:
+            f.write(gzip.compress(data))
+    dataset = PipeModeDataset(channel, pipe_dir=directory, state_dir=directory, config_dir=directory,
+                              compression="GZIP", parallel_files=1)
+    assert records == [record.numpy() for record in dataset]
+
+
+def test_file_channel_invalid_config():
+    channel, directory = write_file_channel("A", {"part-0": [b"a"]})
+    with pytest.raises(PipeModeDatasetException):
+        PipeModeDataset(channel, pipe_dir=directory, state_dir=directory, config_dir=directory, shard_index=1)
+    with pytest.raises(PipeModeDatasetException):
+        PipeModeDataset(channel, pipe_dir=directory, state_dir=directory, config_dir=directory, parallel_files=0)
+    with pytest.raises(PipeModeDatasetException):
+        PipeModeDataset(channel, pipe_dir=directory, state_dir=directory, config_dir=directory,
+                        record_format='ArrowStream', features={'x': tf.io.FixedLenFeature([], tf.int64)})
+
+    channel, directory = write_to_channel("A", [b"bear"])
+    with pytest.raises(PipeModeDatasetException):
+        PipeModeDataset(channel, pipe_dir=directory, state_dir=directory, config_dir=directory, num_shards=2)
+
+
+def test_unsupported_input_mode():
+    directory = tempfile.mkdtemp()
+    write_config(directory, "A", "Unknown")
+    with pytest.raises(PipeModeDatasetException):
+        PipeModeDataset("A", pipe_dir=directory, state_dir=directory, config_dir=directory)
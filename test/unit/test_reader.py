@@ -0,0 +1,149 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+
+import asyncio
+import gzip
+import json
+import os
+import struct
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+import pytest
+
+from sagemaker_tensorflow import PipeModeReader, PipeModeReaderException, RecordBatch
+
+
+def write_config(directory, channel, input_mode="Pipe"):
+    with open(os.path.join(directory, 'inputdataconfig.json'), 'w') as f:
+        json.dump({channel: {"TrainingInputMode": input_mode}}, f)
+
+
+def recordio(records):
+    data = b""
+    for record in records:
+        data += struct.pack('II', 0xced7230a, len(record)) + record + b"\0" * (-len(record) % 4)
+    return data
+
+
+def crc32c(data):
+    crc = 0xffffffff
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0x82f63b78 if crc & 1 else crc >> 1
+    crc ^= 0xffffffff
+    return ((((crc >> 15) | (crc << 17)) & 0xffffffff) + 0xa282ead8) & 0xffffffff
+
+
+def tfrecord(records):
+    data = b""
+    for record in records:
+        length = struct.pack('Q', len(record))
+        data += length + struct.pack('I', crc32c(length)) + record + struct.pack('I', crc32c(record))
+    return data
+
+
+def write_pipes(channel, pipes, input_mode="Pipe"):
+    directory = tempfile.mkdtemp()
+    write_config(directory, channel, input_mode)
+    for index, data in enumerate(pipes):
+        with open(os.path.join(directory, "{}_{}".format(channel, index)), 'wb') as f:
+            f.write(data)
+    return directory
+
+
+def read_records(reader):
+    return [record for batch in reader for record in batch.to_list()]
+
+
+def test_import_without_tensorflow():
+    code = ("import sys; from sagemaker_tensorflow import PipeModeReader; "
+            "assert 'tensorflow' not in sys.modules")
+    subprocess.check_call([sys.executable, '-c', code], env=dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path)))
+
+
+def test_recordio_batches():
+    records = [b"bear", b"bunny", b"", b"caterpillar", b"dolphin"]
+    directory = write_pipes("A", [recordio(records), recordio([b"elephant"])])
+    reader = PipeModeReader("A", pipe_dir=directory, state_dir=directory, config_dir=directory, batch_size=2)
+    batches = list(reader)
+    assert [2, 2, 1] == [len(batch) for batch in batches]
+    assert isinstance(batches[0], RecordBatch)
+    assert np.uint8 == batches[0].values.dtype
+    assert [0, 4, 9] == batches[0].offsets.tolist()
+    assert records == [record for batch in batches for record in batch.to_list()]
+    assert b"bunny" == bytes(batches[0][-1])
+    # The next pass reads the channel's next pipe
+    assert [b"elephant"] == read_records(reader)
+
+
+def test_tfrecord():
+    records = [b"x" * 100, b"y", b"z" * 3]
+    directory = write_pipes("A", [tfrecord(records)])
+    reader = PipeModeReader("A", record_format='TFRecord', pipe_dir=directory, state_dir=directory,
+                            config_dir=directory)
+    assert records == read_records(reader)
+
+
+def test_text_line_max_batch_bytes():
+    directory = write_pipes("A", [gzip.compress(b"aaaa\nbb\ncccccc\nd\n")])
+    reader = PipeModeReader("A", record_format='TextLine', pipe_dir=directory, state_dir=directory,
+                            config_dir=directory, max_batch_bytes=5, compression='GZIP')
+    assert [[b"aaaa", b"bb"], [b"cccccc"], [b"d"]] == [batch.to_list() for batch in reader]
+
+
+def test_file_channel():
+    directory = tempfile.mkdtemp()
+    write_config(directory, "A", "File")
+    os.makedirs(os.path.join(directory, "A"))
+    for index in range(3):
+        with open(os.path.join(directory, "A", "part-{}".format(index)), 'wb') as f:
+            f.write(recordio([str(index).encode()]))
+    reader = PipeModeReader("A", pipe_dir=directory, state_dir=directory, config_dir=directory, num_shards=2)
+    assert [b"0", b"2"] == read_records(reader)
+    assert [b"0", b"2"] == read_records(reader)
+
+
+def test_async_iteration():
+    records = [str(i).encode() for i in range(10)]
+    directory = write_pipes("A", [recordio(records)])
+    reader = PipeModeReader("A", pipe_dir=directory, state_dir=directory, config_dir=directory, batch_size=4)
+
+    async def read():
+        return [record async for batch in reader for record in batch.to_list()]
+
+    assert records == asyncio.run(read())
+
+
+def test_closed_reader():
+    directory = write_pipes("A", [recordio([b"bear"])])
+    reader = PipeModeReader("A", pipe_dir=directory, state_dir=directory, config_dir=directory)
+    native = reader.open()
+    native.close()
+    with pytest.raises(ValueError):
+        native.read_batch(1)
+
+
+def test_invalid_config():
+    directory = write_pipes("A", [b""])
+    with pytest.raises(PipeModeReaderException):
+        PipeModeReader("B", pipe_dir=directory, state_dir=directory, config_dir=directory)
+    with pytest.raises(PipeModeReaderException):
+        PipeModeReader("A", record_format='CSV', pipe_dir=directory, state_dir=directory, config_dir=directory)
+    with pytest.raises(PipeModeReaderException):
+        PipeModeReader("A", pipe_dir=directory, state_dir=directory, config_dir=directory, batch_size=0)
+    with pytest.raises(PipeModeReaderException):
+        PipeModeReader("A", pipe_dir=directory, state_dir=directory, config_dir=directory, num_shards=2)